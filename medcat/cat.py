@@ -1,22 +1,27 @@
 import os
 import glob
 import shutil
-import pickle
 import json
 import logging
 import math
 import time
 import psutil
-from time import sleep
-from multiprocess import Process, Manager, cpu_count
-from multiprocess.queues import Queue
-from multiprocess.synchronize import Lock
-from typing import Union, List, Tuple, Optional, Dict, Iterable, Set
+import tempfile
+import queue
+import sys
+import random
+from multiprocess import Queue, cpu_count, get_context, get_all_start_methods
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Tuple, Optional, Dict, Iterable, Iterator, Set, Any, Container, Callable, MutableMapping
+from typing import TYPE_CHECKING
+from typing_extensions import TypeGuard
 from itertools import islice, chain, repeat
+from functools import partial
 from datetime import date
 from tqdm.autonotebook import tqdm, trange
 from spacy.tokens import Span, Doc, Token
 import humanfriendly
+import numpy as np
 
 from medcat import __version__
 from medcat.preprocessing.tokenizers import spacy_split_all
@@ -31,18 +36,23 @@ from medcat.utils.hasher import Hasher
 from medcat.ner.vocab_based_ner import NER
 from medcat.linking.context_based_linker import Linker
 from medcat.preprocessing.cleaners import prepare_name
-from medcat.meta_cat import MetaCAT
-from medcat.rel_cat import RelCAT
-from medcat.utils.meta_cat.data_utils import json_to_fake_spacy
+from medcat.preprocessing.name_cache import NameCache
 from medcat.config import Config
 from medcat.vocab import Vocab
-from medcat.ner.transformers_ner import TransformersNER
 from medcat.utils.saving.serializer import SPECIALITY_NAMES, ONE2MANY
 from medcat.utils.saving.envsnapshot import get_environment_info, ENV_SNAPSHOT_FILE_NAME
 from medcat.stats.stats import get_stats
 from medcat.stats.mctexport import count_all_annotations, iter_anns
 from medcat.utils.filters import set_project_filters
 from medcat.utils.usage_monitoring import UsageMonitor
+from medcat.utils.annotation_sinks import AnnotationSink, ResumeIndex, get_sink
+from medcat.utils.doc_cache import DiskDocCache
+from medcat.utils.parallel_training import TrainingDelta, TrainingTracker, merge_training_deltas
+from medcat.utils.worker_pool import WorkerPool
+if TYPE_CHECKING:
+    from medcat.meta_cat import MetaCAT
+    from medcat.rel_cat import RelCAT
+    from medcat.ner.transformers_ner import TransformersNER
 
 
 logger = logging.getLogger(__name__) # separate logger from the package-level one
@@ -53,6 +63,39 @@ HAS_NEW_SPACY = has_new_spacy()
 MIN_GEN_LEN_FOR_WARN = 10_000
 
 
+def _is_component(obj: Any, module_name: str, class_name: str) -> bool:
+    """Check whether an object is an instance of a (heavy) component class
+    without importing the module it is defined in.
+
+    The modules of the MetaCAT, RelCAT and TransformersNER components import
+    torch, transformers and the like, so they are only imported when needed.
+    An object can only be an instance of one of these classes if its module has
+    already been imported.
+
+    Args:
+        obj (Any): The object to check.
+        module_name (str): The name of the module the class is defined in.
+        class_name (str): The name of the class.
+
+    Returns:
+        bool: Whether the object is an instance of the class.
+    """
+    module = sys.modules.get(module_name)
+    return module is not None and isinstance(obj, getattr(module, class_name))
+
+
+def _is_meta_cat(obj: Any) -> TypeGuard['MetaCAT']:
+    return _is_component(obj, 'medcat.meta_cat', 'MetaCAT')
+
+
+def _is_rel_cat(obj: Any) -> TypeGuard['RelCAT']:
+    return _is_component(obj, 'medcat.rel_cat', 'RelCAT')
+
+
+def _is_transformers_ner(obj: Any) -> TypeGuard['TransformersNER']:
+    return _is_component(obj, 'medcat.ner.transformers_ner', 'TransformersNER')
+
+
 class CAT(object):
     """The main MedCAT class used to annotate documents, it is built on top of spaCy
     and works as a spaCy pipeline. Creates an instance of a spaCy pipeline that can
@@ -89,14 +132,15 @@ class CAT(object):
         >>> print(spacy_doc.ents) # Detected entities
     """
     DEFAULT_MODEL_PACK_NAME = "medcat_model_pack"
+    FAST_LOAD_MARKER = ".medcat_fast_load"
 
     def __init__(self,
                  cdb: CDB,
                  vocab: Union[Vocab, None] = None,
                  config: Optional[Config] = None,
-                 meta_cats: List[MetaCAT] = [],
-                 rel_cats: List[RelCAT] = [],
-                 addl_ner: Union[TransformersNER, List[TransformersNER]] = []) -> None:
+                 meta_cats: List['MetaCAT'] = [],
+                 rel_cats: List['RelCAT'] = [],
+                 addl_ner: Union['TransformersNER', List['TransformersNER']] = []) -> None:
         self.cdb = cdb
         self.vocab = vocab
         if config is None:
@@ -110,7 +154,11 @@ class CAT(object):
         self._rel_cats = rel_cats
         self._addl_ner = addl_ner if isinstance(addl_ner, list) else [addl_ner]
         self._create_pipeline(self.config)
+        # The cache of the prepared names (for adding / unlinking names)
+        self.name_cache = NameCache(self.config.preprocessing.name_cache_size)
         self.usage_monitor = UsageMonitor(self.config.version.id, self.config.general.usage_monitor)
+        # The time (in seconds) it took to load each of the components (if loaded from a model pack)
+        self.load_times: Dict[str, float] = {}
 
     def _create_pipeline(self, config: Config):
         # Set log level
@@ -236,7 +284,8 @@ class CAT(object):
                           model_pack_name: str = DEFAULT_MODEL_PACK_NAME,
                           force_rehash: bool = False,
                           change_description: Optional[str] = None,
-                          cdb_format: str = 'dill') -> str:
+                          cdb_format: str = 'dill',
+                          mmap_vectors: bool = False) -> str:
         """Will crete a .zip file containing all the models in the current running instance
         of MedCAT. This is not the most efficient way, for sure, but good enough for now.
 
@@ -254,7 +303,12 @@ class CAT(object):
                 The available formats are:
                 - dill
                 - json
+                - columnar (binary, see `medcat.utils.saving.columnar`)
                 Defaults to 'dill'
+            mmap_vectors (bool):
+                Whether to save the Vocab vectors and the CDB context vectors as separate
+                `.npy` files. These get memory mapped upon load so that multiple processes
+                on the same host can share them. Defaults to `False`.
 
         Returns:
             str:
@@ -289,7 +343,8 @@ class CAT(object):
 
         # Save the CDB
         cdb_path = os.path.join(save_dir_path, "cdb.dat")
-        self.cdb.save(cdb_path, json_path)
+        self.cdb.save(cdb_path, json_path, mmap_vectors=mmap_vectors,
+                      columnar=cdb_format.lower() == 'columnar')
 
         # Save the config
         config_path = os.path.join(save_dir_path, "config.json")
@@ -299,21 +354,21 @@ class CAT(object):
         vocab_path = os.path.join(save_dir_path, "vocab.dat")
         if self.vocab is not None:
             # We will allow creation of modelpacks without vocabs
-            self.vocab.save(vocab_path)
+            self.vocab.save(vocab_path, mmap_vectors=mmap_vectors)
 
         # Save addl_ner
         for comp in self.pipe.spacy_nlp.components:
-            if isinstance(comp[1], TransformersNER):
+            if _is_transformers_ner(comp[1]):
                 trf_path = os.path.join(save_dir_path, "trf_" + comp[1].config.general.name)
                 comp[1].save(trf_path)
 
         # Save all meta_cats
         for comp in self.pipe.spacy_nlp.components:
-            if isinstance(comp[1], MetaCAT):
+            if _is_meta_cat(comp[1]):
                 name = comp[0]
                 meta_path = os.path.join(save_dir_path, "meta_" + name)
                 comp[1].save(meta_path)
-            if isinstance(comp[1], RelCAT):
+            if _is_rel_cat(comp[1]):
                 name = comp[0]
                 rel_path = os.path.join(save_dir_path, "rel_" + name)
                 comp[1].save(rel_path)
@@ -361,6 +416,84 @@ class CAT(object):
             shutil.unpack_archive(zip_path, extract_dir=model_pack_path)
         return model_pack_path
 
+    @classmethod
+    def get_fast_load_path(cls, model_pack_path: str, cache_dir: str) -> str:
+        """Get the path of the fast-load form of an (unpacked) model pack.
+
+        In the fast-load form, the CDB is saved in the columnar format (see
+        `medcat.utils.saving.columnar`) and the CDB context vectors as well as the
+        Vocab vectors are saved so that they can be memory mapped. The rest of the
+        model pack is copied as is.
+
+        The fast-load form is kept in the cache folder (under the hash of the model)
+        and created upon first use.
+
+        Args:
+            model_pack_path (str): The path of the unpacked model pack.
+            cache_dir (str): The cache folder.
+
+        Returns:
+            str: The path of the fast-load form. Or the original path if the model has no hash.
+
+        Raises:
+            OSError: If the fast-load form could not be created.
+        """
+        config_path = os.path.join(model_pack_path, "config.json")
+        model_hash = None
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                model_hash = json.load(f).get('version', {}).get('id')
+        if not model_hash:
+            logger.warning("Unable to use the fast-load cache for a model pack without a hash (%s)",
+                           model_pack_path)
+            return model_pack_path
+        fast_load_path = os.path.join(cache_dir, model_hash)
+        marker_path = os.path.join(fast_load_path, cls.FAST_LOAD_MARKER)
+        if os.path.exists(marker_path):
+            with open(marker_path) as f:
+                if f.read() == __version__:
+                    logger.info("Found the fast-load form of the model pack at %s", fast_load_path)
+                    return fast_load_path
+            logger.info("The fast-load form at %s was created with a different version of MedCAT "
+                        "- recreating it", fast_load_path)
+            shutil.rmtree(fast_load_path)
+        logger.info("Creating the fast-load form of the model pack at %s", fast_load_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        # NOTE: created in a temporary folder first so that (concurrently) loading
+        #       processes never see a partially converted model pack
+        temp_path = tempfile.mkdtemp(dir=cache_dir, prefix=f".{model_hash}_")
+        try:
+            ignored = ['cdb*', 'vocab*'] + [f'{name}.json' for name in SPECIALITY_NAMES]
+            shutil.copytree(model_pack_path, temp_path, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns(*ignored))
+            cls.load_cdb(model_pack_path).save(os.path.join(temp_path, "cdb.dat"), columnar=True)
+            vocab_path = os.path.join(model_pack_path, "vocab.dat")
+            if os.path.exists(vocab_path):
+                Vocab.load(vocab_path).save(os.path.join(temp_path, "vocab.dat"), mmap_vectors=True)
+            with open(os.path.join(temp_path, cls.FAST_LOAD_MARKER), 'w') as f:
+                f.write(__version__)
+            os.rename(temp_path, fast_load_path)
+        except OSError:
+            if not os.path.exists(marker_path):
+                raise
+            # created by another process in the meantime
+            shutil.rmtree(temp_path, ignore_errors=True)
+        return fast_load_path
+
+    @staticmethod
+    def _load_components(loaders: Dict[str, Callable[[], Any]], n_threads: int,
+                         load_times: Dict[str, float]) -> Dict[str, Any]:
+        def load(name: str) -> Any:
+            start = time.perf_counter()
+            component = loaders[name]()
+            load_times[name] = time.perf_counter() - start
+            return component
+        if n_threads <= 1:
+            return {name: load(name) for name in loaders}
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            futures = {name: executor.submit(load, name) for name in loaders}
+            return {name: future.result() for name, future in futures.items()}
+
     @classmethod
     def load_model_pack(cls,
                         zip_path: str,
@@ -369,10 +502,14 @@ class CAT(object):
                         medcat_config_dict: Optional[Dict] = None,
                         load_meta_models: bool = True,
                         load_addl_ner: bool = True,
-                        load_rel_models: bool = True) -> "CAT":
+                        load_rel_models: bool = True,
+                        n_threads: int = 1,
+                        fast_load_cache_dir: Optional[str] = None) -> "CAT":
         """Load everything within the 'model pack', i.e. the CDB, config, vocab and any MetaCAT models
         (if present)
 
+        The time it took to load each of the components is logged and kept in `CAT.load_times`.
+
         Args:
             zip_path (str):
                 The path to model pack zip.
@@ -394,56 +531,81 @@ class CAT(object):
                 Whether to load additional NER models if present (Default value True).
             load_rel_models (bool):
                 Whether to load RelCAT models if present (Default value True).
+            n_threads (int):
+                The number of threads to load the (independent) components with, i.e the CDB,
+                the Vocab and each of the MetaCAT, RelCAT and additional NER models. Defaults to 1.
+            fast_load_cache_dir (Optional[str]):
+                If specified, the model pack is loaded from its fast-load form kept in this folder
+                (which is created upon first use, see `CAT.get_fast_load_path`). Defaults to None.
 
         Returns:
             CAT: The resulting CAT object.
         """
         from medcat.cdb import CDB
         from medcat.vocab import Vocab
-        from medcat.meta_cat import MetaCAT
-        from medcat.rel_cat import RelCAT
 
+        load_times: Dict[str, float] = {}
+        start = time.perf_counter()
         model_pack_path = cls.attempt_unpack(zip_path)
-
-        # Load the CDB
-        cdb: CDB = cls.load_cdb(model_pack_path)
-
-        # load config
-        config_path = os.path.join(model_pack_path, "config.json")
-        cdb.load_config(config_path, medcat_config_dict)
+        load_times['unpack'] = time.perf_counter() - start
+        if fast_load_cache_dir is not None:
+            cache_start = time.perf_counter()
+            model_pack_path = cls.get_fast_load_path(model_pack_path, fast_load_cache_dir)
+            load_times['fast_load_cache'] = time.perf_counter() - cache_start
+
+        def load_cdb() -> CDB:
+            cdb: CDB = cls.load_cdb(model_pack_path)
+            # load config
+            config_path = os.path.join(model_pack_path, "config.json")
+            cdb.load_config(config_path, medcat_config_dict)
+            # Modify the config to contain full path to spacy model
+            cdb.config.general.spacy_model = os.path.join(model_pack_path, os.path.basename(cdb.config.general.spacy_model))
+            return cdb
 
         # TODO load addl_ner
 
-        # Modify the config to contain full path to spacy model
-        cdb.config.general.spacy_model = os.path.join(model_pack_path, os.path.basename(cdb.config.general.spacy_model))
-
-        # Load Vocab
+        loaders: Dict[str, Callable[[], Any]] = {'cdb': load_cdb}
         vocab_path = os.path.join(model_pack_path, "vocab.dat")
         if os.path.exists(vocab_path):
-            vocab = Vocab.load(vocab_path)
-        else:
-            vocab = None
+            loaders['vocab'] = partial(Vocab.load, vocab_path)
 
         # Find ner models in the model_pack
         trf_paths = [os.path.join(model_pack_path, path) for path in os.listdir(model_pack_path) if path.startswith('trf_')] if load_addl_ner else []
-        addl_ner = []
+        if trf_paths:
+            from medcat.ner.transformers_ner import TransformersNER
         for trf_path in trf_paths:
-            trf = TransformersNER.load(save_dir_path=trf_path,config_dict=ner_config_dict)
-            trf.cdb = cdb # Set the cat.cdb to be the CDB of the TRF model
-            addl_ner.append(trf)
+            loaders[os.path.basename(trf_path)] = partial(TransformersNER.load, save_dir_path=trf_path, config_dict=ner_config_dict)
 
         # Find metacat models in the model_pack
-        meta_cats: List[MetaCAT] = []
-        if load_meta_models:
-            meta_cats = [mc[1] for mc in cls.load_meta_cats(model_pack_path, meta_cat_config_dict)]
+        meta_paths = [os.path.join(model_pack_path, path) for path in os.listdir(model_pack_path) if path.startswith('meta_')] if load_meta_models else []
+        if meta_paths:
+            from medcat.meta_cat import MetaCAT
+        for meta_path in meta_paths:
+            loaders[os.path.basename(meta_path)] = partial(MetaCAT.load, save_dir_path=meta_path, config_dict=meta_cat_config_dict)
 
         # Find Rel models in model_pack
         rel_paths = [os.path.join(model_pack_path, path) for path in os.listdir(model_pack_path) if path.startswith('rel_')] if load_rel_models else []
-        rel_cats = []
+        if rel_paths:
+            from medcat.rel_cat import RelCAT
         for rel_path in rel_paths:
-            rel_cats.append(RelCAT.load(load_path=rel_path))
+            loaders[os.path.basename(rel_path)] = partial(RelCAT.load, load_path=rel_path)
+
+        components = cls._load_components(loaders, n_threads, load_times)
+        cdb = components['cdb']
+        vocab = components.get('vocab')
+        addl_ner = [components[os.path.basename(trf_path)] for trf_path in trf_paths]
+        for trf in addl_ner:
+            trf.cdb = cdb # Set the cat.cdb to be the CDB of the TRF model
+        meta_cats: List['MetaCAT'] = [components[os.path.basename(meta_path)] for meta_path in meta_paths]
+        rel_cats = [components[os.path.basename(rel_path)] for rel_path in rel_paths]
 
+        pipe_start = time.perf_counter()
         cat = cls(cdb=cdb, config=cdb.config, vocab=vocab, meta_cats=meta_cats, addl_ner=addl_ner, rel_cats=rel_cats)
+        load_times['pipe'] = time.perf_counter() - pipe_start
+        load_times['total'] = time.perf_counter() - start
+        cat.load_times = load_times
+        logger.info("Loaded the model pack in %.2fs (%s)", load_times['total'],
+                    ', '.join(f'{name}: {secs:.2f}s' for name, secs in load_times.items() if name != 'total'))
         logger.info(cat.get_model_card())  # Print the model card
 
         return cat
@@ -463,12 +625,13 @@ class CAT(object):
         nr_of_jsons_expected = len(SPECIALITY_NAMES) - len(ONE2MANY)
         has_jsons = len(glob.glob(os.path.join(model_pack_path, '*.json'))) >= nr_of_jsons_expected
         json_path = model_pack_path if has_jsons else None
-        logger.info('Loading model pack with %s', 'JSON format' if json_path else 'dill format')
+        # NOTE: the columnar format is identified by the serializer itself
+        logger.info('Loading model pack with %s', 'JSON format' if json_path else 'dill or columnar format')
         cdb = CDB.load(cdb_path, json_path)
         return cdb
 
     @classmethod
-    def load_meta_cats(cls, model_pack_path: str, meta_cat_config_dict: Optional[Dict] = None) -> List[Tuple[str, MetaCAT]]:
+    def load_meta_cats(cls, model_pack_path: str, meta_cat_config_dict: Optional[Dict] = None) -> List[Tuple[str, 'MetaCAT']]:
         """
 
         Args:
@@ -481,6 +644,7 @@ class CAT(object):
         Returns:
             List[Tuple(str, MetaCAT)]: list of pairs of meta cat model names (i.e. the task name) and the MetaCAT models.
         """
+        from medcat.meta_cat import MetaCAT
         meta_paths = [os.path.join(model_pack_path, path)
                       for path in os.listdir(model_pack_path) if path.startswith('meta_')]
         meta_cats = []
@@ -535,6 +699,29 @@ class CAT(object):
                 text = self._get_trimmed_text(text)
                 return self.pipe(text)  # type: ignore
 
+    def _pipe_cached(self, texts: Iterable[str],
+                     doc_cache: Optional[MutableMapping[str, Doc]] = None,
+                     include_preprocessing: bool = False,
+                     per_document: bool = False) -> Iterator[Optional[Doc]]:
+        # the same as calling the model for each text, but the base spacy model is run
+        # in batches and its results can be re-used (see `Pipe.pipe_cached`)
+        self.config.linking.train = False
+        texts = [str(text) for text in texts]
+        trimmed_texts = [self._get_trimmed_text(text) for text in texts]
+        docs = self.pipe.pipe_cached(trimmed_texts, doc_cache=doc_cache,
+                                     include_preprocessing=include_preprocessing,
+                                     per_document=per_document)
+        for text, trimmed_text, doc in zip(texts, trimmed_texts, docs):
+            if self.config.general.usage_monitor.enabled:
+                if doc is None:
+                    nents = 0
+                elif self.config.general.show_nested_entities:
+                    nents = len(doc._.ents)  # type: ignore
+                else:
+                    nents = len(doc.ents)
+                self.usage_monitor.log_inference(len(text), len(trimmed_text), nents)
+            yield doc
+
     def __repr__(self) -> str:
         """Prints the model_card for this CAT instance.
 
@@ -551,7 +738,8 @@ class CAT(object):
                      use_cui_doc_limit: bool = False,
                      use_groups: bool = False,
                      extra_cui_filter: Optional[Set] = None,
-                     do_print: bool = True) -> Tuple:
+                     do_print: bool = True,
+                     doc_cache: Optional[Dict[str, Doc]] = None) -> Tuple:
         """TODO: Refactor and make nice
         Print metrics on a dataset (F1, P, R), it will also print the concepts that have the most FP,FN,TP.
 
@@ -575,6 +763,9 @@ class CAT(object):
                 This filter will be intersected with all other filters, or if all others are not set then only this one will be used.
             do_print (bool):
                 Whether to print stats out. Defaults to True.
+            doc_cache (Optional[Dict[str, Doc]]):
+                The cache for the documents processed by the base spacy model (see `get_stats`).
+                Defaults to None.
 
         Returns:
             fps (dict):
@@ -596,7 +787,8 @@ class CAT(object):
         """
         return get_stats(self, data=data, epoch=epoch, use_project_filters=use_project_filters,
                          use_overlaps=use_overlaps, use_cui_doc_limit=use_cui_doc_limit,
-                         use_groups=use_groups, extra_cui_filter=extra_cui_filter, do_print=do_print)
+                         use_groups=use_groups, extra_cui_filter=extra_cui_filter, do_print=do_print,
+                         doc_cache=doc_cache)
 
     def _init_ckpts(self, is_resumed, checkpoint):
         if self.config.general.checkpoint.steps is not None or checkpoint is not None:
@@ -623,10 +815,18 @@ class CAT(object):
               fine_tune: bool = True,
               progress_print: int = 1000,
               checkpoint: Optional[Checkpoint] = None,
-              is_resumed: bool = False) -> None:
+              is_resumed: bool = False,
+              nproc: int = 1,
+              merge_steps: int = 10000) -> None:
         """Runs training on the data, note that the maximum length of a line
         or document is 1M characters. Anything longer will be trimmed.
 
+        If more than one process is used, the data is read in chunks of `merge_steps`
+        lines/documents. Each chunk is split between the processes which train on
+        their own copies of the CDB. Afterwards, the changes are merged into the CDB
+        (see `medcat.utils.parallel_training.merge_training_deltas`). So the
+        results are (slightly) different from training in a single process.
+
         Args:
             data_iterator (Iterable):
                 Simple iterator over sentences/documents, e.g. a open file
@@ -641,6 +841,12 @@ class CAT(object):
                 The MedCAT checkpoint object
             is_resumed (bool):
                 If True resume the previous training; If False, start a fresh new training.
+            nproc (int):
+                The number of processes to train in. Defaults to 1.
+            merge_steps (int):
+                The number of lines/documents (over all processes) after which the changes
+                made by the different processes are merged. Only used if `nproc` > 1.
+                Defaults to 10000.
         """
         if not fine_tune:
             logger.info("Removing old training data!")
@@ -652,18 +858,16 @@ class CAT(object):
 
         latest_trained_step = checkpoint.count if checkpoint is not None else 0
         epochal_data_iterator = chain.from_iterable(repeat(data_iterator, nepochs))
+        if nproc > 1:
+            if 'fork' in get_all_start_methods():
+                self._train_parallel(islice(epochal_data_iterator, latest_trained_step, None),
+                                     latest_trained_step, progress_print, checkpoint, nproc, merge_steps)
+                self.config.linking.train = _prev_train
+                return
+            logger.warning("Unable to train in parallel since forking processes is not "
+                           "supported on this platform - training in a single process")
         for line in islice(epochal_data_iterator, latest_trained_step, None):
-            if line is not None and line:
-                # Convert to string
-                line = str(line).strip()
-
-                try:
-                    _ = self(line, do_train=True)
-                except Exception as e:
-                    logger.warning("LINE: '%s...' \t WAS SKIPPED", line[0:100])
-                    logger.warning("BECAUSE OF: %s", str(e))
-            else:
-                logger.warning("EMPTY LINE WAS DETECTED AND SKIPPED")
+            self._train_line(line)
 
             latest_trained_step += 1
             if latest_trained_step % progress_print == 0:
@@ -673,6 +877,84 @@ class CAT(object):
 
         self.config.linking.train = _prev_train
 
+    def _train_line(self, line: Any) -> None:
+        if line is not None and line:
+            # Convert to string
+            line = str(line).strip()
+
+            try:
+                _ = self(line, do_train=True)
+            except Exception as e:
+                logger.warning("LINE: '%s...' \t WAS SKIPPED", line[0:100])
+                logger.warning("BECAUSE OF: %s", str(e))
+        else:
+            logger.warning("EMPTY LINE WAS DETECTED AND SKIPPED")
+
+    def _train_parallel(self,
+                        data_iterator: Iterator,
+                        latest_trained_step: int,
+                        progress_print: int,
+                        checkpoint: Optional[Checkpoint],
+                        nproc: int,
+                        merge_steps: int) -> None:
+        ctx = get_context('fork')
+        out_q = ctx.Queue()
+
+        def train_shard(shard_nr: int, shard: List, seed: int) -> None:
+            # NOTE: the (forked) process has its own copy of the CDB
+            #       so only the changes made to it are sent back
+            try:
+                random.seed(seed)
+                np.random.seed(seed % 2**32)
+                with TrainingTracker(self.cdb) as tracker:
+                    for line in shard:
+                        self._train_line(line)
+                out_q.put((shard_nr, tracker.get_delta(), None))
+            except Exception as e:
+                out_q.put((shard_nr, None, repr(e)))
+
+        while True:
+            # make sure the checkpoints are saved at the same steps as when training in a single process
+            chunk_size = merge_steps
+            if checkpoint is not None and checkpoint.steps is not None:
+                chunk_size = min(chunk_size, checkpoint.steps - latest_trained_step % checkpoint.steps)
+            chunk = list(islice(data_iterator, chunk_size))
+            if not chunk:
+                break
+            shards = [chunk[shard_nr::nproc] for shard_nr in range(min(nproc, len(chunk)))]
+            procs = []
+            deltas: Dict[int, TrainingDelta] = {}
+            try:
+                for shard_nr, shard in enumerate(shards):
+                    proc = ctx.Process(target=train_shard, args=(shard_nr, shard, random.getrandbits(64)))
+                    proc.start()
+                    procs.append(proc)
+                while len(deltas) < len(procs):
+                    try:
+                        shard_nr, delta, error = out_q.get(timeout=1)
+                    except queue.Empty:
+                        for shard_nr, proc in enumerate(procs):
+                            if shard_nr not in deltas and not proc.is_alive() and out_q.empty():
+                                raise RuntimeError(f"The training process for shard {shard_nr} died "
+                                                   f"unexpectedly (exit code {proc.exitcode})")
+                        continue
+                    if error is not None:
+                        raise RuntimeError(f"Failed to train on shard {shard_nr}: {error}")
+                    deltas[shard_nr] = delta
+            finally:
+                for proc in procs:
+                    if proc.is_alive() and len(deltas) < len(procs):
+                        proc.terminate()
+                    proc.join()
+            merge_training_deltas(self.cdb, [deltas[shard_nr] for shard_nr in range(len(shards))])
+
+            prev_trained_step = latest_trained_step
+            latest_trained_step += len(chunk)
+            if latest_trained_step // progress_print > prev_trained_step // progress_print:
+                logger.info("DONE: %s", str(latest_trained_step))
+            if checkpoint is not None and checkpoint.steps is not None and latest_trained_step % checkpoint.steps == 0:
+                checkpoint.save(cdb=self.cdb, count=latest_trained_step)
+
     def add_cui_to_group(self, cui: str, group_name: str) -> None:
         """Adds a CUI to a group, will appear in cdb.addl_info['cui2group']
 
@@ -689,6 +971,7 @@ class CAT(object):
 
         # Add group_name
         self.cdb.addl_info['cui2group'][cui] = group_name
+        self.cdb.mark_dirty('addl_info')
 
     def unlink_concept_name(self, cui: str, name: str, preprocessed_name: bool = False) -> None:
         """Unlink a concept name from the CUI (or all CUIs if full_unlink), removes the link from
@@ -713,7 +996,7 @@ class CAT(object):
         if preprocessed_name:
             names = {name: {'nothing': 'nothing'}}
         else:
-            names = prepare_name(name, self.pipe.spacy_nlp, {}, self.config)
+            names = prepare_name(name, self.pipe.spacy_nlp, {}, self.config, self.name_cache)
 
         # If full unlink find all CUIs
         if self.config.general.full_unlink:
@@ -773,7 +1056,7 @@ class CAT(object):
             do_add_concept (bool):
                 Whether to add concept to CDB.
         """
-        names = prepare_name(name, self.pipe.spacy_nlp, {}, self.config)
+        names = prepare_name(name, self.pipe.spacy_nlp, {}, self.config, self.name_cache)
         if not names and cui not in self.cdb.cui2preferred_name and name_status == 'P':
             logger.warning("No names were able to be prepared in CAT.add_and_train_concept "
                            "method. As such no preferred name will be able to be specifeid. "
@@ -819,7 +1102,9 @@ class CAT(object):
                                    checkpoint: Optional[Checkpoint] = None,
                                    retain_filters: bool = False,
                                    is_resumed: bool = False,
-                                   train_meta_cats: bool = False) -> Tuple:
+                                   train_meta_cats: bool = False,
+                                   cache_docs: bool = False,
+                                   doc_cache_dir: Optional[str] = None) -> Tuple:
         """
         Run supervised training on a dataset from MedCATtrainer in JSON format.
 
@@ -836,7 +1121,8 @@ class CAT(object):
                                          devalue_others, use_groups, never_terminate,
                                          train_from_false_positives, extra_cui_filter,
                                          retain_extra_cui_filter, checkpoint,
-                                         retain_filters, is_resumed, train_meta_cats)
+                                         retain_filters, is_resumed, train_meta_cats,
+                                         cache_docs, doc_cache_dir)
 
     def train_supervised_raw(self,
                              data: Dict[str, List[Dict[str, dict]]],
@@ -857,7 +1143,9 @@ class CAT(object):
                              checkpoint: Optional[Checkpoint] = None,
                              retain_filters: bool = False,
                              is_resumed: bool = False,
-                             train_meta_cats: bool = False) -> Tuple:
+                             train_meta_cats: bool = False,
+                             cache_docs: bool = False,
+                             doc_cache_dir: Optional[str] = None) -> Tuple:
         """Train supervised based on the raw data provided.
 
         The raw data is expected in the following format:
@@ -936,6 +1224,15 @@ class CAT(object):
                 If True resume the previous training; If False, start a fresh new training.
             train_meta_cats (bool):
                 If True, also trains the appropriate MetaCATs.
+            cache_docs (bool):
+                If True, the tokenised and preprocessed (i.e tagged and normalised) documents are cached
+                during the first epoch so that only NER and linking is re-run in subsequent epochs.
+                NOTE: The spell checking of the cached documents will not take into account any words
+                added to the CDB during training. Defaults to False.
+            doc_cache_dir (Optional[str]):
+                If set (and caching documents), the cached documents are kept on disk (in a temporary
+                directory within this one) instead of in memory. Useful for large training sets.
+                Defaults to None.
 
         Raises:
             ValueError: If attempting to retain filters with while training over multiple projects.
@@ -986,13 +1283,17 @@ class CAT(object):
         else:
             train_set, test_set, _, _ = make_mc_train_test(data, self.cdb, test_size=test_size)
 
+        # the test set is evaluated after (some of) the epochs, and the output
+        # of the base spacy model for each of its documents doesn't change
+        test_doc_cache: Dict[str, Doc] = {}
         if print_stats > 0:
             fp, fn, tp, p, r, f1, cui_counts, examples = self._print_stats(test_set,
                                                                            use_project_filters=use_filters,
                                                                            use_cui_doc_limit=use_cui_doc_limit,
                                                                            use_overlaps=use_overlaps,
                                                                            use_groups=use_groups,
-                                                                           extra_cui_filter=extra_cui_filter)
+                                                                           extra_cui_filter=extra_cui_filter,
+                                                                           doc_cache=test_doc_cache)
         if reset_cui_count:
             # Get all CUIs
             cuis = []
@@ -1001,9 +1302,11 @@ class CAT(object):
                     doc_annotations = self._get_doc_annotations(doc)
                     for ann in doc_annotations:
                         cuis.append(ann['cui'])
+            self.cdb.record_change('cui2count_train', set(cuis))
             for cui in set(cuis):
                 if cui in self.cdb.cui2count_train:
                     self.cdb.cui2count_train[cui] = 100
+            self.cdb.mark_dirty('cui2count_train')
 
         # Remove entities that were terminated
         if not never_terminate:
@@ -1014,87 +1317,107 @@ class CAT(object):
                         if ann.get('killed', False):
                             self.unlink_concept_name(ann['cui'], ann['value'])
 
-        latest_trained_step = checkpoint.count if checkpoint is not None else 0
-        current_epoch, current_project, current_document = self._get_training_start(train_set, latest_trained_step)
-
-        for epoch in trange(current_epoch, nepochs, initial=current_epoch, total=nepochs, desc='Epoch', leave=False):
-            # Print acc before training
-            for idx_project in trange(current_project, len(train_set['projects']), initial=current_project, total=len(train_set['projects']), desc='Project', leave=False):
-                project = train_set['projects'][idx_project]
-
-                # if retain filters, but not the extra_cui_filters (and they exist),
-                # then we need to do project filters alone, then retain, and only
-                # then add the extra CUI filters
-                if retain_filters and extra_cui_filter and not retain_extra_cui_filter:
-                    # adding project filters without extra_cui_filters
-                    set_project_filters(self.cdb.addl_info, local_filters, project, set(), use_filters)
-                    orig_filters.merge_with(local_filters)
-                    # adding extra_cui_filters, but NOT project filters
-                    set_project_filters(self.cdb.addl_info, local_filters, project, extra_cui_filter, False)
-                    # refrain from doing it again for subsequent epochs
-                    retain_filters = False
-                else:
-                    # Set filters in case we are using the train_from_fp
-                    set_project_filters(self.cdb.addl_info, local_filters, project, extra_cui_filter, use_filters)
-
-                for idx_doc in trange(current_document, len(project['documents']), initial=current_document, total=len(project['documents']), desc='Document', leave=False):
-                    doc = project['documents'][idx_doc]
-                    spacy_doc: Doc = self(doc['text'])  # type: ignore
+        # the preprocessed training documents (if cached) - the text doesn't change between epochs
+        train_doc_cache: Optional[MutableMapping[str, Doc]] = None
+        if cache_docs:
+            if doc_cache_dir is not None:
+                train_doc_cache = DiskDocCache(self.pipe.spacy_nlp.vocab, doc_cache_dir)
+            else:
+                train_doc_cache = {}
 
-                    # Compatibility with old output where annotations are a list
-                    doc_annotations = self._get_doc_annotations(doc)
-                    for ann in doc_annotations:
-                        if not ann.get('killed', False):
-                            cui = ann['cui']
-                            start = ann['start']
-                            end = ann['end']
-                            spacy_entity = tkns_from_doc(spacy_doc=spacy_doc, start=start, end=end)
-                            deleted = ann.get('deleted', False)
-                            if local_filters.check_filters(cui):
-                                self.add_and_train_concept(cui=cui,
-                                                        name=ann['value'],
-                                                        spacy_doc=spacy_doc,
-                                                        spacy_entity=spacy_entity,
-                                                        negative=deleted,
-                                                        devalue_others=devalue_others)
-                    if train_from_false_positives:
-                        fps: List[Span] = get_false_positives(doc, spacy_doc)
-
-                        for fp in fps:  # type: ignore
-                            fp_: Span = fp  # type: ignore
-                            self.add_and_train_concept(cui=fp_._.cui,
-                                                       name=fp_.text,
-                                                       spacy_doc=spacy_doc,
-                                                       spacy_entity=fp_,
-                                                       negative=True,
-                                                       do_add_concept=False)
-
-                    latest_trained_step += 1
-                    if checkpoint is not None and checkpoint.steps is not None and latest_trained_step % checkpoint.steps == 0:
-                        checkpoint.save(self.cdb, latest_trained_step)
-                # if retaining MCT filters AND (if they exist) extra_cui_filters
-                if retain_filters:
-                    orig_filters.merge_with(local_filters)
-                    # refrain from doing it again for subsequent epochs
-                    retain_filters = False
-
-            if terminate_last and not never_terminate:
-                # Remove entities that were terminated, but after all training is done
-                for project in train_set['projects']:
-                    for doc in project['documents']:
+        try:
+            latest_trained_step = checkpoint.count if checkpoint is not None else 0
+            current_epoch, current_project, current_document = self._get_training_start(train_set, latest_trained_step)
+
+            for epoch in trange(current_epoch, nepochs, initial=current_epoch, total=nepochs, desc='Epoch', leave=False):
+                # Print acc before training
+                for idx_project in trange(current_project, len(train_set['projects']), initial=current_project, total=len(train_set['projects']), desc='Project', leave=False):
+                    project = train_set['projects'][idx_project]
+
+                    # if retain filters, but not the extra_cui_filters (and they exist),
+                    # then we need to do project filters alone, then retain, and only
+                    # then add the extra CUI filters
+                    if retain_filters and extra_cui_filter and not retain_extra_cui_filter:
+                        # adding project filters without extra_cui_filters
+                        set_project_filters(self.cdb.addl_info, local_filters, project, set(), use_filters)
+                        orig_filters.merge_with(local_filters)
+                        # adding extra_cui_filters, but NOT project filters
+                        set_project_filters(self.cdb.addl_info, local_filters, project, extra_cui_filter, False)
+                        # refrain from doing it again for subsequent epochs
+                        retain_filters = False
+                    else:
+                        # Set filters in case we are using the train_from_fp
+                        set_project_filters(self.cdb.addl_info, local_filters, project, extra_cui_filter, use_filters)
+
+                    spacy_docs: Optional[Iterator[Optional[Doc]]] = None
+                    if train_doc_cache is not None:
+                        spacy_docs = self._pipe_cached((doc['text'] for doc in project['documents'][current_document:]),
+                                                       doc_cache=train_doc_cache, include_preprocessing=True,
+                                                       per_document=True)
+                    for idx_doc in trange(current_document, len(project['documents']), initial=current_document, total=len(project['documents']), desc='Document', leave=False):
+                        doc = project['documents'][idx_doc]
+                        spacy_doc: Doc = next(spacy_docs) if spacy_docs is not None else self(doc['text'])  # type: ignore
+
+                        # Compatibility with old output where annotations are a list
                         doc_annotations = self._get_doc_annotations(doc)
                         for ann in doc_annotations:
-                            if ann.get('killed', False):
-                                self.unlink_concept_name(ann['cui'], ann['value'])
-
-            if print_stats > 0 and (epoch + 1) % print_stats == 0:
-                fp, fn, tp, p, r, f1, cui_counts, examples = self._print_stats(test_set,
-                                                                               epoch=epoch + 1,
-                                                                               use_project_filters=use_filters,
-                                                                               use_cui_doc_limit=use_cui_doc_limit,
-                                                                               use_overlaps=use_overlaps,
-                                                                               use_groups=use_groups,
-                                                                               extra_cui_filter=extra_cui_filter)
+                            if not ann.get('killed', False):
+                                cui = ann['cui']
+                                start = ann['start']
+                                end = ann['end']
+                                spacy_entity = tkns_from_doc(spacy_doc=spacy_doc, start=start, end=end)
+                                deleted = ann.get('deleted', False)
+                                if local_filters.check_filters(cui):
+                                    self.add_and_train_concept(cui=cui,
+                                                            name=ann['value'],
+                                                            spacy_doc=spacy_doc,
+                                                            spacy_entity=spacy_entity,
+                                                            negative=deleted,
+                                                            devalue_others=devalue_others)
+                        if train_from_false_positives:
+                            fps: List[Span] = get_false_positives(doc, spacy_doc)
+
+                            for fp in fps:  # type: ignore
+                                fp_: Span = fp  # type: ignore
+                                self.add_and_train_concept(cui=fp_._.cui,
+                                                           name=fp_.text,
+                                                           spacy_doc=spacy_doc,
+                                                           spacy_entity=fp_,
+                                                           negative=True,
+                                                           do_add_concept=False)
+
+                        latest_trained_step += 1
+                        if checkpoint is not None and checkpoint.steps is not None and latest_trained_step % checkpoint.steps == 0:
+                            checkpoint.save(self.cdb, latest_trained_step)
+                    # if retaining MCT filters AND (if they exist) extra_cui_filters
+                    if retain_filters:
+                        orig_filters.merge_with(local_filters)
+                        # refrain from doing it again for subsequent epochs
+                        retain_filters = False
+
+                if terminate_last and not never_terminate:
+                    # Remove entities that were terminated, but after all training is done
+                    for project in train_set['projects']:
+                        for doc in project['documents']:
+                            doc_annotations = self._get_doc_annotations(doc)
+                            for ann in doc_annotations:
+                                if ann.get('killed', False):
+                                    self.unlink_concept_name(ann['cui'], ann['value'])
+
+                if print_stats > 0 and (epoch + 1) % print_stats == 0:
+                    fp, fn, tp, p, r, f1, cui_counts, examples = self._print_stats(test_set,
+                                                                                   epoch=epoch + 1,
+                                                                                   use_project_filters=use_filters,
+                                                                                   use_cui_doc_limit=use_cui_doc_limit,
+                                                                                   use_overlaps=use_overlaps,
+                                                                                   use_groups=use_groups,
+                                                                                   extra_cui_filter=extra_cui_filter,
+                                                                                   doc_cache=test_doc_cache)
+        finally:
+            # NOTE: the cached documents are removed from disk even if training fails
+            if isinstance(train_doc_cache, DiskDocCache):
+                train_doc_cache.cleanup()
+
         if (train_meta_cats and
                 # NOTE if no annnotaitons, no point
                 count_all_annotations(data) > 0):  # type: ignore
@@ -1250,7 +1573,7 @@ class CAT(object):
         # Loop though the models and check are there GPU devices
         nn_components = []
         for component in self.pipe.spacy_nlp.components:
-            if isinstance(component[1], MetaCAT) or isinstance(component[1], TransformersNER):
+            if _is_meta_cat(component[1]) or _is_transformers_ner(component[1]):
                 self.pipe.spacy_nlp.disable_pipe(component[0])
                 nn_components.append(component)
 
@@ -1263,6 +1586,7 @@ class CAT(object):
         """
         logger.debug("Running GPU components separately")
 
+        from medcat.utils.meta_cat.data_utils import json_to_fake_spacy
         # First convert the docs into the fake spacy doc format
         spacy_docs = json_to_fake_spacy(docs, id2text=id2text)
         # Disable component locks also
@@ -1270,13 +1594,13 @@ class CAT(object):
             component.config.general['disable_component_lock'] = True
 
         # For meta_cat components
-        for name, component in [c for c in nn_components if isinstance(c[1], MetaCAT)]:
+        for name, component in [c for c in nn_components if _is_meta_cat(c[1])]:
             spacy_docs = component.pipe(spacy_docs)
         for spacy_doc in spacy_docs:
             for ent in spacy_doc.ents:
                 docs[spacy_doc.id]['entities'][ent._.id]['meta_anns'].update(ent._.meta_anns)
 
-    def _batch_generator(self, data: Iterable, batch_size_chars: int, skip_ids: Set = set()):
+    def _batch_generator(self, data: Iterable, batch_size_chars: int, skip_ids: Container = set()):
         docs = []
         char_count = 0
         for doc in data:
@@ -1292,14 +1616,12 @@ class CAT(object):
         if len(docs) > 0:
             yield docs
 
-    def _save_docs_to_file(self, docs: Iterable, annotated_ids: List[str], save_dir_path: str, annotated_ids_path: Optional[str], part_counter: int = 0) -> int:
-        path = os.path.join(save_dir_path, 'part_{}.pickle'.format(part_counter))
-        pickle.dump(docs, open(path, "wb"))
+    def _save_docs_to_file(self, docs: Dict, sink: AnnotationSink, save_dir_path: str, index: ResumeIndex) -> None:
+        part_counter = index.part_counter
+        path = sink.save_part(docs, save_dir_path, part_counter)
         logger.info("Saved part: %s, to: %s", part_counter, path)
-        part_counter = part_counter + 1 # Increase for save, as it should be what is the next part
-        if annotated_ids_path is not None:
-            pickle.dump((annotated_ids, part_counter), open(annotated_ids_path, 'wb'))
-        return part_counter
+        # Only the new IDs are added, along with the number of the next part
+        index.add(docs.keys(), part_counter + 1)
 
     def multiprocessing_batch_char_size(self,
                                         data: Union[List[Tuple], Iterable[Tuple]],
@@ -1312,12 +1634,17 @@ class CAT(object):
                                         save_dir_path: str = os.path.abspath(os.getcwd()),
                                         min_free_memory=0.1,
                                         min_free_memory_size: Optional[str] = None,
-                                        enabled_progress_bar: bool = True) -> Dict:
+                                        enabled_progress_bar: bool = True,
+                                        out_sink: Union[str, AnnotationSink] = 'pickle') -> Dict:
         r"""Run multiprocessing for inference, if out_save_path and out_split_size_chars is used this will also continue annotating
         documents if something is saved in that directory.
 
         This method batches the data based on the number of characters as specified by user.
 
+        The worker processes are started (forked with the model loaded) once and reused for
+        all the batches. The (inner) batches are passed to them through a bounded queue and
+        the annotated documents are streamed back as each of them is done.
+
         PS: This method is unlikely to work on a Windows machine.
 
         Args:
@@ -1343,6 +1670,8 @@ class CAT(object):
                 value is 20*batch_size_chars.
             save_dir_path(str):
                 Where to save the annotated documents if splitting. Defaults to the current working directory.
+                The IDs of the saved documents are kept in a resume index (`annotated_ids.sqlite`) in the
+                same folder. An older `annotated_ids.pickle` is imported into a new index.
             min_free_memory(float):
                 If set a process will not start unless there is at least this much RAM memory left,
                 should be a range between [0, 1] meaning how much of the memory has to be free. Helps when annotating
@@ -1356,10 +1685,13 @@ class CAT(object):
                 `min_free_memory_size` are set, a ValueError is raised. Defaults to None.
             enabled_progress_bar (bool):
                 Whether to enabled the progress bar. Defaults to True.
+            out_sink (Union[str, AnnotationSink]):
+                How to save the parts if splitting. Either the name of a sink ('pickle',
+                'jsonl' or 'parquet') or the sink itself. Defaults to 'pickle'.
 
         Raises:
             Exception: If multiprocessing cannot be done.
-            ValueError: If both free memory specifiers are provided.
+            ValueError: If both free memory specifiers are provided or the sink is unknown.
 
         Returns:
             Dict:
@@ -1368,7 +1700,7 @@ class CAT(object):
                 written to disk (out_save_dir).
         """
         for comp in self.pipe.spacy_nlp.components:
-            if isinstance(comp[1], TransformersNER):
+            if _is_transformers_ner(comp[1]):
                 raise Exception("Please do not use multiprocessing when running a transformer model for NER, run sequentially.")
 
         if min_free_memory_size is not None and min_free_memory != 0.1:
@@ -1380,6 +1712,7 @@ class CAT(object):
             min_free_memory_size_mr = humanfriendly.parse_size(min_free_memory_size)
         else:
             min_free_memory_size_mr = None
+        sink = get_sink(out_sink)
 
         # Set max document length
         self.pipe.spacy_nlp.max_length = self.config.preprocessing.max_document_length
@@ -1400,12 +1733,12 @@ class CAT(object):
         # "5" looks like a magic number here so better with comment about why the choice was made.
         internal_batch_size_chars = batch_size_chars // (5 * nproc)
 
-        annotated_ids_path = os.path.join(save_dir_path, 'annotated_ids.pickle') if save_dir_path is not None else None
-        if annotated_ids_path is not None and os.path.exists(annotated_ids_path):
-            annotated_ids, part_counter = pickle.load(open(annotated_ids_path, 'rb'))
-        else:
-            annotated_ids = []
-            part_counter = 0
+        # The index is only created if the annotated documents are saved
+        index = ResumeIndex.open(save_dir_path, create=out_split_size_chars is not None) if save_dir_path is not None else None
+        skip_ids: Container = set()
+        if index is not None:
+            skip_ids = index
+        nr_annotated = len(index) if index is not None else 0
 
         # for progress bar
         if hasattr(data, '__len__'):  # Check if data has length
@@ -1418,48 +1751,56 @@ class CAT(object):
         docs = {}
         _start_time = time.time()
         _batch_counter = 0 # Used for splitting the output, counts batches between saves
-        for batch in self._batch_generator(iterator, batch_size_chars, skip_ids=set(annotated_ids)):
-            logger.info("Annotated until now: %s docs; Current BS: %s docs; Elapsed time: %.2f minutes",
-                          len(annotated_ids),
-                          len(batch),
-                          (time.time() - _start_time)/60)
-            try:
-                _docs = self._multiprocessing_batch(data=batch,
-                                                    nproc=nproc,
-                                                    only_cui=only_cui,
-                                                    batch_size_chars=internal_batch_size_chars,
-                                                    addl_info=addl_info,
-                                                    nn_components=nn_components,
-                                                    min_free_memory=min_free_memory,
-                                                    min_free_memory_size=min_free_memory_size_mr)
-                docs.update(_docs)
-                annotated_ids.extend(_docs.keys())
-                _batch_counter += 1
-                del _docs
-                if out_split_size_chars is not None and (_batch_counter * batch_size_chars) > out_split_size_chars:
-                    # Save to file and reset the docs 
-                    part_counter = self._save_docs_to_file(docs=docs,
-                                                           annotated_ids=annotated_ids,
-                                                           save_dir_path=save_dir_path,
-                                                           annotated_ids_path=annotated_ids_path,
-                                                           part_counter=part_counter)
-                    del docs
-                    docs = {}
-                    _batch_counter = 0
-                if total_docs is not None:
-                    iterator.set_postfix({"Processed": len(annotated_ids), "Total": total_docs})
-            except Exception as e:
-                logger.warning("Failed an outer batch in the multiprocessing script")
-                logger.warning(e, exc_info=True, stack_info=True)
+        # The workers are only started once (and reused for all the batches)
+        max_queued = 10 * nproc
+        pool = WorkerPool(self._mp_cons, nproc,
+                          only_cui=only_cui,
+                          addl_info=addl_info,
+                          min_free_memory=min_free_memory,
+                          min_free_memory_size=min_free_memory_size_mr)
+        try:
+            for batch in self._batch_generator(iterator, batch_size_chars, skip_ids=skip_ids):
+                logger.info("Annotated until now: %s docs; Current BS: %s docs; Elapsed time: %.2f minutes",
+                              nr_annotated,
+                              len(batch),
+                              (time.time() - _start_time)/60)
+                try:
+                    pool.start()
+                    _docs = self._multiprocessing_batch(data=batch,
+                                                        pool=pool,
+                                                        max_queued=max_queued,
+                                                        batch_size_chars=internal_batch_size_chars,
+                                                        nn_components=nn_components)
+                    docs.update(_docs)
+                    nr_annotated += len(_docs)
+                    _batch_counter += 1
+                    del _docs
+                    if index is not None and out_split_size_chars is not None and (_batch_counter * batch_size_chars) > out_split_size_chars:
+                        # Save to file and reset the docs 
+                        self._save_docs_to_file(docs=docs,
+                                                sink=sink,
+                                                save_dir_path=save_dir_path,
+                                                index=index)
+                        del docs
+                        docs = {}
+                        _batch_counter = 0
+                    if total_docs is not None:
+                        iterator.set_postfix({"Processed": nr_annotated, "Total": total_docs})
+                except Exception as e:
+                    logger.warning("Failed an outer batch in the multiprocessing script")
+                    logger.warning(e, exc_info=True, stack_info=True)
+        finally:
+            pool.stop()
 
         # Save the last batch
-        if out_split_size_chars is not None and len(docs) > 0:
+        if index is not None and out_split_size_chars is not None and len(docs) > 0:
             # Save to file and reset the docs 
             self._save_docs_to_file(docs=docs,
-                                    annotated_ids=annotated_ids,
+                                    sink=sink,
                                     save_dir_path=save_dir_path,
-                                    annotated_ids_path=annotated_ids_path,
-                                    part_counter=part_counter)
+                                    index=index)
+        if index is not None:
+            index.close()
 
         # Enable the GPU Components again
         if separate_nn_components:
@@ -1471,80 +1812,48 @@ class CAT(object):
 
     def _multiprocessing_batch(self,
                                data: Union[List[Tuple], Iterable[Tuple]],
-                               nproc: int = 8,
+                               pool: WorkerPool,
+                               max_queued: int,
                                batch_size_chars: int = 1000000,
-                               only_cui: bool = False,
-                               addl_info: List[str] = [],
-                               nn_components: List = [],
-                               min_free_memory: float = 0.1,
-                               min_free_memory_size: Optional[int] = None) -> Dict:
-        """Run multiprocessing on one batch.
+                               nn_components: List = []) -> Dict:
+        """Run one batch through the (running) worker processes.
 
         Args:
             data:
                 Iterator or array with format: [(id, text), (id, text), ...].
-            nproc (int):
-                Number of processors. Defaults to 8.
+            pool (WorkerPool):
+                The (started) worker processes.
+            max_queued (int):
+                The maximum number of (inner) batches queued for (or being processed by) the workers.
             batch_size_chars (int):
                 Size of a batch in number of characters. Fefaults to 1 000 000.
-            only_cui (bool):
-                Whether to get only CUIs. Defaults to False.
-            addl_info (List[str]):
-                Additional info. Defaults to [].
             nn_components (List):
                 NN components in case there's a separation. Defaults to [].
-            min_free_memory (float):
-                If set a process will not start unless there is at least this much RAM memory left,
-                should be a range between [0, 1] meaning how much of the memory has to be free. Helps when annotating
-                very large datasets because spacy is not the best with memory management and multiprocessing.
-                Defaults to 0.
-            min_free_memory_size (Optional[int]):
-                The minimum human readable memory size required.
 
         Returns:
             Dict:
                 {id: doc_json, id2: doc_json2, ...}
         """
-        # Create the input output for MP
-        with Manager() as manager:
-            out_list = manager.list()
-            lock = manager.Lock()
-            in_q = manager.Queue(maxsize=10*nproc)
-
-            id2text = {}
-            for batch in self._batch_generator(data, batch_size_chars):
-                if nn_components:
-                    # We need this for the json_to_fake_spacy
-                    id2text.update({k: v for k, v in batch})
-                in_q.put(batch)
-
-            # Final data point for workers
-            for _ in range(nproc):
-                in_q.put(None)
-            sleep(2)
-
-            # Create processes
-            procs = []
-            for i in range(nproc):
-                p = Process(target=self._mp_cons,
-                            kwargs={'in_q': in_q,
-                                    'out_list': out_list,
-                                    'pid': i,
-                                    'only_cui': only_cui,
-                                    'addl_info': addl_info,
-                                    'min_free_memory': min_free_memory,
-                                    'min_free_memory_size': min_free_memory_size,
-                                    'lock': lock})
-                p.start()
-                procs.append(p)
-
-            # Join processes
-            for p in procs:
-                p.join()
-
-            docs = {}
-            # Converts a tuple into a dict
-            docs.update({k: v for k, v in out_list})
+        id2text: Dict = {}
+        docs: Dict = {}
+        for batch_nr, batch in enumerate(self._batch_generator(data, batch_size_chars)):
+            if nn_components:
+                # We need this for the json_to_fake_spacy
+                id2text.update({k: v for k, v in batch})
+            while pool.nr_in_flight >= max_queued:
+                _, out = pool.get_result()
+                if out is not None:
+                    docs.update(out)
+            if not pool.is_running:
+                logger.warning("All the worker processes have stopped, some of the documents "
+                               "were not annotated.")
+                break
+            pool.put(batch_nr, batch)
+        while pool.nr_in_flight > 0:
+            # NOTE: if a worker dies, the batch it was working on is lost (the result is None)
+            _, out = pool.get_result()
+            if out is not None:
+                docs.update(out)
 
         # If we have separate GPU components now we pipe that
         if nn_components:
@@ -1570,7 +1879,7 @@ class CAT(object):
         NOTE: When providing a generator for `data`, the generator is evaluated (`list(in_data)`)
               and thus all the data is kept in memory and (potentially) duplicated for use in
               multiple threads. So if you're using a lot of data, it may be better to use
-              `CAT.multiprocessing_batch_char_size` instead.
+              `CAT.multiprocessing_batch_char_size` or `CAT.annotate_stream` instead.
 
         PS:
         This method supports Windows.
@@ -1639,55 +1948,192 @@ class CAT(object):
 
         return out
 
-    def _mp_cons(self, in_q: Queue, out_list: List, min_free_memory: float,
-                 lock: Lock, min_free_memory_size: Optional[int] = None,
+    def annotate_stream(self,
+                        data: Iterable[Tuple],
+                        nproc: int = 2,
+                        batch_size_chars: int = 100 * 1000,
+                        only_cui: bool = False,
+                        addl_info: List[str] = [],
+                        keep_order: bool = True,
+                        max_batches_in_flight: Optional[int] = None,
+                        separate_nn_components: bool = True,
+                        min_free_memory: float = 0.1,
+                        min_free_memory_size: Optional[str] = None) -> Iterator[Tuple[Any, Dict]]:
+        """Annotate a stream of documents using multiprocessing.
+
+        The data is read lazily (in batches based on the number of characters) and the annotated
+        documents are yielded as soon as they are available. At most `max_batches_in_flight`
+        batches are being annotated (or waiting to be yielded) at any one time. So neither
+        the input nor the output is ever held in memory in full, and the input is only read
+        as quickly as the output is consumed. This makes it possible to, e.g., go from a
+        database cursor straight to a sink.
+
+        A document that fails to be annotated is logged and skipped. If a worker process
+        dies (e.g it is killed by the OS), the documents of the batch it was annotating are
+        logged and skipped as well, and the worker is replaced.
+
+        PS: This method is unlikely to work on a Windows machine.
+
+        Args:
+            data (Iterable[Tuple]):
+                Iterable with format: [(id, text), (id, text), ...]
+            nproc (int):
+                Number of processes. Defaults to 2.
+            batch_size_chars (int):
+                Size of a batch (sent to a process) in number of characters. Defaults to 100000.
+            only_cui (bool):
+                Whether to only return the CUIs rather than the full annotations. Defaults to False.
+            addl_info (List[str]):
+                The additional information. Defaults to [].
+            keep_order (bool):
+                Whether to yield the documents in the same order as the input. Otherwise
+                the documents are yielded as soon as they are annotated. Defaults to True.
+            max_batches_in_flight (Optional[int]):
+                The maximum number of batches being annotated (or waiting to be yielded).
+                Defaults to None (2 times the number of processes).
+            separate_nn_components (bool):
+                If set the NN components (e.g MetaCAT) are run in this process
+                rather than the worker processes. Defaults to True.
+            min_free_memory (float):
+                If set a process will not continue unless there is at least this much RAM memory left,
+                should be a range between [0, 1] meaning how much of the memory has to be free.
+                If both `min_free_memory` and `min_free_memory_size` are set, a ValueError is raised.
+                Defaults to 0.1.
+            min_free_memory_size (Optional[str]):
+                If set, a process will not continue unless there's the specified amount of memory
+                available (e.g 2GB, 2000MB and so on). If both `min_free_memory` and
+                `min_free_memory_size` are set, a ValueError is raised. Defaults to None.
+
+        Raises:
+            Exception: If multiprocessing cannot be done.
+            ValueError: If both free memory specifiers are provided or the number of processes is not positive.
+
+        Yields:
+            Tuple[Any, Dict]: The ID and the annotated document (the same as `CAT.get_entities`).
+        """
+        for comp in self.pipe.spacy_nlp.components:
+            if _is_transformers_ner(comp[1]):
+                raise Exception("Please do not use multiprocessing when running a transformer model for NER, run sequentially.")
+        if nproc < 1:
+            raise ValueError(f"Need at least 1 process, got {nproc}")
+        if min_free_memory_size is not None and min_free_memory != 0.1:
+            raise ValueError("Unknown minimum memory size. "
+                             f"Provided `min_free_memory`={min_free_memory} "
+                             f"as well as `min_free_memory_size`={min_free_memory_size}. "
+                             "Please only provide one of the two.")
+        min_free_memory_size_mr = humanfriendly.parse_size(min_free_memory_size) if min_free_memory_size else None
+        if max_batches_in_flight is None:
+            max_batches_in_flight = 2 * nproc
+
+        # Set max document length
+        self.pipe.spacy_nlp.max_length = self.config.preprocessing.max_document_length
+
+        if self._meta_cats and not separate_nn_components:
+            # Hack for torch using multithreading, need for CPU runs only
+            import torch
+            torch.set_num_threads(1)
+
+        nn_components = []
+        if separate_nn_components:
+            nn_components = self._separate_nn_components()
+
+        pool = WorkerPool(self._mp_cons, nproc,
+                          only_cui=only_cui,
+                          addl_info=addl_info,
+                          min_free_memory=min_free_memory,
+                          min_free_memory_size=min_free_memory_size_mr)
+        # The batches that have been queued but not yet yielded
+        pending: Dict[int, List[Tuple]] = {}
+        # The annotated batches waiting for their turn (if keeping order)
+        done: Dict[int, List[Tuple]] = {}
+        next_to_yield = 0
+        batches = enumerate(self._batch_generator(data, batch_size_chars))
+        no_more_data = False
+        try:
+            while True:
+                # NOTE: The workers that have stopped are restarted
+                pool.start()
+                while not no_more_data and len(pending) < max_batches_in_flight:
+                    next_batch = next(batches, None)
+                    if next_batch is None:
+                        no_more_data = True
+                        break
+                    pending[next_batch[0]] = next_batch[1]
+                    pool.put(*next_batch)
+                if not pending:
+                    break
+
+                batch_nr, out = pool.get_result()
+                if out is None:
+                    # The batch was lost since its worker died (see `WorkerPool`)
+                    out = []
+                elif nn_components:
+                    try:
+                        # NOTE: the documents are changed in place
+                        self._run_nn_components(dict(out), nn_components, id2text=dict(pending[batch_nr]))
+                    except Exception as e:
+                        logger.warning(e, exc_info=True, stack_info=True)
+                done[batch_nr] = out
+
+                if not keep_order:
+                    for batch_nr in list(done):
+                        del pending[batch_nr]
+                        yield from done.pop(batch_nr)
+                while next_to_yield in done:
+                    del pending[next_to_yield]
+                    yield from done.pop(next_to_yield)
+                    next_to_yield += 1
+        finally:
+            pool.stop()
+            # Enable the GPU Components again
+            for name, _ in nn_components:
+                self.pipe.spacy_nlp.enable_pipe(name)
+
+    def _mp_cons(self, in_q: Queue, out_q: Queue, min_free_memory: float,
+                 min_free_memory_size: Optional[int] = None,
                  pid: int = 0, only_cui: bool = False, addl_info: List = []) -> None:
         if min_free_memory_size is not None:
             # passed as int not str
             min_free_memory_mr = min_free_memory_size
         else:
             min_free_memory_mr = min_free_memory * psutil.virtual_memory().total
-        out: List = []
 
         while True:
-            if not in_q.empty():
-                if psutil.virtual_memory().available < min_free_memory_mr:
-                    with lock:
-                        out_list.extend(out)
-                    # Stop a process if there is not enough memory left
-                    virmem = psutil.virtual_memory()
-                    logger.warning("Stopping multiprocessing because there is no enough memory available. "
-                                   "Currently %s of memory (out of %s) memory (a fraction of %3.2f) "
-                                   "is available but a minimum of %s is required "
-                                   "(from %3.2f fraction or %s specified size). "
-                                   "If you believe you have enough memory, you can change the `min_free_memory` "
-                                   "or `min_free_memory_size` with latter preferred (but not both!) "
-                                   "keyword argument to something lower. For reference, We would recommend a "
-                                   "minimum of 5GB of memory for a full SNOMED model.",
-                                   humanfriendly.format_size(virmem.available), humanfriendly.format_size(virmem.total),
-                                   virmem.available / virmem.total, humanfriendly.format_size(min_free_memory_mr),
-                                   min_free_memory, str(min_free_memory_size))
-                    break
+            if psutil.virtual_memory().available < min_free_memory_mr:
+                # Stop a process if there is not enough memory left
+                virmem = psutil.virtual_memory()
+                logger.warning("Stopping multiprocessing because there is no enough memory available. "
+                               "Currently %s of memory (out of %s) memory (a fraction of %3.2f) "
+                               "is available but a minimum of %s is required "
+                               "(from %3.2f fraction or %s specified size). "
+                               "If you believe you have enough memory, you can change the `min_free_memory` "
+                               "or `min_free_memory_size` with latter preferred (but not both!) "
+                               "keyword argument to something lower. For reference, We would recommend a "
+                               "minimum of 5GB of memory for a full SNOMED model.",
+                               humanfriendly.format_size(virmem.available), humanfriendly.format_size(virmem.total),
+                               virmem.available / virmem.total, humanfriendly.format_size(min_free_memory_mr),
+                               min_free_memory, str(min_free_memory_size))
+                break
 
-                data = in_q.get()
-                if data is None:
-                    with lock:
-                        out_list.extend(out)
-                    break
+            data = in_q.get()
+            if data is None:
+                break
 
-                for i_text, text in data:
-                    try:
-                        # Annotate document
-                        doc = self.get_entities(text=text, only_cui=only_cui, addl_info=addl_info)
-                        out.append((i_text, doc))
-                    except Exception as e:
-                        logger.warning("PID: %s failed one document in _mp_cons, running will continue normally. \n" +
-                                         "Document length in chars: %s, and ID: %s", pid, len(str(text)), i_text)
-                        logger.warning(str(e))
+            batch_nr, batch = data
+            out: List = []
+            for i_text, text in batch:
+                try:
+                    # Annotate document
+                    doc = self.get_entities(text=text, only_cui=only_cui, addl_info=addl_info)
+                    out.append((i_text, doc))
+                except Exception as e:
+                    logger.warning("PID: %s failed one document in _mp_cons, running will continue normally. \n" +
+                                     "Document length in chars: %s, and ID: %s", pid, len(str(text)), i_text)
+                    logger.warning(str(e))
+            out_q.put((batch_nr, out))
         if self.config.general.usage_monitor.enabled:
             # NOTE: This is in another process, so need to explicitly flush
             self.usage_monitor._flush_logs()
-        sleep(2)
 
     def _add_nested_ent(self, doc: Doc, _ents: List[Span], _ent: Union[Dict, Span]) -> None:
         # if the entities are serialised (PipeRunner.serialize_entities)
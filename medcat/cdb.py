@@ -5,12 +5,14 @@ import json
 import logging
 import aiofiles
 import numpy as np
-from typing import Dict, Set, Optional, List, Union, cast, Iterable
+from typing import Dict, Set, Optional, List, Union, cast, Iterable, Tuple
 import os
 
 from medcat import __version__
-from medcat.utils.hasher import Hasher
+from medcat.utils.hasher import Hasher, StreamingHasher
 from medcat.utils.matutils import unitvec
+from medcat.utils.name_trie import NameTrie
+from medcat.utils.context_matrix import ContextVectorMatrix
 from medcat.utils.ml_utils import get_lr_linking
 from medcat.config import Config, workers
 from medcat.utils.saving.serializer import CDBSerializer
@@ -60,7 +62,16 @@ class CDB(object):
             Stores all the words that appear in this CDB and the count for each one.
         is_dirty (bool):
             Whether or not the CDB has been changed since it was loaded or created
+
+    NOTE: The CDB methods keep track of the attributes they change, so that only the
+          changed attributes are rehashed. Any code that changes the attributes directly
+          must call `record_change` before and `mark_dirty` after the change.
     """
+    TRANSIENT_ATTRIBUTES = ('_name_trie', '_name_trie_state', '_context_matrices', '_state_journals')
+    """Attributes that are built at runtime and should not be saved nor hashed."""
+    UNHASHED_ATTRIBUTES = ('config', '_config_from_file', '_hash', 'is_dirty', '_config_hash',
+                           '_field_hashes', '_dirty_fields', '_memory_optimised_parts')
+    """Attributes that are not part of the hash."""
 
     def __init__(self, config: Union[Config, None] = None) -> None:
         if config is None:
@@ -99,6 +110,10 @@ class CDB(object):
                 }
         self.vocab: Dict = {} # Vocabulary of all words ever in our cdb
         self._optim_params = None
+        # the hashes of the (hashed) attributes, so that only the changed ones need to be rehashed
+        self._field_hashes: Dict[str, str] = {}
+        # the attributes changed since the last hash (None if unknown, i.e all)
+        self._dirty_fields: Optional[Set[str]] = set()
         self.is_dirty = False
         self._init_waf_from_config()
         self._hash: Optional[str] = None
@@ -109,6 +124,13 @@ class CDB(object):
         # since the config is now saved separately
         self._config_hash: Optional[str] = None
         self._memory_optimised_parts: Set[str] = set()
+        # the name trie is built lazily (see `get_name_trie`)
+        self._name_trie: Optional[NameTrie] = None
+        self._name_trie_state: Optional[Tuple] = None
+        # the normalised context vectors are added lazily (see `get_context_similarities`)
+        self._context_matrices: Dict[str, ContextVectorMatrix] = {}
+        # the journals that record the changes to the state (see `medcat.utils.cdb_state`)
+        self._state_journals: List = []
 
     def _init_waf_from_config(self):
         waf = get_and_del_weighted_average_from_config(self.config)
@@ -122,6 +144,65 @@ class CDB(object):
         else:
             self.weighted_average_function = default_weighted_average
 
+    @property
+    def is_dirty(self) -> bool:
+        """Whether or not the CDB has been changed since it was loaded or created.
+
+        Setting this to True marks all of the CDB as changed, so all of it will be rehashed.
+        Use `mark_dirty` to mark (only) specific attributes as changed.
+
+        Returns:
+            bool: Whether or not the CDB has been changed.
+        """
+        return self.__dict__['is_dirty']
+
+    @is_dirty.setter
+    def is_dirty(self, is_dirty: bool) -> None:
+        # NOTE: the value is kept in __dict__ so that it is saved and loaded as before
+        self.__dict__['is_dirty'] = is_dirty
+        if is_dirty:
+            self.__dict__['_dirty_fields'] = None
+
+    def mark_dirty(self, *fields: str) -> None:
+        """Mark the specified attributes (fields) as changed.
+
+        Only the changed attributes are rehashed (see `get_hash`). The CDB methods
+        do this for the attributes they change. But any other code that changes
+        an attribute directly (e.g `cdb.cui2preferred_name[cui] = name`) must
+        call this afterwards, otherwise the hash will not reflect the change.
+
+        Args:
+            *fields (str): The names of the changed attributes (e.g `'cui2names'`).
+        """
+        self.__dict__['is_dirty'] = True
+        if self._dirty_fields is None:
+            return
+        if self._memory_optimised_parts:
+            # the memory optimised parts are shared between attributes
+            self._dirty_fields = None
+        else:
+            self._dirty_fields.update(fields)
+
+    def record_change(self, field: str, keys: Optional[Iterable[str]] = None) -> None:
+        """Record the original values of an attribute (field) before changing it.
+
+        This keeps the state snapshots (see `medcat.utils.cdb_state`) and the tracking
+        of the changes made by training (see `medcat.utils.parallel_training`) correct.
+        The CDB methods do this for the attributes they change. But any other code that
+        changes an attribute directly must call this beforehand (as well as `mark_dirty`
+        afterwards). This does nothing unless the changes are being recorded.
+
+        Args:
+            field (str): The name of the attribute that is about to change (e.g `'cui2names'`).
+            keys (Optional[Iterable[str]]): The keys of the values that are about to change.
+                If None, the entire attribute is replaced / changed in bulk. Defaults to None.
+        """
+        for journal in self._state_journals:
+            if keys is None:
+                journal.record_field(self, field)
+            else:
+                journal.record(self, field, keys)
+
     def get_name(self, cui: str) -> str:
         """Returns preferred name if it exists, otherwise it will return
         the longest name assigned to the concept.
@@ -145,7 +226,7 @@ class CDB(object):
     def update_cui2average_confidence(self, cui: str, new_sim: float) -> None:
         self.cui2average_confidence[cui] = (self.cui2average_confidence.get(cui, 0) * self.cui2count_train.get(cui, 0) + new_sim) / \
                                             (self.cui2count_train.get(cui, 0) + 1)
-        self.is_dirty = True
+        self.mark_dirty('cui2average_confidence')
 
     def _remove_names(self, cui: str, names: Iterable[str]) -> None:
         """Remove names from an existing concept - effect is this name will never again be used to link to this concept.
@@ -159,29 +240,42 @@ class CDB(object):
             names (Iterable[str]):
                 Names to be removed (e.g list, set, or even a dict (in which case keys will be used)).
         """
+        names = list(names)
+        self.record_change('name2cuis', names)
+        self.record_change('name2cuis2status', names)
+        name_trie = self._get_valid_name_trie()
+        # NOTE: the changed values are set as new values since the values
+        #       of compact maps are immutable (see `medcat.utils.compact_maps`)
         for name in names:
             if name in self.name2cuis:
-                if cui in self.name2cuis[name]:
-                    self.name2cuis[name].remove(cui)
-                if len(self.name2cuis[name]) == 0:
+                cuis = list(self.name2cuis[name])
+                if cui in cuis:
+                    cuis.remove(cui)
+                if len(cuis) == 0:
                     del self.name2cuis[name]
+                    if name_trie is not None:
+                        name_trie.remove_name(name)
+                else:
+                    self.name2cuis[name] = cuis
 
             # Remove from name2cuis2status
             if name in self.name2cuis2status:
-                if cui in self.name2cuis2status[name]:
-                    _ = self.name2cuis2status[name].pop(cui)
-                if len(self.name2cuis2status[name]) == 0:
+                cuis2status = dict(self.name2cuis2status[name])
+                if cui in cuis2status:
+                    _ = cuis2status.pop(cui)
+                if len(cuis2status) == 0:
                     del self.name2cuis2status[name]
-
-            # Set to disamb always if name2cuis2status is now only one CUI
-            if name in self.name2cuis2status:
-                if len(self.name2cuis2status[name]) == 1:
-                    for _cui in self.name2cuis2status[name]:
-                        if self.name2cuis2status[name][_cui] == 'A':
-                            self.name2cuis2status[name][_cui] = 'N'
-                        elif self.name2cuis2status[name][_cui] == 'P':
-                            self.name2cuis2status[name][_cui] = 'PD'
-        self.is_dirty = True
+                else:
+                    # Set to disamb always if name2cuis2status is now only one CUI
+                    if len(cuis2status) == 1:
+                        for _cui in cuis2status:
+                            if cuis2status[_cui] == 'A':
+                                cuis2status[_cui] = 'N'
+                            elif cuis2status[_cui] == 'P':
+                                cuis2status[_cui] = 'PD'
+                    self.name2cuis2status[name] = cuis2status
+        self._update_name_trie_state()
+        self.mark_dirty('name2cuis', 'name2cuis2status')
 
     def remove_cui(self, cui: str) -> None:
         """This function takes a `CUI` as an argument and removes it from all the internal objects that reference it.
@@ -190,12 +284,22 @@ class CDB(object):
             cui (str):
                 Concept ID or unique identifier in this database.
         """
+        if self._state_journals:
+            for field in ('cui2names', 'cui2snames', 'cui2context_vectors', 'cui2count_train',
+                          'cui2type_ids', 'cui2preferred_name'):
+                self.record_change(field, [cui])
+            self.record_change('name2cuis', [name for name, cuis in self.name2cuis.items() if cui in cuis])
+            self.record_change('name2cuis2status',
+                               [name for name, cuis2status in self.name2cuis2status.items() if cui in cuis2status])
+            self.record_change('snames')
         if cui in self.cui2names:
             del self.cui2names[cui]
         if cui in self.cui2snames:
             del self.cui2snames[cui]
         if cui in self.cui2context_vectors:
             del self.cui2context_vectors[cui]
+        for matrix in self._context_matrices.values():
+            matrix.remove(cui)
         if cui in self.cui2count_train:
             del self.cui2count_train[cui]
         if cui in self.cui2tags:
@@ -206,12 +310,13 @@ class CDB(object):
             del self.cui2preferred_name[cui]
         if cui in self.cui2average_confidence:
             del self.cui2average_confidence[cui]
-        for name, cuis in self.name2cuis.items():
-            if cui in cuis:
-                cuis.remove(cui)
-        for name, cuis2status in self.name2cuis2status.items():
-            if cui in cuis2status:
-                del cuis2status[cui]
+        # NOTE: the changed values are set as new values since the values
+        #       of compact maps are immutable (see `medcat.utils.compact_maps`)
+        for name, cuis in [(name, cuis) for name, cuis in self.name2cuis.items() if cui in cuis]:
+            self.name2cuis[name] = [_cui for _cui in cuis if _cui != cui]
+        for name, cuis2status in [(name, cuis2status) for name, cuis2status in self.name2cuis2status.items()
+                                  if cui in cuis2status]:
+            self.name2cuis2status[name] = {_cui: status for _cui, status in cuis2status.items() if _cui != cui}
         if isinstance(self.snames, set):
             # if this is a memory optimised CDB, this won't be a set
             # but it also won't need to be changed since it
@@ -220,6 +325,7 @@ class CDB(object):
             for cuis in self.cui2snames.values():
                 self.snames |= cuis
         self.name2count_train = {name: len(cuis) for name, cuis in self.name2cuis.items()}
+        self._name_trie = None
         self.is_dirty = True
 
     def add_names(self, cui: str, names: Dict[str, Dict], name_status: str = 'A', full_build: bool = False) -> None:
@@ -281,6 +387,13 @@ class CDB(object):
         Raises:
             ValueError: If there is no name info yet `names` dict is not empty.
         """
+        if self._state_journals:
+            for field in ('cui2names', 'cui2snames', 'cui2type_ids', 'cui2preferred_name'):
+                self.record_change(field, [cui])
+            for field in ('name_isupper', 'name2cuis', 'name2cuis2status'):
+                self.record_change(field, names)
+            self.record_change('snames', [sname for name_info in names.values() for sname in name_info['snames']])
+            self.record_change('vocab', [token for name_info in names.values() for token in name_info['tokens']])
         # Add CUI to the required dictionaries
         if cui not in self.cui2names:
             # Create placeholders
@@ -291,38 +404,48 @@ class CDB(object):
             self.cui2type_ids[cui] = type_ids
         else:
             # If the CUI is already in update the type_ids
-            self.cui2type_ids[cui].update(type_ids)
+            # NOTE: the changed values are set as new values since the values
+            #       of compact maps are immutable (see `medcat.utils.compact_maps`)
+            self.cui2type_ids[cui] = set(self.cui2type_ids[cui]).union(type_ids)
 
         # Add names to the required dictionaries
         name_info = None
+        name_trie = self._get_valid_name_trie()
+        # NOTE: the names are set as new values (after the loop) since the values
+        #       of compact maps are immutable (see `medcat.utils.compact_maps`)
+        cui_names = set(self.cui2names[cui])
+        cui_snames = set(self.cui2snames.get(cui, ()))
         for name in names:
             name_info = names[name]
             # Extend snames
             self.snames.update(name_info['snames'])
 
+            if name_trie is not None:
+                for sname in name_info['snames']:
+                    name_trie.add_sname(sname)
+                name_trie.add_name(name)
+
             # Add name to cui2names
-            self.cui2names[cui].add(name)
-            # Extend cui2snames, but check is the cui already in also
-            if cui in self.cui2snames:
-                self.cui2snames[cui].update(name_info['snames'])
-            else:
-                self.cui2snames[cui] = name_info['snames']
+            cui_names.add(name)
+            # Extend cui2snames
+            cui_snames.update(name_info['snames'])
 
             # Add whether concept is uppercase
             self.name_isupper[name] = names[name]['is_upper']
 
             if name in self.name2cuis:
                 # Means we have already seen this name
-                if cui not in self.name2cuis[name]:
+                cuis = self.name2cuis[name]
+                if cui not in cuis:
                     # If CUI is not already linked do it
-                    self.name2cuis[name].append(cui)
+                    self.name2cuis[name] = list(cuis) + [cui]
 
                     # At the same time it means the cui is also missing from name2cuis2status, but the
                     #name is there
-                    self.name2cuis2status[name][cui] = name_status
+                    self.name2cuis2status[name] = {**self.name2cuis2status[name], cui: name_status}
                 elif name_status == 'P':
                     # If name_status is P overwrite whatever was the old status
-                    self.name2cuis2status[name][cui] = name_status
+                    self.name2cuis2status[name] = {**self.name2cuis2status[name], cui: name_status}
             else:
                 # Means we never saw this name
                 self.name2cuis[name] = [cui]
@@ -338,6 +461,9 @@ class CDB(object):
                 else:
                     self.vocab[token] = 1
 
+        self.cui2names[cui] = cui_names
+        self.cui2snames[cui] = cui_snames
+
         # Check is this a preferred name for the concept, this takes the name_info
         #dict which must have a value (but still have to check it, just in case).
         if name_info is not None:
@@ -383,7 +509,9 @@ class CDB(object):
                     self.addl_info['type_id2cuis'][type_id].add(cui)
                 else:
                     self.addl_info['type_id2cuis'][type_id] = {cui}
-        self.is_dirty = True
+        self._update_name_trie_state()
+        self.mark_dirty('cui2names', 'cui2snames', 'cui2type_ids', 'snames', 'name_isupper', 'name2cuis',
+                        'name2cuis2status', 'vocab', 'cui2preferred_name', 'addl_info')
 
     def add_addl_info(self, name: str, data: Dict, reset_existing: bool = False) -> None:
         """Add data to the addl_info dictionary. This is done in a function to
@@ -401,7 +529,7 @@ class CDB(object):
             self.addl_info[name] = {}
 
         self.addl_info[name].update(data)
-        self.is_dirty = True
+        self.mark_dirty('addl_info')
 
     def update_context_vector(self,
                               cui: str,
@@ -425,6 +553,8 @@ class CDB(object):
                 The learning rate will be calculated based on the count for the provided CUI + cui_count.
                 Defaults to 0.
         """
+        self.record_change('cui2context_vectors', [cui])
+        self.record_change('cui2count_train', [cui])
         if cui not in self.cui2context_vectors:
             self.cui2context_vectors[cui] = {}
             self.cui2count_train[cui] = 0
@@ -468,13 +598,36 @@ class CDB(object):
         if not negative:
             # Increase counter only for positive examples
             self.cui2count_train[cui] += 1
-        self.is_dirty = True
+        self.mark_dirty('cui2context_vectors', 'cui2count_train')
+
+    def get_context_similarities(self, cuis: List[str], context_type: str, vector: np.ndarray) -> np.ndarray:
+        """Get the similarities of the context vectors of the CUIs to a (context) vector.
+
+        The normalised context vectors are kept in a dense matrix (per context type)
+        so that the similarities can be calculated for all the CUIs at once. A CUI is
+        added to the matrix when it is first needed and its row is recalculated when
+        its context vector changes (e.g upon `update_context_vector`).
+
+        Args:
+            cuis (List[str]): The CUIs.
+            context_type (str): The context type.
+            vector (np.ndarray): The vector to compare to.
+
+        Returns:
+            np.ndarray: The (cosine) similarity for each CUI (0 if the CUI has no vector of this type).
+        """
+        matrix = self._context_matrices.get(context_type)
+        if matrix is None:
+            matrix = self._context_matrices[context_type] = ContextVectorMatrix()
+        cui_vectors = [self.cui2context_vectors.get(cui, {}).get(context_type) for cui in cuis]
+        return matrix.get_similarities(cuis, cui_vectors, unitvec(vector))
 
     def save(self, path: str, json_path: Optional[str] = None, overwrite: bool = True,
-            calc_hash_if_missing: bool = False) -> None:
+            calc_hash_if_missing: bool = False, mmap_vectors: bool = False, columnar: bool = False) -> None:
         """Saves model to file (in fact it saves variables of this class).
 
         If a `json_path` is specified, the JSON serialization is used for some of the data.
+        If `columnar` is specified, the binary, columnar format is used for the name and CUI maps.
 
         Args:
             path (str):
@@ -485,12 +638,18 @@ class CDB(object):
                 Whether or not to overwrite existing file(s).
             calc_hash_if_missing (bool):
                 Calculate the hash if it's missing. Defaults to `False`
+            mmap_vectors (bool):
+                Whether to save the context vectors separately (as `.npy` files next to
+                the CDB) so that they can be memory mapped upon load. Defaults to `False`.
+            columnar (bool):
+                Whether to save the CDB in the binary, columnar format (see
+                `medcat.utils.saving.columnar`). Defaults to `False`.
         """
         if calc_hash_if_missing and not self._hash:
             # get instead of calculate so that the CDB is marked as not dirty if it was dirty
             self.get_hash()
         ser = CDBSerializer(path, json_path)
-        ser.serialize(self, overwrite=overwrite)
+        ser.serialize(self, overwrite=overwrite, mmap_vectors=mmap_vectors, columnar=columnar)
 
     # TODO - add JSON serialization to async save
     async def save_async(self, path: str) -> None:
@@ -505,7 +664,8 @@ class CDB(object):
         async with aiofiles.open(path, 'wb') as f:
             to_save = {
                 'config': self.config.__dict__,
-                'cdb': {k: v for k, v in self.__dict__.items() if k != 'config'}
+                'cdb': {k: v for k, v in self.__dict__.items()
+                        if k != 'config' and k not in self.TRANSIENT_ATTRIBUTES}
             }
             await f.write(dill.dumps(to_save))
 
@@ -553,7 +713,8 @@ class CDB(object):
         self._config_from_file = True
 
     @classmethod
-    def load(cls, path: str, json_path: Optional[str] = None, config_dict: Optional[Dict] = None) -> "CDB":
+    def load(cls, path: str, json_path: Optional[str] = None, config_dict: Optional[Dict] = None,
+             mmap_mode: Optional[str] = 'r', lazy: bool = True, compact: bool = False) -> "CDB":
         """Load and return a CDB. This allows partial loads in probably not the right way at all.
 
         If `json_path` is specified, the JSON serialization is assumed to be present.
@@ -566,12 +727,21 @@ class CDB(object):
                 Path to the JSON serialized folder
             config_dict:
                 A dictionary that will be used to overwrite existing fields in the config of this CDB
+            mmap_mode (Optional[str]):
+                The memory map mode for the context vectors if they were saved separately
+                (see `numpy.load`). Use None to read them into memory. Defaults to `'r'`.
+            lazy (bool):
+                Whether to only load `addl_info` once it is first accessed if the CDB was
+                saved in the columnar format. Defaults to `True`.
+            compact (bool):
+                Whether to use the compact (integer ID based) name and CUI maps
+                (see `medcat.utils.compact_maps`). Defaults to `False`.
 
         Returns:
             CDB: The resulting concept database.
         """
         ser = CDBSerializer(path, json_path)
-        cdb = ser.deserialize(CDB)
+        cdb = ser.deserialize(CDB, mmap_mode=mmap_mode, lazy=lazy, compact=compact)
         cls._check_medcat_version(cdb.config.asdict())
         fix_waf_lambda(cdb)
         ensure_backward_compatibility(cdb.config, workers)
@@ -597,6 +767,10 @@ class CDB(object):
 
             >>> new_cdb.import_traininig(cdb=old_cdb, overwrite=True)
         """
+        if self._state_journals:
+            cuis = [cui for cui in cdb.cui2context_vectors if cui in self.cui2names]
+            self.record_change('cui2context_vectors', cuis)
+            self.record_change('cui2count_train', cuis)
         # Import vectors and counts
         for cui in cdb.cui2context_vectors:
             if cui in self.cui2names:
@@ -608,7 +782,7 @@ class CDB(object):
 
                 # Increase the vector count
                 self.cui2count_train[cui] = self.cui2count_train.get(cui, 0) + cdb.cui2count_train[cui]
-        self.is_dirty = True
+        self.mark_dirty('cui2context_vectors', 'cui2count_train')
 
     def reset_cui_count(self, n: int = 10) -> None:
         """Reset the CUI count for all concepts that received training, used when starting new unsupervised training
@@ -622,19 +796,23 @@ class CDB(object):
 
             >>> cdb.reset_cui_count()
         """
+        self.record_change('cui2count_train', self.cui2count_train.keys())
         for cui in self.cui2count_train.keys():
             self.cui2count_train[cui] = n
-        self.is_dirty = True
+        self.mark_dirty('cui2count_train')
 
     def reset_training(self) -> None:
         """Will remove all training efforts - in other words all embeddings that are learnt
         for concepts in the current CDB. Please note that this does not remove synonyms (names) that were
         potentially added during supervised/online learning.
         """
+        self.record_change('cui2count_train')
+        self.record_change('cui2context_vectors')
         self.cui2count_train = {}
         self.cui2context_vectors = {}
+        self._context_matrices = {}
         self.reset_concept_similarity()
-        self.is_dirty = True
+        self.mark_dirty('cui2context_vectors', 'cui2count_train')
 
     def populate_cui2snames(self, force: bool = True) -> None:
         """Populate the cui2snames dict if it's empty.
@@ -650,12 +828,14 @@ class CDB(object):
         """
         if not force and self.cui2snames:
             return
+        self.record_change('cui2snames')
         self.cui2snames.clear() # in case forced re-population
         # run through cui2names
         # and create new sets so that they can be independently modified
         for cui, names in self.cui2names.items():
             self.cui2snames[cui] = set(names)  # new set
-        self.is_dirty = True
+        self._name_trie = None
+        self.mark_dirty('cui2snames')
 
     def filter_by_cui(self, cuis_to_keep: Union[List[str], Set[str]]) -> None:
         """Subset the core CDB fields (dictionaries/maps). Note that this will potenitally keep a bit more CUIs
@@ -723,6 +903,9 @@ class CDB(object):
                 new_name2cuis2status[name] = self.name2cuis2status[name]
 
         # Replace everything
+        for field in ('name2cuis', 'snames', 'name2cuis2status', 'cui2names', 'cui2snames',
+                      'cui2context_vectors', 'cui2count_train', 'cui2type_ids', 'cui2preferred_name'):
+            self.record_change(field)
         self.name2cuis = new_name2cuis
         self.snames = snames_to_keep
         self.name2cuis2status = new_name2cuis2status
@@ -733,10 +916,53 @@ class CDB(object):
         self.cui2tags = new_cui2tags
         self.cui2type_ids = new_cui2type_ids
         self.cui2preferred_name = new_cui2preferred_name
+        self._name_trie = None
+        self._context_matrices = {}
         self.is_dirty = True
         # reset memory optimisation state
         self._memory_optimised_parts.clear()
 
+    def _get_names_state(self) -> Tuple:
+        # cheap to calculate state that will change if the names
+        # or sub-names get replaced or (most likely) modified directly
+        snames_len = len(self.snames) if isinstance(self.snames, set) else -1
+        return (self.config.general.separator, id(self.snames), snames_len,
+                id(self.name2cuis), len(self.name2cuis))
+
+    def _get_valid_name_trie(self) -> Optional[NameTrie]:
+        # the name trie if it has been built and is still up to date
+        if self._name_trie is not None and self._name_trie_state != self._get_names_state():
+            self._name_trie = None
+        return self._name_trie
+
+    def _update_name_trie_state(self) -> None:
+        if self._name_trie is not None:
+            self._name_trie_state = self._get_names_state()
+
+    def get_name_trie(self) -> NameTrie:
+        """Get the token level trie of all the names and sub-names in this CDB.
+
+        The trie is built lazily upon first use and is kept up to date when names
+        are added or removed through the CDB methods. If the underlying names
+        (`snames` or `name2cuis`) are replaced or changed in some other way, the
+        trie will be rebuilt.
+
+        Returns:
+            NameTrie: The name trie.
+        """
+        name_trie = self._get_valid_name_trie()
+        if name_trie is None:
+            if isinstance(self.snames, set):
+                snames: Iterable[str] = self.snames
+            else:
+                # memory optimised CDB - snames delegate to cui2snames
+                snames = (sname for cui_snames in self.cui2snames.values() for sname in cui_snames)
+            name_trie = NameTrie.from_names(self.config.general.separator, snames, self.name2cuis.keys())
+            logger.debug("Built a name trie with %d nodes", len(name_trie))
+            self._name_trie = name_trie
+            self._name_trie_state = self._get_names_state()
+        return name_trie
+
     def make_stats(self):
         stats = {}
         stats["Number of concepts"] = len(self.cui2names)
@@ -755,7 +981,7 @@ class CDB(object):
     def reset_concept_similarity(self) -> None:
         """Reset concept similarity matrix."""
         self.addl_info['similarity'] = {}
-        self.is_dirty = True
+        self.mark_dirty('addl_info')
 
     def most_similar(self,
                      cui: str,
@@ -896,23 +1122,42 @@ or download the compatible model."""
         if not should_recalc:
             logger.info("Reusing old hash of CDB since the CDB has not changed: %s", self._hash)
             return self._hash
+        if force_recalc:
+            # rehash everything
+            self._dirty_fields = None
         self.is_dirty = False
         return self.calculate_hash()
 
     def calculate_hash(self):
-        logger.info("Recalculating hash for CDB, this may take a while")
-        hasher = Hasher()
+        """Calculate the hash of the CDB.
 
-        for k,v in self.__dict__.items():
-            if k in ['cui2countext_vectors', 'name2cuis']:
-                hasher.update(v, length=False)
-            elif k in ['_hash', 'is_dirty', '_config_hash']:
+        Each attribute is hashed separately (see `StreamingHasher`) and the hash of the
+        CDB is based on the hashes of the attributes. Only the attributes that have
+        changed since the last time (or that have no hash yet) are rehashed.
+
+        Returns:
+            str: The hash of the CDB.
+        """
+        logger.info("Recalculating hash for CDB")
+        hashed_fields = []
+        for k, v in self.__dict__.items():
+            if k in self.UNHASHED_ATTRIBUTES or k in self.TRANSIENT_ATTRIBUTES:
                 # ignore _hash since if it previously didn't exist, the
                 # new hash would be different when the value does exist
                 # and ignore is_dirty so that we get the same hash as previously
+                # the transient attributes are only built at runtime
                 continue
-            elif k != 'config':
-                hasher.update(v, length=True)
+            hashed_fields.append(k)
+            if self._dirty_fields is None or k in self._dirty_fields or k not in self._field_hashes:
+                logger.debug("Rehashing CDB attribute %s", k)
+                field_hasher = StreamingHasher()
+                field_hasher.update(v)
+                self._field_hashes[k] = field_hasher.hexdigest()
+        self._field_hashes = {k: self._field_hashes[k] for k in hashed_fields}
+        self._dirty_fields = set()
+
+        hasher = Hasher()
+        hasher.update(sorted(self._field_hashes.items()))
 
         # set cached config hash
         self._config_hash = self.config.hash
@@ -3,13 +3,15 @@ import numpy as np
 import datetime
 import logging
 import re
-from typing import Optional, List, Dict, Union, Any
+from typing import Optional, List, Dict, Union, Any, Iterable, Iterator, Set, Tuple
+from multiprocess import Pool
 
 from medcat.pipe import Pipe
 from medcat.cdb import CDB
 from medcat.config import Config
 from medcat.preprocessing.tokenizers import spacy_split_all
-from medcat.preprocessing.cleaners import prepare_name
+from medcat.preprocessing.cleaners import prepare_name, prepare_name_from_doc
+from medcat.preprocessing.name_cache import NameCache
 from medcat.preprocessing.taggers import tag_skip_and_punct
 
 PH_REMOVE = re.compile("(\s)\([a-zA-Z]+[^\)\(]*\)($)")
@@ -17,6 +19,19 @@ PH_REMOVE = re.compile("(\s)\([a-zA-Z]+[^\)\(]*\)($)")
 
 logger = logging.getLogger(__name__)
 
+# (cui, raw names, ontologies, name status, type ids, description)
+ParsedRow = Tuple[str, List[str], Set[str], str, Set[str], str]
+
+# The spacy pipeline and config of each worker process (see `CDBMaker._prepare_shard`)
+_worker_nlp: Any = None
+_worker_config: Any = None
+
+
+def _init_worker(nlp: Any, config: Config) -> None:
+    global _worker_nlp, _worker_config
+    _worker_nlp = nlp
+    _worker_config = config
+
 
 class CDBMaker(object):
     """Given a CSV as shown in https://github.com/CogStack/MedCAT/tree/master/examples/<example> it creates a CDB or
@@ -28,9 +43,12 @@ class CDBMaker(object):
         cdb (medcat.cdb.CDB):
             If set the `CDBMaker` will update the existing `CDB` with
             new concepts in the CSV (Default value `None`).
+        name_cache (Optional[NameCache]):
+            The cache of prepared names, e.g a loaded one from a previous build. If not
+            set, a new one of size `config.preprocessing.name_cache_size` is used (Default value `None`).
     """
 
-    def __init__(self, config: Config, cdb: Optional[CDB] = None) -> None:
+    def __init__(self, config: Config, cdb: Optional[CDB] = None, name_cache: Optional[NameCache] = None) -> None:
         self.config = config
         # Set log level
         logger.setLevel(self.config.general['log_level'])
@@ -43,6 +61,10 @@ class CDBMaker(object):
         else:
             self.cdb = cdb
 
+        if name_cache is None:
+            name_cache = NameCache(self.config.preprocessing['name_cache_size'])
+        self.name_cache = name_cache
+
         # Build the required spacy pipeline
         self.pipe = Pipe(tokenizer=spacy_split_all, config=config)
         self.pipe.add_tagger(tagger=tag_skip_and_punct,
@@ -64,7 +86,9 @@ class CDBMaker(object):
                      escapechar: Optional[str] = None,
                      index_col: bool = False,
                      full_build: bool = False,
-                     only_existing_cuis: bool = False, **kwargs: Any) -> CDB:
+                     only_existing_cuis: bool = False,
+                     n_process: int = 1,
+                     shard_size: int = 1000, **kwargs: Any) -> CDB:
         r"""Compile one or multiple CSVs into a CDB.
 
         Note: This class/method generally uses the same instance of the CDB.
@@ -73,6 +97,12 @@ class CDBMaker(object):
               into new ones.
               To reset the CDB, call `reset_cdb`.
 
+        If `n_process` is larger than 1, the names are prepared (i.e passed through the
+        spacy pipeline) in shards of `shard_size` rows in a pool of processes. The prepared
+        shards are added to the CDB in the original order of the rows, so the result is
+        the same as that of the sequential build. The sequential build uses (and fills)
+        the cache of prepared names (`name_cache`), the parallel one does not.
+
         Args:
             csv_paths (Union[pd.DataFrame, List[str]]):
                 An array of paths to the csv files that should be processed. Can also be an array of pd.DataFrames
@@ -92,6 +122,10 @@ class CDBMaker(object):
             only_existing_cuis (bool):
                 If True no new CUIs will be added, but only linked names will be extended. Mainly used when
                 enriching names of a CDB (e.g. SNOMED with UMLS terms) (Default value `False`).
+            n_process (int):
+                The number of processes used to prepare the names (Default value 1).
+            shard_size (int):
+                The number of rows each process prepares at once if `n_process` > 1 (Default value 1000).
             kwargs (Any):
                 Will be passed to pandas for CSV reading
 
@@ -106,7 +140,6 @@ class CDBMaker(object):
         """
 
         useful_columns = ['cui', 'name', 'ontologies', 'name_status', 'type_ids', 'description']
-        name_status_options = {'A', 'P', 'N'}
 
         for csv_path in csv_paths:
             # Read CSV, everything is converted to strings
@@ -126,9 +159,19 @@ class CDBMaker(object):
                     col2ind[str(col).lower().strip()] = len(cols)
                     cols.append(col)
 
+            rows = (self._parse_row(row, col2ind) for row in df[cols].values)
+            if only_existing_cuis:
+                rows = (row for row in rows if row[0] in self.cdb.cui2names)
+
+            if n_process > 1:
+                self._add_rows_parallel(rows, len(df), full_build, n_process, shard_size)
+                continue
+
             _time = None # Used to check speed
+            # NOTE: the config does not change while the rows are added
+            config_key = self.name_cache.get_config_key(self.config)
             _logging_freq = np.ceil(len(df[cols]) / 100)
-            for row_id, row in enumerate(df[cols].values):
+            for row_id, (cui, raw_names, ontologies, name_status, type_ids, description) in enumerate(rows):
                 if row_id % _logging_freq == 0:
                     # Print some stats
                     if _time is None:
@@ -143,60 +186,117 @@ class CDBMaker(object):
                     # Set previous time to current time
                     _time = ctime
 
-                # This must exist
-                cui = row[col2ind['cui']].strip().upper()
-
-                if not only_existing_cuis or (only_existing_cuis and cui in self.cdb.cui2names):
-                    if 'ontologies' in col2ind:
-                        ontologies = set([ontology.strip() for ontology in row[col2ind['ontologies']].upper().split(self.cnf_cm['multi_separator']) if
-                                         len(ontology.strip()) > 0])
-                    else:
-                        ontologies = set()
-
-                    if 'name_status' in col2ind:
-                        name_status = row[col2ind['name_status']].strip().upper()
-
-                        # Must be allowed
-                        if name_status not in name_status_options:
-                            name_status = 'A'
-                    else:
-                        # Defaults to A - meaning automatic
-                        name_status = 'A'
-
-                    if 'type_ids' in col2ind:
-                        type_ids = set([type_id.strip() for type_id in row[col2ind['type_ids']].upper().split(self.cnf_cm['multi_separator']) if
-                                        len(type_id.strip()) > 0])
-                    else:
-                        type_ids = set()
-
-                    # Get the ones that do not need any changing
-                    if 'description' in col2ind:
-                        description = row[col2ind['description']].strip()
-                    else:
-                        description = ""
-
-                    # We can have multiple versions of a name
-                    names: Dict = {} # {'name': {'tokens': [<str>], 'snames': [<str>]}}
-
-                    raw_names = [raw_name.strip() for raw_name in row[col2ind['name']].split(self.cnf_cm['multi_separator']) if
-                                 len(raw_name.strip()) > 0]
-                    for raw_name in raw_names:
-                        raw_name = raw_name.strip()
-                        prepare_name(raw_name, self.pipe.spacy_nlp, names, self.config)
-
-                        if self.config.cdb_maker.get('remove_parenthesis', 0) > 0 and name_status == 'P':
-                            # Should we remove the content in parenthesis from primary names and add them also
-                            raw_name = PH_REMOVE.sub(" ", raw_name).strip()
-                            if len(raw_name) >= self.config.cdb_maker['remove_parenthesis']:
-                                prepare_name(raw_name, self.pipe.spacy_nlp, names, self.config)
-
-                    self.cdb._add_concept(cui=cui, names=names, ontologies=ontologies, name_status=name_status, type_ids=type_ids,
-                                         description=description, full_build=full_build)
-                    # DEBUG
-                    logger.debug("\n\n**** Added\n CUI: %s\n Names: %s\n Ontologies: %s\n Name status: %s\n Type IDs: %s\n Description: %s\n Is full build: %s",
-                                   cui, names, ontologies, name_status, type_ids, description, full_build)
+                # We can have multiple versions of a name
+                names: Dict = {} # {'name': {'tokens': [<str>], 'snames': [<str>]}}
+                for raw_name in raw_names:
+                    prepare_name(raw_name, self.pipe.spacy_nlp, names, self.config, self.name_cache, config_key)
+
+                self._add_prepared_concept(cui, names, ontologies, name_status, type_ids, description, full_build)
+
+        logger.info("Prepared name cache stats: %s", self.name_cache.get_stats())
 
         return self.cdb
 
+    def _parse_row(self, row: Any, col2ind: Dict[str, int]) -> ParsedRow:
+        # This must exist
+        cui = row[col2ind['cui']].strip().upper()
+
+        if 'ontologies' in col2ind:
+            ontologies = set([ontology.strip() for ontology in row[col2ind['ontologies']].upper().split(self.cnf_cm['multi_separator']) if
+                             len(ontology.strip()) > 0])
+        else:
+            ontologies = set()
+
+        if 'name_status' in col2ind:
+            name_status = row[col2ind['name_status']].strip().upper()
+
+            # Must be allowed
+            if name_status not in {'A', 'P', 'N'}:
+                name_status = 'A'
+        else:
+            # Defaults to A - meaning automatic
+            name_status = 'A'
+
+        if 'type_ids' in col2ind:
+            type_ids = set([type_id.strip() for type_id in row[col2ind['type_ids']].upper().split(self.cnf_cm['multi_separator']) if
+                            len(type_id.strip()) > 0])
+        else:
+            type_ids = set()
+
+        # Get the ones that do not need any changing
+        if 'description' in col2ind:
+            description = row[col2ind['description']].strip()
+        else:
+            description = ""
+
+        # The raw names in the order in which they are to be prepared
+        raw_names = []
+        for raw_name in row[col2ind['name']].split(self.cnf_cm['multi_separator']):
+            raw_name = raw_name.strip()
+            if len(raw_name) == 0:
+                continue
+            raw_names.append(raw_name)
+
+            if self.config.cdb_maker.get('remove_parenthesis', 0) > 0 and name_status == 'P':
+                # Should we remove the content in parenthesis from primary names and add them also
+                raw_name = PH_REMOVE.sub(" ", raw_name).strip()
+                if len(raw_name) >= self.config.cdb_maker['remove_parenthesis']:
+                    raw_names.append(raw_name)
+
+        return cui, raw_names, ontologies, name_status, type_ids, description
+
+    def _add_prepared_concept(self, cui: str, names: Dict, ontologies: Set[str], name_status: str,
+                              type_ids: Set[str], description: str, full_build: bool) -> None:
+        self.cdb._add_concept(cui=cui, names=names, ontologies=ontologies, name_status=name_status, type_ids=type_ids,
+                              description=description, full_build=full_build)
+        # DEBUG
+        logger.debug("\n\n**** Added\n CUI: %s\n Names: %s\n Ontologies: %s\n Name status: %s\n Type IDs: %s\n Description: %s\n Is full build: %s",
+                     cui, names, ontologies, name_status, type_ids, description, full_build)
+
+    @staticmethod
+    def _get_shards(rows: Iterable[ParsedRow], shard_size: int) -> Iterator[List[ParsedRow]]:
+        shard: List[ParsedRow] = []
+        for row in rows:
+            shard.append(row)
+            if len(shard) >= shard_size:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+
+    @staticmethod
+    def _prepare_shard(shard: List[ParsedRow]) -> List[Tuple[ParsedRow, Dict]]:
+        """Prepare the names of a shard of rows (in a worker process).
+
+        Args:
+            shard (List[ParsedRow]): The parsed rows.
+
+        Returns:
+            List[Tuple[ParsedRow, Dict]]: The parsed rows along with their prepared names.
+        """
+        raw_names = [raw_name for row in shard for raw_name in row[1]]
+        sc_names = iter(_worker_nlp.pipe(raw_names))
+        out = []
+        for row in shard:
+            names: Dict = {}
+            for raw_name in row[1]:
+                prepare_name_from_doc(raw_name, next(sc_names), names, _worker_config)
+            out.append((row, names))
+        return out
+
+    def _add_rows_parallel(self, rows: Iterable[ParsedRow], nr_of_rows: int, full_build: bool,
+                           n_process: int, shard_size: int) -> None:
+        start_time = datetime.datetime.now()
+        rows_done = 0
+        with Pool(n_process, initializer=_init_worker, initargs=(self.pipe.spacy_nlp, self.config)) as pool:
+            # NOTE: imap returns the shards in order, so the CDB is built in the same order as sequentially
+            for prepared in pool.imap(self._prepare_shard, self._get_shards(rows, shard_size)):
+                for (cui, _, ontologies, name_status, type_ids, description), names in prepared:
+                    self._add_prepared_concept(cui, names, ontologies, name_status, type_ids, description, full_build)
+                rows_done += len(prepared)
+                elapsed = (datetime.datetime.now() - start_time).total_seconds()
+                logger.info("Current progress: {:.0f}% ({} rows) at {:.1f} rows per second".format(
+                    (rows_done / max(nr_of_rows, 1)) * 100, rows_done, rows_done / max(elapsed, 1e-6)))
+
     def destroy_pipe(self) -> None:
         self.pipe.destroy()
@@ -421,6 +421,9 @@ class Preprocessing(MixingConfig, BaseModel):
     """Documents longer  than this will be trimmed.
 
     NB! For these changes to take effect, the pipe would need to be recreated."""
+    name_cache_size: int = 100_000
+    """The maximum number of raw (concept) names whose prepared versions are cached
+    (see `medcat.preprocessing.name_cache.NameCache`). Set to 0 to disable the cache."""
 
     class Config:
         extra = 'allow'
@@ -60,6 +60,9 @@ class General(MixingConfig, BaseModel):
     """If set the center (concept) will be replaced with this string"""
     batch_size_eval: int = 5000
     """Number of annotations to be meta-annotated at once in eval"""
+    batch_size_eval_tokens: Optional[int] = None
+    """If set, the maximum number of tokens (padding included) to be meta-annotated at once in eval.
+    The annotations are batched by length, so that the batches need little padding."""
     annotate_overlapping: bool = False
     """If set meta_anns will be calculated for doc._.ents, otherwise for doc.ents"""
     tokenizer_name: str = 'bbpe'
@@ -1,8 +1,7 @@
 import numpy as np
 import logging
-from typing import Tuple, Dict, List, Union
-from spacy.tokens import Span, Doc
-from medcat.utils.matutils import unitvec
+from typing import Tuple, Dict, List, Union, Optional
+from spacy.tokens import Span, Doc, Token
 from medcat.cdb import CDB
 from medcat.vocab import Vocab
 from medcat.config import Config
@@ -25,6 +24,9 @@ class ContextModel(object):
         self.cdb = cdb
         self.vocab = vocab
         self.config = config
+        # the weights based on the distance from the entity (see `_get_weights`)
+        self._waf = None
+        self._weights = np.array([])
 
     def get_context_tokens(self, entity: Span, doc: Doc, size: int) -> Tuple:
         """Get context tokens for an entity, this will skip anything that
@@ -51,10 +53,68 @@ class ContextModel(object):
 
         return tokens_left, tokens_center, tokens_right
 
+    def _get_vectors(self, words: List[str]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Get the vectors for a list of words.
+
+        Args:
+            words (List[str]): The words.
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: The vectors (zeros for words without
+                a vector), or None if none of the words have a vector, and the mask of
+                the words that have a vector.
+        """
+        vecs, mask = self.vocab.get_vectors(words)
+        if not mask.any():
+            return None, mask
+        return vecs, mask
+
+    def _get_weights(self, n: int) -> np.ndarray:
+        """Get the weights for the first `n` steps away from the entity.
+
+        The weights are only calculated again if the weighted average function changes
+        or if more of them are needed.
+
+        Args:
+            n (int): The number of weights needed.
+
+        Returns:
+            np.ndarray: The weights.
+        """
+        waf = self.cdb.weighted_average_function
+        if self._waf is not waf or len(self._weights) < n:
+            self._weights = np.array([waf(step) for step in range(n)])
+            self._waf = waf
+        return self._weights[:n]
+
+    def _get_cumulative_sums(self, tokens: List[Token]) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Get the cumulative weighted sums of the vectors of the tokens on one side of
+        an entity, along with the cumulative number of tokens that have vectors.
+
+        The tokens need to be ordered so that the closest to the entity is first.
+
+        Args:
+            tokens (List[Token]): The tokens.
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: The cumulative sums (or None if no vectors
+                were found) and the cumulative counts.
+        """
+        vecs, mask = self._get_vectors([tkn.lower_ for tkn in tokens])
+        counts = np.cumsum(mask)
+        if vecs is None:
+            return None, counts
+        weights = self._get_weights(len(tokens)).astype(vecs.dtype, copy=False)
+        return np.cumsum(vecs * weights[:, None], axis=0), counts
+
     def get_context_vectors(self, entity: Span, doc: Doc, cui=None) -> Dict:
         """Given an entity and the document it will return the context representation for the
         given entity.
 
+        Since the smaller context windows are subsets of the larger ones, the vectors are only
+        looked up once (for the largest window) and all the context types are calculated
+        from the (weighted) cumulative sums.
+
         Args:
             entity (Span): The entity to look for.
             doc (Doc): The document to look in.
@@ -63,32 +123,46 @@ class ContextModel(object):
         Returns:
             Dict: The context vector.
         """
-        vectors = {}
-
-        for context_type in self.config.linking['context_vector_sizes'].keys():
-            size = self.config.linking['context_vector_sizes'][context_type]
-            tokens_left, tokens_center, tokens_right = self.get_context_tokens(entity, doc, size)
-
+        vectors: Dict = {}
+        sizes = self.config.linking['context_vector_sizes']
+        if not sizes:
+            return vectors
+        start_ind = entity[0].i
+        end_ind = entity[-1].i
+        tokens_left, tokens_center, tokens_right = self.get_context_tokens(entity, doc, max(sizes.values()))
+        # the distances from the entity (in increasing order)
+        dists_left = np.array([start_ind - tkn.i for tkn in tokens_left], dtype=int)
+        dists_right = np.array([tkn.i - end_ind for tkn in tokens_right], dtype=int)
+        sums_left, counts_left = self._get_cumulative_sums(tokens_left)
+        sums_right, counts_right = self._get_cumulative_sums(tokens_right)
+        center: Optional[Tuple[Optional[np.ndarray], np.ndarray]] = None
+
+        for context_type, size in sizes.items():
             values = []
-            # Add left
-            values.extend([self.cdb.weighted_average_function(step) * self.vocab.vec(tkn.lower_)
-                           for step, tkn in enumerate(tokens_left) if tkn.lower_ in self.vocab and self.vocab.vec(tkn.lower_) is not None])
+            count = 0
+            # Add left and right
+            for dists, sums, counts in ((dists_left, sums_left, counts_left),
+                                        (dists_right, sums_right, counts_right)):
+                n = int(np.searchsorted(dists, size, side='right'))
+                if n > 0 and counts[n - 1] > 0 and sums is not None:
+                    values.append(sums[n - 1])
+                    count += int(counts[n - 1])
 
             if not self.config.linking['context_ignore_center_tokens']:
                 # Add center
                 if cui is not None and random.random() > self.config.linking['random_replacement_unsupervised'] and self.cdb.cui2names.get(cui, []):
                     new_tokens_center = random.choice(list(self.cdb.cui2names[cui])).split(self.config.general['separator'])
-                    values.extend([self.vocab.vec(tkn) for tkn in new_tokens_center if tkn in self.vocab and self.vocab.vec(tkn) is not None])
+                    center_vecs, center_mask = self._get_vectors(new_tokens_center)
                 else:
-                    values.extend([self.vocab.vec(tkn.lower_) for tkn in tokens_center if tkn.lower_ in self.vocab and self.vocab.vec(tkn.lower_) is not None])
+                    if center is None:
+                        center = self._get_vectors([tkn.lower_ for tkn in tokens_center])
+                    center_vecs, center_mask = center
+                if center_vecs is not None:
+                    values.append(center_vecs.sum(axis=0))
+                    count += int(center_mask.sum())
 
-            # Add right
-            values.extend([self.cdb.weighted_average_function(step) * self.vocab.vec(tkn.lower_)
-                           for step, tkn in enumerate(tokens_right) if tkn.lower_ in self.vocab and self.vocab.vec(tkn.lower_) is not None])
-
-            if len(values) > 0:
-                value = np.average(values, axis=0)
-                vectors[context_type] = value
+            if count > 0:
+                vectors[context_type] = np.sum(values, axis=0) / count
 
         return vectors
 
@@ -119,24 +193,36 @@ class ContextModel(object):
         Returns:
             float: The similarity.
         """
+        return self._similarities([cui], vectors)[0]
 
-        cui_vectors = self.cdb.cui2context_vectors.get(cui, {})
-
-        if cui_vectors and self.cdb.cui2count_train[cui] >= self.config.linking['train_count_threshold']:
-            similarity = 0
-            for context_type in self.config.linking['context_vector_weights']:
-                # Can be that a certain context_type does not exist for a cui/context
-                if context_type in vectors and context_type in cui_vectors:
-                    weight = self.config.linking['context_vector_weights'][context_type]
-                    s = np.dot(unitvec(vectors[context_type]), unitvec(cui_vectors[context_type]))
-                    similarity += weight * s
-
-                    # DEBUG
-                    logger.debug("Similarity for CUI: %s, Count: %s, Context Type: %.10s, Weight: %s.2f, Similarity: %s.3f, S*W: %s.3f",
-                                   cui, self.cdb.cui2count_train[cui], context_type, weight, s, s*weight)
-            return similarity
-        else:
-            return -1
+    def _similarities(self, cuis: List[str], vectors: Dict) -> List[float]:
+        """Calculate the similarities for multiple CUIs once we have the vectors.
+
+        The similarities are calculated for all the CUIs at once (per context type).
+        CUIs that have not been trained (enough) get a similarity of -1.
+
+        Args:
+            cuis (List[str]): The CUIs.
+            vectors (Dict): The vectors.
+
+        Returns:
+            List[float]: The similarities.
+        """
+        similarities = np.zeros(len(cuis))
+        for context_type, weight in self.config.linking['context_vector_weights'].items():
+            # Can be that a certain context_type does not exist for a cui/context
+            if context_type in vectors:
+                sims = self.cdb.get_context_similarities(cuis, context_type, vectors[context_type])
+                similarities += weight * sims
+
+                # DEBUG
+                logger.debug("Similarities for CUIs: %s, Context Type: %.10s, Weight: %.2f, Similarities: %s",
+                             cuis, context_type, weight, sims)
+        for i, cui in enumerate(cuis):
+            if not (self.cdb.cui2context_vectors.get(cui, {}) and
+                    self.cdb.cui2count_train[cui] >= self.config.linking['train_count_threshold']):
+                similarities[i] = -1
+        return similarities.tolist()
 
     def disambiguate(self, cuis: List, entity: Span, name: str, doc: Doc) -> Tuple:
         vectors = self.get_context_vectors(entity, doc)
@@ -155,7 +241,7 @@ class ContextModel(object):
 
         if cuis:    # Maybe none are left after filtering
             # Calculate similarity for each cui
-            similarities = [self._similarity(cui, vectors) for cui in cuis]
+            similarities = self._similarities(cuis, vectors)
             # DEBUG
             logger.debug("Similarities: %s", [(sim, cui) for sim, cui in zip(cuis, similarities)])
 
@@ -207,6 +293,7 @@ class ContextModel(object):
                 # Update the name count, if possible
                 if type(entity) is Span:
                     self.cdb.name2count_train[entity._.detected_name] = self.cdb.name2count_train.get(entity._.detected_name, 0) + 1
+                    self.cdb.mark_dirty('name2count_train')
 
                 if self.config.linking.get('calculate_dynamic_threshold', False):
                     # Update average confidence for this CUI
@@ -215,16 +302,24 @@ class ContextModel(object):
 
             if negative:
                 # Change the status of the name so that it has to be disambiguated always
+                self.cdb.record_change('name2cuis2status', names)
                 for name in names:
-                    if self.cdb.name2cuis2status.get(name, {}).get(cui, '') == 'P':
+                    cuis2status = dict(self.cdb.name2cuis2status.get(name, {}))
+                    if cuis2status.get(cui, '') == 'P':
                         # Set this name to always be disambiguated, even though it is primary
-                        self.cdb.name2cuis2status.get(name, {})[cui] = 'PD'
+                        cuis2status[cui] = 'PD'
                         # Debug
                         logger.debug("Updating status for CUI: %s, name: %s to <PD>", cui, name)
-                    elif self.cdb.name2cuis2status.get(name, {}).get(cui, '') == 'A':
+                    elif cuis2status.get(cui, '') == 'A':
                         # Set this name to always be disambiguated instead of A
-                        self.cdb.name2cuis2status.get(name, {})[cui] = 'N'
+                        cuis2status[cui] = 'N'
                         logger.debug("Updating status for CUI: %s, name: %s to <N>", cui, name)
+                    else:
+                        continue
+                    # NOTE: the changed value is set as a new value since the values
+                    #       of compact maps are immutable (see `medcat.utils.compact_maps`)
+                    self.cdb.name2cuis2status[name] = cuis2status
+                self.cdb.mark_dirty('name2cuis2status')
             if not negative and self.config.linking.get('devalue_linked_concepts', False):
                 #Find what other concepts can be disambiguated against this one
                 _cuis = set()
@@ -248,9 +343,8 @@ class ContextModel(object):
             size = self.config.linking['context_vector_sizes'][context_type]
             # While it should be size*2 it is already too many negative examples, so we leave it at size
             inds = self.vocab.get_negative_samples(size, ignore_punct_and_num=self.config.linking['negative_ignore_punct_and_num'])
-            values = [self.vocab.vec(self.vocab.index2word[ind]) for ind in inds]
-            if len(values) > 0:
-                vectors[context_type] = np.average(values, axis=0)
+            if len(inds) > 0:
+                vectors[context_type] = np.average(self.vocab.vectors[inds], axis=0)
             # Debug
             logger.debug("Updating CUI: %s, with %s negative words", cui, len(inds))
 
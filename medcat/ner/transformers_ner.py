@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import Iterable, Iterator, Optional, Dict, List, cast, Union, Tuple, Callable, Type
 from spacy.tokens import Span
 import inspect
+from bisect import bisect_right
 from functools import partial
 
 from medcat.cdb import CDB
@@ -460,34 +461,49 @@ class TransformersNER(object):
         batch_size_chars = self.config.general['pipe_batch_size_in_chars']
         yield from self._process(stream, batch_size_chars)  # type: ignore
 
+    @staticmethod
+    def _get_token_range(token_ends: List[int], start: int, end: int) -> Tuple[int, int]:
+        """Get the tokens that end within a character range.
+
+        Args:
+            token_ends (List[int]): The (sorted) end character of each token in the document.
+            start (int): The start character (exclusive).
+            end (int): The end character (inclusive).
+
+        Returns:
+            Tuple[int, int]: The index of the first token and the index after the last token.
+                These are equal if there's no such token.
+        """
+        return bisect_right(token_ends, start), bisect_right(token_ends, end)
+
+    def _add_entities(self, doc: Doc, res: List[Dict]) -> None:
+        doc.ents = []  # type: ignore
+        token_ends = [word.idx + len(word.text) for word in doc]
+        for r in res:
+            first, after_last = self._get_token_range(token_ends, r['start'], r['end'])
+            if first < after_last:
+                entity = Span(doc, first, after_last, label=r['entity_group'])
+                entity._.cui = r['entity_group']
+                entity._.context_similarity = r['score']
+                entity._.detected_name = r['word']
+                entity._.id = len(doc._.ents)
+                entity._.confidence = r['score']
+
+                doc._.ents.append(entity)
+
     def _process(self,
                  stream: Iterable[Union[Doc, None]],
                  batch_size_chars: int) -> Iterator[Optional[Doc]]:
         for docs in self.batch_generator(stream, batch_size_chars):  # type: ignore
-            #all_text = [doc.text for doc in docs]
-            #all_text_processed = self.tokenizer.encode_eval(all_text)
-            # For now we will process the documents one by one, should be improved in the future to use batching
-            for doc in docs:
-                res = self.ner_pipe(doc.text, aggregation_strategy=self.config.general['ner_aggregation_strategy'])
-                doc.ents = []  # type: ignore
-                for r in res:
-                    inds = []
-                    for ind, word in enumerate(doc):
-                        end_char = word.idx + len(word.text)
-                        if end_char <= r['end'] and end_char > r['start']:
-                            inds.append(ind)
-                        # To not loop through everything
-                        if end_char > r['end']:
-                            break
-                    if inds:
-                        entity = Span(doc, min(inds), max(inds) + 1, label=r['entity_group'])
-                        entity._.cui = r['entity_group']
-                        entity._.context_similarity = r['score']
-                        entity._.detected_name = r['word']
-                        entity._.id = len(doc._.ents)
-                        entity._.confidence = r['score']
-
-                        doc._.ents.append(entity)
+            # NOTE: The texts are sorted by length so that the texts batched together
+            #       by the pipeline need less padding
+            order = sorted(range(len(docs)), key=lambda i: len(docs[i].text))
+            results = self.ner_pipe([docs[i].text for i in order],
+                                    aggregation_strategy=self.config.general['ner_aggregation_strategy'],
+                                    batch_size=self.config.general['ner_batch_size'])
+            for i, res in zip(order, results):
+                doc = docs[i]
+                self._add_entities(doc, res)
                 create_main_ann(self.cdb, doc)
                 if self.cdb.config.general['make_pretty_labels'] is not None:
                     make_pretty_labels(self.cdb, doc, LabelStyle[self.cdb.config.general['make_pretty_labels']])
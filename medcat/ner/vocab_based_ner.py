@@ -3,6 +3,7 @@ from spacy.tokens import Doc
 from medcat.ner.vocab_based_annotator import maybe_annotate_name
 from medcat.pipeline.pipe_runner import PipeRunner
 from medcat.cdb import CDB
+from medcat.utils.name_trie import NO_NODE
 from medcat.config import Config
 
 
@@ -35,34 +36,42 @@ class NER(PipeRunner):
         """
         # Just take the tokens we need
         _doc = [tkn for tkn in doc if not tkn._.to_skip]
+        # NOTE: walking the name trie is equivalent to checking for
+        #       `name + separator + token` in `cdb.snames` / `cdb.name2cuis`
+        trie = self.cdb.get_name_trie()
+        root = trie.ROOT
+        try_reverse = self.config.ner.get('try_reverse_word_order', False)
+        max_skip_tokens = self.config.ner.max_skip_tokens
         for i in range(len(_doc)):
             tkn = _doc[i]
             tkns = [tkn]
             #name_versions = [tkn.lower_, tkn._.norm]
             name_versions = [tkn._.norm, tkn.lower_]
-            name = ""
+            node = NO_NODE
 
             nv_in_snames = []
             nv_in_names = []
             for name_version in name_versions:
                 # NOTE: if the entire token is an actual concept, we want to capture that
                 #       previous implementation could fail in those cases
-                if name_version in self.cdb.snames:
-                    nv_in_snames.append(name_version)
-                if name_version in self.cdb.name2cuis:
-                    nv_in_names.append(name_version)
+                nv_node = trie.step(root, name_version)
+                if trie.is_sname(nv_node):
+                    nv_in_snames.append(nv_node)
+                if trie.is_name(nv_node):
+                    nv_in_names.append(nv_node)
             if nv_in_names:
                 # TODO: should we prefer 0th (i.e the normalised version) or last (the lower case version)
-                name = nv_in_names[0]
+                node = nv_in_names[0]
             elif nv_in_snames:
                 # TODO: should we prefer 0th (i.e the normalised version) or last (the lower case version)
-                name = nv_in_snames[0]
-            if name in self.cdb.name2cuis and not tkn.is_stop:
+                node = nv_in_snames[0]
+            name = trie.get_name(node)
+            if trie.is_name(node) and not tkn.is_stop:
                 maybe_annotate_name(name, tkns, doc, self.cdb, self.config)
 
             if name: # There has to be at least something appended to the name to go forward
                 for j in range(i+1, len(_doc)):
-                    if _doc[j].i - _doc[j-1].i - 1 > self.config.ner.max_skip_tokens:
+                    if _doc[j].i - _doc[j-1].i - 1 > max_skip_tokens:
                         # Do not allow to skip more than limit
                         break
                     tkn = _doc[j]
@@ -70,27 +79,28 @@ class NER(PipeRunner):
                     name_versions = [tkn._.norm, tkn.lower_]
 
                     name_changed = False
-                    name_reverse = None
+                    reverse_node = NO_NODE
                     for name_version in name_versions:
-                        _name = name + self.config.general.separator + name_version
-                        if _name in self.cdb.snames:
+                        next_node = trie.step(node, name_version)
+                        if trie.is_sname(next_node):
                             # Append the name and break
-                            name = _name
+                            node = next_node
                             name_changed = True
                             break
 
-                        if self.config.ner.get('try_reverse_word_order', False):
-                            _name_reverse = name_version + self.config.general.separator + name
-                            if _name_reverse in self.cdb.snames:
+                        if try_reverse:
+                            _reverse_node = trie.step(trie.step(root, name_version), name)
+                            if trie.is_sname(_reverse_node):
                                 # Append the name and break
-                                name_reverse = _name_reverse
+                                reverse_node = _reverse_node
 
                     if name_changed:
-                        if name in self.cdb.name2cuis:
+                        name = trie.get_name(node)
+                        if trie.is_name(node):
                             maybe_annotate_name(name, tkns, doc, self.cdb, self.config)
-                    elif name_reverse is not None:
-                        if name_reverse in self.cdb.name2cuis:
-                            maybe_annotate_name(name_reverse, tkns, doc, self.cdb, self.config)
+                    elif reverse_node != NO_NODE:
+                        if trie.is_name(reverse_node):
+                            maybe_annotate_name(trie.get_name(reverse_node), tkns, doc, self.cdb, self.config)
                     else:
                         break
 
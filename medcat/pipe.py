@@ -3,7 +3,8 @@ import os
 import spacy
 import gc
 import logging
-from typing import List, Optional, Union, Iterable, Callable
+from typing import List, Optional, Union, Iterable, Iterator, Callable, MutableMapping, TYPE_CHECKING
+from itertools import islice
 from multiprocessing import cpu_count
 from spacy.tokens import Token, Doc, Span
 from spacy.tokenizer import Tokenizer
@@ -11,15 +12,17 @@ from spacy.language import Language
 from spacy.util import raise_error
 from tqdm.autonotebook import tqdm
 from medcat.linking.context_based_linker import Linker
-from medcat.meta_cat import MetaCAT
 from medcat.ner.vocab_based_ner import NER
-from medcat.rel_cat import RelCAT
 from medcat.utils.normalizers import TokenNormalizer, BasicSpellChecker
 from medcat.config import Config
 from medcat.pipeline.pipe_runner import PipeRunner
 from medcat.preprocessing.taggers import tag_skip_and_punct
-from medcat.ner.transformers_ner import TransformersNER
 from medcat.utils.helpers import ensure_spacy_model
+if TYPE_CHECKING:
+    # NOTE: these import torch and transformers, so they're only imported when needed
+    from medcat.meta_cat import MetaCAT
+    from medcat.rel_cat import RelCAT
+    from medcat.ner.transformers_ner import TransformersNER
 
 
 logger = logging.getLogger(__name__) # different logger from the package-level one
@@ -66,6 +69,10 @@ class Pipe(object):
             config.general.spacy_model = DEFAULT_SPACY_MODEL
             self._nlp = self._init_nlp(config)
         self._nlp.tokenizer = tokenizer(self._nlp, config)
+        # the components of the (base) spacy model - these do not depend on the CDB
+        self._base_components = list(self._nlp.pipe_names)
+        # the MedCAT components that run before NER (i.e the tagger and the token normalizer)
+        self._preprocessing_components: List[str] = []
         # Set max document length
         self._nlp.max_length = config.preprocessing.max_document_length
         self.config = config
@@ -91,6 +98,7 @@ class Pipe(object):
         name = name if name is not None else component_factory_name
         Language.factory(name=component_factory_name, default_config={"config": self.config}, func=tagger)
         self._nlp.add_pipe(component_factory_name, name=name, first=True)
+        self._preprocessing_components.append(name)
 
         # Add custom fields needed for this usecase
         Token.set_extension('to_skip', default=False, force=True)
@@ -105,6 +113,7 @@ class Pipe(object):
         name = name if name is not None else component_name
         Language.component(name=component_name, func=token_normalizer)
         self._nlp.add_pipe(component_name, name=name, last=True)
+        self._preprocessing_components.append(name)
 
         # Add custom fields needed for this usecase
         Token.set_extension('norm', default=None, force=True)
@@ -151,7 +160,7 @@ class Pipe(object):
         Span.set_extension('cui', default=-1, force=True)
         Span.set_extension('context_similarity', default=-1, force=True)
 
-    def add_meta_cat(self, meta_cat: MetaCAT, name: Optional[str] = None) -> None:
+    def add_meta_cat(self, meta_cat: 'MetaCAT', name: Optional[str] = None) -> None:
         component_name = spacy.util.get_object_name(meta_cat)
         name = name if name is not None else component_name
         Language.component(name=component_name, func=meta_cat)
@@ -162,7 +171,7 @@ class Pipe(object):
         # Used for sharing pre-processed data/tokens
         Doc.set_extension('share_tokens', default=None, force=True)
 
-    def add_rel_cat(self, rel_cat: RelCAT, name: Optional[str] = None) -> None:
+    def add_rel_cat(self, rel_cat: 'RelCAT', name: Optional[str] = None) -> None:
         component_name = spacy.util.get_object_name(rel_cat)
         name = name if name is not None else component_name
         Language.component(name=component_name, func=rel_cat)
@@ -170,7 +179,7 @@ class Pipe(object):
         # dictionary containing relations of the form {}
         Doc.set_extension("relations", default=[], force=True)
 
-    def add_addl_ner(self, addl_ner: TransformersNER, name: Optional[str] = None) -> None:
+    def add_addl_ner(self, addl_ner: 'TransformersNER', name: Optional[str] = None) -> None:
         component_name = spacy.util.get_object_name(addl_ner)
         name = name if name is not None else component_name
         Language.component(name=component_name, func=addl_ner)  # type: ignore
@@ -244,6 +253,86 @@ class Pipe(object):
                              batch_size=batch_size,
                              component_cfg=component_cfg)
 
+    def pipe_cached(self,
+                    texts: Iterable[str],
+                    doc_cache: Optional[MutableMapping[str, Doc]] = None,
+                    batch_size: int = 1000,
+                    include_preprocessing: bool = False,
+                    per_document: bool = False) -> Iterator[Optional[Doc]]:
+        """Push the texts through the pipeline, processing the spacy part in batches.
+
+        The texts are first tokenised and processed by the components of the
+        (base) spacy model in batches. Since the results don't depend on the
+        CDB, the resulting documents can be kept in `doc_cache` and re-used
+        for the same texts later on (e.g when evaluating the model after each
+        epoch). The rest of the components are then run on a copy of the document.
+
+        The results are the same as when calling the pipeline for each text.
+
+        If `include_preprocessing` is set, the MedCAT tagger and token normalizer
+        are also run before caching the documents so that only NER and linking
+        is re-run for a cached document. NOTE: In that case the spell checking
+        done by the token normalizer will not reflect any words that get added
+        to the CDB after the document was cached.
+
+        If `per_document` is set, the rest of the components are run for each document
+        only once the previous one has been consumed. This is needed if the CDB is
+        changed based on each document (e.g in supervised training), since components
+        that process the documents in batches (e.g MetaCAT) would otherwise process
+        the following documents before the changes are made.
+
+        Args:
+            texts (Iterable[str]): The texts.
+            doc_cache (Optional[MutableMapping[str, Doc]]): The cache of the processed documents
+                (text to document). The same cache should not be used with and without
+                `include_preprocessing`. Defaults to None.
+            batch_size (int): The number of texts processed by the base spacy model at once.
+                Defaults to 1000.
+            include_preprocessing (bool): Whether to also cache the output of the tagger and
+                the token normalizer. Defaults to False.
+            per_document (bool): Whether to run the rest of the components one document at a time.
+                Defaults to False.
+
+        Yields:
+            Optional[Doc]: The document for each text (or None for an empty text).
+        """
+        cached_components = list(self._base_components)
+        if include_preprocessing:
+            cached_components.extend(self._preprocessing_components)
+        other_components = [name for name in self._nlp.pipe_names if name not in cached_components]
+        text_iter = iter(texts)
+        while True:
+            batch = list(islice(text_iter, batch_size))
+            if not batch:
+                break
+            cache = doc_cache if doc_cache is not None else {}
+            missing = list(dict.fromkeys(text for text in batch if text and text not in cache))
+            if missing:
+                cached_docs = self._nlp.pipe(missing, batch_size=batch_size, disable=other_components)
+                cache.update(zip(missing, cached_docs))
+            if per_document:
+                for text in batch:
+                    yield self._nlp(self._copy_doc(cache[text]), disable=cached_components) if text else None
+                continue
+            docs = iter(self._nlp.pipe((self._copy_doc(cache[text]) for text in batch if text),
+                                       batch_size=batch_size, disable=cached_components))
+            for text in batch:
+                yield next(docs) if text else None
+
+    @staticmethod
+    def _copy_doc(doc: Doc) -> Doc:
+        # NOTE: The cached documents only have (immutable) token level extension
+        #       values set (e.g `norm`) in their user data, so instead of the deep
+        #       copy done by `Doc.copy`, a shallow copy of the user data is enough
+        user_data = doc.user_data
+        doc.user_data = {}
+        try:
+            doc_copy = doc.copy()
+        finally:
+            doc.user_data = user_data
+        doc_copy.user_data = dict(user_data)
+        return doc_copy
+
     def set_error_handler(self, error_handler: Callable) -> None:
         self._nlp.set_error_handler(error_handler)
 
@@ -4,13 +4,19 @@ pretty much everything that is not a word.
 import re
 from typing import Dict, Optional, List
 from spacy.language import Language
+from spacy.tokens import Doc
 from medcat.config import Config
+from medcat.preprocessing.name_cache import NameCache
 
 
-def prepare_name(raw_name: str, nlp: Language, names: Dict, config: Config) -> Dict:
+def prepare_name(raw_name: str, nlp: Language, names: Dict, config: Config,
+                 cache: Optional[NameCache] = None, config_key: Optional[str] = None) -> Dict:
     """Generates different forms of a name. Will edit the provided `names` dictionary
     and add information generated from the `name`.
 
+    If a cache is provided, the prepared forms of a raw name already seen are taken
+    from there (rather than running the spacy pipeline again).
+
     Args:
         raw_name (str):
             The raw name to prepare.
@@ -21,13 +27,50 @@ def prepare_name(raw_name: str, nlp: Language, names: Dict, config: Config) -> D
             name versions and other required information will be added here.
         config (Config):
             Global config for medcat.
+        cache (Optional[NameCache]):
+            The cache of prepared names. Defaults to None.
+        config_key (Optional[str]):
+            The (precalculated) cache key of the config (see `NameCache.get_config_key`).
+            Useful when preparing many names with the same config. Defaults to None.
 
     Returns:
         names (Dict):
             The new dictionary of prepared names.
     """
-    sc_name = nlp(raw_name)
+    if cache is None:
+        return prepare_name_from_doc(raw_name, nlp(raw_name), names, config)
+
+    if config_key is None:
+        config_key = cache.get_config_key(config)
+    prepared = cache.get(raw_name, config, config_key)
+    if prepared is None:
+        prepared = cache.add(raw_name, config, prepare_name_from_doc(raw_name, nlp(raw_name), {}, config), config_key)
+    # NOTE: same as preparing it again, the names already there are kept as they are
+    for name, (tokens, snames, is_upper) in prepared.items():
+        if name not in names:
+            names[name] = {'tokens': list(tokens), 'snames': set(snames), 'raw_name': raw_name, 'is_upper': is_upper}
+    return names
+
 
+def prepare_name_from_doc(raw_name: str, sc_name: Doc, names: Dict, config: Config) -> Dict:
+    """Generates different forms of a name that has already been processed by spacy.
+    Same as `prepare_name`, but allows the names to be processed in batches (e.g `nlp.pipe`).
+
+    Args:
+        raw_name (str):
+            The raw name to prepare.
+        sc_name (Doc):
+            The raw name processed by the spacy nlp model.
+        names (Dict):
+            Dictionary of existing names for this concept in this row of a CSV. The new generated
+            name versions and other required information will be added here.
+        config (Config):
+            Global config for medcat.
+
+    Returns:
+        names (Dict):
+            The new dictionary of prepared names.
+    """
     for version in config.cdb_maker['name_versions']:
         tokens = None
         is_upper = sc_name.text.isupper()
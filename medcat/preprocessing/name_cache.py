@@ -0,0 +1,172 @@
+"""A bounded cache for the prepared versions of (raw) names.
+
+The same surface forms tend to repeat across many concepts (and sources), and
+preparing a name (see `medcat.preprocessing.cleaners.prepare_name`) runs the full
+spacy pipeline on it. So the prepared versions of a name are cached based on the
+raw name, the name versions and the (relevant parts of the) config.
+"""
+import dill
+import logging
+import xxhash
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from medcat.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# {name: (tokens, snames, is_upper)}
+CachedNames = Dict[str, Tuple[Tuple[str, ...], frozenset, bool]]
+
+
+class NameCache(object):
+    """A bounded (least recently used) cache of prepared names.
+
+    Args:
+        max_size (int): The maximum number of raw names to keep. Defaults to 100 000.
+    """
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        self.max_size = max_size
+        self._cache: 'OrderedDict[Tuple[str, Tuple[str, ...], str], CachedNames]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_config_key(config: Config) -> str:
+        """Get the key of the parts of the config that affect the prepared names
+        (other than the name versions).
+
+        Args:
+            config (Config): The config.
+
+        Returns:
+            str: The key (hash) of the relevant parts of the config.
+        """
+        cnf_p = config.preprocessing
+        stopwords = cnf_p['stopwords']
+        relevant = (config.general['spacy_model'],
+                    sorted(config.general['spacy_disabled_components']),
+                    config.general['separator'],
+                    sorted(cnf_p['words_to_skip']),
+                    sorted(cnf_p['keep_punct']),
+                    cnf_p['skip_stopwords'],
+                    sorted(stopwords) if stopwords is not None else None,
+                    cnf_p['min_len_normalize'],
+                    sorted(cnf_p.get('do_not_normalize', set())),
+                    config.cdb_maker.get('min_letters_required', 0))
+        return xxhash.xxh64(repr(relevant).encode()).hexdigest()
+
+    @classmethod
+    def _get_key(cls, raw_name: str, config: Config,
+                 config_key: Optional[str]) -> Tuple[str, Tuple[str, ...], str]:
+        if config_key is None:
+            config_key = cls.get_config_key(config)
+        return raw_name, tuple(config.cdb_maker['name_versions']), config_key
+
+    def get(self, raw_name: str, config: Config, config_key: Optional[str] = None) -> Optional[CachedNames]:
+        """Get the prepared names of a raw name.
+
+        Args:
+            raw_name (str): The raw name.
+            config (Config): The config the names are prepared with.
+            config_key (Optional[str]): The (precalculated) key of the config (see `get_config_key`).
+                Defaults to None (i.e it is calculated).
+
+        Returns:
+            Optional[CachedNames]: The prepared names, or None if the raw name is not cached.
+        """
+        if self.max_size <= 0:
+            self.misses += 1
+            return None
+        key = self._get_key(raw_name, config, config_key)
+        names = self._cache.get(key)
+        if names is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return names
+
+    def add(self, raw_name: str, config: Config, names: Dict[str, Dict],
+            config_key: Optional[str] = None) -> CachedNames:
+        """Add the prepared names of a raw name.
+
+        Args:
+            raw_name (str): The raw name.
+            config (Config): The config the names were prepared with.
+            names (Dict[str, Dict]): The names prepared (only) from this raw name.
+            config_key (Optional[str]): The (precalculated) key of the config (see `get_config_key`).
+                Defaults to None (i.e it is calculated).
+
+        Returns:
+            CachedNames: The names in the form they are cached in.
+        """
+        cached = {name: (tuple(info['tokens']), frozenset(info['snames']), info['is_upper'])
+                  for name, info in names.items()}
+        if self.max_size <= 0:
+            return cached
+        key = self._get_key(raw_name, config, config_key)
+        self._cache[key] = cached
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return cached
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of the lookups that were found in the cache.
+
+        Returns:
+            float: The hit rate (0 if there have been no lookups).
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the statistics of the cache.
+
+        Returns:
+            Dict[str, Any]: The size, max size, hits, misses and hit rate of the cache.
+        """
+        return {'size': len(self), 'max_size': self.max_size, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def clear(self) -> None:
+        """Remove everything from the cache and reset the statistics."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, path: str) -> None:
+        """Save the cached names (not the statistics) to a file.
+
+        Args:
+            path (str): The path of the file.
+        """
+        with open(path, 'wb') as f:
+            dill.dump({'max_size': self.max_size, 'cache': list(self._cache.items())}, f)
+
+    @classmethod
+    def load(cls, path: str, max_size: Optional[int] = None) -> 'NameCache':
+        """Load a saved cache.
+
+        Args:
+            path (str): The path of the file.
+            max_size (Optional[int]): The maximum size of the loaded cache. Defaults to the saved one.
+
+        Returns:
+            NameCache: The loaded cache.
+        """
+        with open(path, 'rb') as f:
+            data = dill.load(f)
+        cache = cls(data['max_size'] if max_size is None else max_size)
+        # NOTE: the (least recently used) ones are first, so keep the last ones if need be
+        items = data['cache'][-cache.max_size:] if cache.max_size > 0 else []
+        cache._cache.update(items)
+        logger.info("Loaded %d prepared names from %s", len(cache), path)
+        return cache
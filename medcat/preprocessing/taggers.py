@@ -1,5 +1,6 @@
+from typing import Dict, Optional, Tuple
 from spacy.language import Language
-from spacy.tokens import Doc
+from spacy.tokens import Doc, Token
 from medcat.config import Config
 from medcat.pipeline.pipe_runner import PipeRunner
 
@@ -31,22 +32,47 @@ class _Tagger(PipeRunner):
     def __init__(self, nlp: Language, name: str, config: Config) -> None:
         self.name = name
         self.config = config
+        # The tags only depend on the lexeme (and the config), so they are memoised
+        # per lexeme (orth) - {orth: (is_punct, to_skip)}
+        self._memo: Dict[int, Tuple[bool, bool]] = {}
+        self._memo_config: Optional[Tuple] = None
         super().__init__(self.config.general['workers'])
 
-    # Override
-    def __call__(self, doc: Doc) -> Doc:
+    def _get_memo(self) -> Dict[int, Tuple[bool, bool]]:
+        cnf_p = self.config.preprocessing
+        memo_config = (self.config.punct_checker, self.config.word_skipper,
+                       frozenset(cnf_p['keep_punct']), cnf_p['skip_stopwords'])
+        if memo_config != self._memo_config:
+            self._memo = {}
+            self._memo_config = memo_config
+        return self._memo
+
+    def _get_tags(self, token: Token) -> Tuple[bool, bool]:
         # Make life easier
         cnf_p = self.config.preprocessing
 
+        if self.config.punct_checker.match(token.lower_) and token.text not in cnf_p['keep_punct']:
+            # There can't be punct in a token if it also has text
+            return True, True
+        elif self.config.word_skipper.match(token.lower_):
+            # Skip if specific strings
+            return False, True
+        elif cnf_p['skip_stopwords'] and token.is_stop:
+            return False, True
+        return False, False
+
+    # Override
+    def __call__(self, doc: Doc) -> Doc:
+        memo = self._get_memo()
+
         for token in doc:
-            if self.config.punct_checker.match(token.lower_) and token.text not in cnf_p['keep_punct']:
-                # There can't be punct in a token if it also has text
+            tags = memo.get(token.orth)
+            if tags is None:
+                tags = memo[token.orth] = self._get_tags(token)
+            is_punct, to_skip = tags
+            if is_punct:
                 token._.is_punct = True
-                token._.to_skip = True
-            elif self.config.word_skipper.match(token.lower_):
-                # Skip if specific strings
-                token._.to_skip = True
-            elif cnf_p['skip_stopwords'] and token.is_stop:
+            if to_skip:
                 token._.to_skip = True
 
         return doc
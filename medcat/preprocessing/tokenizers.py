@@ -6,7 +6,6 @@ from spacy.tokenizer import Tokenizer
 from spacy.language import Language
 from spacy.tokens import Doc
 from tokenizers import ByteLevelBPETokenizer
-from transformers.models.bert.tokenization_bert_fast import BertTokenizerFast
 from medcat.config import Config
 
 
@@ -194,6 +193,8 @@ class TokenizerWrapperBERT(object):
 
     @classmethod
     def load(cls, dir_path: str, name: str = 'bert', **kwargs) -> Any:
+        # NOTE: imported here so that transformers is only imported when needed
+        from transformers.models.bert.tokenization_bert_fast import BertTokenizerFast
         tokenizer = cls()
         path = os.path.join(dir_path, name)
         tokenizer.hf_tokenizers = BertTokenizerFast.from_pretrained(path, **kwargs)
@@ -1,5 +1,8 @@
 from typing import Protocol, Tuple, List, Dict, Optional, Set, Iterable, Callable, cast, Any, Union
 
+import logging
+import queue
+import random
 from abc import ABC, abstractmethod
 from enum import Enum, auto
 from copy import deepcopy
@@ -7,6 +10,7 @@ from pydantic import BaseModel
 from itertools import islice
 
 import numpy as np
+from multiprocess import get_context, get_all_start_methods
 
 from medcat.utils.checkpoint import Checkpoint
 from medcat.utils.cdb_state import captured_state_cdb
@@ -18,6 +22,8 @@ from medcat.stats.mctexport import count_all_annotations, count_all_docs, get_nr
 from medcat.stats.mctexport import iter_anns, iter_docs, MedCATTrainerExportProjectInfo
 
 
+logger = logging.getLogger(__name__)
+
 
 class CDBLike(Protocol):
     pass
@@ -289,19 +295,94 @@ def get_fold_creator(mct_export: MedCATTrainerExport,
 
 
 def get_per_fold_metrics(cat: CATLike, folds: List[MedCATTrainerExport],
-                         *args, **kwargs) -> List[Tuple]:
+                         *args, nproc: int = 1, **kwargs) -> List[Tuple]:
+    """Get the metrics for each fold.
+
+    For each fold, the model is trained on all the other folds and then evaluated
+    on the fold itself. Each fold starts from the state of the base model (and the
+    same random state) so the folds are independent of one another.
+
+    With `nproc` > 1 the folds are run in separate (forked) processes, at most `nproc`
+    at a time. Each process shares the base model with the parent (copy-on-write)
+    and only the metrics are sent back. The results are the same as when running
+    the folds sequentially.
+
+    Args:
+        cat (CATLike): The model pack.
+        folds (List[MedCATTrainerExport]): The folds.
+        *args: Arguments passed to the `CAT.train_supervised_raw` method.
+        nproc (int): The number of folds to run in parallel. Defaults to 1.
+        **kwargs: Keyword arguments passed to the `CAT.train_supervised_raw` method.
+
+    Returns:
+        List[Tuple]: The metrics for each fold.
+    """
+    rng_state = (random.getstate(), np.random.get_state())
+    if nproc > 1 and len(folds) > 1:
+        if 'fork' in get_all_start_methods():
+            return _get_per_fold_metrics_parallel(cat, folds, nproc, rng_state, *args, **kwargs)
+        logger.warning("Unable to run the folds in parallel since forking processes is not "
+                       "supported on this platform - running them sequentially")
     metrics = []
-    for fold_nr, cur_fold in enumerate(folds):
-        others = list(folds)
-        others.pop(fold_nr)
-        with captured_state_cdb(cat.cdb):
-            for other in others:
-                cat.train_supervised_raw(cast(Dict[str, Any], other), *args, **kwargs)
-            stats = get_stats(cat, cast(Dict[str, Any], cur_fold), do_print=False)
-            metrics.append(stats)
+    for fold_nr in range(len(folds)):
+        with captured_state_cdb(cat.cdb, use_journal=True):
+            metrics.append(_get_fold_metrics(cat, folds, fold_nr, rng_state, *args, **kwargs))
     return metrics
 
 
+def _get_fold_metrics(cat: CATLike, folds: List[MedCATTrainerExport], fold_nr: int,
+                      rng_state: Tuple, *args, **kwargs) -> Tuple:
+    random.setstate(rng_state[0])
+    np.random.set_state(rng_state[1])
+    for other_nr, other in enumerate(folds):
+        if other_nr != fold_nr:
+            cat.train_supervised_raw(cast(Dict[str, Any], other), *args, **kwargs)
+    return get_stats(cat, cast(Dict[str, Any], folds[fold_nr]), do_print=False)
+
+
+def _get_per_fold_metrics_parallel(cat: CATLike, folds: List[MedCATTrainerExport], nproc: int,
+                                   rng_state: Tuple, *args, **kwargs) -> List[Tuple]:
+    ctx = get_context('fork')
+    out_q = ctx.Queue()
+
+    def run_fold(fold_nr: int) -> None:
+        # NOTE: the (forked) process has its own copy of the base model,
+        #       so there's no need to restore its state afterwards
+        try:
+            out_q.put((fold_nr, _get_fold_metrics(cat, folds, fold_nr, rng_state, *args, **kwargs), None))
+        except Exception as e:
+            out_q.put((fold_nr, None, repr(e)))
+
+    metrics: Dict[int, Tuple] = {}
+    pending = list(range(len(folds)))
+    running: Dict[int, Any] = {}
+    try:
+        while pending or running:
+            while pending and len(running) < nproc:
+                fold_nr = pending.pop(0)
+                logger.info("Starting fold %d of %d in a separate process", fold_nr + 1, len(folds))
+                proc = ctx.Process(target=run_fold, args=(fold_nr, ))
+                proc.start()
+                running[fold_nr] = proc
+            try:
+                fold_nr, fold_metrics, error = out_q.get(timeout=1)
+            except queue.Empty:
+                for fold_nr, proc in running.items():
+                    if not proc.is_alive() and out_q.empty():
+                        raise RuntimeError(f"The process for fold {fold_nr} died unexpectedly "
+                                           f"(exit code {proc.exitcode})")
+                continue
+            running.pop(fold_nr).join()
+            if error is not None:
+                raise RuntimeError(f"Failed to get the metrics for fold {fold_nr}: {error}")
+            metrics[fold_nr] = fold_metrics
+    finally:
+        for proc in running.values():
+            proc.terminate()
+            proc.join()
+    return [metrics[fold_nr] for fold_nr in range(len(folds))]
+
+
 def _merge_examples(all_examples: Dict, cur_examples: Dict) -> None:
     for ex_type, ex_dict in cur_examples.items():
         if ex_type not in all_examples:
@@ -451,7 +532,7 @@ def get_metrics_mean(metrics: List[Tuple[Dict, Dict, Dict, Dict, Dict, Dict, Dic
 
 def get_k_fold_stats(cat: CATLike, mct_export_data: MedCATTrainerExport, k: int = 3,
                      split_type: SplitType = SplitType.DOCUMENTS_WEIGHTED,
-                     include_std: bool = False, *args, **kwargs) -> Tuple:
+                     include_std: bool = False, *args, nproc: int = 1, **kwargs) -> Tuple:
     """Get the k-fold stats for the model with the specified data.
 
     First this will split the MCT export into `k` folds. You can do
@@ -462,6 +543,9 @@ def get_k_fold_stats(cat: CATLike, mct_export_data: MedCATTrainerExport, k: int
     After that the base model state is restored before doing the next fold.
     After all the folds have been done, the metrics are averaged.
 
+    The folds can also be run in parallel (see `nproc`). That gives the
+    same results, but requires enough memory for `nproc` trained models.
+
     Args:
         cat (CATLike): The model pack.
         mct_export_data (MedCATTrainerExport): The MCT export.
@@ -469,6 +553,7 @@ def get_k_fold_stats(cat: CATLike, mct_export_data: MedCATTrainerExport, k: int
         split_type (SplitType): Whether to use annodations or docs. Defaults to DOCUMENTS_WEIGHTED.
         include_std (bool): Whether to include stanrdard deviation. Defaults to False.
         *args: Arguments passed to the `CAT.train_supervised_raw` method.
+        nproc (int): The number of folds to run in parallel (in forked processes). Defaults to 1.
         **kwargs: Keyword arguments passed to the `CAT.train_supervised_raw` method.
 
     Returns:
@@ -476,6 +561,6 @@ def get_k_fold_stats(cat: CATLike, mct_export_data: MedCATTrainerExport, k: int
     """
     creator = get_fold_creator(mct_export_data, k, split_type=split_type)
     folds = creator.create_folds()
-    per_fold_metrics = get_per_fold_metrics(cat, folds, *args, **kwargs)
+    per_fold_metrics = get_per_fold_metrics(cat, folds, *args, nproc=nproc, **kwargs)
     means = get_metrics_mean(per_fold_metrics, include_std)
     return means
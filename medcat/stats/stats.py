@@ -1,4 +1,5 @@
-from typing import Dict, Optional, Set, Tuple, Callable, List, cast
+from typing import Dict, Optional, Set, Tuple, Callable, List, Iterable, Iterator, cast
+from functools import partial
 
 from tqdm import tqdm
 import traceback
@@ -24,7 +25,8 @@ class StatsBuilder:
                  use_overlaps: bool = False,
                  use_cui_doc_limit: bool = False,
                  use_groups: bool = False,
-                 extra_cui_filter: Optional[Set] = None) -> None:
+                 extra_cui_filter: Optional[Set] = None,
+                 docs_getter: Optional[Callable[[List[str]], Iterable[Optional[Doc]]]] = None) -> None:
         self.filters = filters
         self.addl_info = addl_info
         self.doc_getter = doc_getter
@@ -37,6 +39,8 @@ class StatsBuilder:
         self.use_cui_doc_limit = use_cui_doc_limit
         self.use_groups = use_groups
         self.extra_cui_filter = extra_cui_filter
+        # used to process multiple documents at once (if available)
+        self.docs_getter = docs_getter
         self._reset_stats()
 
     def _reset_stats(self):
@@ -64,15 +68,27 @@ class StatsBuilder:
         project_id = cast(str, project.get('id'))
 
         documents = project["documents"]
+        spacy_docs: Optional[Iterator[Optional[Doc]]] = None
+        if self.docs_getter is not None and not self.use_cui_doc_limit:
+            # the filters are the same for all the documents in the project
+            # so they can be processed in batches
+            spacy_docs = iter(self.docs_getter([doc['text'] for doc in documents]))
         for dind, doc in tqdm(
             enumerate(documents),
             desc="Stats document",
             total=len(documents),
             leave=False,
         ):
-            self.process_document(project_name, project_id, doc)
+            spacy_doc = next(spacy_docs) if spacy_docs is not None else None
+            self.process_document(project_name, project_id, doc, spacy_doc)
 
-    def process_document(self, project_name: str, project_id: str, doc: dict) -> None:
+    def _get_doc(self, text: str) -> Optional[Doc]:
+        if self.docs_getter is not None:
+            return next(iter(self.docs_getter([text])))
+        return self.doc_getter(text)  # type: ignore
+
+    def process_document(self, project_name: str, project_id: str, doc: dict,
+                         spacy_doc: Optional[Doc] = None) -> None:
         anns = self._get_doc_annotations(doc)
 
         # Apply document level filtering, in this case project_filter is ignored while the extra_cui_filter is respected still
@@ -83,12 +99,13 @@ class StatsBuilder:
             else:
                 self.filters.cuis = {'empty'}
 
-        spacy_doc: Doc = self.doc_getter(doc['text'])  # type: ignore
+        if spacy_doc is None:
+            spacy_doc = self._get_doc(doc['text'])
 
         if self.use_overlaps:
-            p_anns = spacy_doc._.ents
+            p_anns = spacy_doc._.ents  # type: ignore
         else:
-            p_anns = spacy_doc.ents
+            p_anns = spacy_doc.ents  # type: ignore
 
         (anns_norm, anns_norm_neg,
          anns_examples, _) = self._preprocess_annotations(project_name, project_id, doc, anns)
@@ -101,14 +118,15 @@ class StatsBuilder:
 
     def _process_anns_norm(self, doc: dict, anns_norm: list, p_anns_norm: list,
                            anns_examples: list) -> None:
+        p_anns_norm_set = set(p_anns_norm)
         for iann, ann in enumerate(anns_norm):
-            if ann not in p_anns_norm:
+            if ann not in p_anns_norm_set:
                 cui = ann[1]
                 self.fn += 1
                 self.fn_docs.add(doc.get('name', 'unk'))
 
                 self.fns[cui] = self.fns.get(cui, 0) + 1
-                self.examples['fn'][cui] = self.examples['fn'].get(cui, []) + [anns_examples[iann]]
+                self.examples['fn'].setdefault(cui, []).append(anns_examples[iann])
 
     def _process_p_anns(self, project_name: str, project_id: str, doc: dict, p_anns: list) -> Tuple[list, list]:
         p_anns_norm = []
@@ -124,14 +142,16 @@ class StatsBuilder:
 
     def _count_p_anns_norm(self, doc: dict, anns_norm: list, anns_norm_neg: list,
                            p_anns_norm: list, p_anns_examples: list) -> None:
+        anns_norm_set = set(anns_norm)
+        anns_norm_neg_set = set(anns_norm_neg)
         for iann, ann in enumerate(p_anns_norm):
             cui = ann[1]
-            if ann in anns_norm:
+            if ann in anns_norm_set:
                 self.tp += 1
                 self.tps[cui] = self.tps.get(cui, 0) + 1
 
                 example = p_anns_examples[iann]
-                self.examples['tp'][cui] = self.examples['tp'].get(cui, []) + [example]
+                self.examples['tp'].setdefault(cui, []).append(example)
             else:
                 self.fp += 1
                 self.fps[cui] = self.fps.get(cui, 0) + 1
@@ -139,11 +159,11 @@ class StatsBuilder:
 
                 # Add example for this FP prediction
                 example = p_anns_examples[iann]
-                if ann in anns_norm_neg:
+                if ann in anns_norm_neg_set:
                     # Means that it really was annotated as negative
                     example['real_fp'] = True
 
-                self.examples['fp'][cui] = self.examples['fp'].get(cui, []) + [example]
+                self.examples['fp'].setdefault(cui, []).append(example)
 
     def _create_annoation(self, project_name: str, project_id: str, cui: str, doc: dict, ann: Dict) -> Dict:
         return {"text": doc['text'][max(0, ann['start']-60):ann['end']+60],
@@ -254,7 +274,8 @@ class StatsBuilder:
                  use_overlaps: bool = False,
                  use_cui_doc_limit: bool = False,
                  use_groups: bool = False,
-                 extra_cui_filter: Optional[Set] = None) -> 'StatsBuilder':
+                 extra_cui_filter: Optional[Set] = None,
+                 doc_cache: Optional[Dict[str, Doc]] = None) -> 'StatsBuilder':
         return StatsBuilder(filters=local_filters,
                             addl_info=cat.cdb.addl_info,
                             doc_getter=cat.__call__,
@@ -266,7 +287,8 @@ class StatsBuilder:
                             use_overlaps=use_overlaps,
                             use_cui_doc_limit=use_cui_doc_limit,
                             use_groups=use_groups,
-                            extra_cui_filter=extra_cui_filter)
+                            extra_cui_filter=extra_cui_filter,
+                            docs_getter=partial(cat._pipe_cached, doc_cache=doc_cache))
 
 
 def get_stats(cat,
@@ -277,7 +299,8 @@ def get_stats(cat,
               use_cui_doc_limit: bool = False,
               use_groups: bool = False,
               extra_cui_filter: Optional[Set] = None,
-              do_print: bool = True) -> Tuple:
+              do_print: bool = True,
+              doc_cache: Optional[Dict[str, Doc]] = None) -> Tuple:
     """TODO: Refactor and make nice
     Print metrics on a dataset (F1, P, R), it will also print the concepts that have the most FP,FN,TP.
 
@@ -303,6 +326,10 @@ def get_stats(cat,
             This filter will be intersected with all other filters, or if all others are not set then only this one will be used.
         do_print (bool):
             Whether to print stats out. Defaults to True.
+        doc_cache (Optional[Dict[str, Doc]]):
+            The cache for the documents processed by the base spacy model. This can be used to
+            avoid re-processing the same texts when evaluating the model multiple times
+            (e.g after each training epoch). Defaults to None.
 
     Returns:
         fps (dict):
@@ -330,7 +357,8 @@ def get_stats(cat,
                                     use_overlaps=use_overlaps,
                                     use_cui_doc_limit=use_cui_doc_limit,
                                     use_groups=use_groups,
-                                    extra_cui_filter=extra_cui_filter)
+                                    extra_cui_filter=extra_cui_filter,
+                                    doc_cache=doc_cache)
     for pind, project in tqdm(enumerate(data['projects']), desc="Stats project", total=len(data['projects']), leave=False):
         builder.process_project(project)
 
@@ -0,0 +1,257 @@
+"""Output sinks for (large scale) multiprocessing annotation runs.
+
+The annotated documents are saved in parts (one file per part) by a sink.
+The IDs of the documents already annotated (along with the number of the next
+part) are kept in a (SQLite based) resume index. That way a run can continue
+where it left off without having to rewrite the full list of IDs upon every save.
+"""
+import os
+import json
+import pickle
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Type, Union
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class AnnotationSink(ABC):
+    """The base class for the sinks that save the annotated documents in parts."""
+    file_extension: str = ''
+
+    def get_part_path(self, folder: str, part_nr: int) -> str:
+        """Get the path of the file of a part.
+
+        Args:
+            folder (str): The folder the parts are saved in.
+            part_nr (int): The number of the part.
+
+        Returns:
+            str: The path of the file of the part.
+        """
+        return os.path.join(folder, f'part_{part_nr}.{self.file_extension}')
+
+    def save_part(self, docs: Dict[Any, Dict], folder: str, part_nr: int) -> str:
+        """Save the annotated documents as a (new) part.
+
+        The part is first written in a temporary file which then replaces the target
+        file. So a part file only ever exists if it was written in full.
+
+        Args:
+            docs (Dict[Any, Dict]): The annotated documents, i.e {id: doc_json, id2: doc_json2, ...}
+            folder (str): The folder to save the part in.
+            part_nr (int): The number of the part.
+
+        Returns:
+            str: The path of the saved part.
+        """
+        path = self.get_part_path(folder, part_nr)
+        tmp_path = path + '.tmp'
+        self._write(docs, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @abstractmethod
+    def _write(self, docs: Dict[Any, Dict], path: str) -> None:
+        pass
+
+    @abstractmethod
+    def read_part(self, path: str) -> Iterator[Tuple[Any, Dict]]:
+        """Read the annotated documents of a saved part.
+
+        Args:
+            path (str): The path of the part.
+
+        Yields:
+            Tuple[Any, Dict]: The ID and the annotated document.
+        """
+
+
+class PickleSink(AnnotationSink):
+    """Saves each part as a pickled dict."""
+    file_extension = 'pickle'
+
+    def _write(self, docs: Dict[Any, Dict], path: str) -> None:
+        with open(path, 'wb') as f:
+            pickle.dump(docs, f)
+
+    def read_part(self, path: str) -> Iterator[Tuple[Any, Dict]]:
+        with open(path, 'rb') as f:
+            docs = pickle.load(f)
+        yield from docs.items()
+
+
+class JSONLinesSink(AnnotationSink):
+    """Saves each part in the JSON Lines format.
+
+    Each line is a JSON object with the keys `id` and `annotations`.
+    NOTE: The (integer) keys of the entities become strings in JSON.
+    """
+    file_extension = 'jsonl'
+
+    def _write(self, docs: Dict[Any, Dict], path: str) -> None:
+        with open(path, 'w') as f:
+            for doc_id, doc in docs.items():
+                f.write(json.dumps({'id': doc_id, 'annotations': doc}))
+                f.write('\n')
+
+    def read_part(self, path: str) -> Iterator[Tuple[Any, Dict]]:
+        with open(path) as f:
+            for line in f:
+                data = json.loads(line)
+                yield data['id'], data['annotations']
+
+
+class ParquetSink(AnnotationSink):
+    """Saves each part as a Parquet file.
+
+    Each row is a document with the columns `id` and `annotations`
+    (the latter as a JSON string). The IDs need to be of the same type.
+    NOTE: The (integer) keys of the entities become strings in JSON.
+    """
+    file_extension = 'parquet'
+
+    def _write(self, docs: Dict[Any, Dict], path: str) -> None:
+        # NOTE: pyarrow is installed as a dependency of datasets
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({'id': list(docs.keys()),
+                          'annotations': [json.dumps(doc) for doc in docs.values()]})
+        pq.write_table(table, path)
+
+    def read_part(self, path: str) -> Iterator[Tuple[Any, Dict]]:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        for doc_id, annotations in zip(table.column('id').to_pylist(), table.column('annotations').to_pylist()):
+            yield doc_id, json.loads(annotations)
+
+
+SINKS: Dict[str, Type[AnnotationSink]] = {
+    'pickle': PickleSink,
+    'jsonl': JSONLinesSink,
+    'parquet': ParquetSink,
+}
+
+
+def get_sink(sink: Union[str, AnnotationSink]) -> AnnotationSink:
+    """Get the sink based on its name (or the sink itself).
+
+    Args:
+        sink (Union[str, AnnotationSink]): The name of the sink (see `SINKS`) or the sink itself.
+
+    Raises:
+        ValueError: If the sink is unknown.
+
+    Returns:
+        AnnotationSink: The sink.
+    """
+    if isinstance(sink, AnnotationSink):
+        return sink
+    if sink not in SINKS:
+        raise ValueError(f"Unknown sink: '{sink}'. Available: {list(SINKS.keys())}")
+    return SINKS[sink]()
+
+
+def _json_default(value: Any) -> Any:
+    # NOTE: NumPy scalars (e.g `np.int64`) are not serialisable, but equal to the Python values
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class ResumeIndex:
+    """The index of the documents already annotated (and saved).
+
+    The IDs are kept in a SQLite database, so new IDs are only appended
+    and checking for an ID does not require loading all of them in memory.
+    The IDs are stored in their JSON representation so that, for instance,
+    the ID `1` and the ID `'1'` are kept apart. NumPy scalars are stored as the
+    corresponding Python values (i.e the ID `np.int64(1)` is the same as `1`).
+
+    Args:
+        path (str): The path of the database.
+    """
+    FILE_NAME = 'annotated_ids.sqlite'
+    LEGACY_FILE_NAME = 'annotated_ids.pickle'
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER)")
+            self._conn.execute("INSERT OR IGNORE INTO info VALUES ('part_counter', 0)")
+
+    @classmethod
+    def open(cls, folder: str, create: bool = True) -> Optional['ResumeIndex']:
+        """Open the resume index in a folder.
+
+        If the folder has the (legacy) pickled list of IDs but no resume index,
+        the IDs are imported into a new index. If the index is not to be created,
+        the new index is kept in memory (rather than next to the legacy file).
+
+        Args:
+            folder (str): The folder.
+            create (bool): Whether to create the index if it does not exist. Defaults to True.
+
+        Returns:
+            Optional[ResumeIndex]: The index, or None if it does not exist and was not to be created.
+        """
+        path = os.path.join(folder, cls.FILE_NAME)
+        legacy_path = os.path.join(folder, cls.LEGACY_FILE_NAME)
+        if os.path.exists(path):
+            return cls(path)
+        if not create and not os.path.exists(legacy_path):
+            return None
+        # NOTE: the legacy IDs are only migrated to a new file if the index is to be created
+        index = cls(path if create else ':memory:')
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'rb') as f:
+                annotated_ids, part_counter = pickle.load(f)
+            logger.info("Importing %d annotated IDs from %s", len(annotated_ids), legacy_path)
+            index.add(annotated_ids, part_counter)
+        return index
+
+    @staticmethod
+    def _to_key(doc_id: Any) -> str:
+        return json.dumps(doc_id, default=_json_default)
+
+    def __contains__(self, doc_id: Any) -> bool:
+        cur = self._conn.execute("SELECT 1 FROM ids WHERE id = ?", (self._to_key(doc_id),))
+        return cur.fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        for (key,) in self._conn.execute("SELECT id FROM ids"):
+            yield json.loads(key)
+
+    @property
+    def part_counter(self) -> int:
+        """The number of the next part to save.
+
+        Returns:
+            int: The number of the next part.
+        """
+        return self._conn.execute("SELECT value FROM info WHERE key = 'part_counter'").fetchone()[0]
+
+    def add(self, doc_ids: Iterable[Any], part_counter: int) -> None:
+        """Add the IDs of newly saved documents (in a single transaction).
+
+        Args:
+            doc_ids (Iterable[Any]): The document IDs.
+            part_counter (int): The number of the next part to save.
+        """
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO ids VALUES (?)",
+                                   ((self._to_key(doc_id),) for doc_id in doc_ids))
+            self._conn.execute("UPDATE info SET value = ? WHERE key = 'part_counter'", (part_counter,))
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
@@ -1,6 +1,7 @@
 import logging
 import contextlib
-from typing import Dict, TypedDict, Set, List, cast
+from typing import Dict, TypedDict, Set, List, Iterable, Any, cast
+from collections.abc import MutableSet
 import numpy as np
 import tempfile
 import dill
@@ -16,11 +17,14 @@ CDBState = TypedDict(
     'CDBState',
     {
         'name2cuis': Dict[str, List[str]],
+        'name2cuis2status': Dict[str, Dict[str, str]],
         'snames': Set[str],
         'cui2names': Dict[str, Set[str]],
         'cui2snames': Dict[str, Set[str]],
         'cui2context_vectors': Dict[str, Dict[str, np.ndarray]],
         'cui2count_train': Dict[str, int],
+        'cui2type_ids': Dict[str, Set[str]],
+        'cui2preferred_name': Dict[str, str],
         'name_isupper': Dict,
         'vocab': Dict[str, int],
     })
@@ -32,11 +36,14 @@ state of a CDB after modifying it.
 
 Currently, the following fields are saved:
  - name2cuis
+ - name2cuis2status
  - snames
  - cui2names
  - cui2snames
  - cui2context_vectors
  - cui2count_train
+ - cui2type_ids
+ - cui2preferred_name
  - name_isupper
  - vocab
 """
@@ -59,6 +66,137 @@ def copy_cdb_state(cdb) -> CDBState:
     })
 
 
+_MISSING = object()
+
+
+class CDBStateJournal:
+    """Keeps track of the original values of the parts of the CDB state that get changed.
+
+    Instead of copying all of the CDB state up front, the journal is
+    attached to a CDB and the CDB records the original value of each
+    key (e.g a CUI or a name) of a state field right before changing it.
+    Only the first change of each key is recorded. So the memory used
+    depends on how much of the CDB is changed rather than its size.
+
+    If an entire field is replaced (or changed in bulk), a (deep) copy of
+    the field as it was before the journal was attached is kept instead.
+
+    NOTE: Only the changes made through the CDB methods (and the training
+          done through the `CAT` class) are recorded. If the state fields
+          are changed directly, the changes will not be rolled back.
+    """
+
+    def __init__(self) -> None:
+        self._originals: Dict[str, Dict[str, Any]] = {}
+        self._replaced: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return (sum(len(originals) for originals in self._originals.values()) +
+                len(self._replaced))
+
+    def record(self, cdb, field: str, keys: Iterable[str]) -> None:
+        """Record the original values of the keys of the field before they get changed.
+
+        For set fields (e.g `snames`), whether the value was present is recorded.
+
+        Args:
+            cdb: The CDB whose state is changed.
+            field (str): The name of the field.
+            keys (Iterable[str]): The keys (or values of a set) that will be changed.
+        """
+        if field in self._replaced:
+            return
+        container = getattr(cdb, field)
+        originals = self._originals.setdefault(field, {})
+        if isinstance(container, MutableSet):
+            for key in keys:
+                if key not in originals:
+                    originals[key] = key in container
+        elif hasattr(container, 'keys'):
+            for key in keys:
+                if key not in originals:
+                    originals[key] = deepcopy(container[key]) if key in container else _MISSING
+        # NOTE: otherwise the field delegates to another one (i.e a memory optimised CDB)
+
+    def record_field(self, cdb, field: str) -> None:
+        """Record the entire field before it gets replaced or changed in bulk.
+
+        Args:
+            cdb: The CDB whose state is changed.
+            field (str): The name of the field.
+        """
+        if field in self._replaced:
+            return
+        state = deepcopy(getattr(cdb, field))
+        _restore(state, self._originals.pop(field, {}))
+        self._replaced[field] = state
+
+    def get_changed_keys(self, field: str) -> Set[str]:
+        """Get the keys of the field whose original values have been recorded.
+
+        NOTE: If the entire field has been recorded (see `record_field`),
+              there are no individual keys to return.
+
+        Args:
+            field (str): The name of the field.
+
+        Returns:
+            Set[str]: The changed keys.
+        """
+        return set(self._originals.get(field, {}))
+
+    def get_original(self, field: str, key: str, default: Any = None) -> Any:
+        """Get the recorded original value of the key of the field.
+
+        Args:
+            field (str): The name of the field.
+            key (str): The key.
+            default (Any): The value to return if the key wasn't originally present
+                (or wasn't recorded). Defaults to None.
+
+        Returns:
+            Any: The original value.
+        """
+        value = self._originals.get(field, {}).get(key, _MISSING)
+        return default if value is _MISSING else value
+
+    def rollback(self, cdb) -> None:
+        """Restore the recorded parts of the state of the CDB.
+
+        Afterwards, the journal is empty.
+
+        Args:
+            cdb: The CDB to roll back.
+        """
+        fields = set(self._originals) | set(self._replaced)
+        logger.debug("Rolling back %d changes in %d CDB state fields", len(self), len(fields))
+        for field, originals in self._originals.items():
+            _restore(getattr(cdb, field), originals)
+        for field, state in self._replaced.items():
+            setattr(cdb, field, state)
+        self._originals.clear()
+        self._replaced.clear()
+        if fields:
+            # the names may have changed without the name trie noticing
+            cdb._name_trie = None
+            cdb.mark_dirty(*fields)
+
+
+def _restore(container: Any, originals: Dict[str, Any]) -> None:
+    if isinstance(container, MutableSet):
+        for key, was_present in originals.items():
+            if was_present:
+                container.add(key)
+            else:
+                container.discard(key)
+        return
+    for key, value in originals.items():
+        if value is not _MISSING:
+            container[key] = value
+        elif key in container:
+            del container[key]
+
+
 def save_cdb_state(cdb, file_path: str) -> None:
     """Saves CDB state in a file.
 
@@ -121,7 +259,7 @@ def load_and_apply_cdb_state(cdb, file_path: str) -> None:
 
 
 @contextlib.contextmanager
-def captured_state_cdb(cdb, save_state_to_disk: bool = False):
+def captured_state_cdb(cdb, save_state_to_disk: bool = False, use_journal: bool = False):
     """A context manager that captures and re-applies the initial CDB state.
 
     The context manager captures/copies the initial state of the CDB when entering.
@@ -132,15 +270,30 @@ def captured_state_cdb(cdb, save_state_to_disk: bool = False):
     Otherwise the copy of the original state will be held in memory.
     If saved on disk, a temporary file is used and removed afterwards.
 
+    Alternatively, `use_journal` can be used to only keep track of the parts
+    of the state that get changed (see `CDBStateJournal`). That is usually
+    a lot faster and uses a lot less memory since training generally only
+    changes a small part of the CDB.
+
     Args:
         cdb: The CDB to use.
         save_state_to_disk (bool): Whether to save state on disk or hold in in memory.
             Defaults to False.
+        use_journal (bool): Whether to only record the changed parts of the state.
+            Defaults to False.
+
+    Raises:
+        ValueError: If both `save_state_to_disk` and `use_journal` are specified.
 
     Yields:
         None
     """
-    if save_state_to_disk:
+    if save_state_to_disk and use_journal:
+        raise ValueError("Unable to both save the CDB state on disk and use a journal")
+    if use_journal:
+        with journaled_state_capture(cdb):
+            yield
+    elif save_state_to_disk:
         with on_disk_memory_capture(cdb):
             yield
     else:
@@ -177,3 +330,22 @@ def on_disk_memory_capture(cdb):
         save_cdb_state(cdb, tf.name)
         yield
         load_and_apply_cdb_state(cdb, tf.name)
+
+
+@contextlib.contextmanager
+def journaled_state_capture(cdb):
+    """Capture the changes to the CDB state in a journal.
+
+    Args:
+        cdb: The CDB to use.
+
+    Yields:
+        CDBStateJournal: The journal.
+    """
+    journal = CDBStateJournal()
+    cdb._state_journals.append(journal)
+    try:
+        yield journal
+    finally:
+        cdb._state_journals.remove(journal)
+        journal.rollback(cdb)
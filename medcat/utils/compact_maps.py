@@ -0,0 +1,523 @@
+"""Compact (integer ID based) versions of the name and CUI maps of a CDB.
+
+In a regular CDB, each of the name and CUI maps (`name2cuis`, `name2cuis2status`,
+`cui2names`, `cui2snames`, `name_isupper`, `name2count_train`) as well as `snames`
+holds its own Python containers (lists, sets, dicts) for every name / CUI.
+For a large CDB (e.g UMLS) these containers take up most of the memory.
+
+In the compact representation, every name and CUI is interned once (in a `StringTable`)
+and the maps are stored as flat arrays of integer IDs along with the offsets of
+the values of each key (i.e CSR). The maps are exposed through dict (and set)
+compatible views so that the rest of MedCAT (NER, linking, training) can use
+them as before.
+
+The values (e.g the CUIs of a name) are built upon access and are not kept, so that
+the memory footprint does not grow with lookups (e.g during annotation). Since
+changing such a value in place would not persist, the values are immutable (i.e
+a tuple instead of a list, a frozenset instead of a set and a read-only mapping
+instead of a dict), so that an attempt to do so fails. A changed value has to be
+set instead (i.e `cdb.name2cuis[name] = cuis + [cui]`), upon which it is kept (in
+an overlay). The CDB methods (and training) do this already.
+"""
+import logging
+from abc import abstractmethod
+from collections.abc import ItemsView, Mapping, MutableMapping, MutableSet, ValuesView
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from medcat.utils.saving.coding import (PartEncoder, UnsuitableObject, SET_IDENTIFIER,
+                                        register_encoder_decoder)
+from medcat.utils.saving.columnar import decode_strings, encode_columns
+
+
+logger = logging.getLogger(__name__)
+
+
+# this will be used in CDB._memory_optimised_parts
+COMPACT_PART = 'COMPACT'
+COMPACT_NAMES = ('name2cuis', 'name2cuis2status', 'cui2names', 'cui2snames',
+                 'cui2type_ids', 'name_isupper', 'name2count_train', 'snames')
+
+_MISSING = object()
+# the immutable counterparts of the containers of the values
+_FROZEN_CONTAINERS: Dict[Callable, Callable] = {list: tuple, set: frozenset}
+
+
+class StringTable:
+    """A table of interned strings.
+
+    Args:
+        strings (List[str]): The (unique) strings.
+    """
+
+    def __init__(self, strings: List[str]) -> None:
+        self.strings = strings
+        self.ids: Dict[str, int] = {s: i for i, s in enumerate(strings)}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getstate__(self) -> dict:
+        # the IDs are rebuilt upon load
+        return {'strings': self.strings}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['strings'])  # type: ignore
+
+
+class _CompactItemsView(ItemsView):
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        yield from self._mapping._iter_items()  # type: ignore
+
+
+class _CompactValuesView(ValuesView):
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, value in self._mapping._iter_items():  # type: ignore
+            yield value
+
+
+class CompactDict(MutableMapping):
+    """The base class for the dict compatible views of the compact maps.
+
+    The keys present upon creation are stored as integer IDs (in `key_ids`). Any
+    changes are kept in an overlay. The values are built upon access and not kept.
+    The values are immutable, so they cannot be changed in place.
+
+    Args:
+        keys (StringTable): The table the keys are in.
+        key_ids (np.ndarray): The ID of the key of each row (in the order of the original dict).
+    """
+
+    def __init__(self, keys: StringTable, key_ids: np.ndarray) -> None:
+        self._keys = keys
+        self._key_ids = key_ids
+        self._rows = np.full(len(keys), -1, dtype=np.int32)
+        self._rows[key_ids] = np.arange(len(key_ids), dtype=np.int32)
+        self._overlay: Dict[str, Any] = {}
+        # the keys in the base that have been removed (even if added back)
+        self._removed: Set[str] = set()
+        # the keys (in order) that are not in the base or have been added back
+        self._added: Dict[str, None] = {}
+
+    @abstractmethod
+    def _decode(self, row: int) -> Any:
+        pass
+
+    def _freeze(self, value: Any) -> Any:
+        return value
+
+    def _thaw(self, value: Any) -> Any:
+        return value
+
+    def _get_row(self, key: str) -> int:
+        key_id = self._keys.ids.get(key)
+        if key_id is None:
+            return -1
+        return int(self._rows[key_id])
+
+    def _in_base(self, key: str) -> bool:
+        return key not in self._removed and self._get_row(key) >= 0
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._overlay.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if key in self._removed:
+            raise KeyError(key)
+        row = self._get_row(key)
+        if row < 0:
+            raise KeyError(key)
+        return self._decode(row)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self._overlay and not self._in_base(key):
+            self._added[key] = None
+        self._overlay[key] = self._freeze(value)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        self._added.pop(key, None)
+        if self._get_row(key) >= 0:
+            self._removed.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or self._in_base(key)  # type: ignore
+
+    def __iter__(self) -> Iterator[str]:
+        strings, removed = self._keys.strings, self._removed
+        for key_id in self._key_ids.tolist():
+            key = strings[key_id]
+            if key not in removed:
+                yield key
+        yield from list(self._added)
+
+    def __len__(self) -> int:
+        return len(self._key_ids) - len(self._removed) + len(self._added)
+
+    def _iter_items(self) -> Iterator[Tuple[str, Any]]:
+        strings, removed, overlay = self._keys.strings, self._removed, self._overlay
+        for row, key_id in enumerate(self._key_ids.tolist()):
+            key = strings[key_id]
+            if key in removed:
+                continue
+            value = overlay.get(key, _MISSING)
+            yield key, (value if value is not _MISSING else self._decode(row))
+        for key in list(self._added):
+            yield key, overlay[key]
+
+    def items(self) -> ItemsView:
+        """The items of the map.
+
+        The values are immutable and the values of the keys that have not
+        been set are built on the fly (and not kept).
+
+        Returns:
+            ItemsView: The items.
+        """
+        return _CompactItemsView(self)
+
+    def values(self) -> ValuesView:
+        """The values of the map.
+
+        The values are immutable and the values of the keys that have not
+        been set are built on the fly (and not kept).
+
+        Returns:
+            ValuesView: The values.
+        """
+        return _CompactValuesView(self)
+
+    def thawed_items(self) -> Iterator[Tuple[str, Any]]:
+        """The items of the map with the values as regular (mutable) containers.
+
+        The values are built on the fly, so any changes to them will not persist.
+
+        Yields:
+            Tuple[str, Any]: The key and the value.
+        """
+        for key, value in self._iter_items():
+            yield key, self._thaw(value)
+
+    def __eq__(self, other: object) -> bool:
+        # NOTE: the values are compared as the regular containers so that
+        #       e.g a compact map is equal to the dict it was built from
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        other_items = other.thawed_items() if isinstance(other, CompactDict) else other.items()
+        return dict(self.thawed_items()) == dict(other_items)
+
+    def __getstate__(self) -> dict:
+        # NOTE: some of the immutable values (i.e `MappingProxyType`) cannot be pickled
+        state = dict(self.__dict__)
+        state['_overlay'] = {key: self._thaw(value) for key, value in self._overlay.items()}
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._overlay = {key: self._freeze(value) for key, value in self._overlay.items()}
+
+    def clear(self) -> None:
+        self._key_ids = self._key_ids[:0]
+        self._rows[:] = -1
+        self._overlay.clear()
+        self._removed.clear()
+        self._added.clear()
+
+    def to_dict(self) -> dict:
+        """Convert to a regular dict.
+
+        Returns:
+            dict: The regular dict.
+        """
+        return dict(self.thawed_items())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self)} items)'
+
+
+class CompactMultiDict(CompactDict):
+    """A compact map from a key to multiple values (e.g `name2cuis` or `cui2names`).
+
+    The values are the immutable counterparts of the container (i.e a tuple
+    instead of a list and a frozenset instead of a set).
+
+    Args:
+        keys (StringTable): The table the keys are in.
+        key_ids (np.ndarray): The ID of the key of each row.
+        values (StringTable): The table the values are in.
+        offsets (np.ndarray): The offsets of the values of each row (one more than the number of rows).
+        value_ids (np.ndarray): The IDs of the values.
+        container (Callable[..., Any]): The (regular) container of the values (e.g `set` or `list`).
+    """
+
+    def __init__(self, keys: StringTable, key_ids: np.ndarray, values: StringTable,
+                 offsets: np.ndarray, value_ids: np.ndarray,
+                 container: Callable[..., Any]) -> None:
+        super().__init__(keys, key_ids)
+        self._values = values
+        self._offsets = offsets
+        self._value_ids = value_ids
+        self._container = container
+        self._frozen_container = _FROZEN_CONTAINERS.get(container, container)
+
+    def _decode(self, row: int) -> Any:
+        strings = self._values.strings
+        ids = self._value_ids[self._offsets[row]:self._offsets[row + 1]].tolist()
+        return self._frozen_container([strings[value_id] for value_id in ids])
+
+    def _freeze(self, value: Any) -> Any:
+        return self._frozen_container(value)
+
+    def _thaw(self, value: Any) -> Any:
+        return self._container(value)
+
+
+class CompactStatusDict(CompactMultiDict):
+    """A compact map from a name to the status of each of its CUIs (i.e `name2cuis2status`).
+
+    The values are read-only mappings (i.e `MappingProxyType`).
+
+    Args:
+        keys (StringTable): The table the names are in.
+        key_ids (np.ndarray): The ID of the name of each row.
+        values (StringTable): The table the CUIs are in.
+        offsets (np.ndarray): The offsets of the CUIs of each row.
+        value_ids (np.ndarray): The IDs of the CUIs.
+        statuses (StringTable): The table of the statuses.
+        status_ids (np.ndarray): The IDs of the status of each CUI.
+    """
+
+    def __init__(self, keys: StringTable, key_ids: np.ndarray, values: StringTable,
+                 offsets: np.ndarray, value_ids: np.ndarray,
+                 statuses: StringTable, status_ids: np.ndarray) -> None:
+        super().__init__(keys, key_ids, values, offsets, value_ids, dict)
+        self._statuses = statuses
+        self._status_ids = status_ids
+
+    def _decode(self, row: int) -> Mapping[str, str]:
+        start, end = self._offsets[row], self._offsets[row + 1]
+        cuis, statuses = self._values.strings, self._statuses.strings
+        return MappingProxyType({cuis[cui_id]: statuses[status_id] for cui_id, status_id in
+                                 zip(self._value_ids[start:end].tolist(), self._status_ids[start:end].tolist())})
+
+    def _freeze(self, value: Any) -> Any:
+        return MappingProxyType(dict(value))
+
+    def _thaw(self, value: Any) -> Any:
+        return dict(value)
+
+
+class CompactScalarDict(CompactDict):
+    """A compact map from a key to a scalar (e.g `name_isupper`).
+
+    Args:
+        keys (StringTable): The table the keys are in.
+        key_ids (np.ndarray): The ID of the key of each row.
+        values (np.ndarray): The value of each row.
+    """
+
+    def __init__(self, keys: StringTable, key_ids: np.ndarray, values: np.ndarray) -> None:
+        super().__init__(keys, key_ids)
+        self._values = values
+
+    def _decode(self, row: int) -> Any:
+        return self._values[row].item()
+
+
+class CompactSet(MutableSet):
+    """A compact set of strings (i.e `snames`).
+
+    Args:
+        table (StringTable): The table the strings are in.
+        ids (np.ndarray): The IDs of the strings in the set.
+    """
+
+    def __init__(self, table: StringTable, ids: np.ndarray) -> None:
+        self._table = table
+        self._mask = np.zeros(len(table), dtype=np.bool_)
+        self._mask[ids] = True
+        self._base_len = int(self._mask.sum())
+        self._removed: Set[str] = set()
+        self._added: Set[str] = set()
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable) -> set:
+        # the result of set operations (e.g `|`) is a regular set
+        return set(it)
+
+    def _in_base(self, value: str) -> bool:
+        value_id = self._table.ids.get(value)
+        return value_id is not None and bool(self._mask[value_id])
+
+    def __contains__(self, value: object) -> bool:
+        if value in self._added:
+            return True
+        return value not in self._removed and self._in_base(value)  # type: ignore
+
+    def __iter__(self) -> Iterator[str]:
+        strings, removed = self._table.strings, self._removed
+        for value_id in np.flatnonzero(self._mask).tolist():
+            value = strings[value_id]
+            if value not in removed:
+                yield value
+        yield from list(self._added)
+
+    def __len__(self) -> int:
+        return self._base_len - len(self._removed) + len(self._added)
+
+    def add(self, value: str) -> None:
+        if value in self:
+            return
+        if self._in_base(value):
+            self._removed.discard(value)
+        else:
+            self._added.add(value)
+
+    def discard(self, value: str) -> None:
+        if value in self._added:
+            self._added.discard(value)
+        elif self._in_base(value):
+            self._removed.add(value)
+
+    def update(self, *others: Iterable[str]) -> None:
+        """Add all the values from the other iterables.
+
+        Args:
+            *others (Iterable[str]): The iterables of values to add.
+        """
+        for other in others:
+            for value in other:
+                self.add(value)
+
+    def union(self, *others: Iterable[str]) -> set:
+        """Get the union of this and the other iterables.
+
+        Args:
+            *others (Iterable[str]): The other iterables.
+
+        Returns:
+            set: The union (as a regular set).
+        """
+        return set(self).union(*others)
+
+    def clear(self) -> None:
+        self._mask[:] = False
+        self._base_len = 0
+        self._removed.clear()
+        self._added.clear()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self)} items)'
+
+
+def _compact_scalars(d: Dict[str, Any], table: StringTable) -> Optional[CompactScalarDict]:
+    if not all(type(value) is int for value in d.values()):
+        return None
+    key_ids = [table.ids.get(key) for key in d]
+    if any(key_id is None for key_id in key_ids):
+        return None
+    return CompactScalarDict(table, np.array(key_ids, dtype=np.int32),
+                             np.fromiter(d.values(), dtype=np.int64, count=len(d)))
+
+
+def from_columns(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Build the compact maps from the columnar arrays (see `medcat.utils.saving.columnar`).
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The columnar arrays.
+
+    Returns:
+        Dict[str, Any]: The compact maps (by attribute name).
+    """
+    cuis, names, type_ids, statuses = (
+        StringTable(decode_strings(arrays[f'{table_name}.blob'], arrays[f'{table_name}.offsets']))
+        for table_name in ('cuis', 'names', 'type_ids', 'statuses'))
+
+    def multi(name: str, keys: StringTable, values: StringTable, container: Callable) -> CompactMultiDict:
+        return CompactMultiDict(keys, arrays[f'{name}.keys'], values, arrays[f'{name}.offsets'],
+                                arrays[f'{name}.values'], container)
+    return {
+        'cui2names': multi('cui2names', cuis, names, set),
+        'cui2snames': multi('cui2snames', cuis, names, set),
+        'cui2type_ids': multi('cui2type_ids', cuis, type_ids, set),
+        'name2cuis': multi('name2cuis', names, cuis, list),
+        'name2cuis2status': CompactStatusDict(
+            names, arrays['name2cuis2status.keys'], cuis, arrays['name2cuis2status.offsets'],
+            arrays['name2cuis2status.values'], statuses, arrays['name2cuis2status.statuses']),
+        'name_isupper': CompactScalarDict(names, arrays['name_isupper.keys'], arrays['name_isupper.values']),
+        'snames': CompactSet(names, arrays['snames']),
+    }
+
+
+def is_compact(cdb) -> bool:
+    """Check whether the name and CUI maps of a CDB are compact.
+
+    Args:
+        cdb (CDB): The CDB.
+
+    Returns:
+        bool: Whether the maps are compact.
+    """
+    return isinstance(cdb.name2cuis, CompactDict)
+
+
+def compact_cdb(cdb, arrays: Optional[Dict[str, np.ndarray]] = None) -> None:
+    """Replace the name and CUI maps of a CDB with their compact versions.
+
+    Args:
+        cdb (CDB): The CDB.
+        arrays (Optional[Dict[str, np.ndarray]]): The columnar arrays of the CDB if they already exist.
+            Defaults to None.
+    """
+    if arrays is None:
+        arrays = encode_columns(cdb.__dict__)
+    maps = from_columns(arrays)
+    name2count_train = _compact_scalars(cdb.name2count_train, maps['name_isupper']._keys)
+    if name2count_train is not None:
+        maps['name2count_train'] = name2count_train
+    # NOTE: the contents are the same, so the hash does not change
+    cdb.__dict__.update(maps)
+    cdb._memory_optimised_parts.add(COMPACT_PART)
+    logger.info('Compacted the name and CUI maps of the CDB')
+
+
+def uncompact_cdb(cdb) -> None:
+    """Replace the compact name and CUI maps of a CDB with regular dicts and sets.
+
+    Args:
+        cdb (CDB): The CDB.
+    """
+    for name in COMPACT_NAMES:
+        value = cdb.__dict__[name]
+        if isinstance(value, CompactDict):
+            cdb.__dict__[name] = value.to_dict()
+        elif isinstance(value, CompactSet):
+            cdb.__dict__[name] = set(value)
+    cdb._memory_optimised_parts.discard(COMPACT_PART)
+
+
+class CompactEncoder(PartEncoder):
+    """JSON encoder for the compact maps. These are saved as regular dicts and sets."""
+
+    def try_encode(self, obj):
+        if isinstance(obj, CompactDict):
+            return obj.to_dict()
+        if isinstance(obj, CompactSet):
+            return {SET_IDENTIFIER: list(obj)}
+        raise UnsuitableObject()
+
+
+def attempt_compact_after_load(cdb) -> None:
+    if COMPACT_PART in cdb._memory_optimised_parts and not is_compact(cdb):
+        compact_cdb(cdb)
+
+
+register_encoder_decoder(encoder=CompactEncoder,
+                         decoder=None,
+                         loading_postprocessor=attempt_compact_after_load)
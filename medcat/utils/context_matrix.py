@@ -0,0 +1,167 @@
+"""A dense matrix of (pre-normalised) context vectors.
+
+The linker used to normalise the context vectors of every candidate CUI every time
+it disambiguated an entity. The matrix in here keeps the normalised vectors of a
+single context type in contiguous rows so that the similarities for all the candidates
+can be calculated with one matrix-vector product.
+"""
+import weakref
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+_MIN_CAPACITY = 16
+
+
+def _no_ref() -> None:
+    return None
+
+
+class ContextVectorMatrix(object):
+    """The normalised context vectors (of one context type) in a dense matrix.
+
+    The rows are added lazily - i.e when a CUI is first a candidate. Each row keeps
+    a (weak) reference to the context vector it was calculated from. So if the context
+    vector of a CUI gets replaced (e.g by `CDB.update_context_vector`), the row is
+    recalculated the next time it is needed.
+
+    The rows of removed CUIs (and of CUIs whose context vector no longer exists) are
+    reused for new CUIs. If more than half of the rows are unused, the matrix is compacted.
+
+    The matrix is (at least) single precision, and is upcast if a context vector of a
+    wider type (e.g `float64`) is added.
+
+    NOTE: Changes made to the context vectors in place will not be detected.
+    """
+
+    def __init__(self) -> None:
+        self.cui2row: Dict[str, int] = {}
+        self._sources: List[Callable[[], Optional[np.ndarray]]] = []
+        self._free_rows: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.cui2row)
+
+    def _reset(self, vec: np.ndarray) -> None:
+        self.cui2row = {}
+        self._sources = []
+        self._free_rows = []
+        self._matrix = np.zeros((_MIN_CAPACITY, vec.shape[0]), dtype=np.result_type(vec.dtype, np.float32))
+
+    def _resize(self, capacity: int, rows: Optional[List[int]] = None,
+                dtype: Optional[np.dtype] = None) -> None:
+        matrix = self._matrix
+        assert matrix is not None
+        new_matrix = np.zeros((capacity, matrix.shape[1]), dtype=matrix.dtype if dtype is None else dtype)
+        if rows is None:
+            new_matrix[:matrix.shape[0]] = matrix
+        else:
+            new_matrix[:len(rows)] = matrix[rows]
+        self._matrix = new_matrix
+
+    def _set_row(self, row: int, vec: np.ndarray) -> None:
+        assert self._matrix is not None
+        if not np.can_cast(vec.dtype, self._matrix.dtype, casting='safe'):
+            # NOTE: do not (silently) lose the precision of the vector
+            self._resize(self._matrix.shape[0], dtype=np.result_type(vec.dtype, self._matrix.dtype))
+        matrix = self._matrix
+        norm = np.linalg.norm(vec)
+        # NOTE: the same as `unitvec` - the zero vector is kept as is
+        matrix[row] = vec / norm if norm > 0 else vec
+        try:
+            self._sources[row] = weakref.ref(vec)
+        except TypeError:
+            # not something we can reference - recalculate every time
+            self._sources[row] = _no_ref
+
+    def _free_stale_rows(self) -> None:
+        # the rows whose context vector no longer exists (e.g the CUI was removed)
+        stale_cuis = [cui for cui, row in self.cui2row.items()
+                      if self._sources[row] is not _no_ref and self._sources[row]() is None]
+        for cui in stale_cuis:
+            self._free_row(cui)
+        self._compact_if_sparse()
+
+    def _free_row(self, cui: str) -> None:
+        row = self.cui2row.pop(cui)
+        self._sources[row] = _no_ref
+        self._free_rows.append(row)
+
+    def _compact_if_sparse(self) -> None:
+        if len(self._free_rows) > len(self._sources) // 2 and self._matrix is not None \
+                and self._matrix.shape[0] > _MIN_CAPACITY:
+            self._compact()
+
+    def _compact(self) -> None:
+        cuis = list(self.cui2row)
+        rows = [self.cui2row[cui] for cui in cuis]
+        self._resize(max(_MIN_CAPACITY, 2 * len(rows)), rows=rows)
+        self.cui2row = {cui: row for row, cui in enumerate(cuis)}
+        self._sources = [self._sources[row] for row in rows]
+        self._free_rows = []
+
+    def _new_row(self) -> int:
+        assert self._matrix is not None
+        if not self._free_rows and len(self._sources) == self._matrix.shape[0]:
+            self._free_stale_rows()
+            capacity = self._matrix.shape[0]
+            # NOTE: grow unless enough rows were freed, so that the stale rows are not
+            #       looked for upon every new CUI
+            if len(self._sources) == capacity and len(self._free_rows) < capacity // 4:
+                self._resize(2 * capacity)
+        if self._free_rows:
+            return self._free_rows.pop()
+        self._sources.append(_no_ref)
+        return len(self._sources) - 1
+
+    def _get_row(self, cui: str, vec: np.ndarray) -> int:
+        if self._matrix is None or vec.shape[0] != self._matrix.shape[1]:
+            # first vector or the vector size has changed
+            self._reset(vec)
+        row = self.cui2row.get(cui)
+        if row is None:
+            row = self.cui2row[cui] = self._new_row()
+            self._set_row(row, vec)
+        elif self._sources[row]() is not vec:
+            self._set_row(row, vec)
+        return row
+
+    def remove(self, cui: str) -> None:
+        """Remove the row of a CUI (if it has one).
+
+        The row is reused for the next new CUI. If more than half of the
+        rows are unused, the matrix is compacted.
+
+        Args:
+            cui (str): The CUI.
+        """
+        if cui in self.cui2row:
+            self._free_row(cui)
+            self._compact_if_sparse()
+
+    def get_similarities(self, cuis: List[str], cui_vectors: List[Optional[np.ndarray]],
+                         unit_vector: np.ndarray) -> np.ndarray:
+        """Get the similarities of the context vectors of the CUIs to a normalised vector.
+
+        Args:
+            cuis (List[str]): The CUIs.
+            cui_vectors (List[Optional[np.ndarray]]): The current context vectors of the CUIs
+                (or None if a CUI does not have a vector of this context type).
+            unit_vector (np.ndarray): The normalised vector to compare to.
+
+        Returns:
+            np.ndarray: The similarity for each CUI (0 for CUIs without a vector).
+        """
+        for cui, vec in zip(cuis, cui_vectors):
+            if vec is not None:
+                self._get_row(cui, np.asarray(vec))
+        # NOTE: the rows are only looked up once all were added since adding a row may compact the matrix
+        rows = np.array([-1 if vec is None else self.cui2row[cui]
+                         for cui, vec in zip(cuis, cui_vectors)], dtype=np.int64)
+        similarities = np.zeros(len(cuis))
+        mask = rows >= 0
+        if self._matrix is not None and mask.any():
+            similarities[mask] = self._matrix[rows[mask]] @ unit_vector
+        return similarities
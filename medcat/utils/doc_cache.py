@@ -0,0 +1,74 @@
+"""A document cache that keeps the (preprocessed) spacy documents on disk.
+
+This is meant to be used with `medcat.pipe.Pipe.pipe_cached` when the
+processed documents wouldn't fit in memory (e.g for a large training
+set). Each document is saved in a separate file within a (temporary)
+directory and read back upon access.
+"""
+import os
+import logging
+import tempfile
+from hashlib import sha1
+from typing import Dict, Iterator, MutableMapping, Optional
+
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
+
+
+logger = logging.getLogger(__name__)
+
+
+class DiskDocCache(MutableMapping[str, Doc]):
+    """A (text to document) cache that keeps the documents on disk.
+
+    The documents are saved in a temporary directory which is removed
+    once the cache is cleaned up (see `cleanup`). The cache can also
+    be used as a context manager that cleans up upon exit.
+
+    Args:
+        vocab (Vocab): The vocab of the documents.
+        cache_dir (Optional[str]): The directory within which to create the temporary
+            directory. If None, the default temporary directory is used. Defaults to None.
+    """
+
+    def __init__(self, vocab: Vocab, cache_dir: Optional[str] = None) -> None:
+        self.vocab = vocab
+        self._temp_dir = tempfile.TemporaryDirectory(dir=cache_dir, prefix='medcat_docs_')
+        self._files: Dict[str, str] = {}
+        logger.debug("Caching documents on disk at '%s'", self._temp_dir.name)
+
+    def _get_path(self, text: str) -> str:
+        return os.path.join(self._temp_dir.name, sha1(text.encode('utf-8')).hexdigest() + '.doc')
+
+    def __getitem__(self, text: str) -> Doc:
+        with open(self._files[text], 'rb') as f:
+            return Doc(self.vocab).from_bytes(f.read())
+
+    def __setitem__(self, text: str, doc: Doc) -> None:
+        path = self._get_path(text)
+        with open(path, 'wb') as f:
+            f.write(doc.to_bytes())
+        self._files[text] = path
+
+    def __delitem__(self, text: str) -> None:
+        os.remove(self._files.pop(text))
+
+    def __contains__(self, text: object) -> bool:
+        return text in self._files
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def cleanup(self) -> None:
+        """Remove the cached documents from disk."""
+        self._files.clear()
+        self._temp_dir.cleanup()
+
+    def __enter__(self) -> 'DiskDocCache':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.cleanup()
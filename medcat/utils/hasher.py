@@ -1,5 +1,7 @@
 import xxhash
+import numpy as np
 import dill
+from collections.abc import Mapping, Set as AbstractSet
 from io import BytesIO as StringIO
 
 
@@ -24,3 +26,85 @@ class Hasher(object):
 
     def hexdigest(self):
         return self.m.hexdigest()
+
+
+class StreamingHasher(object):
+    """Hashes (nested) objects piece by piece, without pickling them as a whole.
+
+    Strings, numbers, lists, tuples, dicts and numpy arrays are fed to the hash
+    directly. Sets are hashed independently of their (random) iteration order.
+    Anything else is pickled (with dill) on its own.
+    """
+    _FLUSH_EVERY = 4096
+
+    def __init__(self) -> None:
+        self.m = xxhash.xxh64()
+        self._parts: list = []
+
+    def _write(self, part: bytes) -> None:
+        self._parts.append(part)
+        if len(self._parts) >= self._FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._parts:
+            self.m.update(b''.join(self._parts))
+            self._parts.clear()
+
+    def update(self, obj) -> None:
+        self._add(obj)
+        self._flush()
+
+    @classmethod
+    def _get_set_digest(cls, elements) -> int:
+        # the sum of the digests of the elements does not depend on their order
+        total = 0
+        for element in elements:
+            if type(element) is str:
+                digest = xxhash.xxh64_intdigest(element.encode('utf-8', 'surrogatepass'))
+            else:
+                sub_hasher = cls()
+                sub_hasher.update(element)
+                digest = sub_hasher.m.intdigest()
+            total = (total + digest) & 0xFFFFFFFFFFFFFFFF
+        return total
+
+    def _add(self, obj) -> None:
+        obj_type = type(obj)
+        if obj_type is str:
+            encoded = obj.encode('utf-8', 'surrogatepass')
+            self._write(b's%d:' % len(encoded))
+            self._write(encoded)
+        elif obj is None or obj_type is int or obj_type is float or obj_type is bool:
+            self._write(b'n%s;' % repr(obj).encode())
+        elif obj_type is dict or (isinstance(obj, Mapping) and not isinstance(obj, dict)):
+            # NOTE: other mappings (e.g the lazily loaded or compact parts of the CDB) are hashed
+            #       like a dict, but dict subclasses (e.g OrderedDict) are not
+            self._write(b'{%d:' % len(obj))
+            # NOTE: the (immutable) values of the compact maps are hashed like the regular containers
+            items = obj.thawed_items() if hasattr(obj, 'thawed_items') else obj.items()
+            for key, value in items:
+                self._add(key)
+                self._add(value)
+        elif obj_type is list or obj_type is tuple:
+            self._write(b'[%d:' % len(obj) if obj_type is list else b'(%d:' % len(obj))
+            for element in obj:
+                self._add(element)
+        elif obj_type is set or obj_type is frozenset or (
+                isinstance(obj, AbstractSet) and not isinstance(obj, (set, frozenset))):
+            self._write(b'S%d:%x;' % (len(obj), self._get_set_digest(obj)))
+        elif isinstance(obj, np.ndarray):
+            self._write(b'a%s%s:' % (obj.dtype.str.encode(), repr(obj.shape).encode()))
+            self._flush()
+            self.m.update(np.ascontiguousarray(obj).data)
+        elif isinstance(obj, np.generic):
+            self._write(b'g%s:' % obj.dtype.str.encode())
+            self._write(obj.tobytes())
+        else:
+            pickled = dumps(obj)
+            self._write(b'p%d:' % len(pickled))
+            self._write(pickled)
+
+    def hexdigest(self) -> str:
+        self._flush()
+        return self.m.hexdigest()
@@ -5,7 +5,9 @@ from medcat.cdb import CDB
 from medcat.preprocessing.cleaners import clean_name
 from medcat.utils.other import TPL_ENT, TPL_ENTS
 
+import numpy as np
 from spacy import __version__ as spacy_version
+from spacy.attrs import IDX
 
 import logging
 
@@ -207,12 +209,12 @@ def tkn_inds_from_doc(spacy_doc, text_inds=None, source_val=None):
 
 
 def tkns_from_doc(spacy_doc, start, end):
-    tkns = []
-    for tkn in spacy_doc:
-        if tkn.idx >= start and tkn.idx <= end:
-            tkns.append(tkn)
-
-    return tkns
+    # the tokens are ordered by their (start) character index, so the
+    # ones starting within [start, end] can be found by binary search
+    idxs = spacy_doc.to_array(IDX)
+    first = int(np.searchsorted(idxs, start, side='left'))
+    last = int(np.searchsorted(idxs, end, side='right'))
+    return [spacy_doc[i] for i in range(first, last)]
 
 
 def filter_cdb_by_icd10(cdb: CDB) -> CDB:
@@ -255,6 +257,7 @@ def umls_to_icd10cm(cdb, csv_path):
                         cdb.cui2info[cui]["icd10"] = [icd10]
         except Exception as e:
             logger.warn("Issue at %s", row["CUI"], exc_info=e)
+    cdb.mark_dirty('cui2info')
 
 
 def umls_to_icd10_over_snomed(cdb, pickle_path):
@@ -275,6 +278,7 @@ def umls_to_icd10_over_snomed(cdb, pickle_path):
                     cdb.cui2info[cui]['icd10'] = [icd10]
             else:
                 pass
+    cdb.mark_dirty('cui2info')
 
 
 def umls_to_icd10_ext(cdb, pickle_path):
@@ -288,6 +292,7 @@ def umls_to_icd10_ext(cdb, pickle_path):
 
                 logger.info("%s %s", cui, icd10)
                 cdb.cui2info[cui]['icd10'] = [icd10]
+    cdb.mark_dirty('cui2info')
 
 
 def umls_to_icd10(cdb: CDB, csv_path: str):
@@ -321,6 +326,7 @@ def umls_to_icd10(cdb: CDB, csv_path: str):
                     cdb.cui2info[cui]["icd10"] = [icd10]
         except Exception as e:
             logger.warn("Issue at %s", row["CUI"], exc_info=e)
+    cdb.mark_dirty('cui2info')
 
 
 def umls_to_snomed(cdb: CDB, pickle_path):
@@ -347,6 +353,7 @@ def umls_to_snomed(cdb: CDB, pickle_path):
                     cdb.cui2info[cui]['snomed'].append(snomed_cui)
                 else:
                     cdb.cui2info[cui]['snomed'] = [snomed_cui]
+    cdb.mark_dirty('cui2info')
 
 
 def snomed_to_umls(cdb: CDB, pickle_path: str):
@@ -373,6 +380,7 @@ def snomed_to_umls(cdb: CDB, pickle_path: str):
                     cdb.cui2info[cui]['umls'].append(umls_cui)
                 else:
                     cdb.cui2info[cui]['umls'] = [umls_cui]
+    cdb.mark_dirty('cui2info')
 
 
 def snomed_to_icd10(cdb: CDB, csv_path: str):
@@ -402,6 +410,7 @@ def snomed_to_icd10(cdb: CDB, csv_path: str):
                 cdb.cui2info[cui]['icd10'].append(icd)
             else:
                 cdb.cui2info[cui]['icd10'] = [icd]
+    cdb.mark_dirty('cui2info')
 
 
 def snomed_to_desc(cdb: CDB, csv_path: str):
@@ -430,6 +439,7 @@ def snomed_to_desc(cdb: CDB, csv_path: str):
                 cdb.cui2preferred_name[cui] = str(desc)
             elif str(desc) not in str(cdb.cui2preferred_name[cui]):
                 cdb.cui2preferred_name[cui] = str(cdb.cui2preferred_name[cui]) + "\n\n" + str(desc)
+    cdb.mark_dirty('cui2preferred_name')
 
 
 def filter_only_icd10(doc, cat):
@@ -490,6 +500,7 @@ def remove_icd10_ranges(cdb):
                 cdb.cui2info[cui]['icd10'] = new_icd
             else:
                 del cdb.cui2info[cui]['icd10']
+    cdb.mark_dirty('cui2info')
 
 
 def dep_check_scispacy():
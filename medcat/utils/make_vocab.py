@@ -116,6 +116,7 @@ class MakeVocab(object):
                 else:
                     # Update the count with the counts from the new dataset
                     self.cdb.vocab[word] += self.vocab[word]
+            self.cdb.mark_dirty('vocab')
 
         # Save the vocab also
         self.vocab.save(path=self.vocab_path)
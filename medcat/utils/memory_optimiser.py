@@ -2,6 +2,7 @@ from typing import Any, Dict, KeysView, Iterator, List, Tuple, Union, Optional,
 
 from medcat.cdb import CDB
 from medcat.utils.saving.coding import EncodeableObject, PartEncoder, PartDecoder, UnsuitableObject, register_encoder_decoder
+from medcat.utils.compact_maps import COMPACT_PART, compact_cdb, uncompact_cdb
 
 
 CUI_DICT_NAMES_TO_COMBINE = [
@@ -285,7 +286,12 @@ def perform_optimisation(cdb: CDB, optimise_cuis: bool = True,
         optimise_cuis (bool): Whether to optimise cui2<...> dicts. Defaults to True.
         optimise_names (bool): Whether to optimise name2<...> dicts. Defaults to False.
         optimise_snames (bool): Whether to optimise `snames` set. Defaults to True.
+
+    Raises:
+        ValueError: If the CDB has been compacted (see `perform_compaction`).
     """
+    if COMPACT_PART in cdb._memory_optimised_parts:
+        raise ValueError('Unable to optimise a compacted CDB - use `unoptimise_cdb` first')
     # cui2<...> -> cui2many
     if optimise_cuis:
         _optimise(cdb, ONE2MANY, CUI_DICT_NAMES_TO_COMBINE)
@@ -300,6 +306,31 @@ def perform_optimisation(cdb: CDB, optimise_cuis: bool = True,
         cdb._memory_optimised_parts.add(SNAMES_PART)
 
 
+def perform_compaction(cdb: CDB) -> None:
+    """Replaces the name and CUI maps of the CDB with compact (integer ID based) versions.
+
+    The names and CUIs are interned once and the following are stored as arrays of IDs:
+        name2cuis, name2cuis2status, cui2names, cui2snames, cui2type_ids,
+        name_isupper, name2count_train (if all the counts are integers) and snames.
+
+    The maps are replaced with dict (and set) compatible views (see `medcat.utils.compact_maps`)
+    so that the CDB can be used (and trained) as before. However, the values of the maps are
+    immutable (e.g a tuple instead of a list), so a changed value has to be set as a new value.
+    This cannot be combined with the other optimisations (see `perform_optimisation`).
+
+    Args:
+        cdb (CDB): The CDB to modify.
+
+    Raises:
+        ValueError: If the CDB has already been otherwise optimised.
+    """
+    if COMPACT_PART in cdb._memory_optimised_parts:
+        return
+    if cdb._memory_optimised_parts:
+        raise ValueError('Unable to compact an otherwise optimised CDB - use `unoptimise_cdb` first')
+    compact_cdb(cdb)
+
+
 def _attempt_fix_after_load(cdb: CDB, one2many_name: str, dict_names: List[str]):
     if not hasattr(cdb, one2many_name):
         return
@@ -336,7 +367,8 @@ def _unoptimise_snames(cdb: CDB, cui2snames: str = 'cui2snames',
 
 
 def unoptimise_cdb(cdb: CDB):
-    """This undoes all the (potential) memory optimisations done in `perform_optimisation`.
+    """This undoes all the (potential) memory optimisations done in `perform_optimisation`
+    (or `perform_compaction`).
 
     This method relies on `CDB._memory_optimised_parts` to be up to date.
 
@@ -349,6 +381,8 @@ def unoptimise_cdb(cdb: CDB):
         _unoptimise(cdb, NAME2MANY, NAME_DICT_NAMES_TO_COMBINE)
     if SNAMES_PART in cdb._memory_optimised_parts:
         _unoptimise_snames(cdb)
+    if COMPACT_PART in cdb._memory_optimised_parts:
+        uncompact_cdb(cdb)
     cdb._memory_optimised_parts.clear()
 
 
@@ -57,7 +57,8 @@ def create_batch_piped_data(data: List[Tuple[List[int], int, Optional[int]]],
         y:
             class label of the data
     """
-    max_seq_len = max([len(x[0]) for x in data])
+    # NOTE: padding only up to the longest sequence in this batch
+    max_seq_len = max([len(x[0]) for x in data[start_ind:end_ind]])
     x = [x[0][0:max_seq_len] + [pad_id] * max(0, max_seq_len - len(x[0])) for x in data[start_ind:end_ind]]
     cpos = [x[1] for x in data[start_ind:end_ind]]
     y = None
@@ -71,10 +72,47 @@ def create_batch_piped_data(data: List[Tuple[List[int], int, Optional[int]]],
     return x, cpos, attention_masks, y
 
 
+def create_length_buckets(lengths: List[int], max_samples: int,
+                          max_tokens: Optional[int] = None) -> List[List[int]]:
+    """Group the samples into batches of samples of similar length.
+
+    The samples are sorted by length so that each batch needs as little padding
+    as possible. A batch has at most `max_samples` samples and (if set) at most
+    `max_tokens` tokens, padding included. A sample longer than `max_tokens`
+    gets a batch of its own.
+
+    Args:
+        lengths (List[int]):
+            The length (number of tokens) of each sample.
+        max_samples (int):
+            The maximum number of samples in a batch.
+        max_tokens (Optional[int]):
+            The maximum number of tokens (including padding) in a batch. Defaults to None.
+
+    Returns:
+        List[List[int]]: The indices of the samples in each batch.
+    """
+    batches: List[List[int]] = []
+    cur_batch: List[int] = []
+    for ind in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # NOTE: since the samples are sorted, the current one is the longest in the batch
+        if cur_batch and (len(cur_batch) >= max_samples or
+                          (max_tokens is not None and (len(cur_batch) + 1) * lengths[ind] > max_tokens)):
+            batches.append(cur_batch)
+            cur_batch = []
+        cur_batch.append(ind)
+    if cur_batch:
+        batches.append(cur_batch)
+    return batches
+
+
 def predict(model: nn.Module, data: List[Tuple[List[int], int, Optional[int]]],
             config: ConfigMetaCAT) -> Tuple:
     """Predict on data used in the meta_cat.pipe
 
+    The data is batched by length (see `create_length_buckets`) and the
+    predictions are returned in the original order.
+
     Args:
         model (nn.Module):
             The model.
@@ -92,29 +130,34 @@ def predict(model: nn.Module, data: List[Tuple[List[int], int, Optional[int]]],
 
     pad_id = config.model['padding_idx']
     batch_size = config.general['batch_size_eval']
+    batch_size_tokens = config.general['batch_size_eval_tokens']
     device = config.general['device']
     ignore_cpos = config.model['ignore_cpos']
 
     model.eval()
     model.to(device)
 
-    num_batches = math.ceil(len(data) / batch_size)
-    all_logits = []
+    batches = create_length_buckets([len(x[0]) for x in data], batch_size, batch_size_tokens)
+    logits: Optional[np.ndarray] = None
 
     with torch.no_grad():
-        for i in range(num_batches):
-            x, cpos, attention_masks, _ = create_batch_piped_data(data, i * batch_size, (i + 1) * batch_size,
+        for inds in batches:
+            batch_data = [data[ind] for ind in inds]
+            x, cpos, attention_masks, _ = create_batch_piped_data(batch_data, 0, len(batch_data),
                                                                   device=device, pad_id=pad_id)
 
-            logits = model(x, center_positions=cpos, attention_mask=attention_masks, ignore_cpos=ignore_cpos)
-            all_logits.append(logits.detach().cpu().numpy())
+            batch_logits = model(x, center_positions=cpos, attention_mask=attention_masks, ignore_cpos=ignore_cpos)
+            batch_logits = batch_logits.detach().cpu().numpy()
+            if logits is None:
+                logits = np.empty((len(data), batch_logits.shape[1]), dtype=batch_logits.dtype)
+            # back to the original order
+            logits[inds] = batch_logits
 
     predictions = []
     confidences = []
 
     # Can be that there are not logits, data is empty
-    if all_logits:
-        logits = np.concatenate(all_logits, axis=0)
+    if logits is not None:
         predictions = np.argmax(logits, axis=1)
         confidences = np.max(softmax(logits, axis=1), axis=1)
 
@@ -54,9 +54,7 @@ def build_vocab_from_hf(model_name, hf_tokenizer, vocab):
                 embs = model.embeddings.word_embeddings.weight.cpu().detach().numpy()
 
             # Reset all vecs in current vocab
-            vocab.vec_index2word = {}
-            for ind in vocab.index2word.keys():
-                vocab.vocab[vocab.index2word[ind]]['vec'] = None
+            vocab.remove_all_vectors()
 
             for i in range(hf_tokenizer.vocab_size):
                 tkn = hf_tokenizer.ids_to_tokens[i]
@@ -0,0 +1,176 @@
+"""A token level trie over the names and sub-names of a CDB.
+
+The vocab based NER used to build `name + separator + token` strings for every
+extension it tried and probe `cdb.snames` and `cdb.name2cuis` with them. The trie
+in here allows the same walk to be done with integer token IDs and integer node IDs
+without allocating any new strings along the way.
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+NO_NODE = -1
+"""The node ID used for a failed step within the trie."""
+
+_TOKEN_BITS = 32
+
+
+class NameTrie(object):
+    """Token level trie built from the names (`cdb.name2cuis`) and
+    sub-names (`cdb.snames`) of a CDB.
+
+    Each name is split by the separator and every part becomes one step in the trie.
+    This means that a string is in `cdb.snames` (or `cdb.name2cuis`) if and only if
+    walking its separated parts from the root ends up in a node marked as a sub-name
+    (or a name).
+
+    Args:
+        separator (str): The separator used to merge the tokens of a name.
+    """
+    ROOT = 0
+
+    def __init__(self, separator: str) -> None:
+        self.separator = separator
+        self._token2id: Dict[str, int] = {}
+        # (parent_node << _TOKEN_BITS) | token_id -> child_node
+        self._children: Dict[int, int] = {}
+        self._node_names: List[Optional[str]] = [None]
+        self._is_sname: List[bool] = [False]
+        self._is_name: List[bool] = [False]
+
+    def __len__(self) -> int:
+        return len(self._node_names)
+
+    def _get_or_add_token(self, token: str) -> int:
+        tid = self._token2id.get(token)
+        if tid is None:
+            tid = len(self._token2id)
+            self._token2id[token] = tid
+        return tid
+
+    def _insert(self, name: str) -> int:
+        node = self.ROOT
+        for part in name.split(self.separator):
+            key = (node << _TOKEN_BITS) | self._get_or_add_token(part)
+            child = self._children.get(key)
+            if child is None:
+                child = len(self._node_names)
+                self._children[key] = child
+                self._node_names.append(None)
+                self._is_sname.append(False)
+                self._is_name.append(False)
+            node = child
+        # keep a reference to the original string object
+        self._node_names[node] = name
+        return node
+
+    def add_sname(self, sname: str) -> None:
+        """Add a sub-name to the trie.
+
+        Args:
+            sname (str): The sub-name.
+        """
+        self._is_sname[self._insert(sname)] = True
+
+    def add_name(self, name: str) -> None:
+        """Add a (full) name to the trie.
+
+        Args:
+            name (str): The name.
+        """
+        self._is_name[self._insert(name)] = True
+
+    def remove_name(self, name: str) -> None:
+        """Unmark a (full) name in the trie.
+
+        The nodes are kept since the name may still be a sub-name.
+
+        Args:
+            name (str): The name.
+        """
+        node = self.ROOT
+        for part in name.split(self.separator):
+            node = self.step(node, part)
+        if node != NO_NODE:
+            self._is_name[node] = False
+
+    def step(self, node: int, part: Optional[str]) -> int:
+        """Take one step in the trie.
+
+        The step is equivalent to checking for `name + separator + part`
+        where `name` is the name of the current node. If the part itself
+        contains the separator, it will take multiple steps in the trie.
+
+        Args:
+            node (int): The current node (or `NameTrie.ROOT`).
+            part (Optional[str]): The next part of the name.
+
+        Returns:
+            int: The next node, or `NO_NODE` if there is no such node.
+        """
+        if node == NO_NODE:
+            return NO_NODE
+        tid = self._token2id.get(part)  # type: ignore
+        if tid is not None:
+            return self._children.get((node << _TOKEN_BITS) | tid, NO_NODE)
+        if isinstance(part, str) and self.separator in part:
+            # NOTE: the parts in the trie never contain the separator
+            for sub_part in part.split(self.separator):
+                node = self.step(node, sub_part)
+                if node == NO_NODE:
+                    break
+            return node
+        return NO_NODE
+
+    def is_sname(self, node: int) -> bool:
+        """Check whether the node represents a sub-name (i.e is in `cdb.snames`).
+
+        Args:
+            node (int): The node.
+
+        Returns:
+            bool: Whether the node is a sub-name.
+        """
+        return node != NO_NODE and self._is_sname[node]
+
+    def is_name(self, node: int) -> bool:
+        """Check whether the node represents a name (i.e is in `cdb.name2cuis`).
+
+        Args:
+            node (int): The node.
+
+        Returns:
+            bool: Whether the node is a name.
+        """
+        return node != NO_NODE and self._is_name[node]
+
+    def get_name(self, node: int) -> str:
+        """Get the name (or sub-name) for a node.
+
+        Args:
+            node (int): The node. Should be either a name or a sub-name.
+
+        Returns:
+            str: The name, or an empty string if the node is neither a name nor a sub-name.
+        """
+        if node == NO_NODE:
+            return ''
+        return self._node_names[node] or ''
+
+    @classmethod
+    def from_names(cls, separator: str, snames: Iterable[str], names: Iterable[str]) -> 'NameTrie':
+        """Build a trie from sub-names and names.
+
+        Args:
+            separator (str): The separator used to merge the tokens of a name.
+            snames (Iterable[str]): The sub-names.
+            names (Iterable[str]): The names.
+
+        Returns:
+            NameTrie: The built trie.
+        """
+        trie = cls(separator)
+        for sname in snames:
+            trie.add_sname(sname)
+        for name in names:
+            trie.add_name(name)
+        return trie
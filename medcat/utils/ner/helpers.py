@@ -39,5 +39,6 @@ def make_or_update_cdb(json_path: str, cdb: Optional[CDB] = None,
             # We are adding only what is needed
             cdb.cui2names[cui] = set([cui])
             cdb.cui2preferred_name[cui] = cui
+    cdb.mark_dirty('cui2names', 'cui2preferred_name')
 
     return cdb
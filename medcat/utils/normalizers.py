@@ -1,18 +1,184 @@
-from typing import Optional, Set, Iterable, Iterator
+from typing import Optional, Set, Iterable, Iterator, Dict, List, Any, Tuple
 import re
 import spacy
+from collections import OrderedDict
+from itertools import islice
 from medcat.pipeline.pipe_runner import PipeRunner
 
 
 CONTAINS_NUMBER = re.compile('[0-9]+')
 
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+DIACRITICS = 'àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿ'
+
+
+class _LRUCache(object):
+    """A simple (least recently used) bounded cache.
+
+    Args:
+        max_size (int): The maximum number of items to keep.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._cache: OrderedDict = OrderedDict()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key not in self._cache:
+            return default
+        self._cache.move_to_end(key)
+        return self._cache[key]
+
+    def set(self, key: Any, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _get_deletes(word: str, max_distance: int) -> Set[str]:
+    deletes = {word}
+    current = deletes
+    for _ in range(max_distance):
+        current = {part[:i] + part[i + 1:] for part in current for i in range(len(part))}
+        deletes |= current
+    return deletes
+
+
+class SymSpellIndex(object):
+    """A symmetric delete (SymSpell-style) index of words.
+
+    Each word is indexed under all the strings that can be obtained by deleting up
+    to `max_distance` characters from (the prefix of) the word. Two words that are
+    within `max_distance` edits (deletes, inserts, replaces or transposes) of each
+    other always share at least one of these strings. So looking up a word gives
+    a (small) superset of the indexed words that are within `max_distance` edits
+    of it - without having to generate all the edits of the word.
+
+    Args:
+        max_distance (int): The maximum number of edits.
+        prefix_len (int): Only this many characters at the start of a word are used
+            for the deletes. This limits the size of the index. Defaults to 7.
+    """
+
+    def __init__(self, max_distance: int, prefix_len: int = 7) -> None:
+        self.max_distance = max_distance
+        self.prefix_len = prefix_len
+        self.nr_of_words = 0
+        self._index: Dict[str, List[str]] = {}
+
+    def get_deletes(self, word: str) -> Set[str]:
+        """Get all the deletes (up to the max distance) of the prefix of a word.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            Set[str]: The deletes (including the prefix itself).
+        """
+        return _get_deletes(word[:self.prefix_len], self.max_distance)
+
+    def add(self, words: Iterable[str]) -> None:
+        """Add words to the index.
+
+        Args:
+            words (Iterable[str]): The words to add.
+        """
+        index = self._index
+        for word in words:
+            for delete in self.get_deletes(word):
+                similar = index.get(delete)
+                if similar is None:
+                    index[delete] = [word]
+                else:
+                    similar.append(word)
+            self.nr_of_words += 1
+
+    def lookup(self, word: str) -> Set[str]:
+        """Get the indexed words that may be within the max distance of a word.
+
+        Args:
+            word (str): The word.
+
+        Returns:
+            Set[str]: A superset of the indexed words within the max distance.
+        """
+        index = self._index
+        found: Set[str] = set()
+        for delete in self.get_deletes(word):
+            similar = index.get(delete)
+            if similar is not None:
+                found.update(similar)
+        return found
+
+
+def _first_mismatch(word: str, other: str) -> int:
+    for i, (c1, c2) in enumerate(zip(word, other)):
+        if c1 != c2:
+            return i
+    return min(len(word), len(other))
+
+
+def _is_edit1(word: str, other: str, letters: str) -> bool:
+    # NOTE: equivalent to `other in BasicSpellChecker.get_edits1(word, ...)`
+    len_diff = len(other) - len(word)
+    if len_diff == -1:
+        i = _first_mismatch(word, other)
+        return word[i + 1:] == other[i:]
+    if len_diff == 1:
+        i = _first_mismatch(word, other)
+        return other[i] in letters and other[i + 1:] == word[i:]
+    if len_diff != 0:
+        return False
+    if word == other:
+        return any(c in letters for c in word) or any(c1 == c2 for c1, c2 in zip(word, word[1:]))
+    i = _first_mismatch(word, other)
+    if other[i] in letters and word[i + 1:] == other[i + 1:]:
+        return True
+    return (i + 1 < len(word) and word[i] == other[i + 1] and word[i + 1] == other[i]
+            and word[i + 2:] == other[i + 2:])
+
+
+def _get_reverse_edits1(other: str, letters: str, alphabet: str) -> List[str]:
+    # NOTE: all the words (made up of characters in `alphabet`) that have `other`
+    #       as one of their edits (see `BasicSpellChecker.get_edits1`)
+    splits = [(other[:i], other[i:]) for i in range(len(other) + 1)]
+    undeletes = [L + c + R for L, R in splits for c in alphabet]
+    transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
+    unreplaces = [L + c + R[1:] for L, R in splits if R and R[0] in letters for c in alphabet]
+    uninserts = [L + R[1:] for L, R in splits if R and R[0] in letters]
+    return undeletes + transposes + unreplaces + uninserts
+
 
 class BasicSpellChecker(object):
+    """A spell checker based on the words in the CDB vocab.
 
-    def __init__(self, cdb_vocab, config, data_vocab=None):
+    The candidate corrections are found through a symmetric delete index
+    (see `SymSpellIndex`) of the CDB vocab rather than by generating (and looking up)
+    all the edits of a word. The index is built upon first use and updated as
+    words are added to the vocab. The candidates of each word are cached.
+
+    Args:
+        cdb_vocab: The CDB vocab.
+        config: The config.
+        data_vocab: The (data) vocab. Defaults to None.
+        cache_size (int): The number of words to cache the candidates of. Defaults to 100 000.
+    """
+
+    def __init__(self, cdb_vocab, config, data_vocab=None, cache_size: int = 100_000):
         self.vocab = cdb_vocab
         self.config = config
         self.data_vocab = data_vocab
+        self._index: Optional[SymSpellIndex] = None
+        self._candidates = _LRUCache(cache_size)
 
     def P(self, word: str) -> float:
         """Probability of `word`.
@@ -48,27 +214,62 @@ class BasicSpellChecker(object):
         Returns:
             Optional[str]: Fixed word, or None if no fixes were applied.
         """
-        fix = max(self.candidates(word), key=self.P)
-        if fix != word:
-            return fix
-        else:
-            return None
+        self._update_index()
+        key = (word, self.config.general.spell_check_deep, self.config.general.diacritics)
+        # NOTE: only the candidates are cached since the counts of the words
+        #       (and thus the most probable candidate) can change (e.g in training)
+        candidates: Optional[Tuple[str, ...]] = self._candidates.get(key)
+        if candidates is None:
+            candidates = tuple(self.candidates(word))
+            self._candidates.set(key, candidates)
+        fix: Optional[str] = max(candidates, key=self.P)
+        if fix == word:
+            fix = None
+        return fix
+
+    def _update_index(self) -> SymSpellIndex:
+        max_distance = 2 if self.config.general.spell_check_deep else 1
+        index = self._index
+        # NOTE: words are only ever added to the vocab (at the end)
+        if index is None or index.max_distance < max_distance or index.nr_of_words > len(self.vocab):
+            index = self._index = SymSpellIndex(max_distance)
+        if index.nr_of_words < len(self.vocab):
+            index.add(islice(self.vocab, index.nr_of_words, None))
+            self._candidates.clear()
+        return index
 
     def candidates(self, word: str) -> Iterable[str]:
         """Generate possible spelling corrections for word.
 
+        These are the known words within one edit of the word. Or, if there are none
+        and `spell_check_deep` is enabled, within two edits.
+
         Args:
             word (str): The word.
 
         Returns:
             Iterable[str]: The list of candidate words.
         """
+        if word in self.vocab:
+            return {word}
+        letters = get_letters(self.config.general.diacritics)
+        similar = self._update_index().lookup(word)
+        known1 = {other for other in similar if _is_edit1(word, other, letters)}
+        if known1:
+            return known1
         if self.config.general.spell_check_deep:
             # This will check a two letter edit distance
-            return self.known([word]) or self.known(self.edits1(word)) or self.known(self.edits2(word)) or [word]
-        else:
-            # Will check only one letter edit distance
-            return self.known([word]) or self.known(self.edits1(word)) or [word]
+            # NOTE: sharing a delete (of the full words) is necessary, but not sufficient
+            deletes = _get_deletes(word, 2)
+            similar = {other for other in similar if abs(len(other) - len(word)) <= 2 and
+                       not deletes.isdisjoint(_get_deletes(other, 2))}
+            edits1 = self.edits1(word) if similar else set()
+            alphabet = letters + ''.join(set(word).difference(letters))
+            known2 = {other for other in similar
+                      if not edits1.isdisjoint(_get_reverse_edits1(other, letters, alphabet))}
+            if known2:
+                return known2
+        return [word]
 
     def known(self, words: Iterable[str]) -> Set[str]:
         """The subset of `words` that appear in the dictionary of WORDS.
@@ -95,10 +296,7 @@ class BasicSpellChecker(object):
         Returns:
             Set[str]: The set of all edits
         """
-        letters    = 'abcdefghijklmnopqrstuvwxyz'
-
-        if use_diacritics:
-            letters += 'àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿ'
+        letters    = get_letters(use_diacritics)
 
         splits     = [(word[:i], word[i:])    for i in range(len(word) + 1)]
         deletes    = [L + R[1:]               for L, R in splits if R]
@@ -124,6 +322,18 @@ class BasicSpellChecker(object):
         pass
 
 
+def get_letters(use_diacritics: bool) -> str:
+    """Get the letters that can be inserted or replaced in an edit.
+
+    Args:
+        use_diacritics (bool): Whether to use diacritics or not.
+
+    Returns:
+        str: The letters.
+    """
+    return LETTERS + DIACRITICS if use_diacritics else LETTERS
+
+
 def get_all_edits_n(word: str, use_diacritics: bool, n: int,
                     return_ordered: bool = False) -> Iterator[str]:
     """Get all N-th order edits of a word.
@@ -165,31 +375,62 @@ class TokenNormalizer(PipeRunner):
     Args:
         config
         spell_checker
+        cache_size (int): The number of fixes to cache the normalised forms of. Defaults to 100 000.
     """
 
     # Custom pipeline component name
     name = 'token_normalizer'
 
     # Override
-    def __init__(self, config, spell_checker=None):
+    def __init__(self, config, spell_checker=None, cache_size: int = 100_000):
         self.config = config
         self.spell_checker = spell_checker
         self.nlp = spacy.load(config.general.spacy_model, disable=config.general.spacy_disabled_components)
+        self._fix_norms = _LRUCache(cache_size)
+        # The norms only depend on the lexeme, its tag and lemma (and the config),
+        # so they are memoised - {(orth, tag, lemma): (norm, to_skip)}
+        self._norms: Dict[Tuple[int, int, int], Tuple[str, bool]] = {}
+        self._norms_config: Optional[Tuple] = None
         super().__init__(self.config.general.workers)
 
+    def _get_norms_memo(self) -> Dict[Tuple[int, int, int], Tuple[str, bool]]:
+        cnf_p = self.config.preprocessing
+        norms_config = (cnf_p.min_len_normalize, frozenset(cnf_p.do_not_normalize or ()))
+        if norms_config != self._norms_config:
+            self._norms = {}
+            self._norms_config = norms_config
+        return self._norms
+
+    def _get_norm(self, token) -> Tuple[str, bool]:
+        if len(token.lower_) < self.config.preprocessing.min_len_normalize:
+            return token.lower_, False
+        elif (self.config.preprocessing.do_not_normalize) and token.tag_ is not None and \
+                 token.tag_ in self.config.preprocessing.do_not_normalize:
+            return token.lower_, False
+        elif token.lemma_ == '-PRON-':
+            return token.lemma_, True
+        else:
+            return token.lemma_.lower(), False
+
+    def _get_fix_norms(self, fix: str) -> Tuple[str, str]:
+        norms = self._fix_norms.get(fix)
+        if norms is None:
+            tmp = self.nlp(fix)[0]
+            norms = (tmp.lower_, tmp.lemma_.lower())
+            self._fix_norms.set(fix, norms)
+        return norms
+
     # Override
     def __call__(self, doc):
+        norms = self._get_norms_memo()
         for token in doc:
-            if len(token.lower_) < self.config.preprocessing.min_len_normalize:
-                token._.norm = token.lower_
-            elif (self.config.preprocessing.do_not_normalize) and token.tag_ is not None and \
-                     token.tag_ in self.config.preprocessing.do_not_normalize:
-                token._.norm = token.lower_
-            elif token.lemma_ == '-PRON-':
-                token._.norm = token.lemma_
+            key = (token.orth, token.tag, token.lemma)
+            norm = norms.get(key)
+            if norm is None:
+                norm = norms[key] = self._get_norm(token)
+            token._.norm = norm[0]
+            if norm[1]:
                 token._.to_skip = True
-            else:
-                token._.norm = token.lemma_.lower()
 
             if self.config.general.spell_check:
                 # Fix the token if necessary
@@ -197,9 +438,9 @@ class TokenNormalizer(PipeRunner):
                         and token.lower_ not in self.spell_checker and not CONTAINS_NUMBER.search(token.lower_):
                     fix = self.spell_checker.fix(token.lower_)
                     if fix is not None:
-                        tmp = self.nlp(fix)[0]
+                        fix_lower, fix_lemma = self._get_fix_norms(fix)
                         if len(token.lower_) < self.config.preprocessing.min_len_normalize:
-                            token._.norm = tmp.lower_
+                            token._.norm = fix_lower
                         else:
-                            token._.norm = tmp.lemma_.lower()
+                            token._.norm = fix_lemma
         return doc
@@ -0,0 +1,160 @@
+"""Helpers for (data-)parallel self-supervised training.
+
+Each worker process trains on its own shard of the data against its
+own (forked) copy of the CDB and keeps track of what it changed
+(see `TrainingTracker`). The changes (see `TrainingDelta`) are then
+merged into the main CDB (see `merge_training_deltas`).
+"""
+import logging
+from typing import Dict, TypedDict, List, Set, Optional
+
+import numpy as np
+
+from medcat.utils.cdb_state import CDBStateJournal
+
+
+logger = logging.getLogger(__name__) # separate logger from the package-level one
+
+
+TrainingDelta = TypedDict(
+    'TrainingDelta',
+    {
+        'cui2context_vectors': Dict[str, Dict[str, np.ndarray]],
+        'cui2count_train': Dict[str, int],
+        'cui2average_confidence': Dict[str, float],
+        'name2count_train': Dict[str, int],
+    })
+"""Training delta.
+
+The changes to the CDB made by (self-supervised) training:
+ - cui2context_vectors: The new context vectors of the changed CUIs
+ - cui2count_train: The number of (positive) training examples of the changed CUIs
+ - cui2average_confidence: The new average confidence of the changed CUIs
+ - name2count_train: The number of training examples of the changed names
+"""
+
+
+class TrainingTracker:
+    """Keeps track of the changes made to a CDB by (self-supervised) training.
+
+    The tracker is a context manager. Only the changes made within its
+    context are tracked.
+
+    NOTE: The changes to the context vectors and the training counts are tracked
+          through a `CDBStateJournal`. So if these are reset (e.g by `CDB.reset_training`)
+          within the context, they cannot be tracked.
+
+    Args:
+        cdb: The CDB to track.
+    """
+
+    def __init__(self, cdb) -> None:
+        self.cdb = cdb
+        self._journal = CDBStateJournal()
+        self._name2count_train: Dict[str, int] = {}
+        self._cui2average_confidence: Dict[str, float] = {}
+
+    def __enter__(self) -> 'TrainingTracker':
+        self._name2count_train = dict(self.cdb.name2count_train)
+        self._cui2average_confidence = dict(self.cdb.cui2average_confidence)
+        self.cdb._state_journals.append(self._journal)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.cdb._state_journals.remove(self._journal)
+
+    def get_delta(self) -> TrainingDelta:
+        """Get the changes made to the CDB so far.
+
+        Returns:
+            TrainingDelta: The changes.
+        """
+        cdb = self.cdb
+        cuis = (self._journal.get_changed_keys('cui2context_vectors') |
+                self._journal.get_changed_keys('cui2count_train'))
+        delta: TrainingDelta = {
+            'cui2context_vectors': {cui: dict(cdb.cui2context_vectors[cui]) for cui in cuis
+                                    if cui in cdb.cui2context_vectors},
+            'cui2count_train': {cui: (cdb.cui2count_train.get(cui, 0) -
+                                      self._journal.get_original('cui2count_train', cui, 0))
+                                for cui in cuis},
+            'cui2average_confidence': {cui: value for cui, value in cdb.cui2average_confidence.items()
+                                       if value != self._cui2average_confidence.get(cui)},
+            'name2count_train': {name: count - self._name2count_train.get(name, 0)
+                                 for name, count in cdb.name2count_train.items()
+                                 if count != self._name2count_train.get(name, 0)},
+        }
+        return delta
+
+
+def _weighted_average(vectors: List[np.ndarray], weights: List[float]) -> np.ndarray:
+    if sum(weights) <= 0:
+        weights = [1] * len(vectors)
+    return np.average(np.stack(vectors), axis=0, weights=weights)
+
+
+def merge_training_deltas(cdb, deltas: List[TrainingDelta]) -> None:
+    """Merge the changes made by training (in separate copies of the CDB) into the CDB.
+
+    All the deltas are expected to have been obtained starting from the current
+    state of the CDB.
+
+    The context vectors of each CUI are the average of the vectors of the deltas
+    in which the CUI changed, weighted by the number of (positive) training
+    examples the CUI had in each delta. If the CUI had no positive training
+    examples in any of them (e.g only negative ones), the vectors are weighed equally.
+    The training counts are added up.
+
+    Args:
+        cdb: The CDB to merge the changes into.
+        deltas (List[TrainingDelta]): The changes to merge.
+    """
+    changed_cuis: Set[str] = set()
+    for delta in deltas:
+        changed_cuis.update(delta['cui2count_train'])
+    logger.debug("Merging %d training deltas with %d changed CUIs", len(deltas), len(changed_cuis))
+    cdb.record_change('cui2context_vectors', changed_cuis)
+    cdb.record_change('cui2count_train', changed_cuis)
+    for cui in changed_cuis:
+        cui_deltas = [delta for delta in deltas if cui in delta['cui2count_train']]
+        counts = [delta['cui2count_train'][cui] for delta in cui_deltas]
+        orig_count = cdb.cui2count_train.get(cui, 0)
+        new_count = orig_count + sum(counts)
+        _merge_vectors(cdb, cui, cui_deltas, counts)
+        _merge_average_confidence(cdb, cui, cui_deltas, counts, orig_count, new_count)
+        cdb.cui2count_train[cui] = new_count
+    for delta in deltas:
+        for name, count in delta['name2count_train'].items():
+            cdb.name2count_train[name] = cdb.name2count_train.get(name, 0) + count
+    cdb.mark_dirty('cui2context_vectors', 'cui2count_train', 'cui2average_confidence', 'name2count_train')
+
+
+def _merge_vectors(cdb, cui: str, cui_deltas: List[TrainingDelta], counts: List[int]) -> None:
+    vectors_per_type: Dict[str, List[np.ndarray]] = {}
+    weights_per_type: Dict[str, List[float]] = {}
+    for delta, count in zip(cui_deltas, counts):
+        for context_type, vector in delta['cui2context_vectors'].get(cui, {}).items():
+            vectors_per_type.setdefault(context_type, []).append(vector)
+            weights_per_type.setdefault(context_type, []).append(count)
+    cui_vectors: Optional[Dict[str, np.ndarray]] = cdb.cui2context_vectors.get(cui)
+    if cui_vectors is None:
+        if not any(cui in delta['cui2context_vectors'] for delta in cui_deltas):
+            return
+        # NOTE: the CUI may have been trained without any context vectors (e.g no known words)
+        cui_vectors = cdb.cui2context_vectors[cui] = {}
+    for context_type, vectors in vectors_per_type.items():
+        cui_vectors[context_type] = _weighted_average(vectors, weights_per_type[context_type])
+
+
+def _merge_average_confidence(cdb, cui: str, cui_deltas: List[TrainingDelta], counts: List[int],
+                              orig_count: int, new_count: int) -> None:
+    if new_count <= 0 or not any(cui in delta['cui2average_confidence'] for delta in cui_deltas):
+        return
+    # the average confidence is an average over the training examples so each delta
+    # contributes the sum of the confidences of its new examples
+    orig_total = cdb.cui2average_confidence.get(cui, 0) * orig_count
+    total = orig_total
+    for delta, count in zip(cui_deltas, counts):
+        if cui in delta['cui2average_confidence']:
+            total += delta['cui2average_confidence'][cui] * (orig_count + count) - orig_total
+    cdb.cui2average_confidence[cui] = total / new_count
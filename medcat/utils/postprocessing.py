@@ -1,4 +1,4 @@
-from spacy.tokens import Span, Doc
+from spacy.tokens import Doc
 from typing import Optional, List
 from medcat.cdb import CDB
 from enum import Enum, auto
@@ -15,23 +15,18 @@ def map_ents_to_groups(cdb: CDB, doc: Doc) -> None:
 
 
 def make_pretty_labels(cdb: CDB, doc: Doc, style: Optional[LabelStyle] = None) -> None:
-    ents = list(doc.ents)
+    ents = doc.ents
+    if style == LabelStyle.short:
+        labels = [ent._.cui for ent in ents]
+    elif style == LabelStyle.long:
+        labels = ["{} | {} | {:.2f}".format(ent._.cui, cdb.get_name(ent._.cui), ent._.context_similarity)
+                  for ent in ents]
+    else:
+        labels = ['concept'] * len(ents)
 
-    n_ents = []
-    for ent in ents:
-        if style == LabelStyle.short:
-            label = ent._.cui
-        elif style == LabelStyle.long:
-            label = "{} | {} | {:.2f}".format(ent._.cui, cdb.get_name(ent._.cui), ent._.context_similarity)
-        else:
-            label = 'concept'
-
-        n_ent = Span(doc, ent.start, ent.end, label)
-        for attr in ent._.__dict__['_extensions'].keys():
-            setattr(n_ent._, attr, getattr(ent._, attr))
-        n_ents.append(n_ent)
-
-    doc.ents = n_ents  # type: ignore
+    # NOTE: The values of the span extensions are kept in doc.user_data keyed by
+    #       the offsets of the span, so the relabelled spans keep them as they are.
+    doc.ents = [(label, ent.start, ent.end) for label, ent in zip(labels, ents)]  # type: ignore
 
 
 def create_main_ann(cdb: CDB, doc: Doc, tuis: Optional[List] = None) -> None:
@@ -44,19 +39,17 @@ def create_main_ann(cdb: CDB, doc: Doc, tuis: Optional[List] = None) -> None:
         doc (Doc): Spacy document.
         tuis (Optional[List], optional): The type IDs. Defaults to None.
     """
-    doc._.ents.sort(key=lambda x: len(x.text), reverse=True)
+    # NOTE: the number of characters is the length of the text
+    doc._.ents.sort(key=lambda x: x.end_char - x.start_char, reverse=True)
 
-    tkns_in = set()
+    # Whether each token (by index) is already in a (longer) annotation
+    tkns_in = bytearray(len(doc))
     main_anns = []
     for ent in doc._.ents:
         if tuis is None or ent._.tui in tuis:
-            to_add = True
-            for tkn in ent:
-                if tkn in tkns_in:
-                    to_add = False
-            if to_add:
-                for tkn in ent:
-                    tkns_in.add(tkn)
+            start, end = ent.start, ent.end
+            if tkns_in.find(1, start, end) == -1:
+                tkns_in[start:end] = b'\x01' * (end - start)
                 main_anns.append(ent)
 
     doc.ents = list(doc.ents) + main_anns  # type: ignore
@@ -0,0 +1,50 @@
+"""This module is responsible for saving and loading numpy arrays (e.g word and
+context vectors) separately from the rest of the data.
+
+Arrays saved in such a way can be memory mapped upon load. That way, multiple
+processes (e.g workers or API replicas on the same host) can use a single copy
+of the data in the page cache instead of each holding their own.
+"""
+import os
+import logging
+from typing import Optional, Literal, cast
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def save_array(path: str, arr: np.ndarray) -> None:
+    """Save a numpy array (in the `.npy` format).
+
+    The array is first written into a temporary file which then replaces the
+    target file. That way any existing memory map of the target file (i.e if
+    the same model was loaded and is now being saved) stays valid.
+
+    Args:
+        path (str): The path to save the array at.
+        arr (np.ndarray): The array to save.
+    """
+    tmp_path = path + '.tmp'
+    logger.debug('Saving array of shape %s to %s', arr.shape, path)
+    with open(tmp_path, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
+
+
+def load_array(path: str, mmap_mode: Optional[str] = 'r') -> np.ndarray:
+    """Load a numpy array saved with `save_array`.
+
+    Args:
+        path (str): The path of the saved array.
+        mmap_mode (Optional[str]): The memory map mode (see `numpy.load`).
+            Use None to read the array into memory. Defaults to `'r'`.
+
+    Returns:
+        np.ndarray: The (potentially memory mapped) array.
+    """
+    logger.debug('Loading array from %s (mmap_mode=%s)', path, mmap_mode)
+    # NOTE: the memory map is kept alive by the (plain ndarray) view
+    mode = cast(Optional[Literal['r+', 'r', 'w+', 'c']], mmap_mode)
+    return np.asarray(np.load(path, mmap_mode=mode))
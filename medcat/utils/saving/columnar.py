@@ -0,0 +1,318 @@
+"""A binary, columnar format for the name and CUI maps of a CDB.
+
+The name and CUI based maps make up most of a (large) CDB. Saved with dill (or JSON)
+each occurrence of each name and CUI is saved (and loaded) as a separate string.
+In the columnar format, every distinct CUI, name and type ID is saved once
+(in a string table) and the maps refer to them by their index. The maps themselves
+are saved as flat integer arrays along with the offsets of the values of each key
+(i.e the `indptr` of a CSR matrix).
+
+Everything is saved into a single (uncompressed) `.npz` file. Since the same
+(interned) string objects are reused when the maps are rebuilt upon load, the loaded
+CDB also takes up less memory than one loaded from dill or JSON.
+
+The rarely used parts (i.e `addl_info`) are saved separately (with dill) and can be
+loaded lazily - i.e only once they are first accessed.
+"""
+import gc
+import logging
+from collections import UserDict
+from collections.abc import Mapping, Set as AbstractSet
+from typing import Any, Callable, Collection, Dict, Iterable, List, Set, Tuple
+
+import dill
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+ONE2MANY_SETS = ('cui2names', 'cui2snames', 'cui2type_ids')
+COLUMNAR_NAMES = ONE2MANY_SETS + ('name2cuis', 'name2cuis2status', 'name_isupper', 'snames')
+LAZY_NAMES = ('addl_info', )
+
+
+class LazyDict(UserDict):
+    """A dict that is only loaded upon first access.
+
+    Once loaded, this acts like a regular dict. When pickled (e.g when the CDB is
+    saved with dill), the loaded data is saved as a regular dict.
+
+    Args:
+        loader (Callable[[], dict]): The method that loads the data.
+    """
+
+    def __init__(self, loader: Callable[[], dict]) -> None:
+        # NOTE: not calling the super constructor since that would set the data
+        self._loader = loader
+
+    @property
+    def data(self) -> dict:  # type: ignore
+        """The underlying data. This is loaded upon first access.
+
+        Returns:
+            dict: The underlying data.
+        """
+        if '_data' not in self.__dict__:
+            logger.info('Lazily loading data')
+            self.__dict__['_data'] = self._loader()
+        return self.__dict__['_data']
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the data has been loaded.
+
+        Returns:
+            bool: Whether the data has been loaded.
+        """
+        return '_data' in self.__dict__
+
+    def __reduce__(self):
+        return dict, (self.data, )
+
+    def __repr__(self) -> str:
+        if not self.is_loaded:
+            return f'{self.__class__.__name__}(<not loaded>)'
+        return repr(self.data)
+
+
+def materialise(obj: Any) -> Any:
+    """Get the underlying dict of a lazily loaded dict.
+
+    Args:
+        obj (Any): The object.
+
+    Returns:
+        Any: The underlying dict if the object is a `LazyDict`, the object itself otherwise.
+    """
+    if isinstance(obj, LazyDict):
+        return obj.data
+    return obj
+
+
+def save_lazy(path: str, value: object) -> None:
+    """Save a lazily loadable part of the CDB.
+
+    Args:
+        path (str): The file path.
+        value (object): The part to save.
+    """
+    with open(path, 'wb') as f:
+        dill.dump(materialise(value), f)
+
+
+def load_lazy(path: str, lazy: bool = True) -> dict:
+    """Load a lazily loadable part of the CDB.
+
+    Args:
+        path (str): The file path.
+        lazy (bool): Whether to only load the data upon first access. Defaults to True.
+
+    Returns:
+        dict: The (lazily loaded) data.
+    """
+    def loader() -> dict:
+        with open(path, 'rb') as f:
+            return dill.load(f)
+    if lazy:
+        return LazyDict(loader)  # type: ignore
+    return loader()
+
+
+def _encode_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in strings], dtype=np.int64)
+    blob = ''.join(strings).encode('utf-8', 'surrogatepass')
+    return np.frombuffer(blob, dtype=np.uint8), offsets
+
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """Decode a string table.
+
+    Args:
+        blob (np.ndarray): The UTF-8 encoded (concatenated) strings.
+        offsets (np.ndarray): The (character) offsets of the strings.
+
+    Returns:
+        List[str]: The strings.
+    """
+    # NOTE: the offsets are in characters rather than bytes, so the blob is decoded once
+    joined = blob.tobytes().decode('utf-8', 'surrogatepass')
+    offs = offsets.tolist()
+    return [joined[start:end] for start, end in zip(offs[:-1], offs[1:])]
+
+
+class _Interner:
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+
+    def add_all(self, strings: Iterable[str]) -> None:
+        ids = self.ids
+        for s in strings:
+            if s not in ids:
+                ids[s] = len(ids)
+
+    def encode(self, strings: Iterable[str]) -> np.ndarray:
+        ids = self.ids
+        return np.fromiter((ids[s] for s in strings), dtype=np.int32)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return _encode_strings(list(self.ids))
+
+
+def _encode_one2many(d: Dict[str, Collection[str]], keys: _Interner, values: _Interner,
+                     prefix: str, out: Dict[str, np.ndarray]) -> None:
+    out[f'{prefix}.keys'] = keys.encode(d)
+    out[f'{prefix}.offsets'] = np.zeros(len(d) + 1, dtype=np.int64)
+    out[f'{prefix}.offsets'][1:] = np.cumsum([len(vals) for vals in d.values()], dtype=np.int64)
+    out[f'{prefix}.values'] = values.encode(v for vals in d.values() for v in vals)
+
+
+def _decode_one2many(arrays: Dict[str, np.ndarray], prefix: str, keys: List[str], values: List[str],
+                     container: Callable) -> Dict:
+    offs = arrays[f'{prefix}.offsets'].tolist()
+    vals = [values[i] for i in arrays[f'{prefix}.values'].tolist()]
+    return {keys[k]: container(vals[start:end])
+            for k, start, end in zip(arrays[f'{prefix}.keys'].tolist(), offs[:-1], offs[1:])}
+
+
+def is_suitable(cdb_dict: Dict) -> bool:
+    """Check whether the parts of the CDB can be saved in the columnar format.
+
+    Args:
+        cdb_dict (Dict): The `__dict__` of the CDB.
+
+    Returns:
+        bool: Whether all the parts exist and are of the expected types.
+    """
+    if any(not isinstance(cdb_dict.get(name), Mapping) for name in COLUMNAR_NAMES if name != 'snames'):
+        return False
+    return isinstance(cdb_dict.get('snames'), AbstractSet)
+
+
+def encode_columns(cdb_dict: Dict) -> Dict[str, np.ndarray]:
+    """Encode the name and CUI maps of a CDB into the columnar arrays.
+
+    Args:
+        cdb_dict (Dict): The `__dict__` of the CDB.
+
+    Returns:
+        Dict[str, np.ndarray]: The arrays (by name).
+    """
+    cuis, names, type_ids, statuses = _Interner(), _Interner(), _Interner(), _Interner()
+    for name in ONE2MANY_SETS:
+        cuis.add_all(cdb_dict[name])
+    for cui_names in cdb_dict['cui2names'].values():
+        names.add_all(cui_names)
+    for cui_snames in cdb_dict['cui2snames'].values():
+        names.add_all(cui_snames)
+    for cui_type_ids in cdb_dict['cui2type_ids'].values():
+        type_ids.add_all(cui_type_ids)
+    for name in ('name2cuis', 'name2cuis2status', 'name_isupper'):
+        names.add_all(cdb_dict[name])
+    names.add_all(cdb_dict['snames'])
+    for name_cuis in cdb_dict['name2cuis'].values():
+        cuis.add_all(name_cuis)
+    for cui2status in cdb_dict['name2cuis2status'].values():
+        cuis.add_all(cui2status)
+        statuses.add_all(cui2status.values())
+
+    out: Dict[str, np.ndarray] = {}
+    for table_name, table in (('cuis', cuis), ('names', names), ('type_ids', type_ids),
+                              ('statuses', statuses)):
+        out[f'{table_name}.blob'], out[f'{table_name}.offsets'] = table.to_arrays()
+    _encode_one2many(cdb_dict['cui2names'], cuis, names, 'cui2names', out)
+    _encode_one2many(cdb_dict['cui2snames'], cuis, names, 'cui2snames', out)
+    _encode_one2many(cdb_dict['cui2type_ids'], cuis, type_ids, 'cui2type_ids', out)
+    _encode_one2many(cdb_dict['name2cuis'], names, cuis, 'name2cuis', out)
+    _encode_one2many(cdb_dict['name2cuis2status'], names, cuis, 'name2cuis2status', out)
+    out['name2cuis2status.statuses'] = statuses.encode(
+        status for cui2status in cdb_dict['name2cuis2status'].values() for status in cui2status.values())
+    out['name_isupper.keys'] = names.encode(cdb_dict['name_isupper'])
+    out['name_isupper.values'] = np.fromiter(cdb_dict['name_isupper'].values(), dtype=np.bool_)
+    out['snames'] = names.encode(cdb_dict['snames'])
+    logger.info('Encoded %d CUIs and %d names in the columnar format', len(cuis.ids), len(names.ids))
+    return out
+
+
+def save_columns(path: str, cdb_dict: Dict) -> None:
+    """Save the name and CUI maps of a CDB in the columnar format.
+
+    Args:
+        path (str): The `.npz` file path.
+        cdb_dict (Dict): The `__dict__` of the CDB.
+    """
+    out = encode_columns(cdb_dict)
+    logger.info('Saving the columnar parts of the CDB into "%s"', path)
+    with open(path, 'wb') as f:
+        np.savez(f, **out)
+
+
+def read_columns(path: str) -> Dict[str, np.ndarray]:
+    """Read the columnar arrays of a CDB.
+
+    Args:
+        path (str): The `.npz` file path.
+
+    Returns:
+        Dict[str, np.ndarray]: The arrays (by name).
+    """
+    logger.info('Loading the columnar parts of the CDB from "%s"', path)
+    with np.load(path) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def load_columns(path: str) -> Dict:
+    """Load the name and CUI maps of a CDB saved in the columnar format.
+
+    Args:
+        path (str): The `.npz` file path.
+
+    Returns:
+        Dict: The name and CUI maps (by attribute name).
+    """
+    return decode_columns(read_columns(path))
+
+
+def decode_columns(arrays: Dict[str, np.ndarray]) -> Dict:
+    """Decode the columnar arrays into the name and CUI maps of a CDB.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The arrays (by name).
+
+    Returns:
+        Dict: The name and CUI maps (by attribute name).
+    """
+    # NOTE: building millions of containers would otherwise trigger many (needless)
+    #       garbage collections since none of them are cyclic
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _decode_columns(arrays)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _decode_columns(arrays: Dict[str, np.ndarray]) -> Dict:
+    cuis, names, type_ids, statuses = (
+        decode_strings(arrays[f'{table_name}.blob'], arrays[f'{table_name}.offsets'])
+        for table_name in ('cuis', 'names', 'type_ids', 'statuses'))
+    out: Dict = {
+        'cui2names': _decode_one2many(arrays, 'cui2names', cuis, names, set),
+        'cui2snames': _decode_one2many(arrays, 'cui2snames', cuis, names, set),
+        'cui2type_ids': _decode_one2many(arrays, 'cui2type_ids', cuis, type_ids, set),
+        'name2cuis': _decode_one2many(arrays, 'name2cuis', names, cuis, list),
+    }
+    offs = arrays['name2cuis2status.offsets'].tolist()
+    status_cuis = [cuis[i] for i in arrays['name2cuis2status.values'].tolist()]
+    cui_statuses = [statuses[i] for i in arrays['name2cuis2status.statuses'].tolist()]
+    out['name2cuis2status'] = {
+        names[k]: dict(zip(status_cuis[start:end], cui_statuses[start:end]))
+        for k, start, end in zip(arrays['name2cuis2status.keys'].tolist(), offs[:-1], offs[1:])}
+    out['name_isupper'] = dict(zip((names[k] for k in arrays['name_isupper.keys'].tolist()),
+                                   arrays['name_isupper.values'].tolist()))
+    snames: Set[str] = {names[k] for k in arrays['snames'].tolist()}
+    out['snames'] = snames
+    return out
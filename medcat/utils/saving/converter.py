@@ -20,7 +20,7 @@ def main():
     parser.add_argument('modelpack', help='The model pack to use',
                         type=str)
     parser.add_argument('format', help='The target format. '
-                        'Either "dill" or "json" can be specified.', type=str)
+                        'Either "dill", "json" or "columnar" can be specified.', type=str)
     parser.add_argument('target', help='The target folder.', type=str)
     parser.add_argument('--silent', '-s', help='Make the operation silent (i.e ignore console output)',
                         action='store_true')
@@ -5,12 +5,17 @@ And to save as well as load them in some other way.
 """
 import os
 import logging
-from typing import cast, Dict, Optional, Type
+from typing import cast, Dict, List, Optional, Type
 import dill
 import json
+import numpy as np
 
 from medcat.config import Config
 from medcat.utils.saving.coding import CustomDelegatingEncoder, default_hook, default_postprocessing
+from medcat.utils.saving.arrays import save_array, load_array
+from medcat.utils.saving.columnar import (COLUMNAR_NAMES, LAZY_NAMES, is_suitable, materialise,
+                                          save_columns, read_columns, decode_columns, save_lazy, load_lazy)
+from medcat.utils.compact_maps import COMPACT_PART, CompactDict, compact_cdb, is_compact
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +26,9 @@ __SPECIALITY_NAMES_NAME = set(
 __SPECIALITY_NAMES_OTHER = set(["snames", "addl_info"])
 ONE2MANY = set(['cui2many', 'name2many'])  # these may or may not exist
 SPECIALITY_NAMES = __SPECIALITY_NAMES_CUI | __SPECIALITY_NAMES_NAME | __SPECIALITY_NAMES_OTHER | ONE2MANY
+CONTEXT_VECTORS_NAME = 'cui2context_vectors'
+CONTEXT_VECTORS_ROWS_NAME = 'cui2context_vectors_rows'
+COLUMNAR_PARTS_NAME = 'cdb_columnar_parts'
 
 
 class JsonSetSerializer:
@@ -87,6 +95,15 @@ class CDBSerializer:
     The rest of the information (i.e config and other less memory intensive parts) will
     still be saved using dill like they have been before.
 
+    Optionally, the context vectors (`cui2context_vectors`) can be saved separately as
+    one `.npy` matrix per context type (next to the main file). These will then be
+    memory mapped upon load.
+
+    Alternatively, the CDB can be saved in a binary, columnar format (see
+    `medcat.utils.saving.columnar`). In that case, the name and CUI maps are saved in
+    a `.npz` file and `addl_info` in a separate file (both next to the main file) and the
+    context vectors are saved as `.npy` matrices. The format is identified upon load.
+
     The objects of this class can be used for both serializing as well as deserializing.
     If the `json_path` parameter is passed, the JSON (de)serialization will be performed.
 
@@ -105,7 +122,66 @@ class CDBSerializer:
         else:
             self.jsons = None
 
-    def serialize(self, cdb, overwrite: bool = False) -> None:
+    def _get_context_vectors_path(self, context_type: str) -> str:
+        return os.path.splitext(self.main_path)[0] + f'_context_vectors_{context_type}.npy'
+
+    def _save_context_vectors(self, cui2context_vectors: Dict[str, Dict[str, np.ndarray]],
+                              overwrite: bool) -> Dict[str, object]:
+        cuis = list(cui2context_vectors.keys())
+        type2rows: Dict[str, List[int]] = {}
+        for row, cui in enumerate(cuis):
+            for context_type in cui2context_vectors[cui]:
+                type2rows.setdefault(context_type, []).append(row)
+        for context_type, rows in type2rows.items():
+            path = self._get_context_vectors_path(context_type)
+            if not overwrite and os.path.exists(path):
+                raise ValueError(
+                    f'Cannot overwrite file {path} - specify overwrite=True if you wish to overwrite')
+            matrix = np.stack([cui2context_vectors[cuis[row]][context_type] for row in rows])
+            logger.info('Saving context vectors of type "%s" into "%s"', context_type, path)
+            save_array(path, matrix)
+        return {'cuis': cuis, 'rows': type2rows}
+
+    def _load_context_vectors(self, cui2context_vectors_rows: Dict,
+                              mmap_mode: Optional[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        cuis = cui2context_vectors_rows['cuis']
+        cui2context_vectors: Dict[str, Dict[str, np.ndarray]] = {cui: {} for cui in cuis}
+        for context_type, rows in cui2context_vectors_rows['rows'].items():
+            matrix = load_array(self._get_context_vectors_path(context_type), mmap_mode=mmap_mode)
+            for row, cui_row in enumerate(rows):
+                # NOTE: these are views into the (memory mapped) matrix
+                cui2context_vectors[cuis[cui_row]][context_type] = matrix[row]
+        return cui2context_vectors
+
+    def _get_columns_path(self) -> str:
+        return os.path.splitext(self.main_path)[0] + '_columns.npz'
+
+    def _get_lazy_path(self, name: str) -> str:
+        return os.path.splitext(self.main_path)[0] + f'_{name}.dat'
+
+    def _save_columnar(self, cdb, overwrite: bool) -> List[str]:
+        paths = [self._get_columns_path()] + [self._get_lazy_path(name) for name in LAZY_NAMES]
+        for path in paths:
+            if not overwrite and os.path.exists(path):
+                raise ValueError(
+                    f'Cannot overwrite file {path} - specify overwrite=True if you wish to overwrite')
+        save_columns(self._get_columns_path(), cdb.__dict__)
+        for name in LAZY_NAMES:
+            save_lazy(self._get_lazy_path(name), cdb.__dict__[name])
+        return list(COLUMNAR_NAMES + LAZY_NAMES)
+
+    def _load_columnar(self, cdb, lazy: bool, compact: bool) -> None:
+        arrays = read_columns(self._get_columns_path())
+        if compact or COMPACT_PART in cdb._memory_optimised_parts:
+            # NOTE: the compact maps are built directly from the arrays
+            compact_cdb(cdb, arrays)
+        else:
+            cdb.__dict__.update(decode_columns(arrays))
+        for name in LAZY_NAMES:
+            cdb.__dict__[name] = load_lazy(self._get_lazy_path(name), lazy=lazy)
+
+    def serialize(self, cdb, overwrite: bool = False, mmap_vectors: bool = False,
+                  columnar: bool = False) -> None:
         """Used to dump CDB to a file or or multiple files.
 
         If `json_path` was specified to the constructor, this will serialize
@@ -118,10 +194,22 @@ class CDBSerializer:
         Args:
             cdb (CDB): The context database (CDB)
             overwrite (bool): Whether to allow overwriting existing files. Defaults to False.
+            mmap_vectors (bool): Whether to save the context vectors separately so that they
+                can be memory mapped upon load. Defaults to False.
+            columnar (bool): Whether to save the CDB in the binary, columnar format. This also
+                saves the context vectors separately. Defaults to False.
 
         Raises:
-            ValueError: If file(s) exist(s) and overwrite if `False`
+            ValueError: If file(s) exist(s) and overwrite if `False` or if both the JSON and the
+                columnar format are requested.
         """
+        if columnar and self.jsons is not None:
+            raise ValueError('Unable to save the CDB in both the JSON and the columnar format')
+        if columnar and not is_suitable(cdb.__dict__):
+            logger.warning('Unable to save a memory optimised CDB in the columnar format '
+                           '- saving it with dill instead')
+            columnar = False
+        mmap_vectors = mmap_vectors or columnar
         if not overwrite and os.path.exists(self.main_path):
             raise ValueError(
                 f'Cannot overwrite file "{self.main_path}" - specify overwrite=True if you wish to overwrite')
@@ -134,13 +222,29 @@ class CDBSerializer:
         if self.json_path and os.path.exists(self.json_path) and not overwrite:
             raise ValueError(f'Unable to overwrite shelf path "{self.json_path}"'
                              ' - specify overrwrite=True if you wish to overwrite')
-        to_save = {}
+        to_save: Dict[str, object] = {}
+        if mmap_vectors and not isinstance(cdb.cui2context_vectors, dict):
+            logger.warning('Unable to save the context vectors separately for a memory '
+                           'optimised CDB - saving them with the rest of the CDB')
+            mmap_vectors = False
+        if mmap_vectors:
+            to_save[CONTEXT_VECTORS_ROWS_NAME] = self._save_context_vectors(
+                cdb.cui2context_vectors, overwrite)
+        columnar_parts: List[str] = []
+        if columnar:
+            columnar_parts = self._save_columnar(cdb, overwrite)
+            to_save[COLUMNAR_PARTS_NAME] = columnar_parts
         # This uses different names so as to not be ambiguous
         # when looking at files whether the json parts should
         # exist separately or not
         to_save['cdb_main' if self.jsons is not None else 'cdb'] = dict(
-            ((key, val) for key, val in cdb.__dict__.items() if
+            # NOTE: any other compact maps would otherwise hold a copy of the (already saved) names
+            ((key, val.to_dict() if columnar and isinstance(val, CompactDict) else val)
+             for key, val in cdb.__dict__.items() if
              key not in ('config', '_config_from_file') and
+             key not in getattr(cdb, 'TRANSIENT_ATTRIBUTES', ()) and
+             (not mmap_vectors or key != CONTEXT_VECTORS_NAME) and
+             key not in columnar_parts and
              (self.jsons is None or key not in SPECIALITY_NAMES)))
         logger.info('Dumping CDB to %s', self.main_path)
         with open(self.main_path, 'wb') as f:
@@ -149,17 +253,30 @@ class CDBSerializer:
             for name in SPECIALITY_NAMES:
                 if name not in cdb.__dict__:
                     continue  # in case cui2many doesn't exit
-                self.jsons[name].write(cdb.__dict__[name])
+                self.jsons[name].write(materialise(cdb.__dict__[name]))
 
-    def deserialize(self, cdb_cls):
+    def deserialize(self, cdb_cls, mmap_mode: Optional[str] = 'r', lazy: bool = True,
+                    compact: bool = False):
         """Deserializes the json in the specified file info a CDB.
 
         If the `json_path` was specified to the constructor,
         the JSON serialized files are used.
         Otherwise, everything is loaded from the `main_path` file.
 
+        If the context vectors were saved separately, they are memory mapped.
+
+        If the CDB was saved in the columnar format, the name and CUI maps are
+        loaded from the columnar file.
+
         Args:
             cdb_cls: CDB class.
+            mmap_mode (Optional[str]): The memory map mode for the separately saved
+                context vectors (see `numpy.load`). Use None to read them into memory.
+                Defaults to `'r'`.
+            lazy (bool): Whether to only load the rarely used parts (i.e `addl_info`) of a CDB
+                saved in the columnar format once they are first accessed. Defaults to True.
+            compact (bool): Whether to use the compact name and CUI maps (see
+                `medcat.utils.compact_maps`). Defaults to False.
 
         Returns:
             CDB: The resulting CDB.
@@ -196,7 +313,14 @@ class CDBSerializer:
                 if not os.path.exists(self.jsons[name].file_name):
                     continue  # in case of non-memory-optimised where cui2many doesn't exist
                 cdb.__dict__[name] = self.jsons[name].read()
+        if COLUMNAR_PARTS_NAME in data:
+            self._load_columnar(cdb, lazy, compact)
+        if CONTEXT_VECTORS_ROWS_NAME in data:
+            cdb.cui2context_vectors = self._load_context_vectors(
+                data[CONTEXT_VECTORS_ROWS_NAME], mmap_mode)
         # if anything has
         # been registered to postprocess the CDBs
         default_postprocessing(cdb)
+        if compact and not is_compact(cdb):
+            compact_cdb(cdb)
         return cdb
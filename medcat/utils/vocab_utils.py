@@ -26,9 +26,7 @@ def calc_matrix(vocab: Vocab, target_size: int) -> np.ndarray:
     Returns:
         np.ndarray: The transformation matrix.
     """
-    all_vecs = np.vstack(
-        [value['vec'] for value in vocab.vocab.values() if value['vec'] is not None]
-    )
+    all_vecs = vocab.vectors[vocab.has_vec]
     logger.debug("Vocab vectors have a total shape of %s", np.shape(all_vecs))
     all_vecs_meaned = all_vecs - np.mean(all_vecs, axis=0)
     cov_matrix = np.cov(all_vecs_meaned, rowvar=False)
@@ -68,11 +66,8 @@ def convert_vocab(vocab: Vocab, matrix: np.ndarray,
         matrix (np.ndarray): The transformation matrix.
         unigram_table_size (int): The unigram table size. Defualts to 10 000 000.
     """
-    for d in vocab.vocab.values():
-        cvec = d['vec']
-        if cvec is None:
-            continue
-        d['vec'] = convert_vec(cvec, matrix)
+    # all the vectors at once - the ones for words without vectors stay all zeros
+    vocab.vectors = convert_vec(vocab.vectors.T, matrix).T
     logger.info("Recalc unigram table")
     vocab.make_unigram_table(unigram_table_size)
 
@@ -0,0 +1,236 @@
+"""A pool of (persistent) worker processes for annotating batches of documents.
+
+Each worker has its own input queue so that it is always known which
+batches each worker holds. If a worker dies unexpectedly (e.g it is killed
+by the OS because it ran out of memory), the batches it had started but
+not sent the results of are lost, while the batches it had not yet started
+are given to the other workers. So waiting for the results never hangs
+because of a dead worker.
+
+NOTE: A single input queue shared by all the workers is not used since a
+      worker that dies while waiting for (or reading) a batch would leave
+      the lock of the queue acquired, blocking all the other workers.
+"""
+import logging
+import queue
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from multiprocess import Process, Queue
+
+
+logger = logging.getLogger(__name__) # separate logger from the package-level one
+
+
+class WorkerPool:
+    """A pool of worker processes that annotate batches of documents.
+
+    The target of the workers is called as `target(in_q=..., out_q=..., pid=..., **target_kwargs)`.
+    It is expected to get `(batch_nr, batch)` tuples from its input queue (in order) and put
+    `(batch_nr, result)` tuples in the output queue. Upon getting None, it is expected to stop.
+    A worker is allowed to stop on its own (e.g if there's not enough memory left), the
+    batches it hasn't started are then given to the other workers.
+
+    Args:
+        target (Callable): The function the workers run.
+        nproc (int): The number of workers.
+        **target_kwargs (Any): The other keyword arguments for the target.
+    """
+
+    def __init__(self, target: Callable, nproc: int, **target_kwargs: Any) -> None:
+        self._target = target
+        self._target_kwargs = target_kwargs
+        self.procs: List[Optional[Process]] = [None] * nproc
+        self._in_qs: List[Optional[Queue]] = [None] * nproc
+        self._out_q: Queue = Queue()
+        # the batches given to each worker without a result yet (in the order they were given)
+        self._assigned: List[Dict[int, Any]] = [{} for _ in range(nproc)]
+        # the batches waiting for a worker
+        self._unassigned: Dict[int, Any] = {}
+        # the batches whose results have been received but not yet returned
+        self._ready: List[Tuple[int, Any]] = []
+        # the batches that were lost (because their workers died)
+        self._lost: List[int] = []
+
+    @property
+    def nr_in_flight(self) -> int:
+        """The number of batches that have been put in the pool but whose results haven't been returned.
+
+        Returns:
+            int: The number of batches in flight.
+        """
+        return (sum(len(assigned) for assigned in self._assigned) + len(self._unassigned) +
+                len(self._ready) + len(self._lost))
+
+    @property
+    def is_running(self) -> bool:
+        """Whether any of the workers is running.
+
+        Returns:
+            bool: Whether any of the workers is running.
+        """
+        return any(p is not None and p.is_alive() for p in self.procs)
+
+    def start(self) -> None:
+        """Start the workers that are not (or no longer) running."""
+        self._check_workers()
+        for worker_nr, p in enumerate(self.procs):
+            if p is not None:
+                continue
+            in_q: Queue = Queue()
+            p = Process(target=self._target,
+                        kwargs=dict(in_q=in_q, out_q=self._out_q, pid=worker_nr, **self._target_kwargs))
+            p.start()
+            self.procs[worker_nr] = p
+            self._in_qs[worker_nr] = in_q
+        self._assign_batches()
+
+    def put(self, batch_nr: int, batch: Any) -> None:
+        """Put a batch in the pool.
+
+        The batch is given to the (running) worker with the fewest batches.
+
+        Args:
+            batch_nr (int): The (unique) number of the batch.
+            batch (Any): The batch.
+        """
+        self._unassigned[batch_nr] = batch
+        self._assign_batches()
+
+    def get_result(self) -> Tuple[int, Optional[Any]]:
+        """Get the result of one of the batches in flight (in no particular order).
+
+        If the batch was lost, the result is None. If none of the workers is
+        running, all the remaining batches are lost.
+
+        Returns:
+            Tuple[int, Optional[Any]]: The number of the batch and its result.
+
+        Raises:
+            ValueError: If there are no batches in flight.
+        """
+        while True:
+            if self._ready:
+                return self._ready.pop(0)
+            if self._lost:
+                return self._lost.pop(0), None
+            if not self.nr_in_flight:
+                raise ValueError("There are no batches in flight")
+            if not self.is_running:
+                self._check_workers()
+                self._lose_unassigned()
+                continue
+            try:
+                self._receive(self._out_q.get(timeout=1))
+            except queue.Empty:
+                self._check_workers()
+                self._assign_batches()
+
+    def stop(self) -> None:
+        """Stop the workers.
+
+        The batches the workers haven't started are dropped.
+        """
+        running = [worker_nr for worker_nr, p in enumerate(self.procs) if p is not None and p.is_alive()]
+        for worker_nr in running:
+            in_q = self._in_qs[worker_nr]
+            if in_q is not None:
+                # Remove anything not yet processed so the workers stop as soon as possible
+                _clear_queue(in_q)
+                in_q.put(None)
+        # NOTE: A process that has put data in a queue will not finish before the
+        #       data has been consumed. Normally, all the results have already been
+        #       collected at this point, but not if we got here due to an exception.
+        while any(p is not None and p.is_alive() for p in self.procs):
+            try:
+                self._out_q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for worker_nr, p in enumerate(self.procs):
+            if p is not None:
+                p.join()
+            self._discard_queue(worker_nr)
+            self.procs[worker_nr] = None
+        self._out_q.close()
+
+    def _receive(self, result: Tuple[int, Any]) -> None:
+        batch_nr = result[0]
+        for assigned in self._assigned:
+            if batch_nr in assigned:
+                del assigned[batch_nr]
+                self._ready.append(result)
+                return
+        logger.debug("Ignoring the result of batch %s which was not in flight", batch_nr)
+
+    def _check_workers(self) -> None:
+        dead = [worker_nr for worker_nr, p in enumerate(self.procs) if p is not None and not p.is_alive()]
+        if not dead:
+            return
+        # the (last) results of the dead workers are in the queue already
+        while True:
+            try:
+                self._receive(self._out_q.get(timeout=0.1))
+            except queue.Empty:
+                break
+        for worker_nr in dead:
+            p = self.procs[worker_nr]
+            assert p is not None
+            p.join()
+            assigned = self._assigned[worker_nr]
+            self._assigned[worker_nr] = {}
+            # the batches still in the queue of the worker were not started and can be given to others
+            in_q = self._in_qs[worker_nr]
+            not_started = set(batch_nr for batch_nr, _ in _clear_queue(in_q)) if in_q is not None else set()
+            for batch_nr in list(assigned):
+                if batch_nr in not_started:
+                    self._unassigned[batch_nr] = assigned.pop(batch_nr)
+            if assigned:
+                # NOTE: this is also the case if a result was not sent before the worker died
+                logger.warning("Worker %d died unexpectedly (exit code %s), %d documents were not annotated",
+                               worker_nr, p.exitcode, sum(_len(batch) for batch in assigned.values()))
+                self._lost.extend(assigned)
+            self._discard_queue(worker_nr)
+            self.procs[worker_nr] = None
+
+    def _assign_batches(self) -> None:
+        running = [worker_nr for worker_nr, p in enumerate(self.procs) if p is not None and p.is_alive()]
+        if not running:
+            return
+        for batch_nr in sorted(self._unassigned):
+            worker_nr = min(running, key=lambda worker_nr: len(self._assigned[worker_nr]))
+            batch = self._unassigned.pop(batch_nr)
+            self._assigned[worker_nr][batch_nr] = batch
+            in_q = self._in_qs[worker_nr]
+            assert in_q is not None
+            in_q.put((batch_nr, batch))
+
+    def _lose_unassigned(self) -> None:
+        if self._unassigned:
+            logger.warning("None of the workers is running, %d documents were not annotated",
+                           sum(_len(batch) for batch in self._unassigned.values()))
+        self._lost.extend(sorted(self._unassigned))
+        self._unassigned.clear()
+
+    def _discard_queue(self, worker_nr: int) -> None:
+        in_q = self._in_qs[worker_nr]
+        if in_q is None:
+            return
+        # NOTE: there may be data no one will read, so don't wait for it to be flushed
+        in_q.cancel_join_thread()
+        in_q.close()
+        self._in_qs[worker_nr] = None
+
+
+def _len(batch: Any) -> int:
+    return len(batch) if hasattr(batch, '__len__') else 1
+
+
+def _clear_queue(in_q: Queue) -> List[Any]:
+    items = []
+    while True:
+        try:
+            item = in_q.get(timeout=0.1)
+        except queue.Empty:
+            break
+        if item is not None:
+            items.append(item)
+    return items
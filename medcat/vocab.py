@@ -1,32 +1,208 @@
+import os
 import numpy as np
 import pickle
-from typing import Optional, List, Dict, cast
+from typing import Optional, List, Dict, Tuple, Any, Iterator, cast
+from collections.abc import Mapping, MutableMapping
 import logging
 
+from medcat.utils.saving.arrays import save_array, load_array
+
 
 logger = logging.getLogger(__name__)
 
 
+class _WordInfo(MutableMapping):
+    """The information of a word in the Vocab.
+
+    This is a view of the data within the Vocab which allows the
+    information to be accessed (and changed) as if it were a dict,
+    e.g `{'vec': <np.array>, 'cnt': <int>, 'ind': <int>}`.
+
+    Args:
+        vocab (Vocab): The vocab.
+        word (str): The word.
+    """
+    KEYS = ('vec', 'cnt', 'ind')
+
+    def __init__(self, vocab: 'Vocab', word: str) -> None:
+        self._vocab = vocab
+        self._word = word
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'vec':
+            return self._vocab.vec(self._word)
+        elif key == 'cnt':
+            return self._vocab.count(self._word)
+        elif key == 'ind':
+            return self._vocab.word2index[self._word]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        ind = self._vocab.word2index[self._word]
+        if key == 'vec':
+            self._vocab._set_vec(ind, value)
+        elif key == 'cnt':
+            self._vocab._counts[ind] = value
+        else:
+            raise KeyError(f"Unable to set '{key}' for a word in the vocab")
+
+    def __delitem__(self, key: str) -> None:
+        raise KeyError(f"Unable to remove '{key}' for a word in the vocab")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class _WordInfos(Mapping):
+    """The map from word to its information (see `_WordInfo`).
+
+    Args:
+        vocab (Vocab): The vocab.
+    """
+
+    def __init__(self, vocab: 'Vocab') -> None:
+        self._vocab = vocab
+
+    def __getitem__(self, word: str) -> _WordInfo:
+        if word not in self._vocab.word2index:
+            raise KeyError(word)
+        return _WordInfo(self._vocab, word)
+
+    def __contains__(self, word: object) -> bool:
+        return word in self._vocab.word2index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._vocab.word2index)
+
+    def __len__(self) -> int:
+        return len(self._vocab.word2index)
+
+
 class Vocab(object):
     """Vocabulary used to store word embeddings for context similarity
     calculation. Also used by the spell checker - but not for fixing the spelling
     only for checking is something correct.
 
+    The word vectors are kept in a single contiguous (`float32`) matrix and the
+    counts in a parallel array. The row in both is the index of the word.
+
     Properties:
-        vocab (dict):
+        vocab (Mapping):
             Map from word to attributes, e.g. {'house': {'vec': <np.array>, 'cnt': <int>, ...}, ...}
+        word2index (dict):
+            From word to its index (i.e the row in the vectors / counts)
         index2word (dict):
-            From word to an index - used for negative sampling
+            From index to a word - used for negative sampling
         vec_index2word (dict):
             Same as index2word but only words that have vectors
         unigram_table (dict):
             Negative sampling.
     """
+    _MIN_CAPACITY = 16
+
     def __init__(self) -> None:
-        self.vocab: Dict = {}
+        self.word2index: Dict[str, int] = {}
         self.index2word: Dict = {}
         self.vec_index2word: Dict = {}
         self.cum_probs = np.array([])
+        # NOTE: the arrays below may have more rows than there are words
+        #       so that adding words one by one doesn't copy them every time
+        self._vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self._counts: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._has_vec: np.ndarray = np.zeros(0, dtype=bool)
+
+    @property
+    def vocab(self) -> Mapping[str, MutableMapping]:
+        """The map from word to its information.
+
+        Returns:
+            Mapping[str, MutableMapping]: The map, e.g {'house': {'vec': <np.array>, 'cnt': <int>, ...}, ...}
+        """
+        return _WordInfos(self)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The word vector matrix.
+
+        The rows for words without a vector are all zeros.
+
+        Returns:
+            np.ndarray: The vectors (one row per word index).
+        """
+        return self._vectors[:len(self.index2word)]
+
+    @vectors.setter
+    def vectors(self, vectors: np.ndarray) -> None:
+        if vectors.ndim != 2 or vectors.shape[0] != len(self.index2word):
+            raise ValueError(f"Expected {len(self.index2word)} rows of vectors, got shape {vectors.shape}")
+        self._vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._counts = self._counts[:len(self.index2word)]
+        self._has_vec = self._has_vec[:len(self.index2word)]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """The word counts.
+
+        Returns:
+            np.ndarray: The counts (one per word index).
+        """
+        return self._counts[:len(self.index2word)]
+
+    @property
+    def has_vec(self) -> np.ndarray:
+        """The word indices that have a vector.
+
+        Returns:
+            np.ndarray: The (boolean) mask of the word indices with a vector.
+        """
+        return self._has_vec[:len(self.index2word)]
+
+    def _ensure_capacity(self, num_rows: int) -> None:
+        capacity = self._counts.shape[0]
+        if num_rows <= capacity:
+            return
+        new_capacity = max(num_rows, 2 * capacity, self._MIN_CAPACITY)
+        counts = np.zeros(new_capacity, dtype=np.int64)
+        counts[:capacity] = self._counts
+        self._counts = counts
+        has_vec = np.zeros(new_capacity, dtype=bool)
+        has_vec[:capacity] = self._has_vec
+        self._has_vec = has_vec
+        vectors = np.zeros((new_capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:capacity] = self._vectors
+        self._vectors = vectors
+
+    def _ensure_writeable(self) -> None:
+        # the vectors are read only if they've been memory mapped
+        if not self._vectors.flags.writeable:
+            self._vectors = np.array(self._vectors)
+
+    def _set_vec(self, ind: int, vec: Optional[np.ndarray]) -> None:
+        self._ensure_writeable()
+        if vec is None:
+            self._has_vec[ind] = False
+            self._vectors[ind] = 0
+            self.vec_index2word.pop(ind, None)
+            return
+        vec = np.asarray(vec, dtype=np.float32)
+        if vec.ndim != 1:
+            raise ValueError(f"Expected a 1D vector, got shape {vec.shape}")
+        if vec.shape[0] != self._vectors.shape[1]:
+            if self._has_vec.any():
+                raise ValueError(f"Expected a vector of length {self._vectors.shape[1]}, "
+                                 f"got {vec.shape[0]}")
+            # no vectors yet (or they've all been removed) so we can change the size
+            self._vectors = np.zeros((self._counts.shape[0], vec.shape[0]), dtype=np.float32)
+        self._vectors[ind] = vec
+        self._has_vec[ind] = True
+        if ind not in self.vec_index2word:
+            self.vec_index2word[ind] = self.index2word[ind]
 
     def inc_or_add(self, word: str, cnt: int = 1, vec: Optional[np.ndarray] = None) -> None:
         """Add a word or increase its count.
@@ -40,7 +216,7 @@ class Vocab(object):
             vec(Optional[np.ndarray]):
                 Word vector (Default value = None)
         """
-        if word not in self.vocab:
+        if word not in self.word2index:
             self.add_word(word, cnt, vec)
         else:
             self.inc_wc(word, cnt)
@@ -48,9 +224,8 @@ class Vocab(object):
     def remove_all_vectors(self) -> None:
         """Remove all stored vector representations."""
         self.vec_index2word = {}
-
-        for word in self.vocab:
-            self.vocab[word]['vec'] = None
+        self._has_vec[:] = False
+        self._vectors = np.zeros_like(self._vectors)
 
     def remove_words_below_cnt(self, cnt: int) -> None:
         """Remove all words with frequency below cnt.
@@ -59,19 +234,21 @@ class Vocab(object):
             cnt(int):
                 Word count limit.
         """
-        for word in list(self.vocab.keys()):
-            if self.vocab[word]['cnt'] < cnt:
-                del self.vocab[word]
-
-        # Rebuild index2word and vec_index2word
+        keep = [ind for ind in self.index2word if self._counts[ind] >= cnt]
+        self._counts = self._counts[keep]
+        self._has_vec = self._has_vec[keep]
+        self._vectors = self._vectors[keep]
+
+        # Rebuild word2index, index2word and vec_index2word
+        words = [self.index2word[ind] for ind in keep]
+        self.word2index = {}
         self.index2word = {}
         self.vec_index2word = {}
-        for word in self.vocab.keys():
-            ind = len(self.index2word)
+        for ind, word in enumerate(words):
             self.index2word[ind] = word
-            self.vocab[word]['ind'] = ind
+            self.word2index[word] = ind
 
-            if self.vocab[word]['vec'] is not None:
+            if self._has_vec[ind]:
                 self.vec_index2word[ind] = word
 
     def inc_wc(self, word: str, cnt: int = 1) -> None:
@@ -83,7 +260,7 @@ class Vocab(object):
             cnt(int):
                 By how muhc to increase the count (Default value = 1)
         """
-        self.item(word)['cnt'] += cnt
+        self._counts[self.word2index[word]] += cnt
 
     def add_vec(self, word: str, vec: np.ndarray) -> None:
         """Add vector to a word.
@@ -94,11 +271,7 @@ class Vocab(object):
             vec(np.ndarray):
                 The vector to add.
         """
-        self.vocab[word]['vec'] = vec
-
-        ind = self.vocab[word]['ind']
-        if ind not in self.vec_index2word:
-            self.vec_index2word[ind] = word
+        self._set_vec(self.word2index[word], vec)
 
     def reset_counts(self, cnt: int = 1) -> None:
         """Reset the count for all word to cnt.
@@ -107,8 +280,7 @@ class Vocab(object):
             cnt(int):
                 New count for all words in the vocab. (Default value = 1)
         """
-        for word in self.vocab.keys():
-            self.vocab[word]['cnt'] = cnt
+        self._counts[:] = cnt
 
     def update_counts(self, tokens: List[str]) -> None:
         """Given a list of tokens update counts for words in the vocab.
@@ -134,22 +306,19 @@ class Vocab(object):
             replace(bool):
                 Will replace old vector representation (Default value = True)
         """
-        if word not in self.vocab:
+        if word not in self.word2index:
             ind = len(self.index2word)
+            self._ensure_capacity(ind + 1)
             self.index2word[ind] = word
-            item = {'vec': vec, 'cnt': cnt, 'ind': ind}
-            self.vocab[word] = item
+            self.word2index[word] = ind
+            self._counts[ind] = cnt
 
             if vec is not None:
-                self.vec_index2word[ind] = word
+                self._set_vec(ind, vec)
         elif replace and vec is not None:
-            self.vocab[word]['vec'] = vec
-            self.vocab[word]['cnt'] = cnt
-
-            # If this word didn't have a vector before
-            ind = self.vocab[word]['ind']
-            if ind not in self.vec_index2word:
-                self.vec_index2word[ind] = word
+            ind = self.word2index[word]
+            self._set_vec(ind, vec)
+            self._counts[ind] = cnt
 
     def add_words(self, path: str, replace: bool = True) -> None:
         """Adds words to the vocab from a file, the file
@@ -189,7 +358,6 @@ class Vocab(object):
                            "there is now a simpler approach that doesn't require "
                            "the creation of a massive array. So therefore, there "
                            "is no need to pass the `table_size` parameter anymore.")
-        freqs = []
         # index list maps the slot in which a word index
         # sits in vec_index2word to the actual index for said word
         # e.g:
@@ -199,13 +367,10 @@ class Vocab(object):
         #    and while 0 will be in the 0th position (as expected)
         #    in the final probability list, 2 will be in 1st position
         #    so we need to mark that conversion down
-        index_list = []
-        for word_index, word in self.vec_index2word.items():
-            freqs.append(self[word])
-            index_list.append(word_index)
+        index_list = list(self.vec_index2word.keys())
 
         # Power and normalize frequencies
-        freqs = np.array(freqs) ** (3/4)
+        freqs = self._counts[index_list] ** (3/4)
         freqs /= freqs.sum()
 
         # Calculate cumulative probabilities
@@ -245,29 +410,109 @@ class Vocab(object):
         return self.count(word)
 
     def vec(self, word: str) -> np.ndarray:
-        return self.vocab[word]['vec']
+        ind = self.word2index[word]
+        return self._vectors[ind] if self._has_vec[ind] else None
 
     def count(self, word: str) -> int:
-        return self.vocab[word]['cnt']
+        return int(self._counts[self.word2index[word]])
 
-    def item(self, word: str) -> Dict:
+    def item(self, word: str) -> MutableMapping:
         return self.vocab[word]
 
     def __contains__(self, word: str) -> bool:
-        if word in self.vocab:
+        if word in self.word2index:
             return True
 
         return False
 
-    def save(self, path: str) -> None:
+    def get_vectors(self, words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the vectors for a list of words at once.
+
+        Args:
+            words (List[str]): The words.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+                The vectors (zeros for words that are not in the vocab or have no
+                vector) and the mask of the words that do have a vector.
+        """
+        inds = np.fromiter((self.word2index.get(word, -1) for word in words),
+                           dtype=np.int64, count=len(words))
+        mask = inds >= 0
+        mask[mask] = self._has_vec[inds[mask]]
+        vecs = self._vectors[np.where(mask, inds, 0)]
+        vecs[~mask] = 0
+        return vecs, mask
+
+    def _get_state(self) -> Dict:
+        state = dict(self.__dict__)
+        # do not save the unused rows
+        num_rows = len(self.index2word)
+        state['_vectors'] = self._vectors[:num_rows]
+        state['_counts'] = self._counts[:num_rows]
+        state['_has_vec'] = self._has_vec[:num_rows]
+        return state
+
+    def _init_from_legacy(self, word_infos: Dict[str, Dict]) -> None:
+        # the older format which had a dict for each word, i.e
+        # {'house': {'vec': <np.array>, 'cnt': <int>, 'ind': <int>}, ...}
+        num_rows = max([len(self.index2word)] + [info['ind'] + 1 for info in word_infos.values()])
+        dims = [len(info['vec']) for info in word_infos.values() if info['vec'] is not None]
+        self.word2index = {}
+        self._vectors = np.zeros((num_rows, dims[0] if dims else 0), dtype=np.float32)
+        self._counts = np.zeros(num_rows, dtype=np.int64)
+        self._has_vec = np.zeros(num_rows, dtype=bool)
+        for word, info in word_infos.items():
+            ind = info['ind']
+            self.word2index[word] = ind
+            self._counts[ind] = info['cnt']
+            if info['vec'] is not None:
+                self._vectors[ind] = info['vec']
+                self._has_vec[ind] = True
+
+    @staticmethod
+    def _get_vectors_path(path: str) -> str:
+        return os.path.splitext(path)[0] + '_vectors.npy'
+
+    def save(self, path: str, mmap_vectors: bool = False) -> None:
+        """Save the vocab.
+
+        Args:
+            path (str):
+                The path to save the vocab at.
+            mmap_vectors (bool):
+                Whether to save the vectors separately (in a `.npy` file next to the vocab)
+                so that they can be memory mapped upon load. Defaults to False.
+        """
+        state = self._get_state()
+        if mmap_vectors:
+            save_array(self._get_vectors_path(path), state['_vectors'])
+            state['_vectors'] = None
         with open(path, 'wb') as f:
-            pickle.dump(self.__dict__, f)
+            pickle.dump(state, f)
 
     @classmethod
-    def load(cls, path: str) -> "Vocab":
+    def load(cls, path: str, mmap_mode: Optional[str] = 'r') -> "Vocab":
+        """Load a vocab.
+
+        Args:
+            path (str):
+                The path to the saved vocab.
+            mmap_mode (Optional[str]):
+                The memory map mode for the vectors if they were saved separately
+                (see `numpy.load`). Use None to read them into memory. Defaults to `'r'`.
+
+        Returns:
+            Vocab: The loaded vocab.
+        """
         with open(path, 'rb') as f:
             vocab = cls()
             vocab.__dict__ = pickle.load(f)
+        if 'vocab' in vocab.__dict__:
+            vocab._init_from_legacy(vocab.__dict__.pop('vocab'))
+        elif vocab._vectors is None:
+            # vectors were saved separately
+            vocab._vectors = load_array(cls._get_vectors_path(path), mmap_mode=mmap_mode)
         if not hasattr(vocab, 'cum_probs'):
             # NOTE: this is not too expensive, only around 0.05s
             vocab.make_unigram_table()
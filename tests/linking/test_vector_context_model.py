@@ -0,0 +1,157 @@
+import random
+import unittest
+
+import numpy as np
+import spacy
+from spacy.tokens import Token
+
+from medcat.cdb import CDB
+from medcat.config import Config
+from medcat.linking.vector_context_model import ContextModel
+from medcat.utils.matutils import unitvec
+from medcat.vocab import Vocab
+
+
+def old_get_context_vectors(cm: ContextModel, entity, doc, cui=None):
+    # the (simpler, but slower) per context type implementation
+    vectors = {}
+    for context_type, size in cm.config.linking['context_vector_sizes'].items():
+        tokens_left, tokens_center, tokens_right = cm.get_context_tokens(entity, doc, size)
+        values = []
+        values.extend([cm.cdb.weighted_average_function(step) * cm.vocab.vec(tkn.lower_)
+                       for step, tkn in enumerate(tokens_left)
+                       if tkn.lower_ in cm.vocab and cm.vocab.vec(tkn.lower_) is not None])
+        if not cm.config.linking['context_ignore_center_tokens']:
+            if (cui is not None and random.random() > cm.config.linking['random_replacement_unsupervised']
+                    and cm.cdb.cui2names.get(cui, [])):
+                new_tokens_center = random.choice(list(cm.cdb.cui2names[cui])).split(cm.config.general['separator'])
+                values.extend([cm.vocab.vec(tkn) for tkn in new_tokens_center
+                               if tkn in cm.vocab and cm.vocab.vec(tkn) is not None])
+            else:
+                values.extend([cm.vocab.vec(tkn.lower_) for tkn in tokens_center
+                               if tkn.lower_ in cm.vocab and cm.vocab.vec(tkn.lower_) is not None])
+        values.extend([cm.cdb.weighted_average_function(step) * cm.vocab.vec(tkn.lower_)
+                       for step, tkn in enumerate(tokens_right)
+                       if tkn.lower_ in cm.vocab and cm.vocab.vec(tkn.lower_) is not None])
+        if len(values) > 0:
+            vectors[context_type] = np.average(values, axis=0)
+    return vectors
+
+
+def old_similarity(cm: ContextModel, cui, vectors):
+    # the (simpler, but slower) per CUI implementation
+    cui_vectors = cm.cdb.cui2context_vectors.get(cui, {})
+    if cui_vectors and cm.cdb.cui2count_train[cui] >= cm.config.linking['train_count_threshold']:
+        similarity = 0
+        for context_type, weight in cm.config.linking['context_vector_weights'].items():
+            if context_type in vectors and context_type in cui_vectors:
+                similarity += weight * np.dot(unitvec(vectors[context_type]), unitvec(cui_vectors[context_type]))
+        return similarity
+    return -1
+
+
+class SimilaritiesTests(unittest.TestCase):
+    CUIS = ['C1', 'C2', 'C3', 'C4', 'C5']
+
+    def setUp(self) -> None:
+        self.config = Config()
+        self.config.linking['train_count_threshold'] = 2
+        self.cdb = CDB(config=self.config)
+        self.cm = ContextModel(self.cdb, Vocab(), self.config)
+        self.rng = np.random.default_rng(5)
+        # C1 and C2 trained, C3 only once (under threshold), C4 only has one context type
+        for cui, times in [('C1', 3), ('C2', 2), ('C3', 1)]:
+            for _ in range(times):
+                self.cdb.update_context_vector(cui, self.get_vectors())
+        for _ in range(2):
+            self.cdb.update_context_vector('C4', {'long': self.rng.random(10)})
+        self.vectors = self.get_vectors()
+
+    def get_vectors(self) -> dict:
+        return {context_type: self.rng.random(10) for context_type in
+                self.config.linking['context_vector_weights']}
+
+    def assert_same(self):
+        got = self.cm._similarities(self.CUIS, self.vectors)
+        expected = [old_similarity(self.cm, cui, self.vectors) for cui in self.CUIS]
+        np.testing.assert_allclose(got, expected)
+
+    def test_same_as_per_cui(self):
+        self.assert_same()
+
+    def test_same_after_update(self):
+        self.assert_same()
+        self.cdb.update_context_vector('C2', self.get_vectors(), negative=True)
+        self.cdb.update_context_vector('C5', self.get_vectors())
+        self.cdb.update_context_vector('C5', self.get_vectors())
+        self.assert_same()
+
+    def test_single_similarity(self):
+        for cui in self.CUIS:
+            with self.subTest(cui):
+                self.assertAlmostEqual(self.cm._similarity(cui, self.vectors),
+                                       old_similarity(self.cm, cui, self.vectors))
+
+
+class ContextVectorsTests(unittest.TestCase):
+    TEXT = ("the patient was admitted with severe chest pain and shortness of breath after "
+            "a long walk , history of kidney failure and type two diabetes , no known allergies")
+    NO_VECTOR = {'with', 'walk'}
+    NOT_IN_VOCAB = {'pain', 'history'}
+    SKIP = {'the', 'a', 'of', 'and', 'no', ','}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Token.set_extension('to_skip', default=False, force=True)
+        Token.set_extension('is_punct', default=False, force=True)
+        cls.vocab = Vocab()
+        rng = np.random.default_rng(42)
+        for word in set(cls.TEXT.split(' ')) - cls.NOT_IN_VOCAB:
+            vec = None if word in cls.NO_VECTOR else rng.random(10)
+            cls.vocab.add_word(word, cnt=10, vec=vec)
+        cls.nlp = spacy.blank('en')
+
+    def setUp(self) -> None:
+        self.config = Config()
+        self.config.linking['context_vector_sizes'] = {'xlong': 27, 'long': 12, 'medium': 6, 'short': 2}
+        self.cdb = CDB(config=self.config)
+        self.cdb.add_names('C1', {'kidney~failure': {'tokens': ['kidney', 'failure'],
+                                                     'snames': {'kidney', 'kidney~failure'},
+                                                     'raw_name': 'kidney failure', 'is_upper': False}})
+        self.cm = ContextModel(self.cdb, self.vocab, self.config)
+        self.doc = self.nlp(self.TEXT)
+        for tkn in self.doc:
+            tkn._.to_skip = tkn.lower_ in self.SKIP
+
+    def assert_same(self, got: dict, expected: dict):
+        self.assertEqual(set(got), set(expected))
+        for context_type in expected:
+            with self.subTest(context_type):
+                np.testing.assert_allclose(got[context_type], expected[context_type], rtol=1e-5)
+
+    def test_same_as_per_context_type(self):
+        for start, end in [(6, 8), (0, 1), (17, 19), (27, 29)]:
+            with self.subTest(f"{start}-{end}"):
+                entity = self.doc[start:end]
+                self.assert_same(self.cm.get_context_vectors(entity, self.doc),
+                                 old_get_context_vectors(self.cm, entity, self.doc))
+
+    def test_same_with_center_replacement(self):
+        self.config.linking['random_replacement_unsupervised'] = -1
+        entity = self.doc[17:19]
+        random.seed(1)
+        got = self.cm.get_context_vectors(entity, self.doc, cui='C1')
+        random.seed(1)
+        self.assert_same(got, old_get_context_vectors(self.cm, entity, self.doc, cui='C1'))
+
+    def test_same_ignoring_center(self):
+        self.config.linking['context_ignore_center_tokens'] = True
+        entity = self.doc[6:8]
+        self.assert_same(self.cm.get_context_vectors(entity, self.doc),
+                         old_get_context_vectors(self.cm, entity, self.doc))
+
+    def test_no_vectors(self):
+        self.config.linking['context_ignore_center_tokens'] = True
+        self.config.linking['context_vector_sizes'] = {'tiny': 0}
+        entity = self.doc[7:8]  # 'pain' is not in the vocab
+        self.assertEqual(self.cm.get_context_vectors(entity, self.doc), {})
@@ -65,3 +65,28 @@ class TransformerNERTest(unittest.TestCase):
         assert len(self.undertest.tokenizer.label_map) == original_label_map_size + len(cui2preferred_name)
         assert self.undertest.tokenizer.cui2name.get("concept_1") == "Preferred Name 1"
         assert self.undertest.tokenizer.cui2name.get("concept_2") == "Preferred Name 2"
+
+
+class TokenRangeTest(unittest.TestCase):
+    TEXT = "\nPatient Name: John Smith\nAddress: 15 Maple Avenue\nCity: New York"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.doc = English().make_doc(cls.TEXT)
+        cls.token_ends = [word.idx + len(word.text) for word in cls.doc]
+
+    def get_expected(self, start: int, end: int) -> list:
+        return [word.i for word in self.doc if start < word.idx + len(word.text) <= end]
+
+    def test_finds_tokens(self):
+        start = self.TEXT.index("John")
+        end = start + len("John Smith")
+        first, after_last = TransformersNER._get_token_range(self.token_ends, start, end)
+        self.assertEqual("John Smith", self.doc[first:after_last].text)
+
+    def test_same_as_scan(self):
+        for start in range(len(self.TEXT)):
+            for end in range(start, len(self.TEXT) + 1):
+                with self.subTest(f"{start}-{end}"):
+                    first, after_last = TransformersNER._get_token_range(self.token_ends, start, end)
+                    self.assertEqual(self.get_expected(start, end), list(range(first, after_last)))
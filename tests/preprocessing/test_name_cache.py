@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from medcat.cdb_maker import CDBMaker
+from medcat.config import Config
+from medcat.preprocessing.cleaners import prepare_name
+from medcat.preprocessing.name_cache import NameCache
+
+
+def get_names(raw_name: str) -> dict:
+    return {raw_name.lower(): {'tokens': [raw_name.lower()], 'snames': {raw_name.lower()},
+                               'raw_name': raw_name, 'is_upper': raw_name.isupper()}}
+
+
+class NameCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = Config()
+        self.cache = NameCache(max_size=2)
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get('Virus', self.config))
+        self.assertEqual(1, self.cache.misses)
+
+    def test_hit(self):
+        self.cache.add('Virus', self.config, get_names('Virus'))
+        self.assertEqual({'virus': (('virus',), frozenset({'virus'}), False)}, self.cache.get('Virus', self.config))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_hit_rate(self):
+        self.cache.add('Virus', self.config, get_names('Virus'))
+        self.cache.get('Virus', self.config)
+        self.cache.get('Other', self.config)
+        self.assertEqual(0.5, self.cache.hit_rate)
+        self.assertEqual({'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+                         self.cache.get_stats())
+
+    def test_bounded(self):
+        for raw_name in ['A', 'B', 'C']:
+            self.cache.add(raw_name, self.config, get_names(raw_name))
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get('A', self.config))
+
+    def test_keeps_recently_used(self):
+        self.cache.add('A', self.config, get_names('A'))
+        self.cache.add('B', self.config, get_names('B'))
+        self.cache.get('A', self.config)
+        self.cache.add('C', self.config, get_names('C'))
+        self.assertIsNotNone(self.cache.get('A', self.config))
+        self.assertIsNone(self.cache.get('B', self.config))
+
+    def test_disabled(self):
+        cache = NameCache(max_size=0)
+        cache.add('A', self.config, get_names('A'))
+        self.assertEqual(0, len(cache))
+
+    def test_config_in_key(self):
+        self.cache.add('Virus', self.config, get_names('Virus'))
+        self.config.cdb_maker['name_versions'] = ['LOWER']
+        self.assertIsNone(self.cache.get('Virus', self.config))
+
+    def test_preprocessing_config_in_key(self):
+        self.cache.add('Virus', self.config, get_names('Virus'))
+        self.config.preprocessing['min_len_normalize'] = 3
+        self.assertIsNone(self.cache.get('Virus', self.config))
+
+    def test_precalculated_config_key(self):
+        config_key = NameCache.get_config_key(self.config)
+        self.cache.add('Virus', self.config, get_names('Virus'), config_key)
+        self.assertIsNotNone(self.cache.get('Virus', self.config))
+        self.assertEqual(self.cache.get('Virus', self.config), self.cache.get('Virus', self.config, config_key))
+
+    def test_save_load(self):
+        self.cache.add('A', self.config, get_names('A'))
+        self.cache.add('B', self.config, get_names('B'))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'name_cache.dat')
+            self.cache.save(path)
+            loaded = NameCache.load(path, max_size=1)
+        self.assertEqual(1, len(loaded))
+        self.assertEqual(self.cache.get('B', self.config), loaded.get('B', self.config))
+
+
+class PrepareNameWithCacheTests(unittest.TestCase):
+    raw_names = ['Virus', 'chronic kidney diseases', 'HTN', 'Virus', 'chronic kidney diseases']
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.config = Config()
+        cls.config.general["spacy_model"] = "en_core_web_md"
+        cls.maker = CDBMaker(cls.config)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.maker.destroy_pipe()
+
+    def setUp(self) -> None:
+        self.cache = NameCache()
+
+    def test_same_as_without_cache(self):
+        for raw_name in self.raw_names:
+            with self.subTest(raw_name):
+                self.assertEqual(prepare_name(raw_name, self.maker.pipe.spacy_nlp, {}, self.config),
+                                 prepare_name(raw_name, self.maker.pipe.spacy_nlp, {}, self.config, self.cache))
+
+    def test_keeps_existing_names(self):
+        names = prepare_name('viruses', self.maker.pipe.spacy_nlp, {}, self.config, self.cache)
+        exp_names = prepare_name('virus', self.maker.pipe.spacy_nlp, dict(names), self.config)
+        self.assertEqual(exp_names, prepare_name('virus', self.maker.pipe.spacy_nlp, dict(names), self.config, self.cache))
+
+    def test_counts_hits(self):
+        for raw_name in self.raw_names:
+            prepare_name(raw_name, self.maker.pipe.spacy_nlp, {}, self.config, self.cache)
+        self.assertEqual(2, self.cache.hits)
+        self.assertEqual(3, self.cache.misses)
+
+    def test_config_key_calculated_once(self):
+        with mock.patch.object(NameCache, 'get_config_key', wraps=NameCache.get_config_key) as get_config_key:
+            prepare_name('Virus', self.maker.pipe.spacy_nlp, {}, self.config, self.cache)
+            self.assertEqual(1, get_config_key.call_count)
+
+    def test_config_key_passed_in(self):
+        config_key = NameCache.get_config_key(self.config)
+        with mock.patch.object(NameCache, 'get_config_key', wraps=NameCache.get_config_key) as get_config_key:
+            for raw_name in self.raw_names:
+                prepare_name(raw_name, self.maker.pipe.spacy_nlp, {}, self.config, self.cache, config_key)
+            get_config_key.assert_not_called()
+        self.assertEqual(2, self.cache.hits)
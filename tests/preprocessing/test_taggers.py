@@ -0,0 +1,45 @@
+import unittest
+
+import spacy
+from spacy.tokens import Token
+
+from medcat.config import Config
+from medcat.preprocessing.taggers import tag_skip_and_punct
+
+
+class TaggerTests(unittest.TestCase):
+    TEXT = "The patient (nos) has a fever: nos , fever... the END"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Token.set_extension('to_skip', default=False, force=True)
+        Token.set_extension('is_punct', default=False, force=True)
+        cls.nlp = spacy.blank("en")
+
+    def setUp(self) -> None:
+        self.config = Config()
+        self.tagger = tag_skip_and_punct(self.nlp, "tagger", self.config)
+
+    def get_tags(self) -> list:
+        doc = self.tagger(self.nlp.make_doc(self.TEXT))
+        return [(token.text, token._.is_punct, token._.to_skip) for token in doc]
+
+    def test_tags(self):
+        self.assertEqual(self.get_tags(), [
+            ('The', False, False), ('patient', False, False), ('(', True, True), ('nos', False, True),
+            (')', True, True), ('has', False, False), ('a', False, False), ('fever', False, False),
+            (':', False, False), ('nos', False, True), (',', True, True), ('fever', False, False),
+            ('...', True, True), ('the', False, False), ('END', False, False)])
+
+    def test_same_tags_when_memoised(self):
+        tags = self.get_tags()
+        self.assertEqual(self.get_tags(), tags)
+
+    def test_config_change_applies(self):
+        self.get_tags()
+        self.config.preprocessing.skip_stopwords = True
+        self.config.preprocessing.keep_punct.add(',')
+        tags = self.get_tags()
+        self.assertIn(('The', False, True), tags)
+        self.assertIn(('the', False, True), tags)
+        self.assertIn((',', False, False), tags)
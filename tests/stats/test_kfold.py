@@ -224,6 +224,27 @@ class KFoldWeightedDocsMetricsTests(KFoldMetricsTests):
     SPLIT_TYPE = kfold.SplitType.DOCUMENTS_WEIGHTED
 
 
+class KFoldParallelMetricsTests(KFoldCATTests):
+    K = 3
+
+    def test_per_fold_metrics_same_as_sequential(self):
+        folds = kfold.get_fold_creator(self.mct_export, self.K, kfold.SplitType.DOCUMENTS).create_folds()
+        sequential = kfold.get_per_fold_metrics(self.cat, folds)
+        parallel = kfold.get_per_fold_metrics(self.cat, folds, nproc=2)
+        self.assertEqual(len(parallel), self.K)
+        for fold_nr, (seq_stats, par_stats) in enumerate(zip(sequential, parallel)):
+            for name, stats1, stats2 in zip(self._names, seq_stats, par_stats):
+                with self.subTest(f"{fold_nr}-{name}"):
+                    self.assertEqual(stats1, stats2)
+
+    def test_parallel_does_not_change_model(self):
+        kfold.get_k_fold_stats(self.cat, self.mct_export, k=self.K, nproc=2)
+        stats = self.cat._print_stats(self.mct_export, do_print=False)
+        for name, stats1, stats2 in zip(self._names, self.reg_stats, stats):
+            with self.subTest(name):
+                self.assertEqual(stats1, stats2)
+
+
 class KFoldDuplicatedTests(KFoldCATTests):
     COPIES = 3
     INCLUDE_STD = False
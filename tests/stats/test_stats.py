@@ -0,0 +1,77 @@
+import os
+import json
+
+from medcat.stats.stats import StatsBuilder, get_stats
+from medcat.cdb import CDB
+from medcat.vocab import Vocab
+from medcat.cat import CAT
+
+import unittest
+
+
+class StatsTests(unittest.TestCase):
+    EXPORT_PATH = os.path.join(os.path.dirname(__file__), "..",
+                               "resources", "medcat_trainer_export.json")
+    EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "examples")
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        with open(cls.EXPORT_PATH) as f:
+            cls.mct_export = json.load(f)
+        cdb = CDB.load(os.path.join(cls.EXAMPLES_PATH, "cdb.dat"))
+        cdb.config.general.spacy_model = "blank:en"
+        cls.cat = CAT(cdb, Vocab.load(os.path.join(cls.EXAMPLES_PATH, "vocab.dat")))
+        cls.cat.train_supervised_raw(cls.mct_export)
+        cls.texts = [doc['text'] for project in cls.mct_export['projects']
+                     for doc in project['documents']]
+
+    def get_stats_one_by_one(self, **kwargs) -> tuple:
+        orig_filters = self.cat.config.linking.filters.copy_of()
+        builder = StatsBuilder.from_cat(self.cat, self.cat.config.linking.filters, **kwargs)
+        builder.docs_getter = None
+        for project in self.mct_export['projects']:
+            builder.process_project(project)
+        builder.finalise_report(0, do_print=False)
+        self.cat.config.linking.filters = orig_filters
+        return builder.unwrap()
+
+
+class BatchedStatsTests(StatsTests):
+
+    def test_batched_same_as_one_by_one(self):
+        self.assertEqual(get_stats(self.cat, self.mct_export, do_print=False),
+                         self.get_stats_one_by_one())
+
+    def test_batched_same_as_one_by_one_with_cui_doc_limit(self):
+        self.assertEqual(get_stats(self.cat, self.mct_export, do_print=False, use_cui_doc_limit=True),
+                         self.get_stats_one_by_one(use_cui_doc_limit=True))
+
+    def test_cached_same_as_one_by_one(self):
+        doc_cache: dict = {}
+        expected = self.get_stats_one_by_one()
+        for nr in range(2):
+            with self.subTest(f"Run {nr}"):
+                self.assertEqual(get_stats(self.cat, self.mct_export, do_print=False, doc_cache=doc_cache),
+                                 expected)
+
+    def test_caches_docs(self):
+        doc_cache: dict = {}
+        get_stats(self.cat, self.mct_export, do_print=False, doc_cache=doc_cache)
+        self.assertEqual(set(doc_cache), set(self.texts))
+        cached = dict(doc_cache)
+        get_stats(self.cat, self.mct_export, do_print=False, doc_cache=doc_cache)
+        for text, doc in doc_cache.items():
+            with self.subTest(text[:20]):
+                self.assertIs(doc, cached[text])
+
+    def test_pipe_cached_same_as_call(self):
+        doc_cache: dict = {}
+        texts = self.texts + ['', self.texts[0]]
+        for doc, text in zip(self.cat._pipe_cached(texts, doc_cache=doc_cache), texts):
+            with self.subTest(text[:20]):
+                expected = self.cat(text)
+                if expected is None:
+                    self.assertIsNone(doc)
+                    continue
+                self.assertEqual([(ent.start, ent.end, ent._.cui, ent._.context_similarity) for ent in doc.ents],
+                                 [(ent.start, ent.end, ent._.cui, ent._.context_similarity) for ent in expected.ents])
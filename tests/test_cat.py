@@ -1,8 +1,10 @@
 import json
+import glob
 import os
 import sys
 import time
-from typing import Callable
+import signal
+from typing import Callable, Optional
 from functools import partial
 import unittest
 from unittest.mock import mock_open, patch
@@ -10,19 +12,37 @@ import tempfile
 import shutil
 import logging
 import contextlib
+import random
 import humanfriendly
+import numpy as np
+from spacy.language import Language
 from transformers import AutoTokenizer
 from medcat.vocab import Vocab
 from medcat.cdb import CDB, logger as cdb_logger
 from medcat.cat import CAT, logger as cat_logger
 from medcat.config import Config
 from medcat.pipe import logger as pipe_logger
+from medcat.utils.annotation_sinks import ResumeIndex, JSONLinesSink
 from medcat.utils.checkpoint import Checkpoint
+from medcat.utils.cdb_state import copy_cdb_state
+from medcat.utils.matutils import unitvec
 from medcat.meta_cat import MetaCAT
 from medcat.config_meta_cat import ConfigMetaCAT
 from medcat.tokenizers.meta_cat_tokenizers import TokenizerWrapperBERT
 
 
+KILLING_TEXT = "This text kills the worker process"
+_orig_get_entities = CAT.get_entities
+
+
+def _get_entities_or_die(cat: CAT, text, *args, **kwargs):
+    if text == KILLING_TEXT:
+        # make sure the previous results are sent before dying
+        time.sleep(0.5)
+        os.kill(os.getpid(), signal.SIGKILL)
+    return _orig_get_entities(cat, text, *args, **kwargs)
+
+
 class CATTests(unittest.TestCase):
     SUPERVISED_TRAINING_JSON = os.path.join(os.path.dirname(__file__), "resources", "medcat_trainer_export.json")
 
@@ -106,6 +126,88 @@ class CATTests(unittest.TestCase):
     def test_multiprocessing_works_min_memory_size(self):
         self.assert_mp_works(self.in_data_mp, min_free_memory_size="1GB")
 
+    def test_multiprocessing_survives_killed_worker(self):
+        in_data = [(nr, f"The dog is sitting outside the house nr {nr}") for nr in range(20)]
+        in_data[5] = (5, KILLING_TEXT)
+        with patch.object(CAT, 'get_entities', _get_entities_or_die):
+            out = self.undertest.multiprocessing_batch_char_size(in_data, nproc=2, batch_size_chars=100)
+        self.assertEqual(set(nr for nr, _ in in_data) - {5}, set(out.keys()))
+
+    def test_multiprocessing_many_batches(self):
+        in_data = [(nr, f"The dog is sitting outside the house nr {nr}") for nr in range(50)]
+        out = self.undertest.multiprocessing_batch_char_size(in_data, nproc=2, batch_size_chars=100)
+        self.assertEqual(set(nr for nr, _ in in_data), set(out.keys()))
+
+    def test_multiprocessing_resumes(self):
+        in_data = [(nr, f"The dog is sitting outside the house nr {nr}") for nr in range(20)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.undertest.multiprocessing_batch_char_size(in_data[:10], nproc=2, batch_size_chars=100,
+                                                           out_split_size_chars=100, save_dir_path=temp_dir)
+            self.undertest.multiprocessing_batch_char_size(in_data, nproc=2, batch_size_chars=100,
+                                                           out_split_size_chars=100, save_dir_path=temp_dir)
+            index = ResumeIndex.open(temp_dir, create=False)
+            annotated_ids = list(index)
+            index.close()
+        self.assertEqual(sorted(nr for nr, _ in in_data), sorted(annotated_ids))
+
+    def test_multiprocessing_saves_jsonl_parts(self):
+        in_data = [(nr, f"The dog is sitting outside the house nr {nr}") for nr in range(20)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.undertest.multiprocessing_batch_char_size(in_data, nproc=2, batch_size_chars=100,
+                                                           out_split_size_chars=100, save_dir_path=temp_dir,
+                                                           out_sink='jsonl')
+            sink = JSONLinesSink()
+            saved = [doc_id for path in glob.glob(os.path.join(temp_dir, 'part_*.jsonl'))
+                     for doc_id, _ in sink.read_part(path)]
+        self.assertEqual(sorted(nr for nr, _ in in_data), sorted(saved))
+
+    def test_annotate_stream(self):
+        out = list(self.undertest.annotate_stream(iter(self.in_data_mp), nproc=1))
+        self.assertEqual([1, 2, 3], [doc_id for doc_id, _ in out])
+        self.assertEqual(1, len(out[0][1]['entities']))
+        self.assertEqual(0, len(out[1][1]['entities']))
+        self.assertEqual(0, len(out[2][1]['entities']))
+
+    def test_annotate_stream_keeps_order(self):
+        in_data = [(nr, "The dog is sitting outside the house " * (1 + nr % 5)) for nr in range(50)]
+        out = self.undertest.annotate_stream(in_data, nproc=2, batch_size_chars=100)
+        self.assertEqual(list(range(50)), [doc_id for doc_id, _ in out])
+
+    def test_annotate_stream_unordered(self):
+        in_data = [(nr, "The dog is sitting outside the house " * (1 + nr % 5)) for nr in range(50)]
+        out = self.undertest.annotate_stream(in_data, nproc=2, batch_size_chars=100, keep_order=False)
+        self.assertEqual(list(range(50)), sorted(doc_id for doc_id, _ in out))
+
+    def test_annotate_stream_survives_killed_worker(self):
+        in_data = [(nr, "The dog is sitting outside the house " * (1 + nr % 5)) for nr in range(50)]
+        in_data[7] = (7, KILLING_TEXT)
+        # the other documents in the same batch are lost as well
+        lost_batch = next(batch for batch in self.undertest._batch_generator(in_data, 100)
+                          if (7, KILLING_TEXT) in batch)
+        for keep_order in (True, False):
+            with self.subTest(f"Keep order: {keep_order}"):
+                with patch.object(CAT, 'get_entities', _get_entities_or_die):
+                    out = list(self.undertest.annotate_stream(in_data, nproc=2, batch_size_chars=100,
+                                                              keep_order=keep_order))
+                out_ids = [doc_id for doc_id, _ in out]
+                if keep_order:
+                    self.assertEqual(out_ids, sorted(out_ids))
+                self.assertEqual(set(nr for nr, _ in in_data) - set(nr for nr, _ in lost_batch), set(out_ids))
+
+    def test_annotate_stream_reads_input_lazily(self):
+        consumed = []
+
+        def gen():
+            for nr in range(1000):
+                consumed.append(nr)
+                yield nr, f"The dog is sitting outside the house nr {nr}"
+        stream = self.undertest.annotate_stream(gen(), nproc=2, batch_size_chars=100,
+                                                max_batches_in_flight=2)
+        self.assertEqual(0, next(stream)[0])
+        stream.close()
+        # at most 2 batches (of around 2 documents) in flight
+        self.assertLess(len(consumed), 10)
+
     def test_mp_fails_incorrect_min_mem(self):
         in_data = [(nr, f"nr:{nr}") for nr in range(4)]
         with self.assertRaises(humanfriendly.InvalidSize):
@@ -513,6 +615,30 @@ class CATTests(unittest.TestCase):
         self.assertIsNotNone(cat.config.version.medcat_version)
         self.assertEqual(cat._meta_cats, [])
 
+    def test_load_model_pack_reports_load_times(self):
+        with tempfile.TemporaryDirectory() as save_dir_path:
+            full_model_pack_name = self.undertest.create_model_pack(save_dir_path, model_pack_name="mp_name")
+            cat = CAT.load_model_pack(os.path.join(save_dir_path, f"{full_model_pack_name}.zip"), n_threads=2)
+        for component in ['unpack', 'cdb', 'vocab', 'pipe', 'total']:
+            with self.subTest(component):
+                self.assertIn(component, cat.load_times)
+        self.assertEqual(cat.cdb.name2cuis, self.undertest.cdb.name2cuis)
+
+    def test_load_model_pack_fast_load_cache(self):
+        with tempfile.TemporaryDirectory() as save_dir_path, tempfile.TemporaryDirectory() as cache_dir:
+            full_model_pack_name = self.undertest.create_model_pack(save_dir_path, model_pack_name="mp_name")
+            zip_path = os.path.join(save_dir_path, f"{full_model_pack_name}.zip")
+            cat = CAT.load_model_pack(zip_path, fast_load_cache_dir=cache_dir)
+            fast_load_path = os.path.join(cache_dir, cat.config.version.id)
+            self.assertEqual(os.listdir(cache_dir), [cat.config.version.id])
+            self.assertTrue(os.path.exists(os.path.join(fast_load_path, "cdb_columns.npz")))
+            self.assertTrue(os.path.exists(os.path.join(fast_load_path, "vocab_vectors.npy")))
+            self.assertEqual(os.path.dirname(cat.config.general.spacy_model), fast_load_path)
+            # loaded from the cache
+            cat = CAT.load_model_pack(zip_path, fast_load_cache_dir=cache_dir)
+            self.assertEqual(cat.cdb.name2cuis, self.undertest.cdb.name2cuis)
+            self.assertEqual(cat.get_hash(), cat.config.version.id)
+
     def test_hashing(self):
         with tempfile.TemporaryDirectory() as save_dir_path:
             self._test_hashing(save_dir_path)
@@ -871,5 +997,173 @@ class TestLoadingOldWeights(unittest.TestCase):
         self.assertIsInstance(res, float)
 
 
+class _ReadAheadRecorder:
+    # a component that (like e.g MetaCAT) processes all the documents it is given at once
+
+    def __init__(self) -> None:
+        self.texts: list = []
+
+    def __call__(self, doc):
+        self.texts.append(doc.text)
+        return doc
+
+    def pipe(self, docs, **kwargs):
+        docs = list(docs)
+        self.texts.extend(doc.text for doc in docs)
+        yield from docs
+
+
+@Language.factory("read_ahead_recorder")
+def _create_read_ahead_recorder(nlp, name):
+    return _ReadAheadRecorder()
+
+
+class CachedDocsSupervisedTrainingTests(unittest.TestCase):
+    SUPERVISED_TRAINING_JSON = os.path.join(os.path.dirname(__file__), "resources", "medcat_trainer_export.json")
+    EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "examples")
+    NEPOCHS = 2
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.vocab = Vocab.load(os.path.join(cls.EXAMPLES_PATH, "vocab.dat"))
+        cls.vocab.make_unigram_table()
+        cls.expected = cls._train()
+
+    @classmethod
+    def _get_cat(cls) -> CAT:
+        random.seed(42)
+        np.random.seed(42)
+        cdb = CDB.load(os.path.join(cls.EXAMPLES_PATH, "cdb.dat"))
+        cdb.config.general.spacy_model = "blank:en"
+        return CAT(cdb=cdb, config=cdb.config, vocab=cls.vocab)
+
+    @classmethod
+    def _train(cls, cat: Optional[CAT] = None, **kwargs) -> dict:
+        if cat is None:
+            cat = cls._get_cat()
+        cat.train_supervised_from_json(cls.SUPERVISED_TRAINING_JSON, nepochs=cls.NEPOCHS,
+                                       train_from_false_positives=True, **kwargs)
+        return copy_cdb_state(cat.cdb)
+
+    def assertSameState(self, state: dict):
+        self.assertEqual(state.keys(), self.expected.keys())
+        for key, value in state.items():
+            with self.subTest(key):
+                if key != 'cui2context_vectors':
+                    self.assertEqual(value, self.expected[key])
+                    continue
+                self.assertEqual(value.keys(), self.expected[key].keys())
+                for cui, vectors in value.items():
+                    for context_type, vector in vectors.items():
+                        np.testing.assert_array_equal(vector, self.expected[key][cui][context_type])
+
+    def test_cached_docs_same_training(self):
+        self.assertSameState(self._train(cache_docs=True))
+
+    def test_cached_docs_on_disk_same_training(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertSameState(self._train(cache_docs=True, doc_cache_dir=temp_dir))
+            self.assertEqual(os.listdir(temp_dir), [])
+
+    def test_cached_docs_on_disk_removed_if_training_fails(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch.object(CAT, 'add_and_train_concept', side_effect=ValueError):
+                with self.assertRaises(ValueError):
+                    self._train(cache_docs=True, doc_cache_dir=temp_dir)
+            self.assertEqual(os.listdir(temp_dir), [])
+
+    def test_cached_docs_not_processed_ahead(self):
+        with open(self.SUPERVISED_TRAINING_JSON) as f:
+            doc_texts = set(doc['text'] for project in json.load(f)['projects'] for doc in project['documents'])
+        cat = self._get_cat()
+        recorder = cat.pipe.spacy_nlp.add_pipe("read_ahead_recorder")
+        trained_texts: list = []
+        orig_add_and_train_concept = CAT.add_and_train_concept
+
+        def add_and_train_concept(cat: CAT, *args, spacy_doc, **kwargs):
+            # the document being trained on is the last one processed (the names are processed as well)
+            processed_texts = [text for text in recorder.texts if text in doc_texts]
+            trained_texts.append((spacy_doc.text, processed_texts[-1]))
+            return orig_add_and_train_concept(cat, *args, spacy_doc=spacy_doc, **kwargs)
+        with patch.object(CAT, 'add_and_train_concept', add_and_train_concept):
+            self._train(cat, cache_docs=True)
+        self.assertTrue(trained_texts)
+        for text, last_processed_text in trained_texts:
+            self.assertEqual(text, last_processed_text)
+
+
+class ParallelTrainingTests(unittest.TestCase):
+    SUPERVISED_TRAINING_JSON = os.path.join(os.path.dirname(__file__), "resources", "medcat_trainer_export.json")
+    EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "examples")
+    NAMES = ["virus", "virus m", "virus k", "virus z", "second csv"]
+    NR_OF_LINES = 50
+    CKPT_STEPS = 20
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.vocab = Vocab.load(os.path.join(cls.EXAMPLES_PATH, "vocab.dat"))
+        cls.vocab.make_unigram_table()
+        with open(cls.SUPERVISED_TRAINING_JSON) as f:
+            export = json.load(f)
+        words = [word for project in export['projects'] for doc in project['documents']
+                 for word in doc['text'].split()]
+        rng = random.Random(42)
+        cls.data = [" ".join(rng.sample(words, 10) + [rng.choice(cls.NAMES)] + rng.sample(words, 10))
+                    for _ in range(cls.NR_OF_LINES)]
+        cls.expected_cdb, cls.expected_ckpts = cls._train()
+
+    @classmethod
+    def _train(cls, **kwargs) -> tuple:
+        random.seed(42)
+        np.random.seed(42)
+        cdb = CDB.load(os.path.join(cls.EXAMPLES_PATH, "cdb.dat"))
+        cdb.config.general.spacy_model = "blank:en"
+        cat = CAT(cdb=cdb, config=cdb.config, vocab=cls.vocab)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            checkpoint = Checkpoint(dir_path=temp_dir, steps=cls.CKPT_STEPS, max_to_keep=sys.maxsize)
+            cat.train(cls.data, checkpoint=checkpoint, **kwargs)
+            checkpoints = sorted(f for f in os.listdir(temp_dir) if "checkpoint-" in f)
+        return cdb, checkpoints
+
+    def test_same_counts(self):
+        cdb, _ = self._train(nproc=2, merge_steps=10)
+        self.assertTrue(cdb.cui2count_train)
+        self.assertEqual(cdb.cui2count_train, self.expected_cdb.cui2count_train)
+        self.assertEqual(cdb.name2count_train, self.expected_cdb.name2count_train)
+
+    def test_similar_vectors(self):
+        cdb, _ = self._train(nproc=2, merge_steps=10)
+        self.assertEqual(cdb.cui2context_vectors.keys(), self.expected_cdb.cui2context_vectors.keys())
+        for cui, vectors in cdb.cui2context_vectors.items():
+            for context_type, vector in vectors.items():
+                with self.subTest(f"{cui}: {context_type}"):
+                    expected = self.expected_cdb.cui2context_vectors[cui][context_type]
+                    self.assertGreater(np.dot(unitvec(vector), unitvec(expected)), 0.9)
+
+    def test_same_checkpoints(self):
+        _, checkpoints = self._train(nproc=2, merge_steps=15)
+        self.assertEqual(checkpoints, self.expected_ckpts)
+
+
+class ImportTests(unittest.TestCase):
+    HEAVY_MODULES = ['transformers', 'datasets', 'peft', 'medcat.meta_cat', 'medcat.rel_cat',
+                     'medcat.ner.transformers_ner']
+    SCRIPT = ("import json, sys\n"
+              "import medcat.cat\n"
+              "print(json.dumps({'modules': [m for m in %r if m in sys.modules]}))\n")
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # NOTE: run in a separate process since these tests import the modules themselves
+        import subprocess
+        out = subprocess.run([sys.executable, "-c", cls.SCRIPT % cls.HEAVY_MODULES],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.join(os.path.dirname(__file__), ".."))
+        cls.result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    def test_does_not_import_heavy_modules(self):
+        self.assertEqual(self.result['modules'], [])
+
+
 if __name__ == "__main__":
     unittest.main()
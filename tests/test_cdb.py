@@ -93,6 +93,14 @@ class CDBTests(unittest.TestCase):
         assert 'C0000039' not in self.undertest.name2cuis['virus~z']
         assert 'C0000039' not in self.undertest.name2cuis2status['virus~z']
 
+    def test_remove_cui_removes_context_matrix_row(self):
+        cuis = ['C0000039', 'C0000139']
+        for cui in cuis:
+            self.undertest.update_context_vector(cui, {'long': np.random.random(300)})
+        self.undertest.get_context_similarities(cuis, 'long', np.random.random(300))
+        self.undertest.remove_cui('C0000039')
+        self.assertEqual(['C0000139'], list(self.undertest._context_matrices['long'].cui2row))
+
     def test_cui2snames_population(self):
         self.undertest.cui2snames.clear()
         self.undertest.populate_cui2snames()
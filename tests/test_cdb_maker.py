@@ -216,5 +216,33 @@ class B_CDBMakerEditTests(unittest.TestCase):
         self.assertEqual(self.cdb.cui2context_vectors, target_result)
 
 
+class C_CDBMakerParallelTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config = Config()
+        cls.config.general["spacy_model"] = "en_core_web_md"
+        cls.config.cdb_maker['remove_parenthesis'] = 5
+        cls.csvs = [
+            os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'examples', 'cdb.csv'),
+            os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'examples', 'cdb_2.csv')
+        ]
+        cls.maker = CDBMaker(cls.config)
+        cls.cdb = cls.maker.prepare_csvs(cls.csvs, full_build=True)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.maker.destroy_pipe()
+
+    def test_ca_parallel_build_same_as_sequential(self):
+        maker = CDBMaker(self.config)
+        cdb = maker.prepare_csvs(self.csvs, full_build=True, n_process=2, shard_size=2)
+        maker.destroy_pipe()
+        for attr in ['cui2names', 'cui2snames', 'name2cuis', 'name2cuis2status', 'cui2type_ids',
+                     'cui2preferred_name', 'name_isupper', 'snames', 'addl_info']:
+            with self.subTest(attr):
+                self.assertEqual(getattr(self.cdb, attr), getattr(cdb, attr))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import os
+import pickle
 import shutil
 import unittest
 from medcat.vocab import Vocab
@@ -37,6 +38,101 @@ class CATTests(unittest.TestCase):
         vocab = Vocab.load(vocab_path)
         self.assertEqual(["house", "dog", "test"], list(vocab.vocab.keys()))
 
+    def test_save_and_load_mmap_vectors(self):
+        self.undertest.add_words(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "examples", "vocab_data.txt"))
+        vocab_path = f"{self.tmp_dir}/vocab.dat"
+        self.undertest.save(vocab_path, mmap_vectors=True)
+        self.assertTrue(os.path.exists(f"{self.tmp_dir}/vocab_vectors.npy"))
+        vocab = Vocab.load(vocab_path)
+        self.assertFalse(vocab.vectors.flags.writeable)
+        self.assertTrue(np.array_equal(vocab.vectors, self.undertest.vectors))
+        self.assertEqual(vocab.count("house"), self.undertest.count("house"))
+
+    def test_mmap_vectors_can_be_changed(self):
+        self.undertest.add_words(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "examples", "vocab_data.txt"))
+        vocab_path = f"{self.tmp_dir}/vocab.dat"
+        self.undertest.save(vocab_path, mmap_vectors=True)
+        vocab = Vocab.load(vocab_path)
+        vocab.add_vec("house", np.array([1.0, 2.0, 3.0]))
+        self.assertTrue(np.array_equal(vocab.vec("house"), [1.0, 2.0, 3.0]))
+        # the saved vectors are not changed
+        self.assertTrue(np.array_equal(Vocab.load(vocab_path).vec("house"), self.undertest.vec("house")))
+
+    def test_load_legacy_format(self):
+        legacy = {'vocab': {'house': {'vec': np.array([1.0, 2.0]), 'cnt': 34, 'ind': 0},
+                            'dog': {'vec': None, 'cnt': 12, 'ind': 1}},
+                  'index2word': {0: 'house', 1: 'dog'},
+                  'vec_index2word': {0: 'house'},
+                  'cum_probs': np.array([1.0])}
+        vocab_path = f"{self.tmp_dir}/vocab.dat"
+        with open(vocab_path, 'wb') as f:
+            pickle.dump(legacy, f)
+        vocab = Vocab.load(vocab_path)
+        self.assertEqual(["house", "dog"], list(vocab.vocab.keys()))
+        self.assertEqual(34, vocab.count("house"))
+        self.assertEqual(12, vocab["dog"])
+        self.assertTrue(np.array_equal(vocab.vec("house"), [1.0, 2.0]))
+        self.assertIsNone(vocab.vec("dog"))
+
+
+class VocabMatrixTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.undertest = Vocab()
+        self.undertest.add_word("house", cnt=3, vec=np.array([1.0, 2.0, 3.0]))
+        self.undertest.add_word("dog", cnt=2)
+        self.undertest.add_word("cat", cnt=1, vec=[4.0, 5.0, 6.0])
+
+    def test_vectors_are_contiguous_float32(self):
+        vectors = self.undertest.vectors
+        self.assertEqual(vectors.shape, (3, 3))
+        self.assertEqual(vectors.dtype, np.float32)
+        self.assertTrue(vectors.flags['C_CONTIGUOUS'])
+
+    def test_vec_is_row(self):
+        self.assertTrue(np.array_equal(self.undertest.vec("cat"), self.undertest.vectors[2]))
+
+    def test_item(self):
+        item = self.undertest.item("house")
+        self.assertEqual(item['cnt'], 3)
+        self.assertEqual(item['ind'], 0)
+        self.assertTrue(np.array_equal(item['vec'], [1.0, 2.0, 3.0]))
+
+    def test_item_can_be_changed(self):
+        self.undertest.item("dog")['cnt'] += 5
+        self.undertest.vocab["dog"]['vec'] = [7.0, 8.0, 9.0]
+        self.assertEqual(self.undertest.count("dog"), 7)
+        self.assertTrue(np.array_equal(self.undertest.vec("dog"), [7.0, 8.0, 9.0]))
+        self.assertIn(1, self.undertest.vec_index2word)
+
+    def test_different_size_vector_fails(self):
+        with self.assertRaises(ValueError):
+            self.undertest.add_vec("dog", np.array([1.0, 2.0]))
+
+    def test_get_vectors(self):
+        vecs, mask = self.undertest.get_vectors(["cat", "dog", "unknown", "house"])
+        self.assertEqual(mask.tolist(), [True, False, False, True])
+        self.assertTrue(np.array_equal(vecs, [[4, 5, 6], [0, 0, 0], [0, 0, 0], [1, 2, 3]]))
+
+    def test_remove_words_below_cnt(self):
+        self.undertest.remove_words_below_cnt(2)
+        self.assertEqual(["house", "dog"], list(self.undertest.vocab.keys()))
+        self.assertEqual(self.undertest.vectors.shape, (2, 3))
+        self.assertEqual(self.undertest.vec_index2word, {0: "house"})
+
+    def test_remove_all_vectors_allows_new_size(self):
+        self.undertest.remove_all_vectors()
+        self.assertIsNone(self.undertest.vec("house"))
+        self.undertest.add_vec("dog", np.array([1.0, 2.0]))
+        self.assertEqual(self.undertest.vectors.shape, (3, 2))
+
+    def test_many_words(self):
+        for i in range(100):
+            self.undertest.add_word(f"word{i}", cnt=i, vec=np.full(3, i))
+        self.assertEqual(self.undertest.vectors.shape, (103, 3))
+        self.assertTrue(np.array_equal(self.undertest.vec("word42"), [42, 42, 42]))
+        self.assertEqual(self.undertest.count("word99"), 99)
+
 
 class VocabUnigramTableTests(unittest.TestCase):
     EXAMPLE_DATA_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)),
@@ -0,0 +1,90 @@
+import random
+import unittest
+
+import numpy as np
+import torch
+
+from medcat.config_meta_cat import ConfigMetaCAT
+from medcat.utils.meta_cat.ml_utils import create_batch_piped_data, create_length_buckets, predict
+from medcat.utils.meta_cat.models import LSTM
+
+
+class CreateLengthBucketsTests(unittest.TestCase):
+
+    def test_has_all_samples(self):
+        lengths = [5, 1, 3, 8, 2, 2, 7]
+        batches = create_length_buckets(lengths, 3)
+        self.assertEqual(list(range(len(lengths))), sorted(ind for batch in batches for ind in batch))
+
+    def test_limits_samples(self):
+        batches = create_length_buckets([1] * 10, 3)
+        self.assertEqual([3, 3, 3, 1], [len(batch) for batch in batches])
+
+    def test_groups_by_length(self):
+        batches = create_length_buckets([10, 1, 10, 1], 2)
+        self.assertEqual([[1, 3], [0, 2]], batches)
+
+    def test_limits_tokens(self):
+        lengths = [2, 2, 2, 4, 4, 4]
+        batches = create_length_buckets(lengths, 100, max_tokens=8)
+        self.assertEqual([[0, 1, 2], [3, 4], [5]], batches)
+        for batch in batches:
+            self.assertLessEqual(len(batch) * max(lengths[ind] for ind in batch), 8)
+
+    def test_long_sample_own_batch(self):
+        self.assertEqual([[1], [0]], create_length_buckets([20, 1], 100, max_tokens=5))
+
+    def test_empty(self):
+        self.assertEqual([], create_length_buckets([], 10))
+
+
+class CreateBatchPipedDataTests(unittest.TestCase):
+
+    def test_pads_to_longest_in_batch(self):
+        data = [([1, 2], 0), ([1, 2, 3, 4, 5, 6], 1), ([1], 0)]
+        x, _, attention_masks, _ = create_batch_piped_data(data, 0, 2, device='cpu', pad_id=0)
+        self.assertEqual((2, 6), tuple(x.shape))
+        x, _, attention_masks, _ = create_batch_piped_data(data, 2, 3, device='cpu', pad_id=0)
+        self.assertEqual((1, 1), tuple(x.shape))
+
+
+class PredictTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        torch.manual_seed(42)
+        cls.config = ConfigMetaCAT()
+        cls.config.general['vocab_size'] = 50
+        cls.config.general['device'] = 'cpu'
+        cls.config.model['input_size'] = 16
+        cls.config.model['hidden_size'] = 8
+        cls.config.model['nclasses'] = 3
+        cls.config.model['padding_idx'] = 0
+        cls.model = LSTM(None, cls.config)
+        rnd = random.Random(42)
+        cls.data = []
+        for _ in range(40):
+            length = rnd.randint(1, 30)
+            cls.data.append(([rnd.randint(1, 49) for _ in range(length)], [rnd.randint(0, length - 1)]))
+
+    def tearDown(self) -> None:
+        self.config.general['batch_size_eval'] = 5000
+        self.config.general['batch_size_eval_tokens'] = None
+
+    def predict_one_by_one(self):
+        self.config.general['batch_size_eval'] = 1
+        return predict(self.model, self.data, self.config)
+
+    def assert_same_predictions(self):
+        exp_predictions, exp_confidences = self.predict_one_by_one()
+        self.config.general['batch_size_eval'] = 7
+        self.config.general['batch_size_eval_tokens'] = 60
+        predictions, confidences = predict(self.model, self.data, self.config)
+        self.assertEqual(list(exp_predictions), list(predictions))
+        self.assertTrue(np.allclose(exp_confidences, confidences, atol=1e-5))
+
+    def test_keeps_order(self):
+        self.assert_same_predictions()
+
+    def test_empty(self):
+        self.assertEqual(([], []), predict(self.model, [], self.config))
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import dill
+import numpy as np
+
+from medcat.utils.saving.columnar import (LazyDict, _encode_strings, decode_strings,
+                                          save_columns, load_columns, is_suitable)
+
+
+class StringTableTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        strings = ['', 'abc', 'ünï~cödé', '\U0001F600', 'a~b']
+        self.assertEqual(decode_strings(*_encode_strings(strings)), strings)
+
+    def test_empty(self):
+        self.assertEqual(decode_strings(*_encode_strings([])), [])
+
+
+class ColumnsTests(unittest.TestCase):
+    cdb_dict = {
+        'cui2names': {'C1': {'n1', 'n2'}, 'C2': {'n2'}},
+        'cui2snames': {'C1': {'n1', 'n2', 's1'}, 'C2': {'n2'}},
+        'cui2type_ids': {'C1': {'T1'}, 'C2': set()},
+        'name2cuis': {'n2': ['C2', 'C1'], 'n1': ['C1']},
+        'name2cuis2status': {'n2': {'C2': 'P', 'C1': 'A'}, 'n1': {'C1': 'N'}},
+        'name_isupper': {'n1': True, 'n2': False},
+        'snames': {'n1', 'n2', 's1'},
+    }
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'columns.npz')
+        save_columns(self.path, self.cdb_dict)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(load_columns(self.path), self.cdb_dict)
+
+    def test_keeps_list_order(self):
+        self.assertEqual(load_columns(self.path)['name2cuis']['n2'], ['C2', 'C1'])
+
+    def test_unsuitable(self):
+        self.assertTrue(is_suitable(self.cdb_dict))
+        self.assertFalse(is_suitable(dict(self.cdb_dict, cui2names=None)))
+
+
+class LazyDictTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.calls = 0
+
+    def loader(self) -> dict:
+        self.calls += 1
+        return {'a': np.arange(3)}
+
+    def test_loads_on_first_access(self):
+        d = LazyDict(self.loader)
+        self.assertEqual(self.calls, 0)
+        self.assertIn('a', d)
+        d['b'] = 1
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(set(d), {'a', 'b'})
+
+    def test_pickles_as_dict(self):
+        back = dill.loads(dill.dumps(LazyDict(self.loader)))
+        self.assertIs(type(back), dict)
+        self.assertEqual(list(back), ['a'])
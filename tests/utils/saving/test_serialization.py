@@ -5,6 +5,8 @@ import shutil
 import tempfile
 import unittest
 
+import numpy as np
+
 from medcat.cdb import CDB
 from medcat.cat import CAT
 from medcat.vocab import Vocab
@@ -56,9 +58,127 @@ class CDBSerializationTests(unittest.TestCase):
                 self.assertEqual(orig, now)
 
 
+class CDBMmapVectorsSerializationTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cdb = CDB.load(os.path.join(os.path.dirname(
+            os.path.realpath(__file__)), "..", "..", "..", "examples", "cdb.dat"))
+        rng = np.random.default_rng(1)
+        for cui in self.cdb.cui2names:
+            self.cdb.update_context_vector(cui, {'long': rng.random(5), 'short': rng.random(5)})
+        # one with only one type of context
+        self.cdb.update_context_vector('C-1', {'short': rng.random(5)})
+        self.main_path = os.path.join(self.temp_dir.name, 'cdb.dat')
+        self.ser = CDBSerializer(self.main_path)
+        self.ser.serialize(self.cdb, overwrite=True, mmap_vectors=True)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_saves_npy_files(self):
+        for context_type in ['long', 'short']:
+            with self.subTest(context_type):
+                self.assertTrue(os.path.exists(os.path.join(
+                    self.temp_dir.name, f'cdb_context_vectors_{context_type}.npy')))
+
+    def test_round_trip(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertEqual(list(cdb.cui2context_vectors), list(self.cdb.cui2context_vectors))
+        for cui, vectors in self.cdb.cui2context_vectors.items():
+            with self.subTest(cui):
+                self.assertEqual(vectors.keys(), cdb.cui2context_vectors[cui].keys())
+                for context_type, vec in vectors.items():
+                    self.assertTrue(np.array_equal(vec, cdb.cui2context_vectors[cui][context_type]))
+
+    def test_vectors_are_memory_mapped(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertFalse(cdb.cui2context_vectors['C-1']['short'].flags.writeable)
+
+    def test_can_read_into_memory(self):
+        cdb = self.ser.deserialize(CDB, mmap_mode=None)
+        self.assertTrue(cdb.cui2context_vectors['C-1']['short'].flags.writeable)
+
+    def test_memory_mapped_can_be_trained(self):
+        cdb = self.ser.deserialize(CDB)
+        before = np.array(cdb.cui2context_vectors['C-1']['short'])
+        cdb.update_context_vector('C-1', {'short': np.ones(5)})
+        self.assertFalse(np.array_equal(before, cdb.cui2context_vectors['C-1']['short']))
+
+    def test_same_hash(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertEqual(cdb.calculate_hash(), self.cdb.calculate_hash())
+
+
+class CDBColumnarSerializationTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cdb = CDB.load(os.path.join(os.path.dirname(
+            os.path.realpath(__file__)), "..", "..", "..", "examples", "cdb.dat"))
+        self.cdb.addl_info['cui2group'] = {'C0000039': 'group'}
+        self.cdb.update_context_vector('C0000039', {'long': np.arange(5.)})
+        self.main_path = os.path.join(self.temp_dir.name, 'cdb.dat')
+        self.ser = CDBSerializer(self.main_path)
+        self.ser.serialize(self.cdb, overwrite=True, columnar=True)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_saves_columnar_files(self):
+        for file_name in ['cdb_columns.npz', 'cdb_addl_info.dat', 'cdb_context_vectors_long.npy']:
+            with self.subTest(file_name):
+                self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, file_name)))
+
+    def test_round_trip(self):
+        cdb = self.ser.deserialize(CDB)
+        for name in SPECIALITY_NAMES - ONE2MANY:
+            with self.subTest(name):
+                self.assertEqual(getattr(self.cdb, name), getattr(cdb, name))
+        self.assertEqual(cdb.cui2preferred_name, self.cdb.cui2preferred_name)
+        self.assertTrue(np.array_equal(cdb.cui2context_vectors['C0000039']['long'], np.arange(5.)))
+
+    def test_round_trip_keeps_order(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertEqual(list(cdb.name2cuis.items()), list(self.cdb.name2cuis.items()))
+        self.assertEqual(list(cdb.cui2names), list(self.cdb.cui2names))
+
+    def test_strings_are_interned(self):
+        cdb = self.ser.deserialize(CDB)
+        name = next(iter(cdb.cui2names['C0000039']))
+        self.assertIs(next(n for n in cdb.name2cuis if n == name), name)
+
+    def test_addl_info_loaded_lazily(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertFalse(cdb.addl_info.is_loaded)
+        self.assertEqual(cdb.addl_info['cui2group'], {'C0000039': 'group'})
+        self.assertTrue(cdb.addl_info.is_loaded)
+
+    def test_addl_info_loaded_eagerly(self):
+        cdb = self.ser.deserialize(CDB, lazy=False)
+        self.assertIsInstance(cdb.addl_info, dict)
+        self.assertEqual(cdb.addl_info, self.cdb.addl_info)
+
+    def test_same_hash(self):
+        cdb = self.ser.deserialize(CDB)
+        self.assertEqual(cdb.calculate_hash(), self.cdb.calculate_hash())
+
+    def test_can_be_saved_with_dill(self):
+        cdb = self.ser.deserialize(CDB)
+        path = os.path.join(self.temp_dir.name, 'cdb_dill.dat')
+        cdb.save(path)
+        self.assertEqual(CDB.load(path).addl_info, self.cdb.addl_info)
+
+    def test_fails_with_json(self):
+        ser = CDBSerializer(self.main_path, self.temp_dir.name)
+        with self.assertRaises(ValueError):
+            ser.serialize(self.cdb, overwrite=True, columnar=True)
+
+
 class ModelCreationTests(unittest.TestCase):
     dill_model_pack = tempfile.TemporaryDirectory()
     json_model_pack = tempfile.TemporaryDirectory()
+    columnar_model_pack = tempfile.TemporaryDirectory()
     EXAMPLES = os.path.join(os.path.dirname(
         os.path.realpath(__file__)), "..", "..", "..", "examples")
     EXCEPTIONAL_JSONS = ['model_card.json', ENV_SNAPSHOT_FILE_NAME]
@@ -113,6 +233,15 @@ class ModelCreationTests(unittest.TestCase):
         cat = CAT.load_model_pack(folder)
         self.assertIsInstance(cat, CAT)
 
+    def test_load_columnar(self):
+        model_pack_path = self.undertest.create_model_pack(
+            self.columnar_model_pack.name, cdb_format='columnar')
+        folder = os.path.join(self.columnar_model_pack.name, model_pack_path)
+        self.assertTrue(os.path.exists(os.path.join(folder, 'cdb_columns.npz')))
+        cat = CAT.load_model_pack(folder)
+        self.assertEqual(cat.cdb.name2cuis, self.undertest.cdb.name2cuis)
+        self.assertEqual(cat.cdb.cui2snames, self.undertest.cdb.cui2snames)
+
     def test_round_trip(self):
         folder = self.test_dill_to_json()  # make sure the files exist
         cat = CAT.load_model_pack(folder)
@@ -0,0 +1,124 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from medcat.utils.annotation_sinks import (
+    AnnotationSink, PickleSink, JSONLinesSink, ParquetSink, ResumeIndex, get_sink)
+
+
+DOCS = {
+    'doc1': {'entities': {0: {'cui': 'C1', 'start': 0, 'end': 4, 'meta_anns': {}}}, 'tokens': []},
+    'doc2': {'entities': {}, 'tokens': []},
+}
+
+
+class SinkTests(unittest.TestCase):
+    # NOTE: the integer keys of the entities become strings in JSON
+    EXPECTED_JSON = {
+        'doc1': {'entities': {'0': {'cui': 'C1', 'start': 0, 'end': 4, 'meta_anns': {}}}, 'tokens': []},
+        'doc2': {'entities': {}, 'tokens': []},
+    }
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def assert_round_trip(self, sink: AnnotationSink, expected: dict):
+        path = sink.save_part(DOCS, self.temp_dir.name, 3)
+        self.assertEqual(os.path.join(self.temp_dir.name, f'part_3.{sink.file_extension}'), path)
+        self.assertEqual(['part_3.' + sink.file_extension], os.listdir(self.temp_dir.name))
+        self.assertEqual(expected, dict(sink.read_part(path)))
+
+    def test_pickle(self):
+        self.assert_round_trip(PickleSink(), DOCS)
+
+    def test_jsonl(self):
+        self.assert_round_trip(JSONLinesSink(), self.EXPECTED_JSON)
+
+    def test_parquet(self):
+        self.assert_round_trip(ParquetSink(), self.EXPECTED_JSON)
+
+    def test_get_sink_by_name(self):
+        self.assertIsInstance(get_sink('jsonl'), JSONLinesSink)
+
+    def test_get_sink_returns_sink(self):
+        sink = ParquetSink()
+        self.assertIs(sink, get_sink(sink))
+
+    def test_get_sink_fails_unknown(self):
+        with self.assertRaises(ValueError):
+            get_sink('csv')
+
+
+class ResumeIndexTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = ResumeIndex.open(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_empty(self):
+        self.assertEqual(0, len(self.index))
+        self.assertEqual(0, self.index.part_counter)
+
+    def test_add(self):
+        self.index.add([1, 2, '3'], 1)
+        self.assertEqual(3, len(self.index))
+        self.assertEqual(1, self.index.part_counter)
+        self.assertIn(1, self.index)
+        self.assertIn('3', self.index)
+
+    def test_keeps_types_apart(self):
+        self.index.add([1], 1)
+        self.assertNotIn('1', self.index)
+
+    def test_numpy_ids_same_as_python_ids(self):
+        self.index.add([np.int64(1), 2, (np.int32(3), 'a')], 1)
+        self.assertIn(1, self.index)
+        self.assertIn(np.int64(2), self.index)
+        self.assertIn((3, 'a'), self.index)
+
+    def test_iterates_ids(self):
+        self.index.add([1, 'a'], 1)
+        self.assertEqual({1, 'a'}, set(self.index))
+
+    def test_persists(self):
+        self.index.add(['a', 'b'], 1)
+        self.index.add(['c'], 2)
+        self.index.close()
+        self.index = ResumeIndex.open(self.temp_dir.name, create=False)
+        self.assertEqual({'a', 'b', 'c'}, set(self.index))
+        self.assertEqual(2, self.index.part_counter)
+
+    def test_no_index_not_created(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertIsNone(ResumeIndex.open(temp_dir, create=False))
+            self.assertEqual([], os.listdir(temp_dir))
+
+    def test_imports_legacy_ids(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, ResumeIndex.LEGACY_FILE_NAME), 'wb') as f:
+                pickle.dump((['a', 'b'], 4), f)
+            index = ResumeIndex.open(temp_dir, create=False)
+            self.assertIsNotNone(index)
+            self.assertEqual({'a', 'b'}, set(index))
+            self.assertEqual(4, index.part_counter)
+            index.close()
+            self.assertEqual([ResumeIndex.LEGACY_FILE_NAME], os.listdir(temp_dir))
+
+    def test_migrates_legacy_ids(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, ResumeIndex.LEGACY_FILE_NAME), 'wb') as f:
+                pickle.dump((['a', 'b'], 4), f)
+            ResumeIndex.open(temp_dir).close()
+            index = ResumeIndex(os.path.join(temp_dir, ResumeIndex.FILE_NAME))
+            self.assertEqual({'a', 'b'}, set(index))
+            index.close()
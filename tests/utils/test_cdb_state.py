@@ -4,7 +4,7 @@ from unittest import mock
 from typing import Callable, Any, Dict
 import tempfile
 
-from medcat.utils.cdb_state import captured_state_cdb, CDBState, copy_cdb_state
+from medcat.utils.cdb_state import captured_state_cdb, CDBState, copy_cdb_state, journaled_state_capture
 from medcat.cdb import CDB
 from medcat.vocab import Vocab
 from medcat.cat import CAT
@@ -93,11 +93,12 @@ class StateSavedOnDiskTests(StateSavedTests):
 
 class StateWithTrainingTests(StateTests):
     SUPERVISED_TRAINING_JSON = os.path.join(os.path.dirname(__file__), "..", "resources", "medcat_trainer_export.json")
+    use_journal = False
 
     @classmethod
     def setUpClass(cls) -> None:
         super().setUpClass()
-        with captured_state_cdb(cls.cdb):
+        with captured_state_cdb(cls.cdb, use_journal=cls.use_journal):
             # do training
             cls.undertest.train_supervised_from_json(cls.SUPERVISED_TRAINING_JSON)
             cls.after_train_state = copy_cdb_state(cls.cdb)
@@ -111,3 +112,72 @@ class StateRestoredAfterTrain(StateWithTrainingTests):
 
     def test_restored_state_same(self):
         self.assertDictEqual(self.initial_state, self.restored_state)
+
+
+class StateRestoredAfterTrainWithJournal(StateRestoredAfterTrain):
+    use_journal = True
+
+
+class StateJournalTests(StateTests):
+    CUI = 'C0000039'
+
+    def setUp(self) -> None:
+        self.addCleanup(setattr, self.cdb, '_state_journals', [])
+
+    def assert_restored(self):
+        self.assertDictEqual(self.initial_state, copy_cdb_state(self.cdb))
+
+    def test_journal_records_changes(self):
+        with journaled_state_capture(self.cdb) as journal:
+            self.cdb.add_names(self.CUI, {'journaled~name': {'tokens': ['journaled', 'name'], 'is_upper': False,
+                                                             'snames': {'journaled', 'journaled~name'},
+                                                             'raw_name': 'journaled name'}})
+            self.assertGreater(len(journal), 0)
+            self.assertIn('journaled~name', self.cdb.name2cuis)
+        self.assert_restored()
+
+    def test_removed_names_restored(self):
+        names = list(self.cdb.cui2names[self.CUI])
+        with captured_state_cdb(self.cdb, use_journal=True):
+            self.cdb._remove_names(self.CUI, names)
+        self.assert_restored()
+
+    def test_removed_cui_restored(self):
+        with captured_state_cdb(self.cdb, use_journal=True):
+            self.cdb.remove_cui(self.CUI)
+            self.assertNotIn(self.CUI, self.cdb.cui2names)
+        self.assert_restored()
+
+    def test_direct_changes_restored(self):
+        with captured_state_cdb(self.cdb, use_journal=True):
+            self.cdb.record_change('cui2count_train', [self.CUI])
+            self.cdb.cui2count_train[self.CUI] = 1234
+            self.cdb.mark_dirty('cui2count_train')
+        self.assert_restored()
+
+    def test_bulk_changes_restored(self):
+        with captured_state_cdb(self.cdb, use_journal=True):
+            self.cdb.reset_cui_count(5)
+            self.cdb.filter_by_cui([self.CUI])
+            self.cdb.reset_training()
+        self.assert_restored()
+
+    def test_nested_journals(self):
+        with journaled_state_capture(self.cdb) as outer:
+            self.cdb.remove_cui(self.CUI)
+            after_outer = copy_cdb_state(self.cdb)
+            with journaled_state_capture(self.cdb):
+                self.cdb.reset_training()
+            self.assertDictEqual(after_outer, copy_cdb_state(self.cdb))
+            self.assertGreater(len(outer), 0)
+        self.assert_restored()
+
+    def test_journal_removed_after_exit(self):
+        with captured_state_cdb(self.cdb, use_journal=True):
+            self.assertEqual(len(self.cdb._state_journals), 1)
+        self.assertEqual(len(self.cdb._state_journals), 0)
+
+    def test_journal_and_disk_fail(self):
+        with self.assertRaises(ValueError):
+            with captured_state_cdb(self.cdb, save_state_to_disk=True, use_journal=True):
+                pass
@@ -0,0 +1,168 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from medcat.utils.compact_maps import (StringTable, CompactDict, CompactMultiDict, CompactStatusDict,
+                                       CompactScalarDict, CompactSet)
+
+
+class StringTableTests(unittest.TestCase):
+
+    def test_ids(self):
+        table = StringTable(['a', 'b', 'c'])
+        self.assertEqual(table.ids['c'], 2)
+
+    def test_pickle_rebuilds_ids(self):
+        table = pickle.loads(pickle.dumps(StringTable(['a', 'b'])))
+        self.assertEqual(table.ids, {'a': 0, 'b': 1})
+
+
+class CompactDictTests(unittest.TestCase):
+
+    def test_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CompactDict(StringTable(['n1']), np.array([0], dtype=np.int32))
+
+
+class CompactMultiDictTests(unittest.TestCase):
+    original = {'n1': ['C1', 'C2'], 'n3': ['C2'], 'n2': []}
+
+    def setUp(self) -> None:
+        names = StringTable(['n1', 'n2', 'n3', 'n4'])
+        cuis = StringTable(['C1', 'C2'])
+        self.d = CompactMultiDict(names, np.array([0, 2, 1], dtype=np.int32), cuis,
+                                  np.array([0, 2, 3, 3]), np.array([0, 1, 1], dtype=np.int32), list)
+
+    def test_equal(self):
+        self.assertEqual(self.d, self.original)
+        self.assertEqual(list(self.d.thawed_items()), list(self.original.items()))
+
+    def test_values_immutable(self):
+        self.assertEqual(self.d['n1'], ('C1', 'C2'))
+        self.assertEqual(list(self.d.values()), [('C1', 'C2'), ('C2', ), ()])
+
+    def test_contains(self):
+        self.assertIn('n2', self.d)
+        self.assertNotIn('n4', self.d)
+        self.assertNotIn('n5', self.d)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.d.get('n4'))
+        with self.assertRaises(KeyError):
+            self.d['n5']
+
+    def test_change_in_place_fails(self):
+        with self.assertRaises(AttributeError):
+            self.d['n1'].append('C3')
+        self.assertEqual(self.d, self.original)
+
+    def test_set_value_persists(self):
+        self.d['n1'] = list(self.d['n1']) + ['C3']
+        self.assertEqual(self.d['n1'], ('C1', 'C2', 'C3'))
+        self.assertEqual(list(self.d), list(self.original))
+
+    def test_set_value_immutable(self):
+        self.d['n4'] = ['C1']
+        with self.assertRaises(AttributeError):
+            self.d['n4'].append('C2')
+        self.assertEqual(self.d.to_dict()['n4'], ['C1'])
+
+    def test_lookups_keep_no_values(self):
+        for _ in range(1000):
+            for name in self.original:
+                self.d[name]
+                self.d.get(name)
+        self.assertEqual(self.d._overlay, {})
+
+    def test_change_through_thawed_items_does_not_persist(self):
+        for _, cuis in self.d.thawed_items():
+            cuis.append('C3')
+        self.assertEqual(self.d, self.original)
+
+    def test_set_and_delete(self):
+        expected = dict(self.original)
+        for d in (self.d, expected):
+            d['n4'] = ['C1']
+            d['n1'] = ['C2']
+            del d['n3']
+        self.assertEqual(list(self.d.thawed_items()), list(expected.items()))
+        self.assertEqual(len(self.d), len(expected))
+
+    def test_delete_and_add_back_goes_last(self):
+        expected = dict(self.original)
+        for d in (self.d, expected):
+            del d['n1']
+            d['n1'] = ['C1']
+        self.assertEqual(list(self.d), list(expected))
+
+    def test_pop_and_clear(self):
+        self.assertEqual(self.d.pop('n3'), ('C2', ))
+        self.assertEqual(self.d.pop('n3', None), None)
+        self.d.clear()
+        self.assertEqual(len(self.d), 0)
+        self.assertEqual(dict(self.d), {})
+
+    def test_pickle(self):
+        self.d['n4'] = ['C1']
+        self.assertEqual(pickle.loads(pickle.dumps(self.d)), self.d)
+
+
+class CompactStatusDictTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        names = StringTable(['n1', 'n2'])
+        cuis = StringTable(['C1', 'C2'])
+        statuses = StringTable(['A', 'P'])
+        self.d = CompactStatusDict(names, np.array([1, 0], dtype=np.int32), cuis, np.array([0, 1, 3]),
+                                   np.array([0, 0, 1], dtype=np.int32), statuses,
+                                   np.array([1, 0, 0], dtype=np.int32))
+
+    def test_equal(self):
+        self.assertEqual(self.d, {'n2': {'C1': 'P'}, 'n1': {'C1': 'A', 'C2': 'A'}})
+
+    def test_change_status_in_place_fails(self):
+        with self.assertRaises(TypeError):
+            self.d['n2']['C1'] = 'PD'
+        self.assertEqual(self.d['n2'], {'C1': 'P'})
+
+    def test_set_status_persists(self):
+        self.d['n2'] = {**self.d['n2'], 'C1': 'PD'}
+        self.assertEqual(self.d['n2'], {'C1': 'PD'})
+
+    def test_pickle(self):
+        self.d['n2'] = {'C1': 'PD'}
+        self.assertEqual(pickle.loads(pickle.dumps(self.d)), self.d)
+
+
+class CompactScalarDictTests(unittest.TestCase):
+
+    def test_values_are_python_types(self):
+        d = CompactScalarDict(StringTable(['a', 'b']), np.array([0, 1], dtype=np.int32),
+                              np.array([True, False]))
+        self.assertIs(d['a'], True)
+        self.assertEqual(d, {'a': True, 'b': False})
+
+
+class CompactSetTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.s = CompactSet(StringTable(['a', 'b', 'c']), np.array([0, 2], dtype=np.int32))
+
+    def test_equal(self):
+        self.assertEqual(self.s, {'a', 'c'})
+        self.assertEqual(len(self.s), 2)
+
+    def test_add_discard(self):
+        self.s.update(['b', 'd'])
+        self.s.discard('a')
+        self.s.discard('e')
+        self.assertEqual(self.s, {'b', 'c', 'd'})
+        self.s.add('a')
+        self.assertEqual(self.s, {'a', 'b', 'c', 'd'})
+
+    def test_set_operations(self):
+        self.assertEqual(self.s | {'x'}, {'a', 'c', 'x'})
+        self.assertEqual(self.s.union({'x'}), {'a', 'c', 'x'})
+        self.s |= {'x'}
+        self.assertIn('x', self.s)
@@ -0,0 +1,112 @@
+import unittest
+
+import numpy as np
+
+from medcat.utils.context_matrix import ContextVectorMatrix
+from medcat.utils.matutils import unitvec
+
+
+class ContextVectorMatrixTests(unittest.TestCase):
+    CUIS = ['C1', 'C2', 'C3']
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(3)
+        self.vectors = [rng.random(4) for _ in self.CUIS]
+        self.vector = unitvec(rng.random(4))
+        self.matrix = ContextVectorMatrix()
+
+    def get_expected(self, vectors) -> list:
+        return [0 if vec is None else np.dot(unitvec(vec), self.vector) for vec in vectors]
+
+    def test_similarities(self):
+        got = self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(self.vectors))
+
+    def test_rows_added_lazily(self):
+        self.matrix.get_similarities(self.CUIS[:1], self.vectors[:1], self.vector)
+        self.assertEqual(len(self.matrix), 1)
+        self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        self.assertEqual(len(self.matrix), len(self.CUIS))
+
+    def test_no_vector_has_zero_similarity(self):
+        vectors = [self.vectors[0], None, self.vectors[2]]
+        got = self.matrix.get_similarities(self.CUIS, vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(vectors))
+
+    def test_replaced_vector_recalculated(self):
+        self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        self.vectors[1] = -self.vectors[1]
+        got = self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(self.vectors))
+
+    def test_zero_vector(self):
+        vectors = [np.zeros(4)] + self.vectors[1:]
+        got = self.matrix.get_similarities(self.CUIS, vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(vectors))
+
+    def test_many_cuis(self):
+        rng = np.random.default_rng(4)
+        cuis = [f"C{i}" for i in range(100)]
+        vectors = [rng.random(4) for _ in cuis]
+        got = self.matrix.get_similarities(cuis, vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(vectors))
+
+    def test_vector_size_change(self):
+        self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        vectors = [vec[:2] for vec in self.vectors]
+        vector = unitvec(self.vector[:2])
+        got = self.matrix.get_similarities(self.CUIS, vectors, vector)
+        np.testing.assert_allclose(got, [np.dot(unitvec(vec), vector) for vec in vectors])
+
+    def test_removed_row_reused(self):
+        self.matrix.get_similarities(self.CUIS, self.vectors, self.vector)
+        row = self.matrix.cui2row['C2']
+        self.matrix.remove('C2')
+        self.assertNotIn('C2', self.matrix.cui2row)
+        got = self.matrix.get_similarities(['C4'], self.vectors[1:2], self.vector)
+        self.assertEqual(self.matrix.cui2row['C4'], row)
+        np.testing.assert_allclose(got, self.get_expected(self.vectors[1:2]))
+
+    def test_stale_rows_reused(self):
+        rng = np.random.default_rng(4)
+        cuis = [f"C{i}" for i in range(16)]
+        self.matrix.get_similarities(cuis, [rng.random(4) for _ in cuis], self.vector)
+        # the vectors are no longer referenced (e.g the CUIs were removed)
+        new_cuis = [f"N{i}" for i in range(16)]
+        vectors = [rng.random(4) for _ in new_cuis]
+        got = self.matrix.get_similarities(new_cuis, vectors, self.vector)
+        self.assertEqual(self.matrix._matrix.shape[0], 16)
+        self.assertEqual(set(self.matrix.cui2row), set(new_cuis))
+        np.testing.assert_allclose(got, self.get_expected(vectors))
+
+    def test_compacted(self):
+        rng = np.random.default_rng(4)
+        cuis = [f"C{i}" for i in range(100)]
+        vectors = [rng.random(4) for _ in cuis]
+        self.matrix.get_similarities(cuis, vectors, self.vector)
+        for cui in cuis[10:]:
+            self.matrix.remove(cui)
+        self.assertLessEqual(self.matrix._matrix.shape[0], 32)
+        got = self.matrix.get_similarities(cuis[:10], vectors[:10], self.vector)
+        np.testing.assert_allclose(got, self.get_expected(vectors[:10]))
+
+    def test_keeps_precision(self):
+        vectors = [vec.astype(np.float32) for vec in self.vectors]
+        self.matrix.get_similarities(self.CUIS, vectors, self.vector)
+        self.assertEqual(self.matrix._matrix.dtype, np.float32)
+        self.vectors[0] = self.vectors[0] + 1e-12
+        vectors[0] = self.vectors[0]
+        got = self.matrix.get_similarities(self.CUIS, vectors, self.vector)
+        self.assertEqual(self.matrix._matrix.dtype, np.float64)
+        np.testing.assert_allclose(got[0], self.get_expected(self.vectors[:1])[0], rtol=1e-15)
+
+    def test_compacted_while_adding(self):
+        rng = np.random.default_rng(4)
+        cuis = [f"C{i}" for i in range(64)]
+        vectors = [rng.random(4) for _ in cuis]
+        self.matrix.get_similarities(cuis, vectors, self.vector)
+        # all but the last vector are no longer referenced
+        new_cuis = [cuis[-1]] + [f"N{i}" for i in range(40)]
+        vectors = vectors[-1:] + [rng.random(4) for _ in new_cuis[1:]]
+        got = self.matrix.get_similarities(new_cuis, vectors, self.vector)
+        np.testing.assert_allclose(got, self.get_expected(vectors))
@@ -0,0 +1,53 @@
+import os
+import unittest
+
+import spacy
+from spacy.tokens import Token
+
+from medcat.utils.doc_cache import DiskDocCache
+
+
+class DiskDocCacheTests(unittest.TestCase):
+    TEXTS = ["The patient has a fever.", "No fever today", "The patient has a fever."]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Token.set_extension('norm', default=None, force=True)
+        cls.nlp = spacy.blank("en")
+
+    def setUp(self) -> None:
+        self.cache = DiskDocCache(self.nlp.vocab)
+        self.addCleanup(self.cache.cleanup)
+        for text in self.TEXTS:
+            doc = self.nlp(text)
+            for token in doc:
+                token._.norm = token.lower_
+            self.cache[text] = doc
+
+    def test_has_unique_texts(self):
+        self.assertEqual(len(self.cache), len(set(self.TEXTS)))
+        self.assertEqual(set(self.cache), set(self.TEXTS))
+
+    def test_keeps_docs_on_disk(self):
+        self.assertEqual(len(os.listdir(self.cache._temp_dir.name)), len(set(self.TEXTS)))
+
+    def test_gets_same_doc(self):
+        for text in self.TEXTS:
+            with self.subTest(text):
+                doc = self.cache[text]
+                self.assertEqual(doc.text, text)
+                self.assertEqual([token._.norm for token in doc], [token.lower_ for token in doc])
+
+    def test_gets_new_doc_each_time(self):
+        self.assertIsNot(self.cache[self.TEXTS[0]], self.cache[self.TEXTS[0]])
+
+    def test_can_delete(self):
+        del self.cache[self.TEXTS[0]]
+        self.assertNotIn(self.TEXTS[0], self.cache)
+        self.assertEqual(len(os.listdir(self.cache._temp_dir.name)), len(set(self.TEXTS)) - 1)
+
+    def test_cleanup_removes_files(self):
+        folder = self.cache._temp_dir.name
+        self.cache.cleanup()
+        self.assertEqual(len(self.cache), 0)
+        self.assertFalse(os.path.exists(folder))
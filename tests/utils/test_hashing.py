@@ -4,10 +4,13 @@ import tempfile
 import unittest
 import unittest.mock
 
+import numpy as np
+
 from medcat.cat import CAT
 from medcat.cdb import CDB
 from medcat.vocab import Vocab
 from medcat.config import Config
+from medcat.utils.hasher import StreamingHasher
 
 
 class CDBHashingTests(unittest.TestCase):
@@ -32,6 +35,94 @@ class CDBHashingTests(unittest.TestCase):
         self.assertEqual(h, cdb._hash)
 
 
+class StreamingHasherTests(unittest.TestCase):
+
+    def get_hash(self, obj) -> str:
+        hasher = StreamingHasher()
+        hasher.update(obj)
+        return hasher.hexdigest()
+
+    def test_same_hash(self):
+        obj = {'a': [1, 2.5, None, True], 'b': ('x', {'y'}), 'c': np.arange(5, dtype=np.float32)}
+        self.assertEqual(self.get_hash(obj), self.get_hash(dict(obj)))
+
+    def test_set_order_does_not_matter(self):
+        self.assertEqual(self.get_hash({'a', 'b', 'c', 1}), self.get_hash({1, 'c', 'b', 'a'}))
+
+    def test_different_values_different_hash(self):
+        self.assertNotEqual(self.get_hash({'a': 1}), self.get_hash({'a': 2}))
+
+    def test_different_types_different_hash(self):
+        self.assertNotEqual(self.get_hash(['a']), self.get_hash(('a', )))
+        self.assertNotEqual(self.get_hash(1), self.get_hash('1'))
+
+    def test_arrays(self):
+        self.assertNotEqual(self.get_hash(np.zeros(3)), self.get_hash(np.zeros(3, dtype=np.float32)))
+        self.assertNotEqual(self.get_hash(np.zeros(3)), self.get_hash(np.ones(3)))
+
+
+class CDBIncrementalHashingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cdb = CDB.load(os.path.join(os.path.dirname(
+            os.path.realpath(__file__)), "..", "..", "examples", "cdb.dat"))
+        self.cdb.get_hash(force_recalc=True)
+
+    def test_only_changed_fields_dirty(self):
+        cui = list(self.cdb.cui2names)[0]
+        self.cdb.update_context_vector(cui, {'long': np.ones(300)})
+        self.assertEqual({'cui2context_vectors', 'cui2count_train'}, self.cdb._dirty_fields)
+
+    def test_all_dirty_if_set(self):
+        self.cdb.is_dirty = True
+        self.assertIsNone(self.cdb._dirty_fields)
+
+    def test_incremental_hash_same_as_full(self):
+        cui = list(self.cdb.cui2names)[0]
+        orig_hash = self.cdb.get_hash()
+        self.cdb.update_context_vector(cui, {'long': np.ones(300)})
+        new_hash = self.cdb.get_hash()
+        self.assertNotEqual(orig_hash, new_hash)
+        self.assertEqual(new_hash, self.cdb.get_hash(force_recalc=True))
+
+    def test_incremental_hash_same_as_full_after_direct_change(self):
+        cui = list(self.cdb.cui2names)[0]
+        orig_hash = self.cdb.get_hash()
+        self.cdb.cui2preferred_name[cui] = 'new preferred name'
+        self.cdb.mark_dirty('cui2preferred_name')
+        new_hash = self.cdb.get_hash()
+        self.assertNotEqual(orig_hash, new_hash)
+        self.assertEqual(new_hash, self.cdb.get_hash(force_recalc=True))
+
+    def test_rehashes_only_changed_fields(self):
+        cui = list(self.cdb.cui2names)[0]
+        self.cdb.update_cui2average_confidence(cui, 0.5)
+        with unittest.mock.patch.object(StreamingHasher, 'update', autospec=True,
+                                        side_effect=StreamingHasher.update) as patch_method:
+            self.cdb.get_hash()
+        self.assertEqual(1, patch_method.call_count)
+
+    def test_incremental_hash_same_as_full_after_negative_training(self):
+        self.cdb.config.general.spacy_model = "blank:en"
+        cat = CAT(cdb=self.cdb, vocab=Vocab.load(os.path.join(os.path.dirname(
+            os.path.realpath(__file__)), "..", "..", "examples", "vocab.dat")))
+        orig_hash = self.cdb.get_hash()
+        doc = cat("The virus is here")
+        cat.add_and_train_concept('C0000039', 'virus', spacy_doc=doc, spacy_entity=doc[1:2],
+                                  negative=True, do_add_concept=False)
+        self.assertEqual(self.cdb.name2cuis2status['virus']['C0000039'], 'PD')
+        new_hash = self.cdb.get_hash()
+        self.assertNotEqual(orig_hash, new_hash)
+        self.assertEqual(new_hash, self.cdb.get_hash(force_recalc=True))
+
+    def test_field_hashes_saved(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_file = os.path.join(temp_dir, 'cdb.dat')
+            self.cdb.save(temp_file)
+            cdb = CDB.load(temp_file)
+        self.assertEqual(self.cdb._field_hashes, cdb._field_hashes)
+
+
 class CDBHashingWithConfigTests(unittest.TestCase):
     temp_dir = tempfile.TemporaryDirectory()
 
@@ -1,6 +1,8 @@
 from medcat.utils import memory_optimiser
+from medcat.utils import compact_maps
 
 import unittest
+import copy
 import tempfile
 import os
 import shutil
@@ -347,6 +349,116 @@ class OperationalTests(unittest.TestCase):
                 self.assertIs(cdb.cui2many, d.delegate)
 
 
+class CompactingTests(unittest.TestCase):
+    NAMES = ['name2cuis', 'name2cuis2status', 'cui2names', 'cui2snames', 'cui2type_ids',
+             'name_isupper', 'name2count_train', 'snames']
+
+    def setUp(self) -> None:
+        self.cdb = CDB.load(os.path.join(os.path.dirname(
+            os.path.realpath(__file__)), "..", "..", "examples", "cdb.dat"))
+        self.orig = {name: copy.deepcopy(getattr(self.cdb, name)) for name in self.NAMES}
+        self.orig_hash = self.cdb.get_hash(force_recalc=True)
+        memory_optimiser.perform_compaction(self.cdb)
+
+    def test_knows_compacted(self):
+        self.assertEqual(self.cdb._memory_optimised_parts, {compact_maps.COMPACT_PART})
+        self.assertIsInstance(self.cdb.name2cuis, compact_maps.CompactDict)
+        self.assertIsInstance(self.cdb.snames, compact_maps.CompactSet)
+
+    def test_same_contents(self):
+        for name in self.NAMES:
+            with self.subTest(name):
+                self.assertEqual(getattr(self.cdb, name), self.orig[name])
+
+    def test_same_hash(self):
+        self.assertEqual(self.cdb.get_hash(force_recalc=True), self.orig_hash)
+
+    def test_cannot_optimise_compacted(self):
+        with self.assertRaises(ValueError):
+            memory_optimiser.perform_optimisation(self.cdb)
+
+    def test_add_and_remove(self):
+        names = {'new~name': {'tokens': ['new', 'name'], 'snames': {'new', 'new~name'},
+                              'raw_name': 'new name', 'is_upper': False}}
+        self.cdb.add_names('C-NEW', names)
+        self.assertEqual(self.cdb.name2cuis['new~name'], ('C-NEW', ))
+        self.assertIn('new', self.cdb.snames)
+        self.cdb.remove_cui('C-NEW')
+        self.assertEqual(self.cdb.name2cuis['new~name'], ())
+        self.assertNotIn('C-NEW', self.cdb.cui2names)
+
+    def test_change_in_place_fails(self):
+        name = next(iter(self.orig['name2cuis']))
+        with self.assertRaises(AttributeError):
+            self.cdb.name2cuis[name].append('C-NEW')
+        self.assertEqual(self.cdb.name2cuis, self.orig['name2cuis'])
+
+    def test_remove_names(self):
+        name = next(name for name, cuis in self.orig['name2cuis'].items() if len(cuis) > 1)
+        cui = self.orig['name2cuis'][name][0]
+        self.cdb._remove_names(cui, [name])
+        self.assertNotIn(cui, self.cdb.name2cuis[name])
+        self.assertNotIn(cui, self.cdb.name2cuis2status[name])
+
+    def test_lookups_keep_no_values(self):
+        for _ in range(10):
+            for name in self.orig['name2cuis']:
+                for cui in self.cdb.name2cuis[name]:
+                    self.cdb.name2cuis2status[name][cui]
+                    self.cdb.cui2names[cui]
+                    self.cdb.cui2type_ids.get(cui)
+        for name in ('name2cuis', 'name2cuis2status', 'cui2names', 'cui2type_ids'):
+            with self.subTest(name):
+                self.assertEqual(getattr(self.cdb, name)._overlay, {})
+
+    def test_round_trip(self):
+        memory_optimiser.unoptimise_cdb(self.cdb)
+        self.assertFalse(self.cdb._memory_optimised_parts)
+        for name in self.NAMES:
+            with self.subTest(name):
+                self.assertIsInstance(getattr(self.cdb, name), type(self.orig[name]))
+                self.assertEqual(getattr(self.cdb, name), self.orig[name])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for kwargs in [{}, {'columnar': True}, {'json_path': temp_dir}]:
+                with self.subTest(str(kwargs)):
+                    path = os.path.join(temp_dir, 'cdb.dat')
+                    self.cdb.save(path, **kwargs)
+                    cdb = CDB.load(path, json_path=kwargs.get('json_path'))
+                    self.assertIsInstance(cdb.name2cuis, compact_maps.CompactDict)
+                    self.assertEqual(cdb.name2cuis2status, self.orig['name2cuis2status'])
+
+    def test_load_compact(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'cdb.dat')
+            for columnar in [False, True]:
+                with self.subTest(f'Columnar: {columnar}'):
+                    memory_optimiser.unoptimise_cdb(self.cdb)
+                    self.cdb.save(path, columnar=columnar)
+                    cdb = CDB.load(path, compact=True)
+                    self.assertIsInstance(cdb.cui2snames, compact_maps.CompactDict)
+                    self.assertEqual(cdb.cui2snames, self.orig['cui2snames'])
+
+
+class CompactOperationalTests(OperationalTests):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        memory_optimiser.unoptimise_cdb(cls.cdb)
+        memory_optimiser.perform_compaction(cls.cdb)
+
+    def test_optimised_cdb_has_cui2many(self):
+        self.assertFalse(hasattr(self.cdb, 'cui2many'))
+
+    def test_can_be_loaded_as_json(self):
+        self.test_can_be_saved_as_json()
+        cdb = CDB.load(self.temp_cdb_path, self.json_path)
+        self.assertEqual(cdb.name2cuis, self.cdb.name2cuis)
+        self.assertIsInstance(cdb.name2cuis, compact_maps.CompactDict)
+
+
 class DelegatingValueSetTests(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -0,0 +1,113 @@
+import unittest
+
+from medcat.cdb import CDB
+from medcat.config import Config
+from medcat.utils.name_trie import NameTrie, NO_NODE
+
+
+class NameTrieTests(unittest.TestCase):
+    SEP = '~'
+    SNAMES = {'virus', 'virus~k', 'virus~k~z', 'second', 'second~csv'}
+    NAMES = {'virus', 'virus~k~z', 'second~csv'}
+
+    def setUp(self) -> None:
+        self.trie = NameTrie.from_names(self.SEP, self.SNAMES, self.NAMES)
+
+    def walk(self, name: str) -> int:
+        node = self.trie.ROOT
+        for part in name.split(self.SEP):
+            node = self.trie.step(node, part)
+        return node
+
+    def test_snames_are_found(self):
+        for sname in self.SNAMES:
+            with self.subTest(sname):
+                self.assertTrue(self.trie.is_sname(self.walk(sname)))
+
+    def test_names_are_found(self):
+        for name in self.NAMES:
+            with self.subTest(name):
+                self.assertTrue(self.trie.is_name(self.walk(name)))
+
+    def test_non_names_are_not_names(self):
+        for sname in self.SNAMES - self.NAMES:
+            with self.subTest(sname):
+                self.assertFalse(self.trie.is_name(self.walk(sname)))
+
+    def test_unknown_is_no_node(self):
+        self.assertEqual(self.walk('virus~m'), NO_NODE)
+        self.assertEqual(self.walk('unknown'), NO_NODE)
+        self.assertFalse(self.trie.is_sname(NO_NODE))
+        self.assertFalse(self.trie.is_name(NO_NODE))
+
+    def test_step_from_no_node_stays_no_node(self):
+        self.assertEqual(self.trie.step(NO_NODE, 'virus'), NO_NODE)
+
+    def test_step_with_none_is_no_node(self):
+        self.assertEqual(self.trie.step(self.trie.ROOT, None), NO_NODE)
+
+    def test_step_with_separated_part(self):
+        node = self.trie.step(self.trie.step(self.trie.ROOT, 'virus'), 'k~z')
+        self.assertEqual(node, self.walk('virus~k~z'))
+
+    def test_get_name(self):
+        for sname in self.SNAMES:
+            with self.subTest(sname):
+                self.assertEqual(self.trie.get_name(self.walk(sname)), sname)
+
+    def test_get_name_no_node(self):
+        self.assertEqual(self.trie.get_name(NO_NODE), '')
+
+    def test_remove_name_keeps_sname(self):
+        self.trie.remove_name('virus')
+        node = self.walk('virus')
+        self.assertFalse(self.trie.is_name(node))
+        self.assertTrue(self.trie.is_sname(node))
+
+
+class CDBNameTrieTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cdb = CDB(config=Config())
+        self.cdb.add_names('C1', {'virus~k': {'tokens': ['virus', 'k'], 'snames': {'virus', 'virus~k'},
+                                              'raw_name': 'virus k', 'is_upper': False}})
+        self.trie = self.cdb.get_name_trie()
+
+    def walk(self, name: str) -> int:
+        return self.trie.step(self.trie.ROOT, name)
+
+    def test_trie_is_cached(self):
+        self.assertIs(self.cdb.get_name_trie(), self.trie)
+
+    def test_trie_has_names(self):
+        self.assertTrue(self.trie.is_name(self.walk('virus~k')))
+        self.assertFalse(self.trie.is_name(self.walk('virus')))
+
+    def test_trie_updated_upon_add(self):
+        self.cdb.add_names('C2', {'virus~m': {'tokens': ['virus', 'm'], 'snames': {'virus', 'virus~m'},
+                                              'raw_name': 'virus m', 'is_upper': False}})
+        self.assertIs(self.cdb.get_name_trie(), self.trie)
+        self.assertTrue(self.trie.is_name(self.walk('virus~m')))
+
+    def test_trie_updated_upon_remove(self):
+        self.cdb._remove_names('C1', ['virus~k'])
+        self.assertIs(self.cdb.get_name_trie(), self.trie)
+        self.assertFalse(self.trie.is_name(self.walk('virus~k')))
+
+    def test_trie_rebuilt_upon_direct_change(self):
+        self.cdb.name2cuis['virus'] = ['C1']
+        trie = self.cdb.get_name_trie()
+        self.assertIsNot(trie, self.trie)
+        self.assertTrue(trie.is_name(trie.step(trie.ROOT, 'virus')))
+
+    def test_trie_rebuilt_upon_remove_cui(self):
+        self.cdb.remove_cui('C1')
+        trie = self.cdb.get_name_trie()
+        self.assertIsNot(trie, self.trie)
+        self.assertFalse(trie.is_sname(trie.step(trie.ROOT, 'virus~k')))
+
+    def test_trie_does_not_change_hash(self):
+        cdb = CDB(config=Config())
+        cdb.add_names('C1', {'virus~k': {'tokens': ['virus', 'k'], 'snames': {'virus', 'virus~k'},
+                                         'raw_name': 'virus k', 'is_upper': False}})
+        self.assertEqual(cdb.calculate_hash(), self.cdb.calculate_hash())
@@ -1,5 +1,9 @@
 import unittest
+from unittest.mock import patch
 
+from spacy.tokens import Token
+
+from medcat.config import Config
 from medcat.utils import normalizers
 
 
@@ -69,3 +73,125 @@ class EditOrderTests(unittest.TestCase):
         all_edits1 = list(normalizers.get_all_edits_n(self.WORD, use_diacritics=False, n=1, return_ordered=True))
         ordered = sorted(all_edits1)
         self.assertEqual(all_edits1, ordered)
+
+
+class SymSpellIndexTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.index = normalizers.SymSpellIndex(max_distance=1)
+        self.index.add(['cancer', 'canter', 'dancer', 'fever'])
+
+    def test_lookup_finds_similar(self):
+        self.assertEqual(self.index.lookup('cancr'), {'cancer'})
+        self.assertEqual(self.index.lookup('ancer'), {'cancer', 'dancer'})
+
+    def test_lookup_with_long_words_uses_prefix(self):
+        self.index.add(['abcdefghij'])
+        self.assertIn('abcdefghij', self.index.lookup('abcdefgxyz'))
+
+    def test_counts_words(self):
+        self.assertEqual(self.index.nr_of_words, 4)
+
+
+class BasicSpellCheckerTests(unittest.TestCase):
+    VOCAB = {'cancer': 10, 'canter': 2, 'dancer': 3, 'fever': 5, 'diabetes': 8, 'mellitus': 4,
+             'kidney': 6, 'a-b': 1, 'ab1c': 1, 'crèche': 1, 'x': 1}
+    WORDS = ['cancr', 'cacner', 'ancer', 'cancers', 'canser', 'fevr', 'feverr', 'diabtes',
+             'diabeets', 'mellitis', 'melitis', 'kidny', 'kindey', 'a-bc', 'ab', 'b-a', 'abc1',
+             'creche', 'crche', 'y', '', 'cxncxr', 'cancerous', 'totallyunknown']
+
+    def setUp(self) -> None:
+        self.config = Config()
+
+    def assert_same_as_all_edits(self, deep: bool, diacritics: bool):
+        self.config.general.spell_check_deep = deep
+        self.config.general.diacritics = diacritics
+        spell_checker = normalizers.BasicSpellChecker(dict(self.VOCAB), self.config)
+        for word in self.WORDS:
+            with self.subTest(word):
+                expected = (spell_checker.known([word]) or spell_checker.known(spell_checker.edits1(word)) or
+                            (deep and spell_checker.known(spell_checker.edits2(word))) or [word])
+                self.assertEqual(set(spell_checker.candidates(word)), set(expected))
+
+    def test_candidates_same_as_all_edits(self):
+        self.assert_same_as_all_edits(deep=False, diacritics=False)
+
+    def test_candidates_same_as_all_edits_diacritics(self):
+        self.assert_same_as_all_edits(deep=False, diacritics=True)
+
+    def test_candidates_same_as_all_edits_deep(self):
+        self.assert_same_as_all_edits(deep=True, diacritics=False)
+
+    def test_fix(self):
+        spell_checker = normalizers.BasicSpellChecker(dict(self.VOCAB), self.config)
+        self.assertEqual(spell_checker.fix('cancr'), 'cancer')
+        self.assertEqual(spell_checker.fix('ancer'), 'cancer')
+        self.assertIsNone(spell_checker.fix('cancer'))
+        self.assertIsNone(spell_checker.fix('totallyunknown'))
+
+    def test_candidates_are_cached(self):
+        spell_checker = normalizers.BasicSpellChecker(dict(self.VOCAB), self.config)
+        spell_checker.fix('cancr')
+        with patch.object(spell_checker, 'candidates') as candidates:
+            self.assertEqual(spell_checker.fix('cancr'), 'cancer')
+        candidates.assert_not_called()
+
+    def test_fix_after_vocab_changes(self):
+        vocab = dict(self.VOCAB)
+        spell_checker = normalizers.BasicSpellChecker(vocab, self.config)
+        self.assertIsNone(spell_checker.fix('totallyunknowns'))
+        vocab['totallyunknown'] = 1
+        self.assertEqual(spell_checker.fix('totallyunknowns'), 'totallyunknown')
+
+    def test_fix_after_counts_change(self):
+        vocab = dict(self.VOCAB)
+        spell_checker = normalizers.BasicSpellChecker(vocab, self.config)
+        self.assertEqual(spell_checker.fix('ancer'), 'cancer')
+        vocab['dancer'] += 10
+        self.assertEqual(spell_checker.fix('ancer'), 'dancer')
+
+    def test_fix_after_changing_to_deep(self):
+        spell_checker = normalizers.BasicSpellChecker(dict(self.VOCAB), self.config)
+        self.assertIsNone(spell_checker.fix('melitis'))
+        self.config.general.spell_check_deep = True
+        self.assertEqual(spell_checker.fix('melitis'), 'mellitus')
+
+
+class TokenNormalizerTests(unittest.TestCase):
+    # text, tag, lemma
+    TOKENS = [('Patients', 'NNS', 'Patient'), ('had', 'VBD', 'have'), ('It', 'PRP', '-PRON-'),
+              ('Kidneys', 'NNS', 'Kidney'), ('had', 'VBD', 'have'), ('Kidneys', 'NN', 'Kidneys'), ('is', 'VBZ', 'be')]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Token.set_extension('to_skip', default=False, force=True)
+        Token.set_extension('is_punct', default=False, force=True)
+        Token.set_extension('norm', default=None, force=True)
+
+    def setUp(self) -> None:
+        self.config = Config()
+        self.config.general.spacy_model = "blank:en"
+        self.config.general.spell_check = False
+        self.normalizer = normalizers.TokenNormalizer(self.config)
+
+    def get_norms(self) -> list:
+        doc = self.normalizer.nlp.make_doc(' '.join(text for text, _, _ in self.TOKENS))
+        for token, (_, tag, lemma) in zip(doc, self.TOKENS):
+            token.tag_ = tag
+            token.lemma_ = lemma
+        return [(token._.norm, token._.to_skip) for token in self.normalizer(doc)]
+
+    def test_norms(self):
+        self.assertEqual(self.get_norms(), [('patient', False), ('had', False), ('it', False), ('kidney', False),
+                                            ('had', False), ('kidneys', False), ('is', False)])
+
+    def test_same_norms_when_memoised(self):
+        norms = self.get_norms()
+        self.assertEqual(self.get_norms(), norms)
+
+    def test_config_change_applies(self):
+        self.get_norms()
+        self.config.preprocessing.min_len_normalize = 2
+        self.config.preprocessing.do_not_normalize = set()
+        self.assertEqual(self.get_norms(), [('patient', False), ('have', False), ('-PRON-', True), ('kidney', False),
+                                            ('have', False), ('kidneys', False), ('be', False)])
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from medcat.cdb import CDB
+from medcat.utils.parallel_training import TrainingTracker, merge_training_deltas
+
+
+class TrainingTrackerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cdb = CDB()
+        self.cdb.update_context_vector('C1', {'long': np.ones(3)})
+        self.cdb.update_context_vector('C2', {'long': np.ones(3)})
+        self.cdb.name2count_train['n1'] = 1
+
+    def test_tracks_changes_within_context(self):
+        with TrainingTracker(self.cdb) as tracker:
+            self.cdb.update_context_vector('C1', {'long': np.array([1., 0, 0])})
+            self.cdb.update_context_vector('C1', {'long': np.array([1., 0, 0])}, negative=True)
+            self.cdb.update_context_vector('C3', {'long': np.array([0, 1., 0])})
+            self.cdb.name2count_train['n1'] += 2
+            self.cdb.name2count_train['n3'] = 1
+        self.cdb.update_context_vector('C2', {'long': np.zeros(3)})
+        delta = tracker.get_delta()
+        self.assertEqual(delta['cui2count_train'], {'C1': 1, 'C3': 1})
+        self.assertEqual(set(delta['cui2context_vectors']), {'C1', 'C3'})
+        np.testing.assert_array_equal(delta['cui2context_vectors']['C1']['long'],
+                                      self.cdb.cui2context_vectors['C1']['long'])
+        self.assertEqual(delta['name2count_train'], {'n1': 2, 'n3': 1})
+
+    def test_detaches_from_cdb(self):
+        with TrainingTracker(self.cdb):
+            pass
+        self.assertEqual(self.cdb._state_journals, [])
+
+
+class MergeTrainingDeltasTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cdb = CDB()
+        self.cdb.update_context_vector('C1', {'long': np.zeros(2)})
+        self.cdb.cui2average_confidence['C1'] = 0.5
+        self.cdb.name2count_train['n1'] = 1
+
+    def get_delta(self, vector: list, count: int, confidence: float = 0.5) -> dict:
+        return {
+            'cui2context_vectors': {'C1': {'long': np.array(vector)}},
+            'cui2count_train': {'C1': count},
+            'cui2average_confidence': {'C1': confidence},
+            'name2count_train': {'n1': count},
+        }
+
+    def test_adds_up_counts(self):
+        merge_training_deltas(self.cdb, [self.get_delta([1., 0], 1), self.get_delta([0, 1.], 3)])
+        self.assertEqual(self.cdb.cui2count_train['C1'], 5)
+        self.assertEqual(self.cdb.name2count_train['n1'], 5)
+
+    def test_weighs_vectors_by_counts(self):
+        merge_training_deltas(self.cdb, [self.get_delta([1., 0], 1), self.get_delta([0, 1.], 3)])
+        np.testing.assert_array_almost_equal(self.cdb.cui2context_vectors['C1']['long'], [0.25, 0.75])
+
+    def test_weighs_vectors_equally_without_positive_examples(self):
+        merge_training_deltas(self.cdb, [self.get_delta([1., 0], 0), self.get_delta([0, 1.], 0)])
+        np.testing.assert_array_almost_equal(self.cdb.cui2context_vectors['C1']['long'], [0.5, 0.5])
+        self.assertEqual(self.cdb.cui2count_train['C1'], 1)
+
+    def test_averages_confidence_over_examples(self):
+        # 1 original example with 0.5, 1 new one with 1.0 and 2 new ones with 0.0
+        merge_training_deltas(self.cdb, [self.get_delta([1., 0], 1, confidence=0.75),
+                                         self.get_delta([0, 1.], 2, confidence=0.5 / 3)])
+        self.assertAlmostEqual(self.cdb.cui2average_confidence['C1'], 1.5 / 4)
+
+    def test_adds_new_cuis(self):
+        delta = self.get_delta([1., 1.], 2)
+        delta['cui2context_vectors'] = {'C2': {'long': np.ones(2)}, 'C3': {}}
+        delta['cui2count_train'] = {'C2': 2, 'C3': 1}
+        merge_training_deltas(self.cdb, [delta])
+        self.assertEqual(self.cdb.cui2count_train['C2'], 2)
+        self.assertEqual(self.cdb.cui2context_vectors['C3'], {})
+        np.testing.assert_array_equal(self.cdb.cui2context_vectors['C2']['long'], np.ones(2))
@@ -0,0 +1,70 @@
+import unittest
+
+import spacy
+from spacy.tokens import Doc, Span
+
+from medcat.utils.postprocessing import create_main_ann, make_pretty_labels, LabelStyle
+
+
+class FakeCDB:
+
+    def get_name(self, cui: str) -> str:
+        return 'name of ' + cui
+
+
+class PostprocessingTests(unittest.TestCase):
+    TEXT = 'the patient has chronic kidney disease and diabetes'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        Doc.set_extension('ents', default=[], force=True)
+        Span.set_extension('cui', default=-1, force=True)
+        Span.set_extension('context_similarity', default=-1, force=True)
+        Span.set_extension('meta_anns', default=None, force=True)
+        cls.nlp = spacy.blank('en')
+        cls.cdb = FakeCDB()
+
+    def setUp(self) -> None:
+        self.doc = self.nlp(self.TEXT)
+        # (start, end, cui) - by token index
+        for start, end, cui in [(4, 5, 'C1'), (3, 6, 'C2'), (5, 6, 'C3'), (7, 8, 'C4'), (1, 2, 'C5'), (0, 2, 'C6')]:
+            ent = Span(self.doc, start, end, label='concept')
+            ent._.cui = cui
+            ent._.context_similarity = 0.5
+            ent._.meta_anns = {'Status': cui}
+            self.doc._.ents.append(ent)
+
+    def test_main_ann_keeps_longest(self):
+        create_main_ann(self.cdb, self.doc)
+        self.assertEqual(['C6', 'C2', 'C4'], [ent._.cui for ent in self.doc.ents])
+
+    def test_main_ann_sorts_all_ents(self):
+        create_main_ann(self.cdb, self.doc)
+        lengths = [len(ent.text) for ent in self.doc._.ents]
+        self.assertEqual(sorted(lengths, reverse=True), lengths)
+
+    def test_main_ann_no_overlap(self):
+        create_main_ann(self.cdb, self.doc)
+        tokens = [tkn.i for ent in self.doc.ents for tkn in ent]
+        self.assertEqual(len(set(tokens)), len(tokens))
+
+    def test_pretty_labels_default(self):
+        create_main_ann(self.cdb, self.doc)
+        make_pretty_labels(self.cdb, self.doc)
+        self.assertEqual(['concept'] * 3, [ent.label_ for ent in self.doc.ents])
+
+    def test_pretty_labels_short(self):
+        create_main_ann(self.cdb, self.doc)
+        make_pretty_labels(self.cdb, self.doc, LabelStyle.short)
+        self.assertEqual(['C6', 'C2', 'C4'], [ent.label_ for ent in self.doc.ents])
+
+    def test_pretty_labels_long(self):
+        create_main_ann(self.cdb, self.doc)
+        make_pretty_labels(self.cdb, self.doc, LabelStyle.long)
+        self.assertEqual('C2 | name of C2 | 0.50', self.doc.ents[1].label_)
+
+    def test_pretty_labels_keep_extensions(self):
+        create_main_ann(self.cdb, self.doc)
+        make_pretty_labels(self.cdb, self.doc, LabelStyle.short)
+        self.assertEqual([{'Status': 'C6'}, {'Status': 'C2'}, {'Status': 'C4'}],
+                         [ent._.meta_anns for ent in self.doc.ents])
@@ -0,0 +1,79 @@
+import os
+import signal
+import time
+import unittest
+
+from medcat.utils.worker_pool import WorkerPool
+
+
+KILL = [-1]
+STOP = [-2]
+
+
+def _double(in_q, out_q, pid: int, stopping_pid: int = -1) -> None:
+    stopping = False
+    while not stopping:
+        data = in_q.get()
+        if data is None:
+            break
+        batch_nr, batch = data
+        if batch == KILL:
+            # make sure the previous results are sent
+            time.sleep(0.5)
+            os.kill(os.getpid(), signal.SIGKILL)
+        # stop after the batch (e.g because there's not enough memory)
+        stopping = batch == STOP and pid == stopping_pid
+        out_q.put((batch_nr, [2 * value for value in batch]))
+
+
+class WorkerPoolTests(unittest.TestCase):
+    NPROC = 2
+
+    def setUp(self) -> None:
+        self.pool = WorkerPool(_double, self.NPROC, stopping_pid=0)
+        self.addCleanup(self.pool.stop)
+        self.pool.start()
+
+    def get_results(self, batches: list) -> dict:
+        for batch_nr, batch in enumerate(batches):
+            self.pool.put(batch_nr, batch)
+        results = {}
+        while self.pool.nr_in_flight:
+            batch_nr, result = self.pool.get_result()
+            results[batch_nr] = result
+        return results
+
+    def test_gets_all_results(self):
+        batches = [[nr, nr + 1] for nr in range(10)]
+        self.assertEqual(self.get_results(batches),
+                         {nr: [2 * nr, 2 * nr + 2] for nr in range(10)})
+
+    def test_batch_lost_if_worker_killed(self):
+        batches = [[nr] for nr in range(10)]
+        batches[3] = KILL
+        expected = {nr: [2 * nr] for nr in range(10)}
+        expected[3] = None
+        self.assertEqual(self.get_results(batches), expected)
+        self.assertTrue(self.pool.is_running)
+
+    def test_all_lost_if_all_workers_killed(self):
+        self.assertEqual(self.get_results([KILL] * self.NPROC + [[1], [2]]),
+                         {nr: None for nr in range(self.NPROC + 2)})
+        self.assertFalse(self.pool.is_running)
+
+    def test_batches_given_to_others_if_worker_stops(self):
+        batches = [[nr] for nr in range(10)]
+        batches[0] = STOP
+        expected = {nr: [2 * nr] for nr in range(10)}
+        expected[0] = [-4]
+        self.assertEqual(self.get_results(batches), expected)
+        self.assertEqual(sum(p is not None and p.is_alive() for p in self.pool.procs), self.NPROC - 1)
+
+    def test_restarts_workers(self):
+        self.get_results([KILL])
+        self.pool.start()
+        self.assertEqual(self.get_results([[1]]), {0: [2]})
+
+    def test_no_result_without_batches(self):
+        with self.assertRaises(ValueError):
+            self.pool.get_result()